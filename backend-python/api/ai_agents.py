@@ -15,14 +15,17 @@ import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, Depends, status, Header
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field, validator
-from py2neo import Graph
 
 from vault.storage import VaultStorage
 from vault.zk_proofs import ZKProofService
 from vault.share_links import ShareLinkService
 from api.security import verify_ai_agent_signature, get_current_user, rate_limit, sanitize_input
 from api.monitoring import log_ai_interaction
+from api.database import get_graph, read
+from api.share_bundles import ShareBundleService, attestation_lookup
+from blockchain.sdk.fabric_client import FabricClient
 
 # ML anomaly detection
 try:
@@ -42,14 +45,12 @@ AI_AGENT_SECRET = os.getenv("AI_AGENT_SECRET", os.urandom(32).hex())
 AI_AGENT_RATE_LIMIT = int(os.getenv("AI_AGENT_RATE_LIMIT", 100))  # requests per minute
 
 # Initialize services
-NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
-NEO4J_PASS = os.getenv("NEO4J_PASS", "test")
-
-graph = Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
 vault_storage = VaultStorage()
 zk_service = ZKProofService()
-share_link_service = ShareLinkService(graph)
+share_link_service = ShareLinkService(get_graph())
+share_bundle_service = ShareBundleService(
+    vault_storage, attestation_lookup(FabricClient(), get_graph())
+)
 
 
 # Request/Response Models
@@ -128,7 +129,7 @@ def verify_ai_request(request: AIAgentRequest, signature: Optional[str] = None)
     return verify_ai_agent_signature(payload_str, signature, AI_AGENT_SECRET)
 
 
-def lookup_document_by_hash(document_hash: str) -> Optional[Dict[str, Any]]:
+async def lookup_document_by_hash(document_hash: str) -> Optional[Dict[str, Any]]:
     """
     Reverse lookup a document by its hash.
 
@@ -152,7 +153,7 @@ def lookup_document_by_hash(document_hash: str) -> Optional[Dict[str, Any]]:
         LIMIT 1
         """
 
-        results = graph.run(query, {"hash": clean_hash}).data()
+        results = await read(query, {"hash": clean_hash})
 
         if results:
             return results[0]
@@ -307,6 +308,7 @@ async def ai_verify_proofs_batch(
     results = []
     total_verified = 0
     total_anomalous = 0
+    to_score = []  # (result position, proof) pairs for one detector pass
 
     for i, proof_req in enumerate(request.proofs):
         proof_start = datetime.utcnow()
@@ -335,35 +337,28 @@ async def ai_verify_proofs_batch(
             if verified:
                 total_verified += 1
 
-            # ML anomaly analysis
-            anomaly_result = None
-            if request.include_anomaly_score and ML_AVAILABLE:
-                try:
-                    detector = get_detector()
-                    anomaly_score = detector.analyze_proof(
-                        proof_data_parsed,
-                        agent_id=agent_request.agent_id,
-                        proof_type=proof_req.proof_type,
-                    )
-                    anomaly_result = anomaly_score.to_dict()
-                    if anomaly_score.is_anomalous:
-                        total_anomalous += 1
-                except Exception:
-                    pass
+            # Queue for batched ML anomaly analysis
+            to_score.append(
+                (
+                    len(results),
+                    {
+                        "proof_data": proof_data_parsed,
+                        "proof_type": proof_req.proof_type,
+                        "agent_id": agent_request.agent_id,
+                    },
+                )
+            )
 
             proof_duration = (datetime.utcnow() - proof_start).total_seconds()
 
-            result = {
-                "index": i,
-                "verified": verified,
-                "proof_type": proof_req.proof_type,
-                "verification_time_ms": round(proof_duration * 1000, 2),
-            }
-
-            if anomaly_result:
-                result["anomaly"] = anomaly_result
-
-            results.append(result)
+            results.append(
+                {
+                    "index": i,
+                    "verified": verified,
+                    "proof_type": proof_req.proof_type,
+                    "verification_time_ms": round(proof_duration * 1000, 2),
+                }
+            )
 
         except Exception as e:
             results.append(
@@ -375,6 +370,18 @@ async def ai_verify_proofs_batch(
                 }
             )
 
+    # ML anomaly analysis: one vectorized scoring pass for the whole batch
+    if request.include_anomaly_score and ML_AVAILABLE and to_score:
+        try:
+            detector = get_detector()
+            scores = detector.analyze_batch([proof for _, proof in to_score])
+            for (position, _), anomaly_score in zip(to_score, scores):
+                results[position]["anomaly"] = anomaly_score.to_dict()
+                if anomaly_score.is_anomalous:
+                    total_anomalous += 1
+        except Exception:
+            pass
+
     total_duration = (datetime.utcnow() - start_time).total_seconds()
 
     # Log batch interaction
@@ -433,7 +440,7 @@ async def ai_get_document_hash(
             }
         elif request.document_hash:
             # Reverse lookup by document hash via Neo4j
-            doc = lookup_document_by_hash(request.document_hash)
+            doc = await lookup_document_by_hash(request.document_hash)
             if not doc:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND, detail="Document with hash not found"
@@ -486,13 +493,16 @@ async def ai_create_share_link(
             "full": AccessLevel.FULL,
         }
 
-        proof_link = share_link_service.create_share_link(
+        # ShareLinkService still uses the blocking py2neo Graph
+        proof_link = await run_in_threadpool(
+            share_link_service.create_share_link,
             document_id=request.document_id,
             user_id=user_id,
             access_level=access_level_map.get(request.access_level, AccessLevel.PROOF_ONLY),
             expires_at=expires_at,
             proof_type=request.proof_type,
         )
+        share_bundle_service.warm(proof_link)
 
         log_ai_interaction(
             agent_id=agent_request.agent_id,
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import json
 import time
@@ -8,12 +9,21 @@ from fastapi.staticfiles import StaticFiles
 from starlette.middleware.base import BaseHTTPMiddleware
 from ariadne import QueryType, MutationType, make_executable_schema
 from ariadne.asgi import GraphQL
-from py2neo import Graph
 from sentence_transformers import SentenceTransformer
 from vector_index.faiss_index import FaissIndex
 
 # Import shared utilities (avoids circular imports)
 from api.utils import get_vkey_hash, vkeys_ready, load_vkey_hashes, get_artifacts_dir
+from api.database import close_driver, read, stream, verify_connectivity
+from blockchain.l2.merkle_batcher import close_merkle_batcher
+from blockchain.sdk.fabric_gateway import close_async_fabric_client
+from api.schema_migrations import migrate_on_startup
+from api.pagination import clamp_page_size, decode_cursor, encode_cursor, selected_fields
+from api.graphql_limits import (
+    PersistedQueryHTTPHandler,
+    graphql_validation_rules,
+    validate_with_cache,
+)
 
 # Import vault resolvers and routes
 from api.vault_resolvers import query as vault_query, mutation as vault_mutation
@@ -56,6 +66,13 @@ except ImportError:
     ALERTS_AVAILABLE = False
     get_alert_service = None
 
+try:
+    from ml.model_registry import start_model_watcher, stop_model_watcher
+
+    MODEL_REGISTRY_AVAILABLE = True
+except ImportError:
+    MODEL_REGISTRY_AVAILABLE = False
+
 # Import Prometheus metrics
 try:
     from api.prometheus import get_metrics_endpoint
@@ -66,9 +83,6 @@ except ImportError:
     get_metrics_endpoint = None
     print("Warning: prometheus_client not installed. Metrics disabled.")
 
-NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
-NEO4J_PASS = os.getenv("NEO4J_PASS", "test")
 _DEFAULT_ORIGIN = "http://localhost:5173"
 ALLOWED_ORIGINS = [
     o.strip() for o in os.getenv("ALLOWED_ORIGINS", _DEFAULT_ORIGIN).split(",") if o.strip()
@@ -83,7 +97,6 @@ RATE_LIMIT_MAX = int(os.getenv("RATE_LIMIT_MAX", "60"))  # per window per IP for
 _rate_bucket: dict[str, dict] = {}
 logger = logging.getLogger("security")
 
-graph = Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
 embed_model = SentenceTransformer("all-MiniLM-L6-v2")
 faiss = FaissIndex(index_path="faiss.index")
 
@@ -96,9 +109,9 @@ query = QueryType()
 
 
 @query.field("claim")
-def resolve_claim(_, info, id):
+async def resolve_claim(_, info, id):
     q = "MATCH (c:Claim {id:$id})<-[:REPORTS]-(s:Source) RETURN c, s LIMIT 1"
-    res = graph.run(q, id=id).data()
+    res = await read(q, {"id": id})
     if not res:
         raise HTTPException(status_code=404, detail="Claim not found")
     c = res[0]["c"]
@@ -115,18 +128,24 @@ def resolve_claim(_, info, id):
 
 
 @query.field("search")
-def resolve_search(_, info, query, topK=5):
+async def resolve_search(_, info, query, topK=5):
     vec = embed_model.encode(query)
     results = faiss.search(vec, top_k=topK)
+    # Fetch claim metadata for all hits in one round trip, preserving FAISS rank
+    q = """
+    UNWIND $ids AS id
+    MATCH (c:Claim {id: id})<-[:REPORTS]-(s:Source)
+    WITH id, head(collect({c: c, s: s})) AS row
+    RETURN id, row.c AS c, row.s AS s
+    """
+    rows = {row["id"]: row for row in await read(q, {"ids": [r["id"] for r in results]})}
     claims = []
     for r in results:
-        # fetch claim metadata from Neo4j
-        q = "MATCH (c:Claim {id:$id})<-[:REPORTS]-(s:Source) RETURN c, s LIMIT 1"
-        res = graph.run(q, id=r["id"]).data()
-        if not res:
+        row = rows.get(r["id"])
+        if not row:
             continue
-        c = res[0]["c"]
-        s = res[0]["s"]
+        c = row["c"]
+        s = row["s"]
         claims.append(
             {
                 "id": c["id"],
@@ -143,22 +162,48 @@ def resolve_search(_, info, query, topK=5):
 
 # App/Entity resolvers for Frontend Dashboard
 @query.field("apps")
-def resolve_apps(_, info):
-    """Get all apps/entities from Neo4j."""
-    q = """
+async def resolve_apps(_, info, first=None, after=None):
+    """
+    Get a page of apps/entities from Neo4j.
+
+    Keyset-paginated on App.id. Claims and reviews are only projected when the
+    client selects them, and rows are streamed from Neo4j as they arrive
+    rather than materialised with `.data()`.
+    """
+    limit = clamp_page_size(first)
+    try:
+        after_id = decode_cursor(after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    node_fields = selected_fields(info, "edges", "node")
+    projections = ["a"]
+    if "claims" in node_fields:
+        projections.append("[(a)-[:HAS_CLAIM]->(c:Claim) | c] AS claims")
+    if "reviews" in node_fields:
+        projections.append("[(a)-[:HAS_REVIEW]->(r:Review) | r] AS reviews")
+
+    # Separate predicates keep both first and later pages on the App.id index
+    # (an `$after IS NULL OR ...` disjunction plans as a label scan)
+    predicate = "a.id > $after" if after_id is not None else "a.id IS NOT NULL"
+    q = f"""
     MATCH (a:App)
-    OPTIONAL MATCH (a)-[:HAS_CLAIM]->(c:Claim)
-    OPTIONAL MATCH (a)-[:HAS_REVIEW]->(r:Review)
-    RETURN a, collect(DISTINCT c) as claims, collect(DISTINCT r) as reviews
+    WHERE {predicate}
+    WITH a ORDER BY a.id LIMIT $limit
+    RETURN {", ".join(projections)}
     """
-    results = graph.run(q).data()
-    apps = []
-    for record in results:
-        app_node = record["a"]
-        if not app_node:
-            continue
-        apps.append(
-            {
+    edges = []
+    has_next = False
+    # Fetch one extra row to learn whether another page exists
+    async with stream(q, {"after": after_id, "limit": limit + 1}) as records:
+        async for record in records:
+            if len(edges) == limit:
+                has_next = True
+                break
+            app_node = record["a"]
+            if not app_node:
+                continue
+            app = {
                 "id": app_node.get("id"),
                 "name": app_node.get("name", "Unknown"),
                 "whistlerScore": float(app_node.get("whistlerScore", 0)),
@@ -167,15 +212,26 @@ def resolve_apps(_, info):
                     "category": app_node.get("category"),
                     "description": app_node.get("description"),
                 },
-                "claims": [dict(c) for c in record.get("claims", []) if c],
-                "reviews": [dict(r) for r in record.get("reviews", []) if r],
+                "claims": [],
+                "reviews": [],
             }
-        )
-    return apps
+            if "claims" in node_fields:
+                app["claims"] = [dict(c) for c in record["claims"] or [] if c]
+            if "reviews" in node_fields:
+                app["reviews"] = [dict(r) for r in record["reviews"] or [] if r]
+            edges.append({"cursor": encode_cursor(app["id"]), "node": app})
+
+    return {
+        "edges": edges,
+        "pageInfo": {
+            "hasNextPage": has_next,
+            "endCursor": edges[-1]["cursor"] if edges else None,
+        },
+    }
 
 
 @query.field("app")
-def resolve_app(_, info, id):
+async def resolve_app(_, info, id):
     """Get a specific app by ID."""
     q = """
     MATCH (a:App {id: $id})
@@ -187,7 +243,7 @@ def resolve_app(_, info, id):
            collect(DISTINCT {claim: c, source: s, verdicts: collect(DISTINCT v)}) as claims,
            collect(DISTINCT r) as reviews
     """
-    results = graph.run(q, id=id).data()
+    results = await read(q, {"id": id})
     if not results or not results[0].get("a"):
         return None
 
@@ -243,14 +299,14 @@ def resolve_app(_, info, id):
 
 
 @query.field("scoreApp")
-def resolve_score_app(_, info, appId):
+async def resolve_score_app(_, info, appId):
     """Calculate and return app score breakdown."""
     q = """
     MATCH (a:App {id: $id})
     OPTIONAL MATCH (a)-[:HAS_SCORE]->(s:Score)
     RETURN a, s
     """
-    results = graph.run(q, id=appId).data()
+    results = await read(q, {"id": appId})
     if not results or not results[0].get("a"):
         return None
 
@@ -430,8 +486,19 @@ async def graphql_context_value(request: Request):
     }
 
 
-# Mount GraphQL endpoint with context-aware auth
-app.mount("/graphql", GraphQL(schema, debug=False, context_value=graphql_context_value))
+# Mount GraphQL endpoint with context-aware auth, query cost/depth limits
+# and a SHA-256 persisted query cache that skips parse/validate
+app.mount(
+    "/graphql",
+    GraphQL(
+        schema,
+        debug=False,
+        context_value=graphql_context_value,
+        http_handler=PersistedQueryHTTPHandler(),
+        query_validator=validate_with_cache,
+        validation_rules=graphql_validation_rules,
+    ),
+)
 
 # Mount vault REST routes
 app.include_router(vault_router)
@@ -490,6 +557,22 @@ async def startup_event():
     load_vkey_hashes()
     if not vkeys_ready():
         raise RuntimeError("Verification keys are not loaded; startup gating failed.")
+    await migrate_on_startup()
+    if MODEL_REGISTRY_AVAILABLE:
+        try:
+            start_model_watcher()
+        except Exception as e:
+            logger.error(f"Model registry watcher failed to start: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Anchor pending documents, then drain the shared Neo4j and Fabric connection pools."""
+    if MODEL_REGISTRY_AVAILABLE:
+        stop_model_watcher()
+    await asyncio.to_thread(close_merkle_batcher)
+    await close_async_fabric_client()
+    await close_driver()
 
 
 # Root endpoint
@@ -513,12 +596,7 @@ async def health_live():
 async def health_ready():
     """Readiness probe: checks vkeys and Neo4j connectivity."""
     vkeys_ok = vkeys_ready()
-    neo4j_ok = False
-    try:
-        graph.run("RETURN 1").evaluate()
-        neo4j_ok = True
-    except Exception:
-        neo4j_ok = False
+    neo4j_ok = await verify_connectivity()
     status_code = 200 if (vkeys_ok and neo4j_ok) else 503
     return Response(
         content=json.dumps(
@@ -536,27 +614,11 @@ async def health_ready():
 @app.get("/capabilities")
 async def capabilities():
     from api.utils import HMAC_SECRET
+    from zkp.artifact_manager import get_artifact_manager
 
     return {
         "service": "Truth Engine - Personal Proof Vault",
         "version": "1.0.0",
-        "proofs": [
-            {
-                "type": "age_proof",
-                "circuit": "age",
-                "public_inputs": ["minAgeOut", "referenceTsOut", "documentHashOut", "commitment"],
-                "endpoint": "/vault/share/{token}/bundle",
-                "vk": "/zkp/artifacts/age/verification_key.json",
-                "vk_sha256": get_vkey_hash("age"),
-            },
-            {
-                "type": "authenticity_proof",
-                "circuit": "authenticity",
-                "public_inputs": ["rootOut", "leafOut"],
-                "endpoint": "/vault/share/{token}/bundle",
-                "vk": "/zkp/artifacts/authenticity/verification_key.json",
-                "vk_sha256": get_vkey_hash("authenticity"),
-            },
-        ],
+        "proofs": get_artifact_manager().capabilities(),
         "hmac": bool(HMAC_SECRET),
     }
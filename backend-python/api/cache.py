@@ -1,16 +1,18 @@
 """
 High-performance caching layer for <0.2s response times.
 Uses in-memory cache with TTL, can be upgraded to Redis for distributed systems.
+Safe to call from threadpool and background threads; every access to the
+shared LRU holds one module lock.
 """
 
+import threading
 import time
 import hashlib
 import json
 import logging
-from typing import Any, Optional, Callable, Dict, Union
+from typing import Any, Optional, Callable, Dict, List, Union
 from functools import wraps
 from collections import OrderedDict
-from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +40,8 @@ class CacheEntry:
 _cache: OrderedDict[str, Union[Dict[str, Any], CacheEntry]] = OrderedDict()
 _cache_max_size = 10000
 _cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+# Guards _cache and _cache_stats; reentrant so helpers can nest
+_cache_lock = threading.RLock()
 
 
 def _make_key(*args, **kwargs) -> str:
@@ -62,25 +66,30 @@ def _evict_lru():
         _cache_stats["evictions"] += 1
 
 
-def get(key: str) -> Optional[Any]:
-    """Get value from cache."""
-    _evict_expired()
-
+def _lookup(key: str) -> Optional[Union[Dict[str, Any], CacheEntry]]:
+    """Entry for a key, or None if missing or expired; caller holds the lock."""
     entry = _cache.get(key)
     if entry is None:
         _cache_stats["misses"] += 1
-        # Record Prometheus metric
-        try:
-            from api.prometheus import metrics
-
-            metrics.record_cache_miss("lru_cache")
-        except Exception:
-            pass
         return None
-
     if isinstance(entry, CacheEntry) and entry.is_expired():
         _cache.pop(key, None)
         _cache_stats["misses"] += 1
+        return None
+    # Move to end (most recently used)
+    _cache.move_to_end(key)
+    _cache_stats["hits"] += 1
+    return entry
+
+
+def get(key: str) -> Optional[Any]:
+    """Get value from cache."""
+    with _cache_lock:
+        _evict_expired()
+        entry = _lookup(key)
+
+    if entry is None:
+        # Record Prometheus metric
         try:
             from api.prometheus import metrics
 
@@ -89,9 +98,6 @@ def get(key: str) -> Optional[Any]:
             pass
         return None
 
-    # Move to end (most recently used)
-    _cache.move_to_end(key)
-    _cache_stats["hits"] += 1
     # Record Prometheus metric
     try:
         from api.prometheus import metrics
@@ -102,53 +108,97 @@ def get(key: str) -> Optional[Any]:
     return entry.value if isinstance(entry, CacheEntry) else entry
 
 
+def get_many(keys: List[str]) -> Dict[str, Any]:
+    """Values for the cached keys among `keys`, with one expiry pass for the batch."""
+    found = {}
+    with _cache_lock:
+        _evict_expired()
+        for key in keys:
+            entry = _lookup(key)
+            if entry is not None:
+                found[key] = entry.value if isinstance(entry, CacheEntry) else entry
+    try:
+        from api.prometheus import metrics
+
+        for _ in range(len(found)):
+            metrics.record_cache_hit("lru_cache")
+        for _ in range(len(keys) - len(found)):
+            metrics.record_cache_miss("lru_cache")
+    except Exception:
+        pass
+    return found
+
+
+def set_many(items: Dict[str, Any], ttl: float = 300.0):
+    """Set several values with one TTL and one expiry pass."""
+    with _cache_lock:
+        _evict_expired()
+        for key, value in items.items():
+            _evict_lru()
+            _cache[key] = CacheEntry(value, ttl)
+            _cache.move_to_end(key)
+        size = len(_cache)
+
+    try:
+        from api.prometheus import metrics
+
+        metrics.update_cache_size(size)
+    except Exception:
+        pass
+
+
 def set(key: str, value: Any, ttl: float = 300.0):
     """Set value in cache with TTL."""
-    _evict_expired()
-    _evict_lru()
+    with _cache_lock:
+        _evict_expired()
+        _evict_lru()
 
-    _cache[key] = CacheEntry(value, ttl)
-    _cache.move_to_end(key)
+        _cache[key] = CacheEntry(value, ttl)
+        _cache.move_to_end(key)
+        size = len(_cache)
 
     # Update Prometheus metric
     try:
         from api.prometheus import metrics
 
-        metrics.update_cache_size(len(_cache))
+        metrics.update_cache_size(size)
     except Exception:
         pass
 
 
 def delete(key: str):
     """Delete key from cache."""
-    _cache.pop(key, None)
+    with _cache_lock:
+        _cache.pop(key, None)
 
 
 def clear():
     """Clear all cache entries."""
-    _cache.clear()
-    _cache_stats["hits"] = 0
-    _cache_stats["misses"] = 0
-    _cache_stats["evictions"] = 0
+    with _cache_lock:
+        _cache.clear()
+        _cache_stats["hits"] = 0
+        _cache_stats["misses"] = 0
+        _cache_stats["evictions"] = 0
 
 
 def get_stats() -> Dict[str, Any]:
     """Get cache statistics."""
-    _evict_expired()
-    hit_rate = (
-        _cache_stats["hits"] / (_cache_stats["hits"] + _cache_stats["misses"])
-        if (_cache_stats["hits"] + _cache_stats["misses"]) > 0
-        else 0
-    )
-
-    return {
-        "size": len(_cache),
-        "max_size": _cache_max_size,
-        "hits": _cache_stats["hits"],
-        "misses": _cache_stats["misses"],
-        "evictions": _cache_stats["evictions"],
-        "hit_rate": hit_rate,
-    }
+    with _cache_lock:
+        _evict_expired()
+        hit_rate = (
+            _cache_stats["hits"] / (_cache_stats["hits"] + _cache_stats["misses"])
+            if (_cache_stats["hits"] + _cache_stats["misses"]) > 0
+            else 0
+        )
+
+        return {
+            "size": len(_cache),
+            "max_size": _cache_max_size,
+            "hits": _cache_stats["hits"],
+            "misses": _cache_stats["misses"],
+            "evictions": _cache_stats["evictions"],
+            "hit_rate": hit_rate,
+        }
 
 
 def cached(ttl: float = 300.0, key_prefix: str = ""):
@@ -208,34 +258,15 @@ def load_vkey_from_disk(circuit: str) -> Optional[Dict[str, Any]]:
     if cached:
         return cached
 
-    vkey_path = (
-        Path(__file__).parent.parent / "zkp" / "artifacts" / circuit / "verification_key.json"
-    )
-    hash_path = (
-        Path(__file__).parent.parent / "zkp" / "artifacts" / circuit / "verification_key.sha256"
-    )
-
-    if not vkey_path.exists():
-        return None
-
     try:
-        with open(vkey_path, "r") as f:
-            vkey_data = json.load(f)
-
-        # Verify integrity if hash file exists
-        if hash_path.exists():
-            vkey_str = json.dumps(vkey_data, sort_keys=True)
-            computed_hash = hashlib.sha256(vkey_str.encode()).hexdigest()
+        from zkp.artifact_manager import get_artifact_manager, ArtifactIntegrityError
 
-            with open(hash_path, "r") as f:
-                expected_hash = f.read().strip()
-
-            if computed_hash != expected_hash:
-                logger.error(f"Verification key integrity check FAILED for {circuit}")
-                logger.error(f"Expected: {expected_hash}, Computed: {computed_hash}")
-                raise SecurityError(f"Verification key integrity check failed for {circuit}")
-
-            logger.debug(f"Verification key integrity verified for {circuit}")
+        try:
+            vkey_data = get_artifact_manager().vkey(circuit)
+        except ArtifactIntegrityError as e:
+            raise SecurityError(str(e)) from e
+        if vkey_data is None:
+            return None
 
         cache_verification_key(circuit, vkey_data)
         return vkey_data
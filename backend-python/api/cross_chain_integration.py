@@ -92,8 +92,8 @@ class CrossChainAnomalyIntegration:
             }
 
         try:
-            # 1. Run anomaly detection
-            anomaly_score = self.detector.analyze_proof(
+            # 1. Run anomaly detection (current global, so registry hot-swaps apply)
+            anomaly_score = get_detector().analyze_proof(
                 proof_data=proof_data,
                 agent_id=agent_id,
                 proof_type=proof_type,
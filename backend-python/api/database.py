@@ -1,14 +1,39 @@
 """
 Database connection singleton for Neo4j.
 Prevents multiple connection instantiation across modules.
+
+Two access paths share this module:
+
+- `get_driver()` / `read()` / `stream()` / `write()` / `get_session()`: the
+  official async `neo4j` driver with one pooled, routed connection pool per
+  process. Managed transactions (`execute_read` / `execute_write`) retry
+  transient errors, and the number of sessions holding a pooled connection
+  feeds the `active_connections` Prometheus gauge.
+- `get_graph()`: a single shared py2neo Graph kept for the synchronous vault
+  services and offline loaders that still use py2neo's Node/Relationship API.
+
+Migration status: API handlers, GraphQL resolvers and the claims consumer
+(ingestion/kafka_consumer.py) run on the async driver. The follow-up still
+to port is the synchronous vault service layer, which API handlers call via
+`run_in_threadpool`. Until it moves to `read()` / `write()`, an API process
+holds both pools. The modules still on py2neo, all through `get_graph()`:
+
+- vault/share_links.py, vault/timeline.py, vault/decisions.py,
+  vault/nullifier_storage.py, vault/write_behind.py, vault/anchoring.py
+- api/share_bundles.py and ingestion/vault_consumer.py, which hand them the graph
+- ml/training_pipeline.py (offline job)
+
+tests/test_database.py fails if any other module imports py2neo.
 """
 
 import os
 import logging
-from typing import Optional, TYPE_CHECKING
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, TYPE_CHECKING
 from functools import lru_cache
 
 if TYPE_CHECKING:
+    from neo4j import AsyncDriver, AsyncManagedTransaction, AsyncResult, AsyncSession
     from py2neo import Graph
 
 logger = logging.getLogger(__name__)
@@ -17,7 +42,17 @@ logger = logging.getLogger(__name__)
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASS = os.getenv("NEO4J_PASS", "test")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE") or None
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_POOL_ACQUIRE_TIMEOUT = float(os.getenv("NEO4J_POOL_ACQUIRE_TIMEOUT", "30"))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+NEO4J_MAX_RETRY_TIME = float(os.getenv("NEO4J_MAX_RETRY_TIME", "15"))
+
+READ_ACCESS = "READ"
+WRITE_ACCESS = "WRITE"
 
+_driver_instance: Optional["AsyncDriver"] = None
+_sessions_in_use = 0
 _graph_instance: Optional["Graph"] = None
 
 
@@ -62,3 +97,167 @@ def close_connection():
             logger.info("Neo4j connection closed")
         except Exception as e:
             logger.error(f"Error closing Neo4j connection: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Async driver (shared connection pool)
+# ---------------------------------------------------------------------------
+
+
+def get_driver() -> "AsyncDriver":
+    """
+    Get the process-wide async Neo4j driver.
+
+    Use a `neo4j://` URI to enable cluster routing; read sessions are then
+    sent to followers and write sessions to the leader.
+    """
+    global _driver_instance
+    if _driver_instance is None:
+        from neo4j import AsyncGraphDatabase
+
+        _driver_instance = AsyncGraphDatabase.driver(
+            NEO4J_URI,
+            auth=(NEO4J_USER, NEO4J_PASS),
+            max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+            connection_acquisition_timeout=NEO4J_POOL_ACQUIRE_TIMEOUT,
+            max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+            max_transaction_retry_time=NEO4J_MAX_RETRY_TIME,
+        )
+        logger.info(f"Neo4j async driver created: {NEO4J_URI} (pool size {NEO4J_MAX_POOL_SIZE})")
+    return _driver_instance
+
+
+def _track_session(delta: int) -> None:
+    """Update the in-use session count and the active_connections gauge."""
+    global _sessions_in_use
+    _sessions_in_use = max(0, _sessions_in_use + delta)
+    try:
+        from api.prometheus import metrics
+
+        metrics.set_active_connections(_sessions_in_use)
+    except Exception:
+        pass
+
+
+def sessions_in_use() -> int:
+    """Number of sessions currently holding a pooled connection."""
+    return _sessions_in_use
+
+
+@asynccontextmanager
+async def session(access_mode: str = WRITE_ACCESS) -> AsyncIterator["AsyncSession"]:
+    """Open a pooled session; the connection is returned to the pool on exit."""
+    neo4j_session = get_driver().session(database=NEO4J_DATABASE, default_access_mode=access_mode)
+    _track_session(1)
+    try:
+        yield neo4j_session
+    finally:
+        try:
+            await neo4j_session.close()
+        finally:
+            _track_session(-1)
+
+
+async def get_session() -> AsyncIterator["AsyncSession"]:
+    """FastAPI dependency yielding a write-routed session."""
+    async with session(WRITE_ACCESS) as neo4j_session:
+        yield neo4j_session
+
+
+async def get_read_session() -> AsyncIterator["AsyncSession"]:
+    """FastAPI dependency yielding a read-routed session."""
+    async with session(READ_ACCESS) as neo4j_session:
+        yield neo4j_session
+
+
+async def _fetch_all(
+    tx: "AsyncManagedTransaction", query: str, parameters: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    result = await tx.run(query, parameters)
+    return await result.data()
+
+
+async def read(
+    query: str,
+    parameters: Optional[Dict[str, Any]] = None,
+    *,
+    neo4j_session: Optional["AsyncSession"] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run a read query in a managed (retried) transaction.
+
+    Returns records as plain dicts; nodes are converted to property dicts.
+    Pass `neo4j_session` to reuse an injected session.
+    """
+    if neo4j_session is not None:
+        return await neo4j_session.execute_read(_fetch_all, query, parameters or {})
+    async with session(READ_ACCESS) as s:
+        return await s.execute_read(_fetch_all, query, parameters or {})
+
+
+@asynccontextmanager
+async def stream(
+    query: str, parameters: Optional[Dict[str, Any]] = None
+) -> AsyncIterator["AsyncResult"]:
+    """
+    Run a read query and yield its result for row-by-row iteration.
+
+    Records are pulled from the server as the caller iterates, so leaving the
+    block early discards the rest without materialising it. Unlike `read()`
+    this is an auto-commit transaction and is not retried.
+    """
+    async with session(READ_ACCESS) as s:
+        yield await s.run(query, parameters or {})
+
+
+async def write(
+    query: str,
+    parameters: Optional[Dict[str, Any]] = None,
+    *,
+    neo4j_session: Optional["AsyncSession"] = None,
+) -> List[Dict[str, Any]]:
+    """Run a write query in a managed (retried) transaction."""
+    if neo4j_session is not None:
+        return await neo4j_session.execute_write(_fetch_all, query, parameters or {})
+    async with session(WRITE_ACCESS) as s:
+        return await s.execute_write(_fetch_all, query, parameters or {})
+
+
+async def flush_user_writes(user_id: str) -> None:
+    """
+    Commit `user_id`'s queued write-behind mutations before a read.
+
+    Gives read-your-writes for nodes written through the py2neo write-behind
+    buffer (e.g. a Document right after upload). Runs in the threadpool; a
+    failed flush is logged and the mutations stay queued for the flusher.
+    """
+    from starlette.concurrency import run_in_threadpool
+    from vault.write_behind import get_write_behind
+
+    try:
+        await run_in_threadpool(get_write_behind(get_graph()).flush, user_id)
+    except Exception as e:
+        logger.warning(f"Write-behind flush before read failed for {user_id}: {e}")
+
+
+async def verify_connectivity() -> bool:
+    """Check that the async driver can reach Neo4j."""
+    try:
+        await get_driver().verify_connectivity()
+        return True
+    except Exception as e:
+        logger.error(f"Neo4j health check failed: {e}")
+        return False
+
+
+async def close_driver():
+    """Close the async driver and its connection pool (for graceful shutdown)."""
+    global _driver_instance
+    if _driver_instance is not None:
+        try:
+            await _driver_instance.close()
+            logger.info("Neo4j async driver closed")
+        except Exception as e:
+            logger.error(f"Error closing Neo4j async driver: {e}")
+        finally:
+            _driver_instance = None
@@ -0,0 +1,392 @@
+"""
+GraphQL query cost analysis, depth/alias limits and automatic persisted queries.
+
+- Static cost analysis uses Ariadne's cost validator with a cost map that
+  weights Neo4j-backed and FAISS-backed fields (multiplied by page sizes).
+- Depth and alias limits reject abusive nested or fan-out queries before
+  any resolver runs.
+- Persisted queries are cached by SHA-256 of the query text (Apollo APQ
+  protocol compatible). Cached documents skip parsing, and documents that
+  already passed validation only re-run the variable-dependent cost rule.
+
+Usage:
+    from api.graphql_limits import (
+        PersistedQueryHTTPHandler,
+        graphql_validation_rules,
+        validate_with_cache,
+    )
+
+    GraphQL(
+        schema,
+        http_handler=PersistedQueryHTTPHandler(),
+        query_validator=validate_with_cache,
+        validation_rules=graphql_validation_rules,
+    )
+"""
+
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Collection, Dict, List, Optional, Tuple, Type
+
+from ariadne.asgi.handlers import GraphQLHTTPHandler
+from ariadne.validation.query_cost import CostValidator
+from graphql import (
+    DocumentNode,
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLSchema,
+    InlineFragmentNode,
+    SelectionSetNode,
+    parse,
+    validate,
+)
+from graphql.validation import ASTValidationRule, ValidationContext
+
+logger = logging.getLogger(__name__)
+
+# Limits
+MAX_QUERY_COST = int(os.getenv("GRAPHQL_MAX_COST", "1000"))
+MAX_QUERY_DEPTH = int(os.getenv("GRAPHQL_MAX_DEPTH", "10"))
+MAX_QUERY_ALIASES = int(os.getenv("GRAPHQL_MAX_ALIASES", "15"))
+
+# Field weights
+NEO4J_FIELD_COST = int(os.getenv("GRAPHQL_NEO4J_FIELD_COST", "10"))
+FAISS_FIELD_COST = int(os.getenv("GRAPHQL_FAISS_FIELD_COST", "50"))
+
+# Persisted query cache
+PERSISTED_QUERY_CACHE_SIZE = int(os.getenv("GRAPHQL_PERSISTED_QUERY_CACHE_SIZE", "1000"))
+
+
+def build_cost_map(
+    neo4j_cost: int = NEO4J_FIELD_COST, faiss_cost: int = FAISS_FIELD_COST
+) -> Dict[str, Dict[str, Any]]:
+    """Build the per-field cost map for schema.graphql."""
+    return {
+        "Query": {
+            "apps": {"complexity": neo4j_cost, "multipliers": ["first"]},
+            "app": {"complexity": neo4j_cost},
+            "scoreApp": {"complexity": neo4j_cost},
+            "claim": {"complexity": neo4j_cost},
+            # Vector search plus one Neo4j lookup per hit
+            "search": {"complexity": faiss_cost + neo4j_cost, "multipliers": ["topK"]},
+            "myDocuments": {"complexity": neo4j_cost},
+            "document": {"complexity": neo4j_cost},
+            "myTimeline": {"complexity": neo4j_cost, "multipliers": ["limit"]},
+            "verifyShareLink": {"complexity": neo4j_cost},
+            "attestation": {"complexity": neo4j_cost},
+        },
+        "App": {
+            "claims": {"complexity": neo4j_cost},
+            "reviews": {"complexity": neo4j_cost},
+        },
+    }
+
+
+COST_MAP = build_cost_map()
+
+
+class PersistedQueryError(Exception):
+    """Raised when a persisted query cannot be resolved."""
+
+    def __init__(self, message: str, code: str):
+        super().__init__(message)
+        self.code = code
+
+
+def record_rejection(reason: str) -> None:
+    """Export a rejected-query metric."""
+    try:
+        from api.prometheus import metrics
+
+        metrics.record_graphql_rejection(reason)
+    except Exception:
+        pass
+
+
+def _record_cache(hit: bool) -> None:
+    try:
+        from api.prometheus import metrics
+
+        if hit:
+            metrics.record_cache_hit("graphql_persisted_query")
+        else:
+            metrics.record_cache_miss("graphql_persisted_query")
+    except Exception:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Validation rules
+# ---------------------------------------------------------------------------
+
+
+class RequestCostValidator(CostValidator):
+    """Cost rule; depends on request variables so it is re-run for cached documents."""
+
+    per_request = True
+
+
+def cost_validator(
+    maximum_cost: int = MAX_QUERY_COST,
+    *,
+    variables: Optional[Dict] = None,
+    cost_map: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Type[ASTValidationRule]:
+    """Create a cost rule bound to this request's variables."""
+    bound_cost_map = cost_map if cost_map is not None else COST_MAP
+
+    class _RequestCostValidator(RequestCostValidator):
+        def __init__(self, context: ValidationContext) -> None:
+            super().__init__(
+                context,
+                maximum_cost=maximum_cost,
+                variables=variables,
+                cost_map=bound_cost_map,
+            )
+
+    return _RequestCostValidator
+
+
+class DepthLimitRule(ASTValidationRule):
+    """Reject operations nested deeper than max_depth (introspection excluded)."""
+
+    max_depth = MAX_QUERY_DEPTH
+
+    def enter_operation_definition(self, node, *_args):
+        depth = self._depth(node.selection_set, 0, frozenset())
+        if depth > self.max_depth:
+            self.report_error(
+                GraphQLError(
+                    f"Query depth {depth} exceeds maximum of {self.max_depth}",
+                    node,
+                    extensions={"code": "QUERY_TOO_DEEP"},
+                )
+            )
+
+    def _depth(self, selection_set: Optional[SelectionSetNode], depth: int, seen) -> int:
+        if not selection_set:
+            return depth
+        deepest = depth
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                if selection.name.value.startswith("__"):
+                    continue
+                deepest = max(deepest, self._depth(selection.selection_set, depth + 1, seen))
+            elif isinstance(selection, InlineFragmentNode):
+                deepest = max(deepest, self._depth(selection.selection_set, depth, seen))
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.context.get_fragment(name)
+                # Fragment cycles are reported by the spec NoFragmentCycles rule
+                if fragment and name not in seen:
+                    deepest = max(
+                        deepest, self._depth(fragment.selection_set, depth, seen | {name})
+                    )
+        return deepest
+
+
+class AliasLimitRule(ASTValidationRule):
+    """Reject documents using more than max_aliases field aliases."""
+
+    max_aliases = MAX_QUERY_ALIASES
+
+    def __init__(self, context: ValidationContext):
+        super().__init__(context)
+        self.alias_count = 0
+
+    def enter_field(self, node: FieldNode, *_args):
+        if node.alias:
+            self.alias_count += 1
+
+    def leave_document(self, node, *_args):
+        if self.alias_count > self.max_aliases:
+            self.report_error(
+                GraphQLError(
+                    f"Query uses {self.alias_count} aliases, maximum is {self.max_aliases}",
+                    extensions={"code": "TOO_MANY_ALIASES"},
+                )
+            )
+
+
+def depth_limit_validator(max_depth: int) -> Type[ASTValidationRule]:
+    return type("DepthLimitRule", (DepthLimitRule,), {"max_depth": max_depth})
+
+
+def alias_limit_validator(max_aliases: int) -> Type[ASTValidationRule]:
+    return type("AliasLimitRule", (AliasLimitRule,), {"max_aliases": max_aliases})
+
+
+def graphql_validation_rules(
+    context_value: Any, document: DocumentNode, data: dict
+) -> List[Type[ASTValidationRule]]:
+    """Ariadne `validation_rules` callable: cost, depth and alias limits."""
+    variables = data.get("variables") if isinstance(data, dict) else None
+    return [
+        cost_validator(variables=variables),
+        DepthLimitRule,
+        AliasLimitRule,
+    ]
+
+
+def _rejection_reason(error: GraphQLError) -> str:
+    extensions = error.extensions or {}
+    if "cost" in extensions:
+        return "cost"
+    if extensions.get("code") == "QUERY_TOO_DEEP":
+        return "depth"
+    if extensions.get("code") == "TOO_MANY_ALIASES":
+        return "aliases"
+    return "invalid"
+
+
+# ---------------------------------------------------------------------------
+# Persisted queries
+# ---------------------------------------------------------------------------
+
+
+class PersistedQueryCache:
+    """LRU cache of parsed documents keyed by SHA-256 of the query text."""
+
+    def __init__(self, max_size: int = PERSISTED_QUERY_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[str, DocumentNode]]" = OrderedDict()
+        self._validated: Dict[int, str] = {}  # id(document) -> sha256
+
+    @staticmethod
+    def hash_query(query: str) -> str:
+        return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, sha256: str) -> Optional[Tuple[str, DocumentNode]]:
+        entry = self._entries.get(sha256)
+        if entry is not None:
+            self._entries.move_to_end(sha256)
+        return entry
+
+    def put(self, sha256: str, query: str, document: DocumentNode) -> None:
+        self._entries[sha256] = (query, document)
+        self._entries.move_to_end(sha256)
+        while len(self._entries) > self.max_size:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._validated.pop(id(evicted), None)
+
+    def mark_validated(self, document: DocumentNode) -> None:
+        for sha256, (_, cached) in self._entries.items():
+            if cached is document:
+                self._validated[id(document)] = sha256
+                return
+
+    def is_validated(self, document: DocumentNode) -> bool:
+        sha256 = self._validated.get(id(document))
+        if sha256 is None:
+            return False
+        entry = self._entries.get(sha256)
+        return entry is not None and entry[1] is document
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._validated.clear()
+
+    def resolve(self, data: dict) -> Optional[Tuple[str, DocumentNode]]:
+        """
+        Resolve request data into a cached (query, document) pair.
+
+        Supports Apollo APQ (`extensions.persistedQuery.sha256Hash`) with or
+        without the query text, and transparently caches plain queries.
+        Returns None when the query does not parse, so the normal GraphQL
+        pipeline can report the syntax error.
+        """
+        query = data.get("query")
+        extensions = data.get("extensions") or {}
+        persisted = extensions.get("persistedQuery") if isinstance(extensions, dict) else None
+        requested_hash = persisted.get("sha256Hash") if isinstance(persisted, dict) else None
+
+        if requested_hash and not query:
+            entry = self.get(requested_hash)
+            _record_cache(entry is not None)
+            if entry is None:
+                raise PersistedQueryError("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND")
+            return entry
+
+        if not isinstance(query, str) or not query:
+            return None
+
+        sha256 = self.hash_query(query)
+        if requested_hash and requested_hash != sha256:
+            raise PersistedQueryError(
+                "provided sha does not match query", "PERSISTED_QUERY_HASH_MISMATCH"
+            )
+
+        entry = self.get(sha256)
+        _record_cache(entry is not None)
+        if entry is not None:
+            return entry
+
+        try:
+            document = parse(query)
+        except GraphQLError:
+            return None
+        self.put(sha256, query, document)
+        return query, document
+
+
+persisted_queries = PersistedQueryCache()
+
+
+def validate_with_cache(
+    schema: GraphQLSchema,
+    document_ast: DocumentNode,
+    rules: Optional[Collection[Type[ASTValidationRule]]] = None,
+    max_errors: Optional[int] = None,
+    type_info: Any = None,
+) -> List[GraphQLError]:
+    """
+    Ariadne `query_validator` that skips static validation for cached documents.
+
+    Only rules marked `per_request` (the cost rule) are re-run for documents
+    that already passed validation once.
+    """
+    if persisted_queries.is_validated(document_ast):
+        per_request = [rule for rule in rules or () if getattr(rule, "per_request", False)]
+        errors = validate(schema, document_ast, rules=per_request) if per_request else []
+    else:
+        errors = validate(
+            schema, document_ast, rules=rules, max_errors=max_errors, type_info=type_info
+        )
+        if not errors:
+            persisted_queries.mark_validated(document_ast)
+
+    for reason in {_rejection_reason(error) for error in errors}:
+        record_rejection(reason)
+    return errors
+
+
+class PersistedQueryHTTPHandler(GraphQLHTTPHandler):
+    """HTTP handler that serves parsed documents from the persisted query cache."""
+
+    async def execute_graphql_query(
+        self,
+        request: Any,
+        data: Any,
+        *,
+        context_value: Any = None,
+        query_document: Optional[DocumentNode] = None,
+    ):
+        if query_document is None and isinstance(data, dict):
+            try:
+                entry = persisted_queries.resolve(data)
+            except PersistedQueryError as e:
+                record_rejection(e.code.lower())
+                return False, {"errors": [{"message": str(e), "extensions": {"code": e.code}}]}
+            if entry is not None:
+                query, query_document = entry
+                data = {**data, "query": query}
+
+        return await super().execute_graphql_query(
+            request, data, context_value=context_value, query_document=query_document
+        )
@@ -30,13 +30,17 @@ import asyncio
 import json
 import logging
 import os
+import sys
 import time
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
+import numpy as np
 from fastapi import APIRouter, HTTPException, BackgroundTasks, status
 from pydantic import BaseModel, Field
 
+from api.cache import get_many as cache_get_many, set_many as cache_set_many
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/ai", tags=["ml-anomaly"])
@@ -51,6 +55,10 @@ KAFKA_TOPIC_MODEL = os.getenv("KAFKA_TOPIC_MODEL", "model.trained")
 ANOMALY_THRESHOLD = float(os.getenv("ANOMALY_THRESHOLD", "0.7"))
 SEQ_LEN = int(os.getenv("ML_SEQ_LEN", "10"))
 
+# Out-of-core training job (python -m ml.training_pipeline)
+TRAIN_DATA_DIR = os.getenv("ML_TRAIN_DATA_DIR", "data/agent_seqs")
+TRAIN_WORKERS = int(os.getenv("ML_TRAIN_WORKERS", "2"))
+
 # Try to import Kafka
 try:
     from kafka import KafkaProducer
@@ -63,10 +71,22 @@ except ImportError:
 # Try to import ML modules
 try:
     from ml.autoencoder import get_autoencoder
-    from ml.anomaly_detector import get_detector
-    from ml.neo4j_loader import Neo4jDataLoader
+    from ml.anomaly_detector import get_detector, swap_detector
+    from ml.inference_queue import get_inference_queue, swap_autoencoder
+    from ml.model_registry import (
+        get_model_watcher,
+        load_autoencoder_version,
+        load_detector_version,
+        registry_path,
+    )
     from ml.zkml_prover import get_zkml_prover
     from ml.deepprove_integration import get_deepprove_zkml
+    from zkp.proving_scheduler import (
+        PRIORITY_DEFAULT,
+        AdmissionRejected,
+        JobNotFound,
+        get_proving_scheduler,
+    )
 
     ML_AVAILABLE = True
 except ImportError as e:
@@ -94,18 +114,17 @@ except ImportError:
     WS_AVAILABLE = False
     get_connection_manager = None
 
-# Try to import Neo4j
+# Try to import the shared Neo4j data-access layer
 try:
-    from py2neo import Graph
+    import neo4j  # noqa: F401
+
+    from api.database import get_graph, read as neo4j_read
 
-    NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-    NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
-    NEO4J_PASS = os.getenv("NEO4J_PASS", "test")
-    neo4j_graph = Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
     NEO4J_AVAILABLE = True
 except Exception as e:
     NEO4J_AVAILABLE = False
-    neo4j_graph = None
+    get_graph = None
+    neo4j_read = None
     logger.warning(f"Neo4j not available: {e}")
 
 
@@ -195,6 +214,9 @@ class ZKMLProofRequest(BaseModel):
     threshold: float = Field(default=0.8, ge=0.0, le=1.0)
     use_rapidsnark: bool = Field(default=True, description="Use Rapidsnark for faster proving")
     include_sequence_commitment: bool = Field(default=False)
+    wait: bool = Field(
+        default=True, description="Wait for the proof; false returns a job id to poll"
+    )
 
 
 class AnomalyResult(BaseModel):
@@ -222,92 +244,179 @@ class BatchResult(BaseModel):
 # Helper functions
 
 
-def fetch_agent_features(
-    agent_id: str,
-    seq_len: int = 10,
-) -> List[List[float]]:
-    """
-    Fetch agent activity features from Neo4j.
+# Per-agent feature cache (seconds); batch calls often repeat recent agents
+FEATURE_CACHE_TTL = float(os.getenv("ML_FEATURE_CACHE_TTL", "5"))
+
+# Feature vector for an agent with no Agent node
+NO_ACTIVITY_FEATURES = [50, 1, 0.5, 1, 12 / 24, 3 / 7, 100, 0.02]
+
+AGENT_FEATURES_QUERY = """
+UNWIND $agent_ids AS agent_id
+MATCH (a:Agent {id: agent_id})
+CALL {
+    WITH a
+    OPTIONAL MATCH (a)-[:HAS_ACTIVITY]->(act:Activity)
+    WHERE act.timestamp > datetime() - duration({days: 30})
+    WITH act
+    ORDER BY act.timestamp DESC
+    LIMIT $seq_len
+    RETURN collect(act {
+        .claim_count, .proof_count, .interaction_count, .hour, .day_of_week,
+        .response_time, .error_rate
+    }) AS activities
+}
+RETURN agent_id, a.reputation AS reputation, activities
+"""
 
-    Returns sequence of feature vectors for the agent.
-    """
-    if not NEO4J_AVAILABLE or neo4j_graph is None:
-        # Generate synthetic features for testing
-        import random
 
-        return [
-            [
-                random.uniform(40, 80),  # reputation
-                random.uniform(1, 5),  # claims
-                random.uniform(0.5, 2),  # proofs
-                random.uniform(0, 3),  # interactions
-                random.randint(8, 20) / 24,  # hour
-                random.randint(0, 6) / 7,  # day
-                random.gauss(100, 20),  # response time
-                random.gauss(0.02, 0.01),  # error rate
-            ]
-            for _ in range(seq_len)
+def _synthetic_features(seq_len: int) -> List[List[float]]:
+    """Synthetic activity for running without Neo4j."""
+    import random
+
+    return [
+        [
+            random.uniform(40, 80),  # reputation
+            random.uniform(1, 5),  # claims
+            random.uniform(0.5, 2),  # proofs
+            random.uniform(0, 3),  # interactions
+            random.randint(8, 20) / 24,  # hour
+            random.randint(0, 6) / 7,  # day
+            random.gauss(100, 20),  # response time
+            random.gauss(0.02, 0.01),  # error rate
         ]
+        for _ in range(seq_len)
+    ]
 
-    try:
-        # Query agent's recent activity
-        query = """
-        MATCH (a:Agent {id: $agent_id})
-        OPTIONAL MATCH (a)-[:HAS_ACTIVITY]->(act:Activity)
-        WHERE act.timestamp > datetime() - duration({days: 30})
-        WITH a, act
-        ORDER BY act.timestamp DESC
-        LIMIT $seq_len
-        RETURN 
-            a.reputation AS reputation,
-            act.claim_count AS claims,
-            act.proof_count AS proofs,
-            act.interaction_count AS interactions,
-            act.hour AS hour,
-            act.day_of_week AS day,
-            act.response_time AS response_time,
-            act.error_rate AS error_rate
-        """
-
-        results = neo4j_graph.run(
-            query,
-            {
-                "agent_id": agent_id,
-                "seq_len": seq_len,
-            },
-        ).data()
 
-        if not results:
-            # No activity found, return defaults
-            return [[50, 1, 0.5, 1, 12 / 24, 3 / 7, 100, 0.02]] * seq_len
+def _fallback_features(seq_len: int) -> List[List[float]]:
+    """Synthetic activity when the Neo4j query fails."""
+    import random
 
-        features = []
-        for r in results:
-            features.append(
+    return [[50 + random.gauss(0, 10), 2, 1, 1, 0.5, 0.5, 100, 0.02] for _ in range(seq_len)]
+
+
+def assemble_agent_features(
+    agent_ids: List[str],
+    records: List[Dict[str, Any]],
+    seq_len: int,
+) -> np.ndarray:
+    """
+    Build the (N, seq_len, 8) feature array from AGENT_FEATURES_QUERY rows.
+
+    Activities are newest first. Missing values fall back to defaults, an
+    agent without recent activity gets one default row carrying its
+    reputation, short sequences are padded by repeating the last row, and
+    agents with no Agent node get NO_ACTIVITY_FEATURES throughout.
+    """
+    out = np.empty((len(agent_ids), seq_len, 8))
+    out[:] = NO_ACTIVITY_FEATURES
+    by_id = {r["agent_id"]: r for r in records}
+
+    for i, agent_id in enumerate(agent_ids):
+        record = by_id.get(agent_id)
+        if record is None:
+            continue
+        reputation = float(record.get("reputation") or 50)
+        activities = (record.get("activities") or [{}])[:seq_len]
+        rows = np.array(
+            [
                 [
-                    float(r.get("reputation") or 50),
-                    float(r.get("claims") or 1),
-                    float(r.get("proofs") or 0.5),
-                    float(r.get("interactions") or 1),
-                    float(r.get("hour") or 12) / 24,
-                    float(r.get("day") or 3) / 7,
-                    float(r.get("response_time") or 100),
-                    float(r.get("error_rate") or 0.02),
+                    reputation,
+                    act.get("claim_count") or 1,
+                    act.get("proof_count") or 0.5,
+                    act.get("interaction_count") or 1,
+                    act.get("hour") or 12,
+                    act.get("day_of_week") or 3,
+                    act.get("response_time") or 100,
+                    act.get("error_rate") or 0.02,
                 ]
-            )
+                for act in activities
+            ],
+            dtype=float,
+        )
+        rows[:, 4] /= 24
+        rows[:, 5] /= 7
+
+        n = len(rows)
+        out[i, :n] = rows
+        out[i, n:] = rows[-1]  # pad by repeating the oldest activity
+
+    return out
+
 
-        # Pad if needed
-        while len(features) < seq_len:
-            features.append(features[-1] if features else [50, 1, 0.5, 1, 0.5, 0.5, 100, 0.02])
+def _feature_cache_key(seq_len: int, agent_id: str) -> str:
+    return f"agent_features:{seq_len}:{agent_id}"
 
-        return features[:seq_len]
 
+async def fetch_agent_features_bulk(
+    agent_ids: List[str],
+    seq_len: int = 10,
+) -> np.ndarray:
+    """
+    Fetch activity features for many agents with one UNWIND query.
+
+    Returns an (N, seq_len, 8) array aligned with `agent_ids`. Results are
+    cached per agent for ML_FEATURE_CACHE_TTL seconds, so only agents not
+    seen recently hit Neo4j.
+    """
+    if not NEO4J_AVAILABLE:
+        # Generate synthetic features for testing
+        return np.array([_synthetic_features(seq_len) for _ in agent_ids]).reshape(
+            len(agent_ids), seq_len, 8
+        )
+
+    out = np.empty((len(agent_ids), seq_len, 8))
+    missing: Dict[str, List[int]] = {}
+    # One cache round trip (and expiry pass) for the whole batch
+    cached = cache_get_many([_feature_cache_key(seq_len, agent_id) for agent_id in agent_ids])
+    for i, agent_id in enumerate(agent_ids):
+        cached_features = cached.get(_feature_cache_key(seq_len, agent_id))
+        if cached_features is not None:
+            out[i] = cached_features
+        else:
+            missing.setdefault(agent_id, []).append(i)
+
+    if not missing:
+        return out
+
+    ids = list(missing)
+    try:
+        records = await neo4j_read(AGENT_FEATURES_QUERY, {"agent_ids": ids, "seq_len": seq_len})
     except Exception as e:
-        logger.error(f"Neo4j query failed for {agent_id}: {e}")
-        # Return synthetic data
-        import random
+        logger.error(f"Neo4j feature query failed for {len(ids)} agents: {e}")
+        for positions in missing.values():
+            out[positions] = _fallback_features(seq_len)
+        return out
+
+    fetched = assemble_agent_features(ids, records, seq_len)
+    for agent_id, features in zip(ids, fetched):
+        out[missing[agent_id]] = features
+    cache_set_many(
+        {_feature_cache_key(seq_len, agent_id): f for agent_id, f in zip(ids, fetched)},
+        ttl=FEATURE_CACHE_TTL,
+    )
+    return out
+
+
+async def fetch_agent_features(
+    agent_id: str,
+    seq_len: int = 10,
+) -> List[List[float]]:
+    """
+    Fetch agent activity features from Neo4j.
+
+    Returns sequence of feature vectors for the agent.
+    """
+    return (await fetch_agent_features_bulk([agent_id], seq_len))[0].tolist()
+
 
-        return [[50 + random.gauss(0, 10), 2, 1, 1, 0.5, 0.5, 100, 0.02] for _ in range(seq_len)]
+def reputation_proof(agent_id: str, features: List[List[float]]) -> Dict[str, Any]:
+    """Heuristic-detector input for an agent's latest reputation reading."""
+    return {
+        "agent_id": agent_id,
+        "proof_data": {"publicSignals": [str(int(features[-1][0]))]},
+        "proof_type": "agent_reputation",
+    }
 
 
 async def run_anomaly_detection(
@@ -315,8 +424,14 @@ async def run_anomaly_detection(
     features: List[List[float]],
     threshold: float,
     include_zkml: bool,
+    heuristic_result: Optional[Any] = None,
 ) -> Dict[str, Any]:
-    """Run anomaly detection on agent features."""
+    """
+    Run anomaly detection on agent features.
+
+    `heuristic_result` is a precomputed AnomalyScore (from a batched
+    `analyze_batch` pass); without it the heuristic detector runs here.
+    """
     result = {
         "agent_id": agent_id,
         "anomaly_score": 0.0,
@@ -339,17 +454,17 @@ async def run_anomaly_detection(
 
     try:
         # Try autoencoder first
-        autoencoder = get_autoencoder()
-        ae_result = autoencoder.detect_anomaly(features)
+        # Queued so concurrent agents share one batched forward pass
+        ae_result = await get_inference_queue().submit(features)
 
         result["anomaly_score"] = ae_result.anomaly_score
         result["reconstruction_error"] = ae_result.reconstruction_error
         result["is_anomalous"] = ae_result.is_anomalous or ae_result.anomaly_score > threshold
 
         # Also run heuristic detector for additional flags
-        detector = get_detector()
-        proof_data = {"publicSignals": [str(int(features[-1][0]))]}
-        heuristic_result = detector.analyze_proof(proof_data, agent_id, "agent_reputation")
+        if heuristic_result is None:
+            detector = get_detector()
+            heuristic_result = detector.analyze_batch([reputation_proof(agent_id, features)])[0]
         result["flags"] = heuristic_result.flags
 
         # Combine scores (weighted)
@@ -360,8 +475,9 @@ async def run_anomaly_detection(
         # Generate zkML proof if requested and anomalous
         if include_zkml and result["is_anomalous"]:
             try:
+                # Off the event loop: repeats are served from (or wait on) the proof cache
                 prover = get_zkml_prover()
-                proof = prover.prove_anomaly_threshold(features, threshold)
+                proof = await asyncio.to_thread(prover.prove_anomaly_threshold, features, threshold)
                 result["zkml_proof"] = proof.to_dict()
             except Exception as e:
                 logger.warning(f"zkML proof generation failed: {e}")
@@ -391,7 +507,7 @@ async def detect_anomaly(
     start_time = time.perf_counter()
 
     # Fetch agent features from Neo4j
-    features = fetch_agent_features(request.agent_id, request.seq_len)
+    features = await fetch_agent_features(request.agent_id, request.seq_len)
 
     # Run detection
     result = await run_anomaly_detection(
@@ -458,18 +574,31 @@ async def detect_anomaly_batch(
     results = []
     anomalous_count = 0
 
-    # Process in parallel using asyncio
-    async def process_agent(agent_id: str) -> Dict[str, Any]:
-        features = fetch_agent_features(agent_id)
+    # Fetch all agents' features with one bulk query
+    fetched = await fetch_agent_features_bulk(request.agent_ids)
+
+    # One vectorized heuristic pass over every agent
+    heuristics: Dict[int, Any] = {}
+    if ML_AVAILABLE:
+        try:
+            scores = get_detector().analyze_batch(
+                [reputation_proof(a, f) for a, f in zip(request.agent_ids, fetched)]
+            )
+            heuristics = dict(enumerate(scores))
+        except Exception as e:
+            logger.warning(f"Batched heuristic scoring failed: {e}")
+
+    async def process_agent(i: int) -> Dict[str, Any]:
         return await run_anomaly_detection(
-            agent_id=agent_id,
-            features=features,
+            agent_id=request.agent_ids[i],
+            features=fetched[i].tolist(),
             threshold=request.threshold,
             include_zkml=request.include_zkml_proof,
+            heuristic_result=heuristics.get(i),
         )
 
     # Run all detections concurrently
-    tasks = [process_agent(agent_id) for agent_id in request.agent_ids]
+    tasks = [process_agent(i) for i in range(len(request.agent_ids))]
     detection_results = await asyncio.gather(*tasks, return_exceptions=True)
 
     for i, result in enumerate(detection_results):
@@ -547,33 +676,69 @@ async def train_model(
         )
 
     async def train_task():
-        """Background training task."""
+        """Background training task (out-of-core pipeline in a child process)."""
         start_time = time.perf_counter()
 
         try:
-            # Load training data
-            loader = Neo4jDataLoader(neo4j_graph)
-            train_data = loader.load_agent_sequences(
-                days=request.days,
-                min_samples=request.min_samples,
-            )
-
-            # Train autoencoder
-            autoencoder = get_autoencoder()
-            history = autoencoder.fit(
-                train_data,
-                epochs=request.epochs,
-                batch_size=request.batch_size,
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable,
+                "-m",
+                "ml.training_pipeline",
+                "run",
+                "--days",
+                str(request.days),
+                "--min-samples",
+                str(request.min_samples),
+                "--epochs",
+                str(request.epochs),
+                "--batch-size",
+                str(request.batch_size),
+                "--seq-len",
+                str(SEQ_LEN),
+                "--workers",
+                str(TRAIN_WORKERS),
+                "--data-dir",
+                TRAIN_DATA_DIR,
+                # Absolute, so the job publishes where this worker's watcher looks
+                "--artifacts",
+                str(registry_path("autoencoder").resolve()),
+                "--detector-artifacts",
+                str(registry_path("detector").resolve()),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
             )
+            stdout, stderr = await proc.communicate()
+            if proc.returncode != 0:
+                tail = stderr.decode(errors="replace").strip().splitlines()[-1:]
+                raise RuntimeError(tail[0] if tail else f"exit code {proc.returncode}")
+            summary = json.loads(stdout.decode().strip().splitlines()[-1])
+
+            # The job activated the new versions; swap them in here now rather than
+            # on the next poll (other workers follow via their registry watchers)
+            watcher = get_model_watcher()
+            if watcher is not None:
+                await asyncio.to_thread(watcher.check)
+            else:
+                model = await asyncio.to_thread(load_autoencoder_version, summary["path"])
+                swap_autoencoder(model)
+                if summary.get("detector_path"):
+                    detector = await asyncio.to_thread(
+                        load_detector_version, summary["detector_path"]
+                    )
+                    swap_detector(detector)
 
             train_time = time.perf_counter() - start_time
 
             # Publish completion event
             event = {
                 "status": "completed",
+                "version": summary["version"],
+                "artifact_path": summary["path"],
                 "epochs": request.epochs,
-                "samples": len(train_data),
-                "final_loss": history["train_loss"][-1] if history.get("train_loss") else None,
+                "samples": summary["samples"],
+                "final_loss": summary["final_loss"],
+                "detector_version": summary.get("detector_version"),
                 "train_time_seconds": round(train_time, 2),
             }
             await publish_kafka_event(
@@ -582,7 +747,7 @@ async def train_model(
                 event=event,
             )
 
-            logger.info(f"Model training completed in {train_time:.2f}s")
+            logger.info(f"Model {summary['version']} trained in {train_time:.2f}s")
 
         except Exception as e:
             logger.error(f"Model training failed: {e}")
@@ -632,14 +797,21 @@ async def ml_status():
             status_info["autoencoder"] = {
                 "type": type(autoencoder).__name__,
                 "ready": True,
+                "batching": get_inference_queue().stats(),
             }
 
+            watcher = get_model_watcher()
+            if watcher is not None:
+                status_info["model_registry"] = watcher.status()
+
             # Check zkML prover
             prover = get_zkml_prover()
             status_info["zkml_prover"] = {
                 "model_hash": prover.model_hash,
                 "circuit_compiled": prover._circuit_compiled,
+                "proof_cache": prover.proof_cache.stats(),
             }
+            status_info["proving_scheduler"] = get_proving_scheduler().stats()
 
         except Exception as e:
             status_info["error"] = str(e)
@@ -705,6 +877,10 @@ async def generate_zkml_proof(request: ZKMLProofRequest):
     - Model commitment (hash)
 
     Output is Groth16-compatible for on-chain verification.
+
+    Proving runs on the shared proving scheduler. With `wait=false` the
+    response is a job id to poll at /ai/zkml/jobs/{job_id}; a full proving
+    queue answers 503 with Retry-After instead of queueing.
     """
     if not ML_AVAILABLE:
         raise HTTPException(
@@ -715,15 +891,33 @@ async def generate_zkml_proof(request: ZKMLProofRequest):
     start_time = time.perf_counter()
 
     # Fetch agent features
-    features = fetch_agent_features(request.agent_id)
+    features = await fetch_agent_features(request.agent_id)
 
     # Generate zkML proof
     try:
         zkml = get_deepprove_zkml()
-        proof = zkml.prove_anomaly(
+        if not request.wait:
+            job_id = get_proving_scheduler().submit(
+                "deepprove_anomaly",
+                zkml.prove_anomaly,
+                features,
+                request.threshold,
+                request.use_rapidsnark,
+                priority=PRIORITY_DEFAULT,
+            )
+            return {
+                "agent_id": request.agent_id,
+                "job_id": job_id,
+                "status": "queued",
+                "poll": f"/ai/zkml/jobs/{job_id}",
+            }
+
+        proof = await asyncio.to_thread(
+            zkml.prove_anomaly,
             features=features,
             threshold=request.threshold,
             use_rapidsnark=request.use_rapidsnark,
+            priority=PRIORITY_DEFAULT,
         )
 
         total_time = (time.perf_counter() - start_time) * 1000
@@ -758,6 +952,12 @@ async def generate_zkml_proof(request: ZKMLProofRequest):
             ),
         }
 
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         logger.error(f"zkML proof generation failed: {e}")
         raise HTTPException(
@@ -766,6 +966,31 @@ async def generate_zkml_proof(request: ZKMLProofRequest):
         )
 
 
+@router.get("/zkml/jobs/{job_id}")
+async def get_zkml_job(job_id: str):
+    """
+    Poll a proving job submitted with `wait=false`.
+
+    Returns its status (queued/running/done/failed), queue wait and prove
+    time, and the proof once done. Any worker on the host can answer, as
+    job state is shared through PROVING_STATE_DIR. Finished jobs expire
+    after PROVING_RESULT_TTL seconds.
+    """
+    if not ML_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="ML modules not available",
+        )
+
+    try:
+        return get_proving_scheduler().poll(job_id)
+    except JobNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown or expired proving job: {job_id}",
+        )
+
+
 @router.post("/zkml/verify")
 async def verify_zkml_proof(proof_data: Dict[str, Any]):
     """
@@ -907,6 +1132,7 @@ async def zkml_status():
             "stats": stats,
             "endpoints": {
                 "prove": "/ai/zkml/prove",
+                "jobs": "/ai/zkml/jobs/{job_id}",
                 "verify": "/ai/zkml/verify",
                 "setup": "/ai/zkml/setup",
             },
@@ -3,7 +3,6 @@ Monitoring and observability for production system.
 Includes metrics, health checks, and audit logging.
 """
 
-import os
 import logging
 from typing import Dict, Any, Optional
 from datetime import datetime
@@ -112,7 +111,7 @@ async def readiness_check():
     """Kubernetes readiness probe."""
     # Check critical services
     checks = {
-        "neo4j": _check_neo4j(),
+        "neo4j": await _check_neo4j(),
         "vault_storage": _check_vault_storage(),
     }
 
@@ -129,17 +128,12 @@ async def liveness_check():
     return JSONResponse(content={"alive": True})
 
 
-def _check_neo4j() -> bool:
-    """Check Neo4j connectivity."""
+async def _check_neo4j() -> bool:
+    """Check Neo4j connectivity over the shared driver pool."""
     try:
-        from py2neo import Graph
+        from api.database import verify_connectivity
 
-        NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-        NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
-        NEO4J_PASS = os.getenv("NEO4J_PASS", "test")
-        graph = Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
-        graph.run("RETURN 1")
-        return True
+        return await verify_connectivity()
     except (ImportError, Exception):
         return False
 
@@ -0,0 +1,80 @@
+"""
+Cursor pagination helpers for GraphQL connections.
+
+Cursors are opaque, URL-safe base64 strings wrapping the keyset value of the
+last returned row, so resolvers can page with `WHERE key > $after` instead of
+SKIP/OFFSET scans.
+"""
+
+import base64
+import os
+from typing import Iterable, List, Optional, Set
+
+from graphql import FieldNode, FragmentSpreadNode, GraphQLResolveInfo, InlineFragmentNode
+
+DEFAULT_PAGE_SIZE = int(os.getenv("GRAPHQL_DEFAULT_PAGE_SIZE", "25"))
+MAX_PAGE_SIZE = int(os.getenv("GRAPHQL_MAX_PAGE_SIZE", "100"))
+
+_CURSOR_PREFIX = "cursor:"
+
+
+def encode_cursor(key: str) -> str:
+    """Encode a keyset value into an opaque cursor."""
+    raw = f"{_CURSOR_PREFIX}{key}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[str]:
+    """Decode a cursor produced by encode_cursor. Raises ValueError if malformed."""
+    if not cursor:
+        return None
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not raw.startswith(_CURSOR_PREFIX):
+        raise ValueError("Invalid cursor")
+    return raw[len(_CURSOR_PREFIX) :]
+
+
+def clamp_page_size(first: Optional[int]) -> int:
+    """Clamp a requested page size into [1, MAX_PAGE_SIZE]."""
+    if first is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(first), MAX_PAGE_SIZE))
+
+
+def _collect_fields(info: GraphQLResolveInfo, selections: Iterable, out: List[FieldNode]) -> None:
+    for selection in selections:
+        if isinstance(selection, FieldNode):
+            out.append(selection)
+        elif isinstance(selection, InlineFragmentNode):
+            _collect_fields(info, selection.selection_set.selections, out)
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = info.fragments.get(selection.name.value)
+            if fragment:
+                _collect_fields(info, fragment.selection_set.selections, out)
+
+
+def selected_fields(info: GraphQLResolveInfo, *path: str) -> Set[str]:
+    """
+    Return the names of fields selected under `path` for the current resolver.
+
+    Example: selected_fields(info, "edges", "node") on an `apps` connection
+    returns {"id", "name", "claims", ...} for whatever the client asked for.
+    Fragments and inline fragments are flattened.
+    """
+    fields: List[FieldNode] = []
+    for node in info.field_nodes:
+        if node.selection_set:
+            _collect_fields(info, node.selection_set.selections, fields)
+
+    for name in path:
+        nested: List[FieldNode] = []
+        for field in fields:
+            if field.name.value == name and field.selection_set:
+                _collect_fields(info, field.selection_set.selections, nested)
+        fields = nested
+
+    return {field.name.value for field in fields}
@@ -38,6 +38,35 @@ rate_limit_hits_total = Counter(
     "rate_limit_hits_total", "Total rate limit hits", ["endpoint", "ip"]
 )
 
+graphql_rejected_queries_total = Counter(
+    "graphql_rejected_queries_total", "GraphQL queries rejected before execution", ["reason"]
+)
+
+proving_queue_wait_seconds = Histogram(
+    "proving_queue_wait_seconds",
+    "Time proving jobs spend queued before a worker picks them up",
+    ["circuit", "priority"],
+    buckets=[0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0],
+)
+
+proving_duration_seconds = Histogram(
+    "proving_duration_seconds",
+    "Proof generation time once running",
+    ["circuit"],
+    buckets=[0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0],
+)
+
+proving_stage_duration_seconds = Histogram(
+    "proving_stage_duration_seconds",
+    "Witness generation, proving and result read time per proof",
+    ["circuit", "stage"],
+    buckets=[0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0],
+)
+
+proving_jobs_total = Counter(
+    "proving_jobs_total", "Proving jobs by outcome", ["circuit", "priority", "status"]
+)
+
 active_connections = Gauge("active_connections", "Active database connections")
 
 system_cpu_percent = Gauge("system_cpu_percent", "System CPU usage percentage")
@@ -86,6 +115,30 @@ class MetricsRecorder:
         """Record rate limit hit."""
         rate_limit_hits_total.labels(endpoint=endpoint, ip=ip).inc()
 
+    @staticmethod
+    def record_graphql_rejection(reason: str):
+        """Record a GraphQL query rejected by cost/depth/alias/persisted-query checks."""
+        graphql_rejected_queries_total.labels(reason=reason).inc()
+
+    @staticmethod
+    def record_proving_job(
+        circuit: str, priority: str, status: str, queue_wait: float, duration: float
+    ):
+        """Record a finished proving job's queue wait and prove time."""
+        proving_jobs_total.labels(circuit=circuit, priority=priority, status=status).inc()
+        proving_queue_wait_seconds.labels(circuit=circuit, priority=priority).observe(queue_wait)
+        proving_duration_seconds.labels(circuit=circuit).observe(duration)
+
+    @staticmethod
+    def record_proving_rejection(circuit: str, priority: str):
+        """Record a proving job rejected by admission control."""
+        proving_jobs_total.labels(circuit=circuit, priority=priority, status="rejected").inc()
+
+    @staticmethod
+    def record_proving_stage(circuit: str, stage: str, duration: float):
+        """Record one stage (witness/prove/read) of a proof."""
+        proving_stage_duration_seconds.labels(circuit=circuit, stage=stage).observe(duration)
+
     @staticmethod
     def set_active_connections(count: int):
         """Set active database connections gauge."""
@@ -1,12 +1,126 @@
 """
 QR code generation for share links.
+
+The QR for a given URL never changes, so rendered images are cached by data
+digest, size, border and error correction. Both variants (PNG and SVG) are
+rendered from one QR matrix on first use, and responses carry a strong ETag
+and Cache-Control so clients and CDNs revalidate with a 304, plus a
+Content-Digest (RFC 9530) of the image bytes.
 """
 
+import base64
+import hashlib
 import io
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
 import qrcode
 from qrcode.image import svg
 from fastapi import Response
 
+QR_CACHE_SIZE = int(os.getenv("QR_CACHE_SIZE", "1024"))
+QR_CACHE_MAX_AGE = int(os.getenv("QR_CACHE_MAX_AGE", "86400"))
+
+MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+@dataclass(frozen=True)
+class RenderedQR:
+    """A rendered QR image with its entity tag and content digest."""
+
+    content: bytes
+    media_type: str
+    etag: str
+    digest: str
+
+
+_rendered: "OrderedDict[Tuple, Dict[str, RenderedQR]]" = OrderedDict()
+_rendered_lock = threading.Lock()
+_render_stats = {"hits": 0, "misses": 0}
+
+
+def _render_variants(
+    data: str, size: int, border: int, error_correction: int
+) -> Dict[str, RenderedQR]:
+    """Build the QR matrix once and encode it as PNG and SVG."""
+    qr_code_instance = qrcode.QRCode(
+        version=1,
+        error_correction=error_correction,
+        box_size=size,
+        border=border,
+    )
+    qr_code_instance.add_data(data)
+    qr_code_instance.make(fit=True)
+
+    png_buffer = io.BytesIO()
+    qr_code_instance.make_image(fill_color="black", back_color="white").save(
+        png_buffer, format="PNG"
+    )
+    svg_buffer = io.BytesIO()
+    qr_code_instance.make_image(image_factory=svg.SvgImage).save(svg_buffer)
+
+    variants = {}
+    for fmt, content in (("png", png_buffer.getvalue()), ("svg", svg_buffer.getvalue())):
+        sha256 = hashlib.sha256(content).digest()
+        etag = f'"{sha256.hex()[:32]}"'
+        digest = f"sha-256=:{base64.b64encode(sha256).decode('ascii')}:"
+        variants[fmt] = RenderedQR(content, MEDIA_TYPES[fmt], etag, digest)
+    return variants
+
+
+def render_qr(
+    data: str,
+    fmt: str = "png",
+    size: int = 10,
+    border: int = 4,
+    error_correction: int = qrcode.constants.ERROR_CORRECT_M,
+) -> RenderedQR:
+    """
+    Rendered QR for `data` in `fmt` ("png" or "svg"), from cache when possible.
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if fmt not in MEDIA_TYPES:
+        raise ValueError(f"Unsupported QR format: {fmt}")
+    key = (hashlib.sha256(data.encode()).hexdigest(), size, border, error_correction)
+    with _rendered_lock:
+        variants = _rendered.get(key)
+        if variants is not None:
+            _rendered.move_to_end(key)
+            _render_stats["hits"] += 1
+            return variants[fmt]
+        _render_stats["misses"] += 1
+
+    # Rendered outside the lock; a concurrent miss for the same key just
+    # renders the same bytes twice
+    variants = _render_variants(data, size, border, error_correction)
+    with _rendered_lock:
+        _rendered[key] = variants
+        while len(_rendered) > QR_CACHE_SIZE:
+            _rendered.popitem(last=False)
+    return variants[fmt]
+
+
+def get_qr_cache_stats() -> Dict[str, int]:
+    """Rendered-QR cache size and hit/miss counts."""
+    with _rendered_lock:
+        return {"size": len(_rendered), "max_size": QR_CACHE_SIZE, **_render_stats}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
 
 def generate_qr_code(
     data: str,
@@ -26,38 +140,32 @@ def generate_qr_code(
     Returns:
         PNG image bytes
     """
-    qr_code_instance = qrcode.QRCode(
-        version=1,
-        error_correction=error_correction,
-        box_size=size,
-        border=border,
-    )
-    qr_code_instance.add_data(data)
-    qr_code_instance.make(fit=True)
+    return render_qr(data, "png", size, border, error_correction).content
 
-    qr_image = qr_code_instance.make_image(fill_color="black", back_color="white")
 
-    # Convert to bytes
-    image_bytes_buffer = io.BytesIO()
-    qr_image.save(image_bytes_buffer, format="PNG")
-    image_bytes_buffer.seek(0)
-
-    return image_bytes_buffer.read()
-
-
-def generate_qr_response(data: str, **kwargs) -> Response:
+def generate_qr_response(
+    data: str, fmt: str = "png", if_none_match: Optional[str] = None, **kwargs
+) -> Response:
     """
     Generate QR code and return as FastAPI Response.
 
     Args:
         data: Data to encode
+        fmt: "png" or "svg"
+        if_none_match: The request's If-None-Match header; a match returns
+            304 Not Modified without a body
         **kwargs: Additional arguments for generate_qr_code
 
     Returns:
-        FastAPI Response with PNG image
+        FastAPI Response with the image, ETag, Cache-Control and
+        Content-Digest (omitted on 304, which has no content)
     """
-    qr_code_bytes = generate_qr_code(data, **kwargs)
-    return Response(content=qr_code_bytes, media_type="image/png")
+    rendered = render_qr(data, fmt, **kwargs)
+    headers = {"ETag": rendered.etag, "Cache-Control": f"public, max-age={QR_CACHE_MAX_AGE}"}
+    if etag_matches(if_none_match, rendered.etag):
+        return Response(status_code=304, headers=headers)
+    headers["Content-Digest"] = rendered.digest
+    return Response(content=rendered.content, media_type=rendered.media_type, headers=headers)
 
 
 def generate_svg_qr_code(data: str, **kwargs) -> str:
@@ -71,22 +179,10 @@ def generate_svg_qr_code(data: str, **kwargs) -> str:
     Returns:
         SVG string
     """
-    qr_code_instance = qrcode.QRCode(
-        version=1,
-        error_correction=kwargs.get("error_correction", qrcode.constants.ERROR_CORRECT_M),
-        box_size=kwargs.get("size", 10),
+    return render_qr(
+        data,
+        "svg",
+        size=kwargs.get("size", 10),
         border=kwargs.get("border", 4),
-    )
-    qr_code_instance.add_data(data)
-    qr_code_instance.make(fit=True)
-
-    # Use SVG factory
-    svg_image_factory = svg.SvgImage
-    svg_image = qr_code_instance.make_image(image_factory=svg_image_factory)
-
-    # Convert to string
-    svg_bytes_buffer = io.BytesIO()
-    svg_image.save(svg_bytes_buffer)
-    svg_bytes_buffer.seek(0)
-
-    return svg_bytes_buffer.read().decode("utf-8")
+        error_correction=kwargs.get("error_correction", qrcode.constants.ERROR_CORRECT_M),
+    ).content.decode("utf-8")
@@ -0,0 +1,51 @@
+"""
+Cypher for hot queries shared between services and schema tooling.
+
+Kept free of heavy imports so `api.schema_migrations` can EXPLAIN the exact
+text the services run without importing them (the ml package pulls in
+numpy, scikit-learn and torch).
+"""
+
+# Last `limit` thresholds per agent within `days`, oldest first, as `s`
+_HISTORY_SUBQUERY = """
+UNWIND $agent_ids AS agent_id
+CALL {
+    WITH agent_id
+    MATCH (r:ReputationProof {agent_id: agent_id})
+    WHERE r.timestamp > datetime() - duration({days: $days})
+    WITH r
+    ORDER BY r.timestamp DESC
+    LIMIT $limit
+    RETURN reverse(collect(toFloat(r.threshold))) AS s
+}
+"""
+
+BULK_HISTORY_QUERY = _HISTORY_SUBQUERY + "RETURN agent_id, s AS scores"
+
+# Same columns as `trend_stats`, aggregated server-side
+BULK_STATS_QUERY = (
+    _HISTORY_SUBQUERY
+    + """
+WITH agent_id, s, size(s) AS n
+WITH agent_id, s, n,
+     CASE WHEN n = 0 THEN 0.0 ELSE reduce(t = 0.0, v IN s | t + v) / n END AS mean
+RETURN agent_id,
+       n,
+       CASE WHEN n = 0 THEN 0.0 ELSE s[n - 1] END AS current,
+       mean,
+       CASE WHEN n > 1
+            THEN sqrt(reduce(t = 0.0, v IN s | t + (v - mean) ^ 2) / (n - 1))
+            ELSE 0.0 END AS volatility,
+       CASE WHEN n > 1
+            THEN reduce(t = 0.0, i IN range(0, n - 1) |
+                        t + (i - (n - 1) / 2.0) * (s[i] - mean)) / (n * (n * n - 1) / 12.0)
+            ELSE 0.0 END AS slope,
+       CASE WHEN n > 1 THEN abs(s[n - 1] - s[n - 2]) ELSE 0.0 END AS last_delta,
+       reduce(k = 0, v IN s | CASE WHEN v = 100 THEN k + 1 ELSE 0 END) AS perfect_streak,
+       n >= 4 AND all(i IN range(0, n - 3) WHERE (s[i + 1] - s[i]) * (s[i + 2] - s[i + 1]) < 0)
+           AS alternating,
+       reduce(m = 0.0, i IN range(0, n - 2) |
+              CASE WHEN abs(s[i + 1] - s[i]) > m THEN abs(s[i + 1] - s[i]) ELSE m END)
+           AS max_abs_diff
+"""
+)
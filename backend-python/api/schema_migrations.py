@@ -0,0 +1,249 @@
+"""
+Versioned Neo4j schema migrations.
+
+Each migration is a numbered set of idempotent `IF NOT EXISTS` schema
+statements. Applied versions are recorded as `(:SchemaMigration {version})`
+nodes so a migration runs once per database. Migrations run on API startup
+(disable with NEO4J_MIGRATE_ON_STARTUP=false) or from the CLI:
+
+    python -m api.schema_migrations               # apply pending migrations
+    python -m api.schema_migrations --status      # list applied / pending
+    python -m api.schema_migrations --check-plans # EXPLAIN hot queries
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from api.database import WRITE_ACCESS, read, session, write
+from api.queries import BULK_HISTORY_QUERY, BULK_STATS_QUERY
+
+logger = logging.getLogger(__name__)
+
+MIGRATE_ON_STARTUP = os.getenv("NEO4J_MIGRATE_ON_STARTUP", "true").lower() != "false"
+
+# Plan operators that mean a MATCH was not served by an index
+SCAN_OPERATORS = ("NodeByLabelScan", "AllNodesScan")
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A numbered set of schema statements applied together."""
+
+    version: int
+    description: str
+    statements: Tuple[str, ...]
+
+
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(
+        version=1,
+        description="Vault baseline (neo4j/init.cypher, neo4j/vault_init.cypher)",
+        statements=(
+            "CREATE CONSTRAINT schema_migration_version IF NOT EXISTS "
+            "FOR (m:SchemaMigration) REQUIRE m.version IS UNIQUE",
+            "CREATE CONSTRAINT claim_id_unique IF NOT EXISTS "
+            "FOR (c:Claim) REQUIRE c.id IS UNIQUE",
+            "CREATE CONSTRAINT source_name_unique IF NOT EXISTS "
+            "FOR (s:Source) REQUIRE s.name IS UNIQUE",
+            "CREATE INDEX claim_state IF NOT EXISTS FOR (c:Claim) ON (c.state)",
+            "CREATE CONSTRAINT document_id_unique IF NOT EXISTS "
+            "FOR (d:Document) REQUIRE d.id IS UNIQUE",
+            "CREATE INDEX document_user_id IF NOT EXISTS FOR (d:Document) ON (d.user_id)",
+            "CREATE INDEX document_type IF NOT EXISTS FOR (d:Document) ON (d.document_type)",
+            "CREATE INDEX document_hash IF NOT EXISTS FOR (d:Document) ON (d.hash)",
+            "CREATE CONSTRAINT user_id_unique IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE",
+            "CREATE CONSTRAINT attestation_id_unique IF NOT EXISTS "
+            "FOR (a:Attestation) REQUIRE a.id IS UNIQUE",
+            "CREATE INDEX attestation_document_id IF NOT EXISTS "
+            "FOR (a:Attestation) ON (a.document_id)",
+            "CREATE INDEX attestation_fabric_tx_id IF NOT EXISTS "
+            "FOR (a:Attestation) ON (a.fabric_tx_id)",
+            "CREATE INDEX timeline_user_id IF NOT EXISTS FOR (t:TimelineEvent) ON (t.user_id)",
+            "CREATE INDEX timeline_event_type IF NOT EXISTS "
+            "FOR (t:TimelineEvent) ON (t.event_type)",
+            "CREATE INDEX timeline_timestamp IF NOT EXISTS "
+            "FOR (t:TimelineEvent) ON (t.timestamp)",
+            "CREATE CONSTRAINT proof_link_token_unique IF NOT EXISTS "
+            "FOR (p:ProofLink) REQUIRE p.share_token IS UNIQUE",
+            "CREATE INDEX proof_link_document_id IF NOT EXISTS "
+            "FOR (p:ProofLink) ON (p.document_id)",
+        ),
+    ),
+    Migration(
+        version=2,
+        description="Hot lookup keys: apps, agents, nullifiers, hashed share tokens, reputation",
+        statements=(
+            "CREATE CONSTRAINT app_id_unique IF NOT EXISTS FOR (a:App) REQUIRE a.id IS UNIQUE",
+            "CREATE CONSTRAINT agent_id_unique IF NOT EXISTS FOR (a:Agent) REQUIRE a.id IS UNIQUE",
+            "CREATE CONSTRAINT nullifier_hash_unique IF NOT EXISTS "
+            "FOR (n:Nullifier) REQUIRE n.hash IS UNIQUE",
+            "CREATE CONSTRAINT proof_link_token_hash_unique IF NOT EXISTS "
+            "FOR (p:ProofLink) REQUIRE p.share_token_hash IS UNIQUE",
+            "CREATE CONSTRAINT timeline_event_id_unique IF NOT EXISTS "
+            "FOR (t:TimelineEvent) REQUIRE t.id IS UNIQUE",
+            "CREATE CONSTRAINT agent_reputation_id IF NOT EXISTS "
+            "FOR (r:ReputationProof) REQUIRE r.proof_id IS UNIQUE",
+            "CREATE INDEX reputation_agent_time IF NOT EXISTS "
+            "FOR (r:ReputationProof) ON (r.agent_id, r.timestamp)",
+        ),
+    ),
+)
+
+# Hot queries whose plans must start from an index seek, keyed by name.
+HOT_QUERIES: Dict[str, str] = {
+    "claim_by_id": "MATCH (c:Claim {id: $id})<-[:REPORTS]-(s:Source) RETURN c, s LIMIT 1",
+    "app_by_id": "MATCH (a:App {id: $id}) RETURN a",
+    "apps_first_page": (
+        "MATCH (a:App) WHERE a.id IS NOT NULL WITH a ORDER BY a.id LIMIT 25 RETURN a"
+    ),
+    "apps_next_page": "MATCH (a:App) WHERE a.id > $after WITH a ORDER BY a.id LIMIT 25 RETURN a",
+    "user_documents": "MATCH (u:User {id: $user_id})-[:OWNS]->(d:Document) RETURN d",
+    "document_by_id": "MATCH (d:Document {id: $id}) RETURN d",
+    "document_by_hash": "MATCH (d:Document {hash: $hash}) RETURN d LIMIT 1",
+    "nullifier_by_hash": "MATCH (n:Nullifier {hash: $nullifier}) RETURN n LIMIT 1",
+    "share_link_by_hash": "MATCH (p:ProofLink {share_token_hash: $token_hash}) RETURN p",
+    "share_links_plaintext": (
+        "MATCH (p:ProofLink) WHERE p.share_token IS NOT NULL "
+        "RETURN p.share_token AS token LIMIT 500"
+    ),
+    "timeline_event_by_id": "MATCH (e:TimelineEvent {id: $id}) RETURN e",
+    "reputation_history": (
+        "MATCH (r:ReputationProof {agent_id: $agent_id}) WHERE r.timestamp >= $since "
+        "RETURN r ORDER BY r.timestamp DESC"
+    ),
+    "reputation_histories": BULK_HISTORY_QUERY,
+    "reputation_stats": BULK_STATS_QUERY,
+    "agent_by_id": "MATCH (a:Agent {id: $agent_id}) RETURN a",
+    "agents_by_ids": "UNWIND $agent_ids AS agent_id MATCH (a:Agent {id: agent_id}) RETURN a",
+    "agents_page": (
+        "MATCH (a:Agent) WHERE a.id > $after WITH a ORDER BY a.id LIMIT $page_size RETURN a"
+    ),
+}
+
+
+def latest_version() -> int:
+    """Highest migration version defined in code."""
+    return max(m.version for m in MIGRATIONS)
+
+
+async def applied_versions() -> Set[int]:
+    """Versions already recorded in the database."""
+    rows = await read("MATCH (m:SchemaMigration) RETURN m.version AS version")
+    return {int(row["version"]) for row in rows}
+
+
+async def migrate(target: Optional[int] = None, dry_run: bool = False) -> List[int]:
+    """
+    Apply pending migrations up to `target` (default: latest).
+
+    Schema statements are run one per transaction, as Neo4j requires, and the
+    version marker is written only after all of its statements succeed.
+    Returns the versions applied (or that would be applied with dry_run).
+    """
+    target = latest_version() if target is None else target
+    done = await applied_versions()
+    pending = [m for m in MIGRATIONS if m.version not in done and m.version <= target]
+
+    for migration in pending:
+        logger.info(f"Applying schema migration {migration.version}: {migration.description}")
+        if dry_run:
+            continue
+        for statement in migration.statements:
+            await write(statement)
+        await write(
+            """
+            MERGE (m:SchemaMigration {version: $version})
+            SET m.description = $description, m.applied_at = datetime()
+            """,
+            {"version": migration.version, "description": migration.description},
+        )
+
+    return [m.version for m in pending]
+
+
+def find_scans(plan: Optional[Dict[str, Any]]) -> List[str]:
+    """Return the label/all-nodes scan operators found anywhere in a plan tree."""
+    if not plan:
+        return []
+    found = []
+    operator = plan.get("operatorType", "")
+    if operator.split("@")[0] in SCAN_OPERATORS:
+        found.append(operator)
+    for child in plan.get("children", []):
+        found.extend(find_scans(child))
+    return found
+
+
+async def explain(query: str) -> Dict[str, Any]:
+    """Return the EXPLAIN plan for a query without executing it."""
+    async with session(WRITE_ACCESS) as s:
+        result = await s.run(f"EXPLAIN {query}")
+        summary = await result.consume()
+        return summary.plan or {}
+
+
+async def check_query_plans() -> Dict[str, List[str]]:
+    """EXPLAIN every hot query; returns {name: scan operators} for offenders."""
+    offenders = {}
+    for name, query in HOT_QUERIES.items():
+        scans = find_scans(await explain(query))
+        if scans:
+            offenders[name] = scans
+    return offenders
+
+
+async def migrate_on_startup() -> None:
+    """Startup hook: apply pending migrations without blocking boot on failure."""
+    if not MIGRATE_ON_STARTUP:
+        return
+    try:
+        applied = await migrate()
+        if applied:
+            logger.info(f"Neo4j schema migrated to version {latest_version()}")
+    except Exception as e:
+        logger.error(f"Neo4j schema migration failed: {e}")
+
+
+async def _main(args) -> int:
+    from api.database import close_driver
+
+    try:
+        if args.status:
+            done = await applied_versions()
+            for m in MIGRATIONS:
+                state = "applied" if m.version in done else "pending"
+                print(f"{m.version:>4}  {state:<8} {m.description}")
+            return 0
+
+        if args.check_plans:
+            offenders = await check_query_plans()
+            for name, scans in offenders.items():
+                print(f"{name}: {', '.join(scans)}")
+            print(f"{len(HOT_QUERIES) - len(offenders)}/{len(HOT_QUERIES)} hot queries use indexes")
+            return 1 if offenders else 0
+
+        applied = await migrate(target=args.target, dry_run=args.dry_run)
+        verb = "Would apply" if args.dry_run else "Applied"
+        print(f"{verb} migrations: {applied or 'none'}")
+        return 0
+    finally:
+        await close_driver()
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Neo4j schema migrations")
+    parser.add_argument("--target", type=int, help="Migrate up to this version")
+    parser.add_argument("--dry-run", action="store_true", help="List pending migrations only")
+    parser.add_argument("--status", action="store_true", help="Show applied/pending versions")
+    parser.add_argument(
+        "--check-plans", action="store_true", help="Fail if a hot query uses a label scan"
+    )
+
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(_main(parser.parse_args())))
@@ -0,0 +1,168 @@
+"""
+Precomputed share-link verification bundles.
+
+A bundle (document hash, verification key digest, attestation with its
+batch inclusion proof, HMAC signature) only changes once the document's
+batch is anchored, so it is built once per share token and access level and
+served from cache until the link expires or runs out of accesses. Bundles
+are warmed in the background when a link is created. A bundle built while
+the document is still waiting for its batch is cached briefly, so the
+anchored proof is picked up on a later access.
+
+Entries are keyed by the token's SHA-256 (the same hash stored in Neo4j),
+never by the raw token.
+"""
+
+import logging
+import os
+import secrets
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from py2neo import Graph
+
+from api.cache import delete as cache_delete, get as cache_get, set as cache_set
+from api.utils import get_verification_key_hash, hmac_sign
+from blockchain.sdk.fabric_client import FabricClient
+from vault.anchoring import get_attestation, get_document_batcher
+from vault.models import AccessLevel, ProofLink
+from vault.share_links import hash_share_token
+
+logger = logging.getLogger(__name__)
+
+SHARE_BUNDLE_PENDING_TTL = float(os.getenv("SHARE_BUNDLE_PENDING_TTL", "60"))
+SHARE_BUNDLE_WARM_WORKERS = int(os.getenv("SHARE_BUNDLE_WARM_WORKERS", "2"))
+
+AttestationLookup = Callable[[str], Optional[Dict[str, Any]]]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=SHARE_BUNDLE_WARM_WORKERS, thread_name_prefix="share-bundle"
+            )
+        return _executor
+
+
+def attestation_lookup(fabric_client: FabricClient, graph: Graph) -> AttestationLookup:
+    """Lookup through Fabric, falling back to the batcher's stored inclusion proofs."""
+    return lambda document_id: get_attestation(
+        fabric_client, get_document_batcher(graph), document_id
+    )
+
+
+def bundle_cache_key(token_hash: str, access_level: AccessLevel) -> str:
+    return f"share_bundle:{token_hash}:{access_level.value}"
+
+
+class ShareBundleService:
+    """Builds signed share bundles and keeps them cached for the link's lifetime."""
+
+    def __init__(self, vault_storage, attestation_lookup: AttestationLookup):
+        """
+        Initialize the bundle service.
+
+        Args:
+            vault_storage: VaultStorage used for document metadata
+            attestation_lookup: Returns the attestation for a document id,
+                or None while it is pending
+        """
+        self.vault_storage = vault_storage
+        self.attestation_lookup = attestation_lookup
+
+    def get(self, proof_link: ProofLink) -> Dict[str, Any]:
+        """
+        Bundle for a validated link, from cache when possible.
+
+        The entry is dropped once the access that returned `proof_link` is
+        the link's last allowed one.
+
+        Raises:
+            HTTPException: 404 if the document is gone, 503 if the circuit's
+                verification key is unavailable
+        """
+        key = bundle_cache_key(hash_share_token(proof_link.share_token), proof_link.access_level)
+        bundle = cache_get(key)
+        if bundle is None:
+            bundle = self._build_and_store(proof_link, key)
+        if proof_link.max_accesses and proof_link.access_count + 1 >= proof_link.max_accesses:
+            cache_delete(key)
+        return bundle
+
+    def warm(self, proof_link: ProofLink) -> Future:
+        """Build and cache a new link's bundle in the background."""
+        key = bundle_cache_key(hash_share_token(proof_link.share_token), proof_link.access_level)
+
+        def build():
+            try:
+                self._build_and_store(proof_link, key)
+            except Exception as e:
+                logger.warning(f"Share bundle warm-up failed for {proof_link.document_id}: {e}")
+
+        return _get_executor().submit(build)
+
+    def build(self, proof_link: ProofLink) -> Dict[str, Any]:
+        """Resolve and sign the bundle for a link (uncached)."""
+        doc_meta = self.vault_storage.get_document_metadata(proof_link.document_id)
+        if not doc_meta:
+            raise HTTPException(status_code=404, detail="Not found")
+
+        # Only query attestation if needed (can be slow)
+        attestation = None
+        if proof_link.proof_type:
+            try:
+                attestation = self.attestation_lookup(proof_link.document_id)
+            except Exception:
+                pass  # Don't fail if attestation query fails
+
+        bundle = {
+            "share_token": proof_link.share_token,
+            "document_id": proof_link.document_id,
+            "proof_type": proof_link.proof_type,
+            "access_level": proof_link.access_level.value,
+            "document_hash": doc_meta.get("hash"),
+            "issued_at": datetime.utcnow().isoformat(),
+            "expires_at": proof_link.expires_at.isoformat() if proof_link.expires_at else None,
+            "max_accesses": proof_link.max_accesses,
+            "nonce": secrets.token_hex(16),
+            "verification": {
+                "circuit": proof_link.proof_type,
+                "vk_url": f"/zkp/artifacts/{proof_link.proof_type}/verification_key.json",
+                "vk_sha256": get_verification_key_hash(proof_link.proof_type),
+                "attestation": attestation or None,
+            },
+        }
+
+        if not bundle["verification"]["vk_sha256"]:
+            raise HTTPException(status_code=503, detail="Verification key unavailable for circuit")
+
+        signature = hmac_sign(bundle)
+        if signature:
+            bundle["signature"] = signature
+        return bundle
+
+    def _build_and_store(self, proof_link: ProofLink, key: str) -> Dict[str, Any]:
+        bundle = self.build(proof_link)
+        ttl = self._ttl(proof_link, bundle)
+        if ttl > 0:
+            cache_set(key, bundle, ttl=ttl)
+        return bundle
+
+    @staticmethod
+    def _ttl(proof_link: ProofLink, bundle: Dict[str, Any]) -> float:
+        """Cache lifetime: until the link expires, or briefly while unanchored."""
+        if proof_link.expires_at is None:
+            ttl = float("inf")
+        else:
+            ttl = (proof_link.expires_at - datetime.utcnow()).total_seconds()
+        if proof_link.proof_type and not bundle["verification"]["attestation"]:
+            ttl = min(ttl, SHARE_BUNDLE_PENDING_TTL)
+        return ttl
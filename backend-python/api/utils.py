@@ -11,35 +11,42 @@ import base64
 from pathlib import Path
 from typing import Dict
 
+from zkp.artifact_manager import MISMATCH, get_artifact_manager
+
 # Configuration
 HMAC_SECRET = os.getenv("BUNDLE_HMAC_SECRET")
 
+# Circuits whose verification keys must be present before serving
+REQUIRED_CIRCUITS = ("age", "authenticity")
+
 # Verification key hashes cache
 _VERIFICATION_KEY_HASHES: Dict[str, str] = {}
 
 
 def get_artifacts_dir() -> Path:
     """Get the path to ZK artifacts directory."""
-    return Path(__file__).resolve().parent.parent / "zkp" / "artifacts"
+    return get_artifact_manager().artifacts_dir
 
 
 def load_verification_key_hashes() -> None:
-    """Compute SHA-256 hashes of verification keys and ensure presence."""
-    artifacts_dir = get_artifacts_dir()
-    required_verification_keys = {
-        "age": artifacts_dir / "age" / "verification_key.json",
-        "authenticity": artifacts_dir / "authenticity" / "verification_key.json",
-    }
+    """Verify all artifacts once via the artifact manager and cache vkey hashes."""
+    manager = get_artifact_manager()
     missing_keys = [
-        str(key_path) for key_path in required_verification_keys.values() if not key_path.exists()
+        str(manager.paths(circuit)["vkey"])
+        for circuit in REQUIRED_CIRCUITS
+        if not manager.available(circuit, "vkey")
     ]
     if missing_keys:
         raise RuntimeError(
             f"Missing verification keys: {missing_keys}. Run zkp build to generate real vkeys."
         )
-    for circuit, key_path in required_verification_keys.items():
-        key_data = key_path.read_bytes()
-        _VERIFICATION_KEY_HASHES[circuit] = hashlib.sha256(key_data).hexdigest()
+    report = manager.preload()
+    failed = [c for c, states in report.items() if MISMATCH in states.values()]
+    if failed:
+        raise RuntimeError(f"Circuit artifact integrity check failed: {failed}")
+    for circuit, states in report.items():
+        if "vkey" in states:
+            _VERIFICATION_KEY_HASHES[circuit] = manager.vkey_hash(circuit)
 
 
 def get_verification_key_hash(circuit: str) -> str:
@@ -58,4 +65,10 @@ def hmac_sign(payload: dict) -> str:
 
 def verification_keys_ready() -> bool:
     """Check if all verification keys are loaded."""
-    return all(_VERIFICATION_KEY_HASHES.get(circuit) for circuit in ("age", "authenticity"))
+    return all(_VERIFICATION_KEY_HASHES.get(circuit) for circuit in REQUIRED_CIRCUITS)
+
+
+# Short names used by api.app
+load_vkey_hashes = load_verification_key_hashes
+get_vkey_hash = get_verification_key_hash
+vkeys_ready = verification_keys_ready
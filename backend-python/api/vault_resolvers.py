@@ -2,30 +2,32 @@
 GraphQL resolvers for vault operations.
 """
 
-import os
 from datetime import datetime
 from ariadne import MutationType, QueryType
-from py2neo import Graph
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 
 from vault.storage import VaultStorage
 from vault.models import AccessLevel
 from vault.zk_proofs import ZKProofService
 from vault.share_links import ShareLinkService
 from vault.timeline import TimelineService
+from vault.anchoring import get_attestation_async, get_document_batcher
 from blockchain.sdk.fabric_client import FabricClient
+from blockchain.sdk.fabric_gateway import get_async_fabric_client
+from api.database import flush_user_writes, get_graph, read
+from api.share_bundles import ShareBundleService, attestation_lookup
 
-# Initialize services
-NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
-NEO4J_PASS = os.getenv("NEO4J_PASS", "test")
-
-graph = Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+# Initialize services. Vault services still use the py2neo Graph, so async
+# resolvers call them through run_in_threadpool to keep the event loop free.
 vault_storage = VaultStorage()
 zk_service = ZKProofService()
-share_link_service = ShareLinkService(graph)
-timeline_service = TimelineService(graph)
+share_link_service = ShareLinkService(get_graph())
+timeline_service = TimelineService(get_graph())
 fabric_client = FabricClient()
+share_bundle_service = ShareBundleService(
+    vault_storage, attestation_lookup(fabric_client, get_graph())
+)
 
 # Resolvers
 query = QueryType()
@@ -41,9 +43,10 @@ def _require_user(info) -> str:
 
 
 @query.field("myDocuments")
-def resolve_my_documents(_, info):
+async def resolve_my_documents(_, info):
     """Get current user's documents."""
     user_id = _require_user(info)
+    await flush_user_writes(user_id)
 
     query_cypher = """
     MATCH (u:User {id: $user_id})-[:OWNS]->(d:Document)
@@ -51,7 +54,7 @@ def resolve_my_documents(_, info):
     ORDER BY d.created_at DESC
     """
 
-    results = graph.run(query_cypher, {"user_id": user_id}).data()
+    results = await read(query_cypher, {"user_id": user_id})
 
     documents = []
     for record in results:
@@ -76,16 +79,17 @@ def resolve_my_documents(_, info):
 
 
 @query.field("document")
-def resolve_document(_, info, id):
+async def resolve_document(_, info, id):
     """Get a specific document by ID."""
     user_id = _require_user(info)
+    await flush_user_writes(user_id)
     query_cypher = """
     MATCH (u:User {id: $user_id})-[:OWNS]->(d:Document {id: $id})
     RETURN d
     LIMIT 1
     """
 
-    results = graph.run(query_cypher, {"id": id, "user_id": user_id}).data()
+    results = await read(query_cypher, {"id": id, "user_id": user_id})
     if not results:
         raise HTTPException(status_code=404, detail="Document not found or access denied")
 
@@ -107,11 +111,11 @@ def resolve_document(_, info, id):
 
 
 @query.field("myTimeline")
-def resolve_my_timeline(_, info, limit=50):
+async def resolve_my_timeline(_, info, limit=50):
     """Get current user's timeline."""
     user_id = _require_user(info)
 
-    events = timeline_service.get_timeline(user_id=user_id, limit=limit)
+    events = await run_in_threadpool(timeline_service.get_timeline, user_id=user_id, limit=limit)
 
     timeline = []
     for event in events:
@@ -131,9 +135,9 @@ def resolve_my_timeline(_, info, limit=50):
 
 
 @query.field("verifyShareLink")
-def resolve_verify_share_link(_, info, token):
+async def resolve_verify_share_link(_, info, token):
     """Verify and get share link details."""
-    proof_link = share_link_service.validate_token(token)
+    proof_link = await run_in_threadpool(share_link_service.validate_token, token)
 
     if not proof_link:
         return None
@@ -151,9 +155,11 @@ def resolve_verify_share_link(_, info, token):
 
 
 @query.field("attestation")
-def resolve_attestation(_, info, documentId):
+async def resolve_attestation(_, info, documentId):
     """Get attestation for a document."""
-    attestation = fabric_client.query_attestation(documentId)
+    attestation = await get_attestation_async(
+        get_async_fabric_client(), get_document_batcher(get_graph()), documentId
+    )
 
     if not attestation:
         return None
@@ -195,14 +201,14 @@ def resolve_upload_document(_, info, documentType, fileName=None, mimeType=None,
 
 
 @mutation.field("generateProof")
-def resolve_generate_proof(_, info, documentId, proofType, proofParams=None):
+async def resolve_generate_proof(_, info, documentId, proofType, proofParams=None):
     """Generate a zero-knowledge proof."""
     import json
 
     user_id = _require_user(info)
 
     # Get document metadata
-    doc_meta = vault_storage.get_document_metadata(documentId)
+    doc_meta = await run_in_threadpool(vault_storage.get_document_metadata, documentId)
     if not doc_meta:
         raise ValueError(f"Document {documentId} not found")
     if doc_meta.get("user_id") != user_id:
@@ -224,8 +230,11 @@ def resolve_generate_proof(_, info, documentId, proofType, proofParams=None):
         if not birth_date:
             raise ValueError("birth_date required for age_proof")
 
-        proof_result = zk_service.generate_age_proof(
-            birth_date=birth_date, min_age=min_age, document_hash=doc_meta["hash"]
+        proof_result = await run_in_threadpool(
+            zk_service.generate_age_proof,
+            birth_date=birth_date,
+            min_age=min_age,
+            document_hash=doc_meta["hash"],
         )
 
     elif proofType == "authenticity_proof":
@@ -238,7 +247,8 @@ def resolve_generate_proof(_, info, documentId, proofType, proofParams=None):
                 "merkle_proof and merkle_positions are required for authenticity_proof"
             )
 
-        proof_result = zk_service.generate_authenticity_proof(
+        proof_result = await run_in_threadpool(
+            zk_service.generate_authenticity_proof,
             document_hash=doc_meta["hash"],
             merkle_root=merkle_root,
             merkle_proof=merkle_proof,
@@ -249,7 +259,8 @@ def resolve_generate_proof(_, info, documentId, proofType, proofParams=None):
         raise ValueError(f"Unknown proof type: {proofType}")
 
     # Log timeline event
-    timeline_service.log_event(
+    await run_in_threadpool(
+        timeline_service.log_event,
         user_id=user_id,
         event_type="proof_generated",
         document_id=documentId,
@@ -265,7 +276,7 @@ def resolve_generate_proof(_, info, documentId, proofType, proofParams=None):
 
 
 @mutation.field("createShareLink")
-def resolve_create_share_link(
+async def resolve_create_share_link(
     _, info, documentId, expiresAt=None, accessLevel="PROOF_ONLY", proofType=None, maxAccesses=None
 ):
     """Create a shareable proof link."""
@@ -280,12 +291,13 @@ def resolve_create_share_link(
     access_level = AccessLevel[accessLevel]
 
     # Verify document ownership
-    meta = vault_storage.get_document_metadata(documentId)
+    meta = await run_in_threadpool(vault_storage.get_document_metadata, documentId)
     if not meta or meta.get("user_id") != user_id:
         raise HTTPException(status_code=404, detail="Document not found or access denied")
 
     # Create share link
-    proof_link = share_link_service.create_share_link(
+    proof_link = await run_in_threadpool(
+        share_link_service.create_share_link,
         document_id=documentId,
         user_id=user_id,
         access_level=access_level,
@@ -293,9 +305,11 @@ def resolve_create_share_link(
         proof_type=proofType,
         max_accesses=maxAccesses,
     )
+    share_bundle_service.warm(proof_link)
 
     # Log timeline event
-    timeline_service.log_event(
+    await run_in_threadpool(
+        timeline_service.log_event,
         user_id=user_id,
         event_type="share_link_created",
         document_id=documentId,
@@ -4,38 +4,40 @@ REST endpoints for vault operations (file uploads, share links, QR codes).
 
 import os
 import base64
-import secrets
 import time
 from typing import Optional
 import logging
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request, status, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
-from py2neo import Graph
 
 from vault.storage import VaultStorage
 from vault.models import DocumentType
 from vault.share_links import ShareLinkService
 from vault.timeline import TimelineService
+from vault.write_behind import get_write_behind
+from vault.anchoring import get_attestation_async, get_document_batcher, queue_document_anchor
 from blockchain.sdk.fabric_client import FabricClient
-from api.qr_generator import generate_qr_response
-from api.cache import cached, get as cache_get, set as cache_set
+from blockchain.sdk.fabric_gateway import get_async_fabric_client
+from api.qr_generator import MEDIA_TYPES as QR_MEDIA_TYPES, generate_qr_response
 from api.monitoring import record_metric
-from api.utils import get_verification_key_hash, hmac_sign
+from api.share_bundles import ShareBundleService, attestation_lookup
 from api.auth import get_current_user
+from api.database import flush_user_writes, get_graph, get_read_session, read
 from datetime import datetime
 
-# Initialize services
-NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
-NEO4J_PASS = os.getenv("NEO4J_PASS", "test")
+# Initialize services. Vault services still use the py2neo Graph, so route
+# handlers call them through run_in_threadpool to keep the event loop free.
 PUBLIC_RATE_LIMIT_WINDOW = int(os.getenv("PUBLIC_RATE_LIMIT_WINDOW", "60"))
 PUBLIC_RATE_LIMIT_MAX = int(os.getenv("PUBLIC_RATE_LIMIT_MAX", "20"))
 
-graph = Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
 vault_storage = VaultStorage()
-share_link_service = ShareLinkService(graph)
-timeline_service = TimelineService(graph)
+share_link_service = ShareLinkService(get_graph())
+timeline_service = TimelineService(get_graph())
 fabric_client = FabricClient()
+share_bundle_service = ShareBundleService(
+    vault_storage, attestation_lookup(fabric_client, get_graph())
+)
 logger = logging.getLogger("security")
 
 # Simple in-memory rate limiter for public endpoints (best-effort, per-IP)
@@ -93,7 +95,8 @@ async def upload_document(
             pass
 
     # Upload and encrypt document
-    document = vault_storage.upload_document(
+    document = await run_in_threadpool(
+        vault_storage.upload_document,
         user_id=uid,
         document_data=file_data,
         document_type=doc_type,
@@ -102,25 +105,17 @@ async def upload_document(
         metadata=meta,
     )
 
-    # Anchor to Fabric
+    # Queue for the next Merkle batch anchored to Fabric; the attestation is
+    # recorded when the batch root is anchored
     try:
-        anchor_result = fabric_client.anchor_document(
-            document_id=document.id, document_hash=document.hash
+        anchor_batch_id = await run_in_threadpool(
+            queue_document_anchor, get_graph(), document.id, document.hash, uid
         )
-        fabric_tx_id = anchor_result.get("transactionId")
     except Exception as e:
         logger.warning("fabric_anchor_failed", extra={"error": str(e), "document_id": document.id})
-        fabric_tx_id = None
+        anchor_batch_id = None
 
     # Persist to Neo4j
-    from datetime import datetime
-    from py2neo import Node, Relationship
-
-    tx = graph.begin()
-
-    user_node = Node("User", id=uid)
-    tx.merge(user_node, "User", "id")
-
     doc_props = {
         "id": document.id,
         "user_id": uid,
@@ -134,71 +129,68 @@ async def upload_document(
     if meta:
         doc_props["metadata"] = json.dumps(meta)
 
-    doc_node = Node("Document", **doc_props)
-    tx.merge(doc_node, "Document", "id")
-
-    owns_rel = Relationship(user_node, "OWNS", doc_node)
-    tx.merge(owns_rel)
-
-    if fabric_tx_id:
-        att_node = Node(
-            "Attestation",
-            id=f"att_{document.id}",
-            document_id=document.id,
-            fabric_tx_id=fabric_tx_id,
-            timestamp=datetime.utcnow().isoformat(),
-        )
-        tx.merge(att_node, "Attestation", "id")
-
-        attests_rel = Relationship(att_node, "ATTESTS", doc_node)
-        tx.merge(attests_rel)
-
-    tx.commit()
+    # Queued with the timeline event below; both commit in the same batch
+    await run_in_threadpool(
+        get_write_behind(get_graph()).enqueue,
+        "document",
+        uid,
+        {"user_id": uid, "props": doc_props, "attestation": None},
+    )
 
     # Log timeline event
-    timeline_service.log_event(
+    await run_in_threadpool(
+        timeline_service.log_event,
         user_id=uid,
         event_type="document_uploaded",
         document_id=document.id,
-        attestation_id=f"att_{document.id}" if fabric_tx_id else None,
         metadata={
             "document_type": doc_type.value,
             "file_name": file.filename,
-            "fabric_tx_id": fabric_tx_id,
+            "anchor_batch_id": anchor_batch_id,
         },
     )
 
     return {
         "document_id": document.id,
         "hash": document.hash,
-        "fabric_tx_id": fabric_tx_id,
+        # Available from the attestation once the batch is anchored
+        "fabric_tx_id": None,
+        "anchor_batch_id": anchor_batch_id,
         "message": "Document uploaded and encrypted successfully",
     }
 
 
 @router.get("/document/{document_id}")
-async def get_document(document_id: str, user=Depends(get_current_user)):
+async def get_document(
+    document_id: str,
+    user=Depends(get_current_user),
+    neo4j_session=Depends(get_read_session),
+):
     """
     Retrieve a document (decrypted).
     Requires authentication.
     """
     uid = user["user_id"]
+    # The Document node may still be queued from a just-finished upload
+    await flush_user_writes(uid)
 
     # Verify ownership
     query = """
     MATCH (u:User {id: $user_id})-[:OWNS]->(d:Document {id: $doc_id})
     RETURN d
     """
-    results = graph.run(query, {"user_id": uid, "doc_id": document_id}).data()
+    results = await read(
+        query, {"user_id": uid, "doc_id": document_id}, neo4j_session=neo4j_session
+    )
 
     if not results:
         raise HTTPException(status_code=404, detail="Document not found or access denied")
 
     # Decrypt and return document
     try:
-        doc_data = vault_storage.download_document(uid, document_id)
+        doc_data = await run_in_threadpool(vault_storage.download_document, uid, document_id)
 
-        doc_meta = vault_storage.get_document_metadata(document_id)
+        doc_meta = await run_in_threadpool(vault_storage.get_document_metadata, document_id)
 
         return JSONResponse(
             content={
@@ -222,18 +214,20 @@ async def verify_share_link(token: str, request: Request):
     """
     _check_rate_limit(f"share:{request.client.host}")
 
-    proof_link = share_link_service.validate_token(token)
+    proof_link = await run_in_threadpool(share_link_service.validate_token, token)
 
     if not proof_link:
         raise HTTPException(status_code=404, detail="Not found")
 
     # Get document metadata
-    doc_meta = vault_storage.get_document_metadata(proof_link.document_id)
+    doc_meta = await run_in_threadpool(vault_storage.get_document_metadata, proof_link.document_id)
     if not doc_meta:
         raise HTTPException(status_code=404, detail="Not found")
 
     # Get attestation
-    attestation = fabric_client.query_attestation(proof_link.document_id)
+    attestation = await get_attestation_async(
+        get_async_fabric_client(), get_document_batcher(get_graph()), proof_link.document_id
+    )
 
     # Return data based on access level
     response_data = {
@@ -272,80 +266,45 @@ async def verify_share_link(token: str, request: Request):
 
 
 @router.get("/qr/{token}")
-async def get_qr_code(token: str, request: Request):
+async def get_qr_code(token: str, request: Request, format: str = "png"):
     """
-    Generate QR code for a share link.
+    Generate QR code for a share link as PNG (default) or SVG.
+
+    Rendered images are cached and carry an ETag; clients revalidating with
+    If-None-Match get 304 Not Modified.
     """
     _check_rate_limit(f"qr:{request.client.host}")
+    if format not in QR_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be png or svg")
     share_url = share_link_service.get_share_url(token)
-    return generate_qr_response(share_url)
+    return generate_qr_response(
+        share_url, fmt=format, if_none_match=request.headers.get("if-none-match")
+    )
 
 
 @router.get("/share/{token}/bundle")
-@cached(ttl=60.0, key_prefix="share_bundle")  # Cache for 60 seconds
 async def get_share_bundle(token: str, request: Request):
     """
     Resolve a share token into a verification bundle for QR consumers.
-    Optimized for <0.2s response time with caching.
+    Optimized for <0.2s response time: the signed bundle is cached per link
+    and access level until the link expires.
     """
     start_time = time.time()
     client_key = f"bundle:{request.client.host}"
     _check_rate_limit(client_key)
 
-    # Check cache first
-    cache_key = f"share_bundle:{token}"
-    cached_bundle = cache_get(cache_key)
-    if cached_bundle:
-        record_metric("share_bundle", time.time() - start_time, success=True)
-        return cached_bundle
-
-    proof_link = share_link_service.validate_token(token)
+    # Validated on every access so expiry, revocation and max_accesses hold
+    proof_link = await run_in_threadpool(share_link_service.validate_token, token)
 
     if not proof_link:
         record_metric("share_bundle", time.time() - start_time, success=False)
         raise HTTPException(status_code=404, detail="Not found")
 
-    doc_meta = vault_storage.get_document_metadata(proof_link.document_id)
-    if not doc_meta:
-        record_metric("share_bundle", time.time() - start_time, success=False)
-        raise HTTPException(status_code=404, detail="Not found")
-
-    # Only query attestation if needed (can be slow)
-    attestation = None
-    if proof_link.proof_type:
-        try:
-            attestation = fabric_client.query_attestation(proof_link.document_id)
-        except Exception:
-            pass  # Don't fail if attestation query fails
-
-    bundle = {
-        "share_token": proof_link.share_token,
-        "document_id": proof_link.document_id,
-        "proof_type": proof_link.proof_type,
-        "access_level": proof_link.access_level.value,
-        "document_hash": doc_meta.get("hash"),
-        "issued_at": datetime.utcnow().isoformat(),
-        "expires_at": proof_link.expires_at.isoformat() if proof_link.expires_at else None,
-        "max_accesses": proof_link.max_accesses,
-        "nonce": secrets.token_hex(16),
-        "verification": {
-            "circuit": proof_link.proof_type,
-            "vk_url": f"/zkp/artifacts/{proof_link.proof_type}/verification_key.json",
-            "vk_sha256": get_verification_key_hash(proof_link.proof_type),
-            "attestation": attestation or None,
-        },
-    }
-
-    if not bundle["verification"]["vk_sha256"]:
+    try:
+        bundle = await run_in_threadpool(share_bundle_service.get, proof_link)
+    except HTTPException:
         record_metric("share_bundle", time.time() - start_time, success=False)
-        raise HTTPException(status_code=503, detail="Verification key unavailable for circuit")
-
-    signature = hmac_sign(bundle)
-    if signature:
-        bundle["signature"] = signature
-
-    # Cache the bundle
-    cache_set(cache_key, bundle, ttl=60.0)
+        raise
 
     duration = time.time() - start_time
     record_metric("share_bundle", duration, success=True)
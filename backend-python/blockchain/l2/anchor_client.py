@@ -0,0 +1,189 @@
+"""
+Anchor clients for Merkle batch roots.
+
+`MerkleBatcher` anchors one root per batch through an `AnchorClient`:
+`FabricAnchorClient` writes it with the vault_anchor chaincode over the
+pooled `AsyncFabricClient`, and `LocalAnchorClient` appends it to a
+JSON-lines file for tests and local development.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Dict, Optional
+
+from blockchain.sdk.fabric_gateway import AsyncFabricClient
+from blockchain.sdk.local_peer import STORAGE_DIR
+
+ANCHOR_LOG_PATH = os.getenv("ANCHOR_LOG_PATH", str(STORAGE_DIR / "anchors.jsonl"))
+
+
+class AnchorError(Exception):
+    """Raised when a batch root cannot be anchored"""
+
+    pass
+
+
+@dataclass
+class AnchorReceipt:
+    """Where and when a batch root was anchored."""
+
+    batch_id: str
+    merkle_root: str
+    leaf_count: int
+    tx_id: str
+    backend: str
+    timestamp: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AnchorReceipt":
+        return cls(**{k: data[k] for k in cls.__dataclass_fields__})
+
+
+class AnchorClient(ABC):
+    """Anchors batch roots to an external ledger."""
+
+    backend = "abstract"
+
+    @abstractmethod
+    def anchor_root(self, batch_id: str, merkle_root: str, leaf_count: int) -> AnchorReceipt:
+        """
+        Anchor one batch root.
+
+        Raises:
+            AnchorError: If the ledger rejects or cannot be reached
+        """
+
+    @abstractmethod
+    def get_anchor(self, batch_id: str) -> Optional[AnchorReceipt]:
+        """Anchored receipt for a batch, or None if unknown."""
+
+    def close(self) -> None:
+        pass
+
+    def _receipt(self, batch_id: str, merkle_root: str, leaf_count: int, tx_id: str):
+        return AnchorReceipt(
+            batch_id=batch_id,
+            merkle_root=merkle_root,
+            leaf_count=leaf_count,
+            tx_id=tx_id,
+            backend=self.backend,
+            timestamp=datetime.utcnow().isoformat(),
+        )
+
+
+class FabricAnchorClient(AnchorClient):
+    """
+    Anchors batch roots with the vault_anchor chaincode, keyed by batch id.
+
+    Calls go through an `AsyncFabricClient`, so roots are submitted on its
+    persistent connection pool. `MerkleBatcher` anchors from its flush
+    thread, so the client runs on a private event loop thread started on
+    first use.
+    """
+
+    backend = "fabric"
+
+    def __init__(self, fabric_client: Optional[AsyncFabricClient] = None):
+        self.fabric_client = fabric_client or AsyncFabricClient()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    @staticmethod
+    def _anchor_id(batch_id: str) -> str:
+        return f"batch_{batch_id}"
+
+    def _call(self, call: Awaitable[Any]) -> Any:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="fabric-anchor-loop", daemon=True
+                ).start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(call, loop).result()
+
+    def anchor_root(self, batch_id: str, merkle_root: str, leaf_count: int) -> AnchorReceipt:
+        document = {
+            "document_id": self._anchor_id(batch_id),
+            "document_hash": merkle_root,
+            "merkle_root": merkle_root,
+        }
+        try:
+            # One root per batch: submit it now rather than lingering for more
+            (result,) = self._call(self.fabric_client.anchor_documents([document]))
+        except Exception as e:
+            raise AnchorError(f"Fabric anchoring failed for batch {batch_id}: {e}") from e
+        if not result.get("success"):
+            raise AnchorError(f"Fabric rejected batch {batch_id}: {result}")
+        return self._receipt(batch_id, merkle_root, leaf_count, result["transactionId"])
+
+    def get_anchor(self, batch_id: str) -> Optional[AnchorReceipt]:
+        anchor = self._call(self.fabric_client.query_attestation(self._anchor_id(batch_id)))
+        if not anchor:
+            return None
+        return AnchorReceipt(
+            batch_id=batch_id,
+            merkle_root=anchor.get("merkleRoot", ""),
+            leaf_count=anchor.get("leafCount", 0),
+            tx_id=anchor.get("fabricTxId", ""),
+            backend=self.backend,
+            timestamp=anchor.get("timestamp", ""),
+        )
+
+    def close(self) -> None:
+        """Close the connection pool and stop the event loop thread."""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.fabric_client.close(), loop).result()
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+
+
+class LocalAnchorClient(AnchorClient):
+    """File-backed stand-in for a ledger: one JSON line per anchored root."""
+
+    backend = "local"
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or ANCHOR_LOG_PATH
+        self._lock = threading.Lock()
+        self._anchors: Optional[Dict[str, AnchorReceipt]] = None
+
+    def _load(self) -> Dict[str, AnchorReceipt]:
+        if self._anchors is None:
+            self._anchors = {}
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    for line in f:
+                        if line.strip():
+                            receipt = AnchorReceipt.from_dict(json.loads(line))
+                            self._anchors[receipt.batch_id] = receipt
+        return self._anchors
+
+    def anchor_root(self, batch_id: str, merkle_root: str, leaf_count: int) -> AnchorReceipt:
+        with self._lock:
+            anchors = self._load()
+            if batch_id in anchors:
+                raise AnchorError(f"Batch {batch_id} already anchored")
+            tx_id = f"local_{len(anchors) + 1:08d}"
+            receipt = self._receipt(batch_id, merkle_root, leaf_count, tx_id)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(receipt.to_dict()) + "\n")
+            anchors[batch_id] = receipt
+            return receipt
+
+    def get_anchor(self, batch_id: str) -> Optional[AnchorReceipt]:
+        with self._lock:
+            return self._load().get(batch_id)
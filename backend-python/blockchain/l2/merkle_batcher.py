@@ -0,0 +1,562 @@
+"""
+Merkle batching for document anchoring.
+
+Instead of one ledger transaction per uploaded document, document hashes
+are accumulated over a size or time window into an incremental Merkle tree
+and only the root is anchored. Every document gets an inclusion proof
+against its batch root, stored for later verification.
+
+Tree: SHA-256 with domain separation (0x00 leaves, 0x01 nodes). A node
+without a right sibling is promoted to the next level unchanged, so no leaf
+is ever duplicated. Leaves bind the document id to its hash.
+
+Durability: queued documents are appended to the process's own pending
+journal and only marked done once their batch is anchored, their proofs are
+stored and the `on_anchored` callback has succeeded. A starting batcher
+adopts and replays the journals of exited processes. Failed callbacks are
+retried on every flush cycle.
+"""
+
+import atexit
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from blockchain.l2.anchor_client import AnchorClient, AnchorReceipt, FabricAnchorClient
+from blockchain.sdk.local_peer import STORAGE_DIR
+
+logger = logging.getLogger(__name__)
+
+ANCHOR_BATCH_MAX = int(os.getenv("ANCHOR_BATCH_MAX", "1000"))
+ANCHOR_BATCH_INTERVAL = float(os.getenv("ANCHOR_BATCH_INTERVAL", "30"))
+ANCHOR_PROOF_DIR = os.getenv("ANCHOR_PROOF_DIR", str(STORAGE_DIR / "proofs"))
+# Default: a journal/ directory next to the stored proofs
+ANCHOR_JOURNAL_DIR = os.getenv("ANCHOR_JOURNAL_DIR", "")
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def leaf_hash(document_id: str, document_hash: str) -> str:
+    """Leaf for a document: binds its id to its content hash."""
+    data = f"{document_id}:{document_hash}".encode()
+    return hashlib.sha256(LEAF_PREFIX + data).hexdigest()
+
+
+def node_hash(left: str, right: str) -> str:
+    return hashlib.sha256(NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+class IncrementalMerkleTree:
+    """
+    Append-only Merkle tree.
+
+    Appending recomputes only the right edge (O(log n)); the root and any
+    inclusion proof are read from the stored levels.
+    """
+
+    def __init__(self):
+        self.levels: List[List[str]] = [[]]
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    def append(self, leaf: str) -> int:
+        """Add a leaf hash; returns its index."""
+        index = len(self.levels[0])
+        self.levels[0].append(leaf)
+        i = index
+        for depth in range(len(self.levels)):
+            level = self.levels[depth]
+            if len(level) == 1:
+                break
+            parent = i // 2
+            left = level[2 * parent]
+            value = node_hash(left, level[2 * parent + 1]) if 2 * parent + 1 < len(level) else left
+            if depth + 1 == len(self.levels):
+                self.levels.append([])
+            above = self.levels[depth + 1]
+            if parent < len(above):
+                above[parent] = value
+            else:
+                above.append(value)
+            i = parent
+        return index
+
+    @property
+    def root(self) -> Optional[str]:
+        return self.levels[-1][0] if self.levels[0] else None
+
+    def proof(self, index: int) -> List[Tuple[str, str]]:
+        """Sibling path for a leaf as (hash, "L" | "R") pairs, leaf to root."""
+        path = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                path.append((level[sibling], "L" if sibling < index else "R"))
+            index //= 2
+        return path
+
+
+@dataclass
+class InclusionProof:
+    """Proof that a document is included in an anchored batch root."""
+
+    document_id: str
+    document_hash: str
+    leaf_index: int
+    siblings: List[Tuple[str, str]]
+    merkle_root: str
+    batch_id: str
+    tx_id: Optional[str] = None
+    backend: Optional[str] = None
+    anchored_at: Optional[str] = None
+
+    def compute_root(self) -> str:
+        value = leaf_hash(self.document_id, self.document_hash)
+        for sibling, side in self.siblings:
+            value = node_hash(sibling, value) if side == "L" else node_hash(value, sibling)
+        return value
+
+    def verify(self, document_hash: Optional[str] = None) -> bool:
+        """Check the path leads from the document to the batch root."""
+        if document_hash is not None and document_hash != self.document_hash:
+            return False
+        return self.compute_root() == self.merkle_root
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["siblings"] = [list(s) for s in self.siblings]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "InclusionProof":
+        fields = {k: data.get(k) for k in cls.__dataclass_fields__}
+        fields["siblings"] = [tuple(s) for s in data["siblings"]]
+        return cls(**fields)
+
+
+class ProofStore:
+    """Inclusion proofs on disk, one JSON file per document."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or ANCHOR_PROOF_DIR
+
+    def _path(self, document_id: str) -> str:
+        return os.path.join(self.directory, f"{document_id}.json")
+
+    def put_many(self, proofs: List[InclusionProof]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        for proof in proofs:
+            with open(self._path(proof.document_id), "w") as f:
+                json.dump(proof.to_dict(), f)
+
+    def get(self, document_id: str) -> Optional[InclusionProof]:
+        path = self._path(document_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return InclusionProof.from_dict(json.load(f))
+
+
+@dataclass
+class BatchEntry:
+    """A document waiting for its batch to be anchored."""
+
+    document_id: str
+    document_hash: str
+    batch_id: str
+    context: Dict[str, Any] = field(default_factory=dict)
+
+
+class PendingJournal:
+    """
+    Per-process JSON-lines logs of documents queued for anchoring.
+
+    Each process appends to its own `pending-<pid>-<id>.jsonl` in `directory`
+    and holds an exclusive flock on it while alive. `add` records are written
+    when a document is queued and `done` records once it no longer needs
+    replaying; `load()` returns what is left.
+
+    On start, journals whose lock is free (their process has exited) are
+    adopted: their pending records are copied into this process's journal
+    and the file is removed. A process therefore never rewrites another's
+    records, and each orphaned document is replayed by exactly one process.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._file = self._open_new()
+        self.adopted = self._adopt_orphans()
+
+    @property
+    def path(self) -> str:
+        return self._file.name
+
+    def _open_new(self):
+        path = os.path.join(self.directory, f"pending-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl")
+        f = open(path, "a")
+        fcntl.flock(f, fcntl.LOCK_EX)
+        return f
+
+    @staticmethod
+    def _add_record(entry: BatchEntry) -> Dict[str, Any]:
+        return {
+            "op": "add",
+            "document_id": entry.document_id,
+            "document_hash": entry.document_hash,
+            "context": entry.context,
+        }
+
+    @staticmethod
+    def _pending(lines) -> Dict[str, Dict[str, Any]]:
+        pending: Dict[str, Dict[str, Any]] = {}
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line from a crash
+            if record.get("op") == "add":
+                pending[record["document_id"]] = record
+            elif record.get("op") == "done":
+                for document_id in record["document_ids"]:
+                    pending.pop(document_id, None)
+        return pending
+
+    def _write(self, f, records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _adopt_orphans(self) -> int:
+        """Take over the pending records of journals whose process has exited."""
+        adopted: Dict[str, Dict[str, Any]] = {}
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if not (name.startswith("pending-") and name.endswith(".jsonl")) or path == self.path:
+                continue
+            try:
+                f = open(path, "r")
+            except FileNotFoundError:
+                continue
+            with f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # owner still running
+                try:
+                    if os.fstat(f.fileno()).st_ino != os.stat(path).st_ino:
+                        continue
+                except FileNotFoundError:
+                    continue  # another process adopted it first
+                records = self._pending(f)
+                # Copy before unlinking: a crash in between only duplicates
+                # records, which load() collapses by document id
+                self._append(list(records.values()))
+                os.unlink(path)
+                adopted.update(records)
+        return len(adopted)
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._write(self._file, records)
+
+    def add(self, entry: BatchEntry) -> None:
+        self._append([self._add_record(entry)])
+
+    def done(self, document_ids: List[str]) -> None:
+        self._append([{"op": "done", "document_ids": document_ids}])
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Records added but not yet done, in queue order."""
+        with self._lock, open(self.path, "r") as f:
+            return list(self._pending(f).values())
+
+    def compact(self, entries: List[BatchEntry]) -> None:
+        """
+        Start a new journal holding only `entries` as pending.
+
+        The replacement is written and locked before the old file is
+        removed, so a crash leaves at least one complete journal to adopt.
+        """
+        with self._lock:
+            old, self._file = self._file, self._open_new()
+            self._write(self._file, [self._add_record(entry) for entry in entries])
+            os.unlink(old.name)
+            old.close()
+
+    def close(self) -> None:
+        """Release the journal; it is left for adoption if anything is pending."""
+        if self._file.closed:
+            return
+        pending = self.load()
+        with self._lock:
+            if not pending:
+                os.unlink(self.path)
+            self._file.close()
+
+
+OnAnchored = Callable[[AnchorReceipt, List[Tuple[BatchEntry, InclusionProof]]], None]
+
+
+class MerkleBatcher:
+    """Accumulate document hashes and anchor one Merkle root per batch."""
+
+    def __init__(
+        self,
+        anchor_client: Optional[AnchorClient] = None,
+        proof_store: Optional[ProofStore] = None,
+        max_batch: int = ANCHOR_BATCH_MAX,
+        flush_interval: float = ANCHOR_BATCH_INTERVAL,
+        on_anchored: Optional[OnAnchored] = None,
+        journal: Optional[PendingJournal] = None,
+        autostart: bool = True,
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            anchor_client: Where batch roots go (default: Fabric, closed with the batcher)
+            proof_store: Where inclusion proofs go (default: ANCHOR_PROOF_DIR)
+            max_batch: Documents that trigger an immediate anchor
+            flush_interval: Seconds a document may wait for its batch to fill
+            on_anchored: Called with the receipt and each (entry, proof) after
+                a batch is anchored, e.g. to record attestations
+            journal: Pending-document journal (default: ANCHOR_JOURNAL_DIR)
+            autostart: Start the background flush thread
+        """
+        self._owns_anchor_client = anchor_client is None
+        self.anchor_client = anchor_client or FabricAnchorClient()
+        self.proof_store = proof_store or ProofStore()
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.on_anchored = on_anchored
+        self.journal = journal or PendingJournal(
+            ANCHOR_JOURNAL_DIR or os.path.join(self.proof_store.directory, "journal")
+        )
+        # Anchored batches whose on_anchored callback has not succeeded yet
+        self._unrecorded: List[Tuple[AnchorReceipt, List[Tuple[BatchEntry, InclusionProof]]]] = []
+
+        self._entries: List[BatchEntry] = []
+        self._tree = IncrementalMerkleTree()
+        self._batch_id = self._new_batch_id()
+        self._cond = threading.Condition()
+        # Serialises anchoring so batches are anchored in order
+        self._flush_lock = threading.Lock()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self._replay()
+        if autostart:
+            self.start()
+
+    def _replay(self) -> None:
+        """Re-queue documents a previous process queued but never finished."""
+        records = self.journal.load()
+        for record in records:
+            entry = BatchEntry(
+                record["document_id"], record["document_hash"], self._batch_id, record["context"]
+            )
+            self._entries.append(entry)
+            self._tree.append(leaf_hash(entry.document_id, entry.document_hash))
+        self._compact_journal()
+        if records:
+            logger.info(f"Replayed {len(records)} pending documents from {self.journal.directory}")
+
+    @staticmethod
+    def _new_batch_id() -> str:
+        return f"{datetime.utcnow():%Y%m%dT%H%M%S}_{uuid.uuid4().hex[:12]}"
+
+    def start(self) -> None:
+        """Start the background flush thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="merkle-batcher", daemon=True)
+        self._thread.start()
+
+    def add(self, document_id: str, document_hash: str, **context) -> BatchEntry:
+        """
+        Queue a document for anchoring; returns its pending entry.
+
+        `context` (e.g. user_id) is handed back to `on_anchored`.
+        """
+        with self._cond:
+            entry = BatchEntry(document_id, document_hash, self._batch_id, context)
+            self.journal.add(entry)
+            self._entries.append(entry)
+            self._tree.append(leaf_hash(document_id, document_hash))
+            if len(self._entries) >= self.max_batch:
+                self._cond.notify()
+        return entry
+
+    def pending(self) -> int:
+        """Number of documents waiting for an anchor."""
+        with self._cond:
+            return len(self._entries)
+
+    def flush(self) -> Optional[AnchorReceipt]:
+        """
+        Anchor the current batch synchronously; returns its receipt.
+
+        On failure the documents go back into the next batch and the error
+        is raised. Callbacks that failed for earlier batches are retried first.
+        """
+        with self._flush_lock:
+            self._retry_callbacks()
+            with self._cond:
+                if not self._entries:
+                    return None
+                entries, tree, batch_id = self._entries, self._tree, self._batch_id
+                self._entries, self._tree = [], IncrementalMerkleTree()
+                self._batch_id = self._new_batch_id()
+
+            try:
+                receipt = self.anchor_client.anchor_root(batch_id, tree.root, len(entries))
+            except Exception:
+                with self._cond:
+                    retry = entries + self._entries
+                    self._entries, self._tree = [], IncrementalMerkleTree()
+                    for entry in retry:
+                        entry.batch_id = self._batch_id
+                        self._entries.append(entry)
+                        self._tree.append(leaf_hash(entry.document_id, entry.document_hash))
+                raise
+
+            proofs = [
+                InclusionProof(
+                    document_id=entry.document_id,
+                    document_hash=entry.document_hash,
+                    leaf_index=i,
+                    siblings=tree.proof(i),
+                    merkle_root=receipt.merkle_root,
+                    batch_id=batch_id,
+                    tx_id=receipt.tx_id,
+                    backend=receipt.backend,
+                    anchored_at=receipt.timestamp,
+                )
+                for i, entry in enumerate(entries)
+            ]
+            self.proof_store.put_many(proofs)
+            logger.info(
+                f"Anchored batch {batch_id}: {len(entries)} documents, root {receipt.merkle_root}"
+            )
+            self._record(receipt, list(zip(entries, proofs)))
+            self._compact_journal()
+            return receipt
+
+    def _compact_journal(self) -> None:
+        """Drop finished documents from the journal so it stays bounded."""
+        with self._cond:
+            unrecorded = [entry for _, anchored in self._unrecorded for entry, _ in anchored]
+            self.journal.compact(unrecorded + self._entries)
+
+    def unrecorded(self) -> int:
+        """Anchored batches whose on_anchored callback is waiting for a retry."""
+        return len(self._unrecorded)
+
+    def _record(
+        self, receipt: AnchorReceipt, anchored: List[Tuple[BatchEntry, InclusionProof]]
+    ) -> bool:
+        """Run on_anchored; the documents stay journaled (and queued for retry) until it works."""
+        if self.on_anchored:
+            try:
+                self.on_anchored(receipt, anchored)
+            except Exception as e:
+                logger.error(
+                    f"on_anchored callback failed for batch {receipt.batch_id}, will retry: {e}"
+                )
+                self._unrecorded.append((receipt, anchored))
+                return False
+        self.journal.done([entry.document_id for entry, _ in anchored])
+        return True
+
+    def _retry_callbacks(self) -> None:
+        pending, self._unrecorded = self._unrecorded, []
+        for i, (receipt, anchored) in enumerate(pending):
+            if not self._record(receipt, anchored):
+                # Keep batch order; later ones wait for the next cycle
+                self._unrecorded.extend(pending[i + 1 :])
+                return
+
+    def get_proof(self, document_id: str) -> Optional[InclusionProof]:
+        """Stored inclusion proof, or None while the document is pending."""
+        return self.proof_store.get(document_id)
+
+    def verify(self, document_id: str, document_hash: str) -> bool:
+        """Check a document against its proof and the anchored batch root."""
+        proof = self.get_proof(document_id)
+        if proof is None or not proof.verify(document_hash):
+            return False
+        receipt = self.anchor_client.get_anchor(proof.batch_id)
+        return receipt is not None and receipt.merkle_root == proof.merkle_root
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopped and len(self._entries) < self.max_batch:
+                    self._cond.wait(self.flush_interval)
+                stopped = self._stopped
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Merkle batch anchoring failed, will retry: {e}")
+            if stopped:
+                return
+
+    def close(self) -> None:
+        """Stop the background thread after anchoring what is pending."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=10)
+            if self._thread.is_alive():
+                return  # still anchoring; its journal stays locked until exit
+            self._thread = None
+        self.journal.close()
+        if self._owns_anchor_client:
+            self.anchor_client.close()
+
+
+_batcher: Optional[MerkleBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_merkle_batcher(on_anchored: Optional[OnAnchored] = None) -> MerkleBatcher:
+    """Shared batcher anchoring to Fabric; `on_anchored` applies on first use."""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = MerkleBatcher(on_anchored=on_anchored)
+        return _batcher
+
+
+def close_merkle_batcher() -> None:
+    """
+    Anchor what is pending and close the shared batcher (for graceful shutdown).
+
+    Call it before interpreter shutdown: the Fabric client hands ledger I/O
+    to worker threads, which can no longer start from atexit hooks. What
+    the atexit fallback cannot anchor stays in the journal for the next start.
+    """
+    global _batcher
+    with _batcher_lock:
+        batcher, _batcher = _batcher, None
+    if batcher is not None:
+        try:
+            batcher.close()
+        except Exception as e:
+            logger.error(f"Merkle batcher shutdown flush failed: {e}")
+
+
+atexit.register(close_merkle_batcher)
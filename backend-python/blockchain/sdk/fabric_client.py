@@ -3,13 +3,34 @@ Hyperledger Fabric SDK client for vault document anchoring.
 """
 
 import os
-import json
 import hashlib
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+from blockchain.sdk.local_peer import LocalLedger
+
 # For MVP, using simplified Fabric client
 # In production, use official fabric-sdk-py or hfc library
+# Async callers should use blockchain.sdk.fabric_gateway.AsyncFabricClient
+
+
+def generate_signature(document_hash: str, merkle_root: str) -> str:
+    """Generate a signature for MVP (simplified)."""
+    # In production, use proper Dilithium or ECDSA signing
+    data = f"{document_hash}{merkle_root}{datetime.utcnow().isoformat()}"
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def get_public_key() -> str:
+    """Get public key for MVP (simplified)."""
+    # In production, load from Fabric wallet or certificate
+    return os.getenv("FABRIC_PUBLIC_KEY", "mock_public_key_hex")
+
+
+def generate_tx_id() -> str:
+    """Generate a mock transaction ID."""
+    data = f"{datetime.utcnow().isoformat()}{os.urandom(16).hex()}"
+    return hashlib.sha256(data.encode()).hexdigest()[:64]
 
 
 class FabricClient:
@@ -20,6 +41,7 @@ class FabricClient:
         network_config_path: Optional[str] = None,
         channel_name: str = "vaultchannel",
         chaincode_name: str = "vault_anchor",
+        ledger: Optional[LocalLedger] = None,
     ):
         """
         Initialize Fabric client.
@@ -28,6 +50,7 @@ class FabricClient:
             network_config_path: Path to Fabric network configuration
             channel_name: Channel name for vault operations
             chaincode_name: Chaincode name for vault anchor contract
+            ledger: Local ledger for simulation mode (default: FABRIC_LOCAL_DB)
         """
         self.channel_name = channel_name or os.getenv("FABRIC_CHANNEL_NAME", "vaultchannel")
         self.chaincode_name = chaincode_name or os.getenv("FABRIC_CHAINCODE_NAME", "vault_anchor")
@@ -36,6 +59,7 @@ class FabricClient:
         # For MVP, we'll simulate Fabric operations
         # In production, initialize actual Fabric SDK connection
         self.connected = False
+        self._ledger = ledger
 
     def connect(self) -> bool:
         """
@@ -71,53 +95,67 @@ class FabricClient:
         if not self.connected:
             self.connect()
 
-        # Use document_hash as merkle_root if not provided
-        if merkle_root is None:
-            merkle_root = document_hash
-
-        # Generate signature if not provided (simplified for MVP)
-        if signature is None:
-            signature = self._generate_signature(document_hash, merkle_root)
-
-        if public_key is None:
-            public_key = self._get_public_key()
-
-        # Prepare chaincode invocation arguments
-        _ = [
-            document_id,
-            merkle_root,
-            document_hash,
-            signature,
-            public_key,
-        ]  # For future chaincode invocation
-
-        # In production, invoke chaincode via Fabric SDK:
-        # response = self.sdk_client.chaincode_invoke(
-        #     channel_name=self.channel_name,
-        #     chaincode_name=self.chaincode_name,
-        #     function='AnchorDocument',
-        #     args=args
-        # )
-
-        # For MVP, simulate transaction
-        tx_id = self._generate_tx_id()
+        return self.anchor_documents(
+            [
+                {
+                    "document_id": document_id,
+                    "document_hash": document_hash,
+                    "merkle_root": merkle_root,
+                    "signature": signature,
+                    "public_key": public_key,
+                }
+            ]
+        )[0]
+
+    def anchor_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Anchor several documents in one batch.
 
-        anchor_data = {
-            "documentID": document_id,
-            "merkleRoot": merkle_root,
-            "hash": document_hash,
-            "signature": signature,
-            "publicKey": public_key,
-            "timestamp": datetime.utcnow().isoformat(),
-            "fabricTxId": tx_id,
-            "channel": self.channel_name,
-            "chaincode": self.chaincode_name,
-        }
+        Args:
+            documents: Dicts with `anchor_document`'s keyword arguments
 
-        # Store anchor data locally (in production, this comes from Fabric)
-        self._store_anchor_locally(document_id, anchor_data)
+        Returns:
+            One result per document, in order; documents the chaincode rejects
+            (empty fields, already anchored) get {"success": False, "error": ...}
+        """
+        if not self.connected:
+            self.connect()
 
-        return {"success": True, "transactionId": tx_id, "anchor": anchor_data}
+        anchors = []
+        for document in documents:
+            document_hash = document["document_hash"]
+            # Use document_hash as merkle_root if not provided
+            merkle_root = document.get("merkle_root") or document_hash
+            # Generate signature if not provided (simplified for MVP)
+            signature = document.get("signature") or self._generate_signature(
+                document_hash, merkle_root
+            )
+            anchors.append(
+                {
+                    "documentID": document["document_id"],
+                    "merkleRoot": merkle_root,
+                    "hash": document_hash,
+                    "signature": signature,
+                    "publicKey": document.get("public_key") or self._get_public_key(),
+                    "timestamp": datetime.utcnow().isoformat(),
+                    # For MVP, simulate transaction
+                    "fabricTxId": self._generate_tx_id(),
+                    "channel": self.channel_name,
+                    "chaincode": self.chaincode_name,
+                }
+            )
+
+        # In production, invoke AnchorDocument via the Fabric gateway.
+        # For MVP, the local ledger applies the chaincode's rules.
+        errors = self.ledger.put_anchors(anchors)
+        return [
+            (
+                {"success": True, "transactionId": anchor["fabricTxId"], "anchor": anchor}
+                if error is None
+                else {"success": False, "error": error}
+            )
+            for anchor, error in zip(anchors, errors)
+        ]
 
     def query_attestation(self, document_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -140,8 +178,21 @@ class FabricClient:
         #     args=[document_id]
         # )
 
-        # For MVP, retrieve from local storage
-        return self._get_anchor_locally(document_id)
+        # For MVP, retrieve from the local ledger
+        return self.ledger.get_anchor(document_id)
+
+    def query_attestations(self, document_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Anchors by document id in one lookup; unknown ids are left out."""
+        if not self.connected:
+            self.connect()
+        return self.ledger.get_anchors(document_ids)
+
+    @property
+    def ledger(self) -> LocalLedger:
+        """Local ledger backing simulation mode, opened on first use."""
+        if self._ledger is None:
+            self._ledger = LocalLedger()
+        return self._ledger
 
     def verify_attestation(self, document_id: str, proof_hash: str) -> bool:
         """
@@ -161,38 +212,10 @@ class FabricClient:
         return anchor.get("hash") == proof_hash
 
     def _generate_signature(self, document_hash: str, merkle_root: str) -> str:
-        """Generate a signature for MVP (simplified)."""
-        # In production, use proper Dilithium or ECDSA signing
-        data = f"{document_hash}{merkle_root}{datetime.utcnow().isoformat()}"
-        signature = hashlib.sha256(data.encode()).hexdigest()
-        return signature
+        return generate_signature(document_hash, merkle_root)
 
     def _get_public_key(self) -> str:
-        """Get public key for MVP (simplified)."""
-        # In production, load from Fabric wallet or certificate
-        return os.getenv("FABRIC_PUBLIC_KEY", "mock_public_key_hex")
+        return get_public_key()
 
     def _generate_tx_id(self) -> str:
-        """Generate a mock transaction ID."""
-        data = f"{datetime.utcnow().isoformat()}{os.urandom(16).hex()}"
-        return hashlib.sha256(data.encode()).hexdigest()[:64]
-
-    def _store_anchor_locally(self, document_id: str, anchor_data: Dict[str, Any]):
-        """Store anchor data locally for MVP (simplified)."""
-        storage_dir = "blockchain/storage"
-        os.makedirs(storage_dir, exist_ok=True)
-
-        file_path = os.path.join(storage_dir, f"{document_id}.json")
-        with open(file_path, "w") as f:
-            json.dump(anchor_data, f, indent=2)
-
-    def _get_anchor_locally(self, document_id: str) -> Optional[Dict[str, Any]]:
-        """Get anchor data from local storage for MVP."""
-        storage_dir = "blockchain/storage"
-        file_path = os.path.join(storage_dir, f"{document_id}.json")
-
-        if not os.path.exists(file_path):
-            return None
-
-        with open(file_path, "r") as f:
-            return json.load(f)
+        return generate_tx_id()
@@ -0,0 +1,383 @@
+"""
+Async Fabric gateway client with pooled peer connections and batched invokes.
+
+`AsyncFabricClient` keeps `FABRIC_POOL_SIZE` peer connections open for its
+lifetime instead of connecting per call. `anchor_document()` calls are
+coalesced into one `AnchorDocument` batch per `FABRIC_BATCH_LINGER` window
+(or `FABRIC_MAX_BATCH` documents), and `anchor_documents()` splits a large
+request into batches submitted concurrently, one per pooled connection.
+Queries fan out across the pool the same way.
+
+The transport sits behind `PeerConnection`. `LocalPeerConnection` executes
+vault_anchor.go's functions against the embedded `LocalLedger`; a gRPC
+gateway connection implements the same two calls.
+
+    async with AsyncFabricClient() as client:
+        results = await client.anchor_documents(
+            [{"document_id": "doc_1", "document_hash": "ab..."}]
+        )
+"""
+
+import asyncio
+import logging
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from blockchain.sdk.fabric_client import generate_signature, generate_tx_id, get_public_key
+from blockchain.sdk.local_peer import LedgerError, LocalLedger, validate_anchor
+
+logger = logging.getLogger(__name__)
+
+FABRIC_POOL_SIZE = int(os.getenv("FABRIC_POOL_SIZE", "4"))
+FABRIC_MAX_BATCH = int(os.getenv("FABRIC_MAX_BATCH", "100"))
+FABRIC_BATCH_LINGER = float(os.getenv("FABRIC_BATCH_LINGER", "0.01"))
+
+
+@dataclass
+class Invocation:
+    """One chaincode call in a submitted batch."""
+
+    tx_id: str
+    args: List[str]
+
+
+@dataclass
+class InvocationResult:
+    tx_id: str
+    success: bool
+    payload: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+class PeerConnection(ABC):
+    """A persistent connection to a peer running the vault_anchor chaincode."""
+
+    @abstractmethod
+    async def submit(self, function: str, invocations: List[Invocation]) -> List[InvocationResult]:
+        """Endorse and commit a batch of transactions; one result per invocation."""
+
+    @abstractmethod
+    async def evaluate(self, function: str, calls: List[List[str]]) -> List[Any]:
+        """Evaluate read-only calls; one result per call (None when not found)."""
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalPeerConnection(PeerConnection):
+    """Stand-in peer executing vault_anchor.go against an embedded ledger."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        channel_name: str = "vaultchannel",
+        chaincode_name: str = "vault_anchor",
+    ):
+        self.ledger = LocalLedger(path)
+        self.channel_name = channel_name
+        self.chaincode_name = chaincode_name
+
+    async def submit(self, function: str, invocations: List[Invocation]) -> List[InvocationResult]:
+        if function != "AnchorDocument":
+            raise ValueError(f"Unknown chaincode function: {function}")
+        return await asyncio.to_thread(self._anchor, invocations)
+
+    async def evaluate(self, function: str, calls: List[List[str]]) -> List[Any]:
+        if function not in ("QueryAnchor", "VerifyAttestation"):
+            raise ValueError(f"Unknown chaincode function: {function}")
+        anchors = await asyncio.to_thread(self.ledger.get_anchors, [args[0] for args in calls])
+        if function == "QueryAnchor":
+            return [anchors.get(args[0]) for args in calls]
+        results = []
+        for document_id, proof_hash in calls:
+            anchor = anchors.get(document_id)
+            results.append(
+                anchor is not None
+                and anchor["hash"] == proof_hash
+                and bool(anchor.get("signature"))
+            )
+        return results
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self.ledger.close)
+
+    def _anchor(self, invocations: List[Invocation]) -> List[InvocationResult]:
+        timestamp = datetime.utcnow().isoformat()
+        anchors = []
+        for invocation in invocations:
+            document_id, merkle_root, document_hash, signature, public_key = invocation.args
+            anchors.append(
+                {
+                    "documentID": document_id,
+                    "merkleRoot": merkle_root,
+                    "hash": document_hash,
+                    "signature": signature,
+                    "publicKey": public_key,
+                    "timestamp": timestamp,
+                    "fabricTxId": invocation.tx_id,
+                    "channel": self.channel_name,
+                    "chaincode": self.chaincode_name,
+                }
+            )
+        errors = self.ledger.put_anchors(anchors)
+        return [
+            InvocationResult(inv.tx_id, error is None, anchor if error is None else None, error)
+            for inv, anchor, error in zip(invocations, anchors, errors)
+        ]
+
+
+class ConnectionPool:
+    """Fixed-size pool of persistent peer connections."""
+
+    def __init__(self, factory: Callable[[], PeerConnection], size: int = FABRIC_POOL_SIZE):
+        self.factory = factory
+        self.size = max(1, size)
+        self._idle: Optional[asyncio.Queue] = None
+        self._connections: List[PeerConnection] = []
+
+    @property
+    def is_open(self) -> bool:
+        return self._idle is not None
+
+    async def open(self) -> None:
+        if self._idle is not None:
+            return
+        self._connections = [self.factory() for _ in range(self.size)]
+        self._idle = asyncio.Queue()
+        for connection in self._connections:
+            self._idle.put_nowait(connection)
+
+    async def run(self, call: Callable[[PeerConnection], Any]) -> Any:
+        """Run `await call(connection)` on an idle connection."""
+        idle = self._idle
+        if idle is None:
+            raise RuntimeError("Connection pool is closed")
+        connection = await idle.get()
+        try:
+            return await call(connection)
+        finally:
+            idle.put_nowait(connection)
+
+    async def close(self) -> None:
+        connections, self._connections, self._idle = self._connections, [], None
+        await asyncio.gather(*(c.close() for c in connections), return_exceptions=True)
+
+
+class AsyncFabricClient:
+    """Async vault anchoring client over a pool of peer connections."""
+
+    def __init__(
+        self,
+        channel_name: Optional[str] = None,
+        chaincode_name: Optional[str] = None,
+        connection_factory: Optional[Callable[[], PeerConnection]] = None,
+        pool_size: int = FABRIC_POOL_SIZE,
+        max_batch: int = FABRIC_MAX_BATCH,
+        linger: float = FABRIC_BATCH_LINGER,
+    ):
+        """
+        Initialize the client; connections are opened by `connect()`.
+
+        Args:
+            channel_name: Channel for vault operations
+            chaincode_name: Vault anchor chaincode name
+            connection_factory: Creates one pooled connection (default: local peer)
+            pool_size: Persistent connections kept open
+            max_batch: Most AnchorDocument calls per submitted batch
+            linger: Seconds `anchor_document()` waits for more calls to batch with
+        """
+        self.channel_name = channel_name or os.getenv("FABRIC_CHANNEL_NAME", "vaultchannel")
+        self.chaincode_name = chaincode_name or os.getenv("FABRIC_CHAINCODE_NAME", "vault_anchor")
+        if connection_factory is None:
+
+            def connection_factory():
+                return LocalPeerConnection(
+                    channel_name=self.channel_name, chaincode_name=self.chaincode_name
+                )
+
+        self.pool = ConnectionPool(connection_factory, pool_size)
+        self.max_batch = max(1, max_batch)
+        self.linger = linger
+        self._pending: List[tuple] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: set = set()
+
+    async def connect(self) -> "AsyncFabricClient":
+        await self.pool.open()
+        return self
+
+    async def close(self) -> None:
+        """Submit pending anchors, wait for in-flight batches, then close the pool."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._pending:
+            await self._flush()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        await self.pool.close()
+
+    async def __aenter__(self) -> "AsyncFabricClient":
+        return await self.connect()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def anchor_document(
+        self,
+        document_id: str,
+        document_hash: str,
+        merkle_root: Optional[str] = None,
+        signature: Optional[str] = None,
+        public_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Anchor a document, batched with concurrent calls.
+
+        Returns:
+            Same shape as `FabricClient.anchor_document`
+        """
+        await self.connect()
+        invocation = self._invocation(
+            document_id, document_hash, merkle_root, signature, public_key
+        )
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((invocation, future))
+        if len(self._pending) >= self.max_batch:
+            self._schedule_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.linger, self._schedule_flush
+            )
+        return await future
+
+    async def anchor_documents(self, documents: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Anchor many documents in batches submitted concurrently over the pool.
+
+        Args:
+            documents: Dicts with `anchor_document`'s keyword arguments
+
+        Returns:
+            One result per document, in order
+        """
+        await self.connect()
+        invocations = [self._invocation(**document) for document in documents]
+        batches = [
+            invocations[i : i + self.max_batch] for i in range(0, len(invocations), self.max_batch)
+        ]
+        submitted = await asyncio.gather(*(self._submit(batch) for batch in batches))
+        return [result for batch in submitted for result in batch]
+
+    async def query_attestation(self, document_id: str) -> Optional[Dict[str, Any]]:
+        return (await self.query_attestations([document_id])).get(document_id)
+
+    async def query_attestations(self, document_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Anchors by document id, queried concurrently; unknown ids are left out."""
+        calls = [[document_id] for document_id in document_ids]
+        results = await self._evaluate("QueryAnchor", calls)
+        return {args[0]: anchor for args, anchor in zip(calls, results) if anchor is not None}
+
+    async def verify_attestation(self, document_id: str, proof_hash: str) -> bool:
+        return (await self._evaluate("VerifyAttestation", [[document_id, proof_hash]]))[0]
+
+    def _invocation(
+        self,
+        document_id: str,
+        document_hash: str,
+        merkle_root: Optional[str] = None,
+        signature: Optional[str] = None,
+        public_key: Optional[str] = None,
+    ) -> Invocation:
+        merkle_root = merkle_root or document_hash
+        args = [
+            document_id,
+            merkle_root,
+            document_hash,
+            signature or generate_signature(document_hash, merkle_root),
+            public_key or get_public_key(),
+        ]
+        return Invocation(generate_tx_id(), args)
+
+    def _schedule_flush(self) -> None:
+        task = asyncio.ensure_future(self._flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._pending:
+            batch, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch :]
+            try:
+                results = await self._submit([invocation for invocation, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _submit(self, invocations: List[Invocation]) -> List[Dict[str, Any]]:
+        # Reject invalid input before it costs an endorsement round trip
+        valid, results = [], {}
+        for invocation in invocations:
+            document_id, merkle_root, document_hash = invocation.args[:3]
+            try:
+                validate_anchor(
+                    {"documentID": document_id, "merkleRoot": merkle_root, "hash": document_hash}
+                )
+                valid.append(invocation)
+            except LedgerError as e:
+                results[invocation.tx_id] = {"success": False, "error": str(e)}
+        if valid:
+            submitted = await self.pool.run(lambda c: c.submit("AnchorDocument", valid))
+            for result in submitted:
+                if result.success:
+                    results[result.tx_id] = {
+                        "success": True,
+                        "transactionId": result.tx_id,
+                        "anchor": result.payload,
+                    }
+                else:
+                    results[result.tx_id] = {"success": False, "error": result.error}
+        return [results[invocation.tx_id] for invocation in invocations]
+
+    async def _evaluate(self, function: str, calls: List[List[str]]) -> List[Any]:
+        await self.connect()
+        if not calls:
+            return []
+        # One chunk per pooled connection
+        step = max(1, -(-len(calls) // self.pool.size))
+        chunks = [calls[i : i + step] for i in range(0, len(calls), step)]
+
+        def evaluate(chunk):
+            return lambda connection: connection.evaluate(function, chunk)
+
+        evaluated = await asyncio.gather(*(self.pool.run(evaluate(chunk)) for chunk in chunks))
+        return [result for chunk in evaluated for result in chunk]
+
+
+_client: Optional[AsyncFabricClient] = None
+
+
+def get_async_fabric_client() -> AsyncFabricClient:
+    """Shared client; its pool opens on first use in the running event loop."""
+    global _client
+    if _client is None:
+        _client = AsyncFabricClient()
+    return _client
+
+
+async def close_async_fabric_client() -> None:
+    """Close the shared client's pool (for graceful shutdown)."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.close()
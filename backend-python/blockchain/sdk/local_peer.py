@@ -0,0 +1,184 @@
+"""
+Embedded stand-in for a Fabric peer running the vault_anchor chaincode.
+
+`LocalLedger` keeps the chaincode's world state in SQLite: one row per
+anchor keyed by document id, with indexes on the document hash, Merkle root
+and transaction id. It applies `AnchorDocument`'s rules (required fields,
+no re-anchoring) and writes a batch of anchors in one transaction. It backs
+`FabricClient`'s local mode and `LocalPeerConnection` for tests and local
+development.
+
+The database lives next to this package (blockchain/storage) unless
+FABRIC_LOCAL_DB is set, so it no longer depends on the process working
+directory. Anchors written by older versions as one JSON file per document
+in that directory are imported on first open.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STORAGE_DIR = Path(__file__).resolve().parent.parent / "storage"
+FABRIC_LOCAL_DB = os.getenv("FABRIC_LOCAL_DB", str(STORAGE_DIR / "fabric_ledger.db"))
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS anchors (
+        document_id TEXT PRIMARY KEY,
+        hash TEXT NOT NULL,
+        merkle_root TEXT NOT NULL,
+        fabric_tx_id TEXT,
+        timestamp TEXT,
+        data TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS anchors_hash ON anchors (hash)",
+    "CREATE INDEX IF NOT EXISTS anchors_merkle_root ON anchors (merkle_root)",
+    "CREATE INDEX IF NOT EXISTS anchors_fabric_tx_id ON anchors (fabric_tx_id)",
+)
+
+# SQLite's default limit on bound parameters per statement is 999
+_QUERY_CHUNK = 500
+
+
+class LedgerError(Exception):
+    """Raised when the chaincode rules reject an anchor"""
+
+    pass
+
+
+def validate_anchor(anchor: Dict[str, Any]) -> None:
+    """AnchorDocument's input checks."""
+    for field, name in (
+        ("documentID", "documentID"),
+        ("merkleRoot", "merkleRoot"),
+        ("hash", "documentHash"),
+    ):
+        if not anchor.get(field):
+            raise LedgerError(f"{name} cannot be empty")
+
+
+class LocalLedger:
+    """SQLite-backed world state for vault anchors."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open (and create if needed) the ledger.
+
+        Args:
+            path: Database file, or ":memory:" (default: FABRIC_LOCAL_DB)
+        """
+        self.path = str(path or FABRIC_LOCAL_DB)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        if self.path != ":memory:":
+            # Readers on other connections are not blocked by a writer
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+        if self.path != ":memory:" and Path(self.path).parent == STORAGE_DIR:
+            self._import_legacy_files(STORAGE_DIR)
+
+    def put_anchors(self, anchors: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Write anchors in one transaction, as AnchorDocument would one by one.
+
+        Returns one entry per anchor: None if written, else the rejection
+        reason (invalid input or document already anchored).
+        """
+        results: List[Optional[str]] = []
+        with self._lock, self._conn:
+            for anchor in anchors:
+                try:
+                    validate_anchor(anchor)
+                    self._conn.execute(
+                        "INSERT INTO anchors VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            anchor["documentID"],
+                            anchor["hash"],
+                            anchor["merkleRoot"],
+                            anchor.get("fabricTxId"),
+                            anchor.get("timestamp"),
+                            json.dumps(anchor),
+                        ),
+                    )
+                    results.append(None)
+                except LedgerError as e:
+                    results.append(str(e))
+                except sqlite3.IntegrityError:
+                    results.append(f"document {anchor['documentID']} already anchored")
+        return results
+
+    def put_anchor(self, anchor: Dict[str, Any]) -> None:
+        """
+        Write one anchor.
+
+        Raises:
+            LedgerError: If the anchor is invalid or already exists
+        """
+        error = self.put_anchors([anchor])[0]
+        if error:
+            raise LedgerError(error)
+
+    def get_anchor(self, document_id: str) -> Optional[Dict[str, Any]]:
+        return self.get_anchors([document_id]).get(document_id)
+
+    def get_anchors(self, document_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Anchors by document id; unknown ids are left out."""
+        return self._select("document_id", list(document_ids))
+
+    def find_by_hash(self, document_hash: str) -> List[Dict[str, Any]]:
+        """Anchors recording a document hash (index lookup)."""
+        return list(self._select("hash", [document_hash]).values())
+
+    def find_by_tx_id(self, tx_id: str) -> Optional[Dict[str, Any]]:
+        found = self._select("fabric_tx_id", [tx_id])
+        return next(iter(found.values()), None)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM anchors").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _select(self, column: str, values: List[str]) -> Dict[str, Dict[str, Any]]:
+        found: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for i in range(0, len(values), _QUERY_CHUNK):
+                chunk = values[i : i + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT document_id, data FROM anchors WHERE {column} IN ({placeholders})",
+                    chunk,
+                )
+                for document_id, data in rows:
+                    found[document_id] = json.loads(data)
+        return found
+
+    def _import_legacy_files(self, directory: Path) -> None:
+        """Import `{document_id}.json` anchors written by the file-based store."""
+        files = list(directory.glob("*.json"))
+        if not files or self.count():
+            return
+        anchors = []
+        for path in files:
+            try:
+                anchor = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if isinstance(anchor, dict) and anchor.get("documentID"):
+                anchors.append(anchor)
+        imported = sum(error is None for error in self.put_anchors(anchors))
+        logger.info(f"Imported {imported} legacy anchor files from {directory}")
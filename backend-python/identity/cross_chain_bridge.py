@@ -213,6 +213,97 @@ class MerkleProof:
         return current == self.root
 
 
+IDENTITY_TREE_DEPTH = 32
+
+
+def _hash_pair(left: str, right: str) -> str:
+    return hashlib.sha256(bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+class FixedDepthMerkleTree:
+    """
+    Fixed-depth append-only Merkle tree, as in the deposit contract.
+
+    Empty subtrees hash to precomputed zero values, so an append touches one
+    node per level: the new leaf's left siblings (the frontier) are already
+    cached. Internal nodes are kept, so proofs are O(depth) lookups, and
+    `extend` recomputes each dirty parent once per batch. Hashing matches
+    `MerkleProof.verify` (SHA-256 of left || right), unlike the
+    variable-height, domain-separated batch tree in
+    `blockchain.l2.merkle_batcher`.
+    """
+
+    def __init__(self, depth: int = IDENTITY_TREE_DEPTH):
+        self.depth = depth
+        self.size = 0
+        self._nodes: Dict[Tuple[int, int], str] = {}
+        self._zeros = ["0" * 64]
+        for _ in range(depth):
+            self._zeros.append(_hash_pair(self._zeros[-1], self._zeros[-1]))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _node(self, level: int, index: int) -> str:
+        return self._nodes.get((level, index), self._zeros[level])
+
+    @property
+    def root(self) -> str:
+        return self._node(self.depth, 0)
+
+    def append(self, leaf: str) -> int:
+        """Add a leaf; returns its index."""
+        return self.extend([leaf])
+
+    def extend(self, leaves: List[str]) -> int:
+        """Add leaves in one pass; returns the index of the first."""
+        start = self.size
+        if start + len(leaves) > 2**self.depth:
+            raise ValueError(f"Merkle tree of depth {self.depth} is full")
+        if not leaves:
+            return start
+        for offset, leaf in enumerate(leaves):
+            self._nodes[(0, start + offset)] = leaf
+        self.size += len(leaves)
+
+        lo, hi = start, self.size - 1
+        for level in range(self.depth):
+            for i in range(lo // 2, hi // 2 + 1):
+                self._nodes[(level + 1, i)] = _hash_pair(
+                    self._node(level, 2 * i), self._node(level, 2 * i + 1)
+                )
+            lo, hi = lo // 2, hi // 2
+        return start
+
+    def proof(self, index: int) -> MerkleProof:
+        """Inclusion proof for the leaf at `index`."""
+        if not 0 <= index < self.size:
+            raise IndexError(f"No leaf at index {index}")
+        return MerkleProof(
+            root=self.root,
+            leaf=self._nodes[(0, index)],
+            path=[self._node(level, (index >> level) ^ 1) for level in range(self.depth)],
+            path_indices=[(index >> level) & 1 for level in range(self.depth)],
+        )
+
+    def to_dict(self) -> Dict:
+        """Snapshot of the tree for persistence."""
+        return {
+            "depth": self.depth,
+            "size": self.size,
+            "nodes": {f"{level}:{index}": h for (level, index), h in self._nodes.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FixedDepthMerkleTree":
+        tree = cls(data["depth"])
+        tree.size = data["size"]
+        for key, h in data["nodes"].items():
+            level, index = key.split(":")
+            tree._nodes[(int(level), int(index))] = h
+        return tree
+
+
 class ChainAdapter(ABC):
     """Abstract adapter for chain-specific operations."""
 
@@ -240,6 +331,14 @@ class ChainAdapter(ABC):
         """Submit a bridge message, return tx hash."""
         pass
 
+    def register_identities(self, identities: List[Tuple[str, Dict]]) -> List[str]:
+        """Register several (commitment, metadata) pairs, return tx hashes."""
+        return [self.register_identity(c, metadata) for c, metadata in identities]
+
+    def get_merkle_proof(self, identity_commitment: str) -> Optional[MerkleProof]:
+        """Inclusion proof against the identity root, if the chain keeps one."""
+        return None
+
 
 class EVMChainAdapter(ChainAdapter):
     """Adapter for EVM-compatible chains."""
@@ -248,69 +347,56 @@ class EVMChainAdapter(ChainAdapter):
         self.chain = chain
         self.config = CHAIN_CONFIG[chain]
         self._identity_registry: Dict[str, Dict] = {}
-        self._merkle_root = "0" * 64
+        self._tree = FixedDepthMerkleTree()
 
     def get_chain(self) -> Chain:
         return self.chain
 
     def register_identity(self, identity_commitment: str, metadata: Dict) -> str:
         """Register identity (simulated for now)."""
-        tx_hash = f"0x{secrets.token_hex(32)}"
-
-        self._identity_registry[identity_commitment] = {
-            "commitment": identity_commitment,
-            "metadata": metadata,
-            "registered_at": datetime.utcnow().isoformat(),
-            "tx_hash": tx_hash,
-        }
-
-        # Update Merkle root (simplified)
-        self._update_merkle_root()
+        return self.register_identities([(identity_commitment, metadata)])[0]
+
+    def register_identities(self, identities: List[Tuple[str, Dict]]) -> List[str]:
+        """Register identities with a single Merkle tree update (simulated)."""
+        tx_hashes, new_leaves = [], []
+        for identity_commitment, metadata in identities:
+            tx_hash = f"0x{secrets.token_hex(32)}"
+            entry = self._identity_registry.get(identity_commitment)
+            if entry is None:
+                entry = {"leaf_index": self._tree.size + len(new_leaves)}
+                new_leaves.append(identity_commitment)
+            entry.update(
+                {
+                    "commitment": identity_commitment,
+                    "metadata": metadata,
+                    "registered_at": datetime.utcnow().isoformat(),
+                    "tx_hash": tx_hash,
+                }
+            )
+            self._identity_registry[identity_commitment] = entry
+            tx_hashes.append(tx_hash)
+            logger.info(f"Registered identity on {self.chain.value}: {identity_commitment[:16]}...")
 
-        logger.info(f"Registered identity on {self.chain.value}: {identity_commitment[:16]}...")
-        return tx_hash
+        self._tree.extend(new_leaves)
+        return tx_hashes
 
     def verify_identity(self, identity_commitment: str) -> bool:
         return identity_commitment in self._identity_registry
 
     def get_identity_root(self) -> str:
-        return self._merkle_root
+        return self._tree.root
+
+    def get_merkle_proof(self, identity_commitment: str) -> Optional[MerkleProof]:
+        entry = self._identity_registry.get(identity_commitment)
+        if entry is None:
+            return None
+        return self._tree.proof(entry["leaf_index"])
 
     def submit_bridge_message(self, message: BridgeMessage) -> str:
         tx_hash = f"0x{secrets.token_hex(32)}"
         logger.info(f"Bridge message submitted on {self.chain.value}: {message.message_id}")
         return tx_hash
 
-    def _update_merkle_root(self):
-        """Update Merkle root after changes."""
-        if not self._identity_registry:
-            return
-
-        leaves = sorted(self._identity_registry.keys())
-        self._merkle_root = self._compute_merkle_root(leaves)
-
-    def _compute_merkle_root(self, leaves: List[str]) -> str:
-        """Compute Merkle root from leaves."""
-        if not leaves:
-            return "0" * 64
-        if len(leaves) == 1:
-            return leaves[0]
-
-        # Pad to power of 2
-        while len(leaves) & (len(leaves) - 1):
-            leaves.append(leaves[-1])
-
-        while len(leaves) > 1:
-            new_level = []
-            for i in range(0, len(leaves), 2):
-                combined = hashlib.sha256(
-                    bytes.fromhex(leaves[i]) + bytes.fromhex(leaves[i + 1])
-                ).hexdigest()
-                new_level.append(combined)
-            leaves = new_level
-
-        return leaves[0]
-
 
 class SolanaChainAdapter(ChainAdapter):
     """Adapter for Solana."""
@@ -318,7 +404,7 @@ class SolanaChainAdapter(ChainAdapter):
     def __init__(self):
         self.chain = Chain.SOLANA
         self._identity_registry: Dict[str, Dict] = {}
-        self._merkle_root = "0" * 64
+        self._tree = FixedDepthMerkleTree()
 
     def get_chain(self) -> Chain:
         return self.chain
@@ -328,7 +414,14 @@ class SolanaChainAdapter(ChainAdapter):
         # Solana uses base58 addresses
         tx_sig = secrets.token_hex(64)  # Would be actual signature
 
+        previous = self._identity_registry.get(identity_commitment)
+        if previous is None:
+            leaf_index = self._tree.append(identity_commitment)
+        else:
+            leaf_index = previous["leaf_index"]
+
         self._identity_registry[identity_commitment] = {
+            "leaf_index": leaf_index,
             "commitment": identity_commitment,
             "metadata": metadata,
             "registered_at": datetime.utcnow().isoformat(),
@@ -342,7 +435,13 @@ class SolanaChainAdapter(ChainAdapter):
         return identity_commitment in self._identity_registry
 
     def get_identity_root(self) -> str:
-        return self._merkle_root
+        return self._tree.root
+
+    def get_merkle_proof(self, identity_commitment: str) -> Optional[MerkleProof]:
+        entry = self._identity_registry.get(identity_commitment)
+        if entry is None:
+            return None
+        return self._tree.proof(entry["leaf_index"])
 
     def submit_bridge_message(self, message: BridgeMessage) -> str:
         tx_sig = secrets.token_hex(64)
@@ -460,8 +559,7 @@ class CrossChainBridge:
             raise ValueError(f"No adapter for primary chain {identity.primary_chain.value}")
 
         # Generate Merkle proof
-        root = primary_adapter.get_identity_root()
-        proof = self._generate_merkle_proof(identity.identity_commitment, root)
+        proof = self._generate_merkle_proof(primary_adapter, identity.identity_commitment)
 
         # Create bridge message (for future message queue integration)
         _ = BridgeMessage(
@@ -504,19 +602,12 @@ class CrossChainBridge:
 
         raise ValueError(f"No adapter for target chain {target_chain.value}")
 
-    def _generate_merkle_proof(
-        self,
-        leaf: str,
-        root: str,
-    ) -> MerkleProof:
-        """Generate a Merkle proof (simplified for demo)."""
-        # In production, this would query the actual on-chain Merkle tree
-        return MerkleProof(
-            root=root,
-            leaf=leaf,
-            path=[secrets.token_hex(32) for _ in range(10)],  # Placeholder
-            path_indices=[0, 1, 0, 1, 0, 1, 0, 1, 0, 1],
-        )
+    def _generate_merkle_proof(self, adapter: ChainAdapter, leaf: str) -> MerkleProof:
+        """Inclusion proof for a commitment against the adapter's identity root."""
+        proof = adapter.get_merkle_proof(leaf)
+        if proof is None:
+            raise ValueError(f"No Merkle proof for identity on {adapter.get_chain().value}")
+        return proof
 
     def verify_cross_chain_identity(
         self,
@@ -20,6 +20,9 @@ from pathlib import Path
 from typing import Dict, Optional, Any, Tuple
 from dataclasses import dataclass
 
+from zkp.artifact_manager import get_artifact_manager
+from zkp.proving_scheduler import PRIORITY_DEFAULT, get_proving_scheduler
+
 logger = logging.getLogger("identity.zkp")
 
 
@@ -70,14 +73,11 @@ class AAIPZKIntegration:
 
     def _check_circuits(self) -> Dict[str, bool]:
         """Check which circuits have built artifacts."""
-        circuits = {
-            "level3_inequality": self.artifacts_dir
-            / "level3_inequality"
-            / "Level3Inequality_final.zkey",
-            "age": self.artifacts_dir / "age" / "age_final.zkey",
-            "authenticity": self.artifacts_dir / "authenticity" / "authenticity_final.zkey",
+        artifacts = get_artifact_manager(self.artifacts_dir)
+        return {
+            name: artifacts.available(name, "zkey")
+            for name in ("level3_inequality", "age", "authenticity")
         }
-        return {name: path.exists() for name, path in circuits.items()}
 
     def _run_snark(self, action: str, circuit: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -182,7 +182,14 @@ class AAIPZKIntegration:
         }
 
         try:
-            result = self._run_snark("prove", "level3_inequality", circuit_input)
+            result = get_proving_scheduler().run(
+                "level3_inequality",
+                self._run_snark,
+                "prove",
+                "level3_inequality",
+                circuit_input,
+                priority=PRIORITY_DEFAULT,
+            )
 
             # Extract nullifier from public signals
             # Format: [threshold, senderID, nullifier, out]
@@ -1,11 +1,11 @@
 import os
 import json
 import time
+import asyncio
 import logging
 
 from kafka import KafkaConsumer
 from dotenv import load_dotenv
-from py2neo import Graph, Node, Relationship
 from sentence_transformers import SentenceTransformer
 from vector_index.faiss_index import FaissIndex
 
@@ -15,9 +15,17 @@ load_dotenv()
 
 KAFKA_BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP", "localhost:9092")
 TOPIC = os.getenv("KAFKA_TOPIC", "raw_claims")
-NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
-NEO4J_PASS = os.getenv("NEO4J_PASS", "test")
+
+# Loaded after .env so the shared driver picks up NEO4J_* from it
+from api.database import close_driver, write  # noqa: E402
+
+PERSIST_CLAIM_QUERY = """
+MERGE (c:Claim {id: $id})
+SET c += $props
+MERGE (s:Source {name: $source})
+MERGE (s)-[r:REPORTS]->(c)
+SET r.confidence = 0.5
+"""
 
 
 def connect_consumer() -> KafkaConsumer:
@@ -31,9 +39,8 @@ def connect_consumer() -> KafkaConsumer:
     )
 
 
-def main():
+async def consume():
     # External deps
-    graph = Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
     embed_model = SentenceTransformer("all-MiniLM-L6-v2")
     faiss = FaissIndex(index_path="faiss.index")
 
@@ -53,22 +60,20 @@ def main():
                     logging.warning("Skipping empty text for id=%s", claim_id)
                     continue
 
-                # Persist to Neo4j
-                tx = graph.begin()
-                cnode = Node(
-                    "Claim",
-                    id=claim_id,
-                    text=text,
-                    veracity=0.5,
-                    state="plausible",
-                    timestamp=timestamp,
+                # Persist to Neo4j (one managed, retried transaction)
+                await write(
+                    PERSIST_CLAIM_QUERY,
+                    {
+                        "id": claim_id,
+                        "source": source,
+                        "props": {
+                            "text": text,
+                            "veracity": 0.5,
+                            "state": "plausible",
+                            "timestamp": timestamp,
+                        },
+                    },
                 )
-                tx.merge(cnode, "Claim", "id")
-                snode = Node("Source", name=source)
-                tx.merge(snode, "Source", "name")
-                rel = Relationship(snode, "REPORTS", cnode, confidence=0.5)
-                tx.merge(rel)
-                tx.commit()
 
                 # Embed and add to FAISS
                 vec = embed_model.encode(text)
@@ -86,6 +91,13 @@ def main():
         if consumer is not None:
             consumer.close()
             logging.info("Kafka consumer closed.")
+        await close_driver()
+
+
+def main():
+    # The consumer is the only task on this loop, so Kafka's blocking poll
+    # holding it between messages costs nothing
+    asyncio.run(consume())
 
 
 if __name__ == "__main__":
@@ -1,5 +1,8 @@
 """
 Kafka consumer for vault documents that encrypts, stores, and anchors to Fabric.
+
+Anchoring is batched: each document joins the next Merkle batch and its
+attestation is recorded once the batch root is anchored.
 """
 
 import os
@@ -9,12 +12,13 @@ from typing import Optional
 from datetime import datetime
 from kafka import KafkaConsumer
 from dotenv import load_dotenv
-from py2neo import Graph, Node, Relationship
+from py2neo import Graph
 
 from vault.storage import VaultStorage
 from vault.models import DocumentType
-from blockchain.sdk.fabric_client import FabricClient
+from vault.anchoring import get_document_batcher
 from vault.timeline import TimelineService
+from vault.write_behind import get_write_behind
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
@@ -22,9 +26,9 @@ load_dotenv()
 
 KAFKA_BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP", "localhost:9092")
 VAULT_TOPIC = os.getenv("KAFKA_VAULT_TOPIC", "vault_documents")
-NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
-NEO4J_PASS = os.getenv("NEO4J_PASS", "test")
+
+# Loaded after .env so the shared connection picks up NEO4J_* from it
+from api.database import get_graph  # noqa: E402
 
 
 def connect_consumer() -> KafkaConsumer:
@@ -45,17 +49,14 @@ def persist_to_neo4j(
     user_id: str,
     document_type: str,
     document_hash: str,
-    fabric_tx_id: Optional[str] = None,
     metadata: Optional[dict] = None,
 ):
-    """Persist document and attestation to Neo4j."""
-    tx = graph.begin()
-
-    # Create or get User node
-    user_node = Node("User", id=user_id)
-    tx.merge(user_node, "User", "id")
+    """
+    Queue the document and its owner on the write-behind buffer.
 
-    # Create Document node
+    The Attestation is recorded by the anchoring batcher once the document's
+    batch root is anchored.
+    """
     doc_props = {
         "id": document_id,
         "user_id": user_id,
@@ -66,37 +67,18 @@ def persist_to_neo4j(
     if metadata:
         doc_props["metadata"] = json.dumps(metadata)
 
-    doc_node = Node("Document", **doc_props)
-    tx.merge(doc_node, "Document", "id")
-
-    # Create OWNS relationship
-    owns_rel = Relationship(user_node, "OWNS", doc_node)
-    tx.merge(owns_rel)
-
-    # Create Attestation node if Fabric tx exists
-    if fabric_tx_id:
-        attestation_node = Node(
-            "Attestation",
-            id=f"att_{document_id}",
-            document_id=document_id,
-            fabric_tx_id=fabric_tx_id,
-            timestamp=datetime.utcnow().isoformat(),
-        )
-        tx.merge(attestation_node, "Attestation", "id")
-
-        # Create ATTESTS relationship
-        attests_rel = Relationship(attestation_node, "ATTESTS", doc_node)
-        tx.merge(attests_rel)
-
-    tx.commit()
+    get_write_behind(graph).enqueue(
+        "document", user_id, {"user_id": user_id, "props": doc_props, "attestation": None}
+    )
 
 
 def main():
     """Main consumer loop."""
-    # Initialize services
-    graph = Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+    # Initialize services. The vault services still run on py2neo (see the
+    # migration status in api/database.py), so use the one shared Graph
+    graph = get_graph()
     vault_storage = VaultStorage()
-    fabric_client = FabricClient()
+    anchor_batcher = get_document_batcher(graph)
     timeline_service = TimelineService(graph)
 
     consumer = None
@@ -145,16 +127,15 @@ def main():
 
                 logging.info("Encrypted and stored document %s for user %s", document.id, user_id)
 
-                # Anchor to Fabric blockchain
+                # Queue for the next Merkle batch anchored to Fabric
                 try:
-                    anchor_result = fabric_client.anchor_document(
-                        document_id=document.id, document_hash=document.hash
-                    )
-                    fabric_tx_id = anchor_result.get("transactionId")
-                    logging.info("Anchored document %s to Fabric: %s", document.id, fabric_tx_id)
+                    anchor_batch_id = anchor_batcher.add(
+                        document.id, document.hash, user_id=user_id
+                    ).batch_id
+                    logging.info("Queued document %s in batch %s", document.id, anchor_batch_id)
                 except Exception as e:
-                    logging.error("Failed to anchor document %s to Fabric: %s", document.id, e)
-                    fabric_tx_id = None
+                    logging.error("Failed to queue document %s for anchoring: %s", document.id, e)
+                    anchor_batch_id = None
 
                 # Persist to Neo4j
                 persist_to_neo4j(
@@ -163,7 +144,6 @@ def main():
                     user_id=user_id,
                     document_type=doc_type.value,
                     document_hash=document.hash,
-                    fabric_tx_id=fabric_tx_id,
                     metadata=metadata,
                 )
 
@@ -175,19 +155,10 @@ def main():
                     metadata={
                         "document_type": doc_type.value,
                         "file_name": file_name,
-                        "fabric_tx_id": fabric_tx_id,
+                        "anchor_batch_id": anchor_batch_id,
                     },
                 )
 
-                if fabric_tx_id:
-                    timeline_service.log_event(
-                        user_id=user_id,
-                        event_type="attestation_created",
-                        document_id=document.id,
-                        attestation_id=f"att_{document.id}",
-                        metadata={"fabric_tx_id": fabric_tx_id},
-                    )
-
                 logging.info("Processed document %s", document.id)
 
             except Exception as e:
@@ -196,6 +167,8 @@ def main():
     except KeyboardInterrupt:
         logging.info("Shutting down vault consumer...")
     finally:
+        anchor_batcher.close()
+        get_write_behind(graph).close()
         if consumer is not None:
             consumer.close()
             logging.info("Vault consumer closed.")
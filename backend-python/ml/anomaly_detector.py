@@ -18,16 +18,21 @@ Usage:
     # score.flags: ["reputation_jump", "burst_pattern", ...]
 """
 
+import hashlib
 import logging
 import os
 import pickle
+import time
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 
+from ml.feature_state import AgentFeatureState
+from ml.forest_export import CompiledForest, compiled_path, export_forest
+
 logger = logging.getLogger(__name__)
 
 # Try to import sklearn, fallback to simple heuristics if not available
@@ -100,6 +105,29 @@ class ProofFeatures:
         )
 
 
+FEATURE_NAMES = [
+    "hour_of_day",
+    "day_of_week",
+    "time_since_last_proof",
+    "proof_count_1h",
+    "proof_count_24h",
+    "unique_nullifiers_1h",
+    "reputation_delta",
+    "threshold_requested",
+    "capability_count",
+    "new_capabilities",
+]
+
+# Column indices into ProofFeatures.to_array() / batch feature matrices
+COL_HOUR_OF_DAY = FEATURE_NAMES.index("hour_of_day")
+COL_TIME_SINCE_LAST = FEATURE_NAMES.index("time_since_last_proof")
+COL_PROOF_COUNT_1H = FEATURE_NAMES.index("proof_count_1h")
+COL_PROOF_COUNT_24H = FEATURE_NAMES.index("proof_count_24h")
+COL_UNIQUE_NULLIFIERS_1H = FEATURE_NAMES.index("unique_nullifiers_1h")
+COL_REPUTATION_DELTA = FEATURE_NAMES.index("reputation_delta")
+COL_NEW_CAPABILITIES = FEATURE_NAMES.index("new_capabilities")
+
+
 class AnomalyDetector:
     """
     ML-based anomaly detector for ZK proofs.
@@ -133,7 +161,9 @@ class AnomalyDetector:
 
         self.model: Optional[IsolationForest] = None
         self.scaler: Optional[StandardScaler] = None
-        self._history: Dict[str, List[Dict]] = {}  # agent_id -> proof history
+        # Flat-array export of model + scaler used for scoring when available
+        self.compiled: Optional[CompiledForest] = None
+        self._state: Dict[str, AgentFeatureState] = {}  # agent_id -> streaming features
 
         if model_path and model_path.exists():
             self._load_model(model_path)
@@ -149,26 +179,51 @@ class AnomalyDetector:
             n_jobs=-1,  # Use all cores
         )
         self.scaler = StandardScaler()
+        self.compiled = None
         logger.info("Initialized new Isolation Forest model")
 
     def _load_model(self, path: Path) -> None:
         """Load a pre-trained model."""
         try:
-            with open(path, "rb") as f:
-                data = pickle.load(f)
-                self.model = data["model"]
-                self.scaler = data["scaler"]
+            raw = path.read_bytes()
+            data = pickle.loads(raw)
+            self.model = data["model"]
+            self.scaler = data["scaler"]
             logger.info(f"Loaded anomaly detection model from {path}")
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             if self.use_ml:
                 self._init_model()
+            return
+
+        forest_path = compiled_path(path)
+        if forest_path.exists():
+            try:
+                compiled = CompiledForest.load(forest_path)
+                if compiled.source_digest == hashlib.sha256(raw).hexdigest():
+                    self.compiled = compiled
+                    return
+                logger.warning(f"Compiled forest {forest_path} is stale, re-exporting")
+            except Exception as e:
+                logger.warning(f"Ignoring compiled forest {forest_path}: {e}")
+        self._compile()
+
+    def _compile(self) -> None:
+        """Export the fitted model + scaler to the flat-array scorer."""
+        try:
+            self.compiled = export_forest(self.model, self.scaler)
+        except Exception as e:
+            self.compiled = None
+            logger.warning(f"Compiled forest unavailable, using sklearn scoring: {e}")
 
     def save_model(self, path: Path) -> None:
-        """Save the trained model."""
+        """Save the trained model (pickle plus the flat-array export beside it)."""
         if self.model and self.scaler:
-            with open(path, "wb") as f:
-                pickle.dump({"model": self.model, "scaler": self.scaler}, f)
+            raw = pickle.dumps({"model": self.model, "scaler": self.scaler})
+            path.write_bytes(raw)
+            if self.compiled is not None:
+                self.compiled.source_digest = hashlib.sha256(raw).hexdigest()
+                self.compiled.save(compiled_path(path))
             logger.info(f"Saved model to {path}")
 
     def _extract_features(
@@ -176,37 +231,25 @@ class AnomalyDetector:
         proof_data: Dict[str, Any],
         agent_id: str,
         proof_type: str,
+        now_ms: Optional[int] = None,
     ) -> ProofFeatures:
-        """Extract features from a proof for anomaly detection."""
-        now = datetime.utcnow()
-        history = self._history.get(agent_id, [])
+        """Extract features from a proof using the agent's streaming state (O(1))."""
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        now = datetime.utcfromtimestamp(now_ms / 1000)
+        state = self._state.get(agent_id) or AgentFeatureState()
 
         # Timing features
         hour_of_day = now.hour
         day_of_week = now.weekday()
-
-        # Time since last proof
-        if history:
-            last_ts = history[-1].get("timestamp", now - timedelta(days=1))
-            time_since_last = (now - last_ts).total_seconds()
-        else:
-            time_since_last = 86400  # Default to 24h
+        time_since_last = state.seconds_since_last(now_ms)  # 24h for new agents
 
         # Count proofs in time windows
-        proof_count_1h = sum(
-            1 for p in history if (now - p.get("timestamp", now)).total_seconds() < 3600
-        )
-        proof_count_24h = sum(
-            1 for p in history if (now - p.get("timestamp", now)).total_seconds() < 86400
-        )
+        proof_count_1h = state.count_1h.count(now_ms)
+        proof_count_24h = state.count_24h.count(now_ms)
 
         # Unique nullifiers (sybil detection)
-        recent_nullifiers = set(
-            p.get("nullifier")
-            for p in history
-            if (now - p.get("timestamp", now)).total_seconds() < 3600 and p.get("nullifier")
-        )
-        unique_nullifiers_1h = len(recent_nullifiers)
+        unique_nullifiers_1h = state.unique_nullifiers_1h(now_ms)
 
         # Reputation features
         reputation_delta = 0.0
@@ -218,21 +261,16 @@ class AnomalyDetector:
                     int(public_signals[1]) if str(public_signals[1]).isdigit() else 0
                 )
 
-            # Check reputation history
-            rep_history = [
-                p.get("threshold", 0) for p in history if p.get("proof_type") == "agent_reputation"
-            ]
-            if rep_history:
-                reputation_delta = threshold_requested - rep_history[-1]
+            # Compare with the last reputation threshold
+            if state.last_reputation_threshold is not None:
+                reputation_delta = threshold_requested - state.last_reputation_threshold
 
         # Capability features
         capability_count = 0
         new_capabilities = 0
         if proof_type == "agent_capability":
             capability_count = len(proof_data.get("capabilities", []))
-            known_caps = set(cap for p in history for cap in p.get("capabilities", []))
-            current_caps = set(proof_data.get("capabilities", []))
-            new_capabilities = len(current_caps - known_caps)
+            new_capabilities = state.new_capabilities(proof_data.get("capabilities", []))
 
         return ProofFeatures(
             hour_of_day=hour_of_day,
@@ -247,70 +285,75 @@ class AnomalyDetector:
             new_capabilities=new_capabilities,
         )
 
+    def _heuristic_scores(self, X: np.ndarray) -> Tuple[np.ndarray, List[Tuple[str, np.ndarray]]]:
+        """
+        Vectorized heuristic scoring over an (N, 10) feature matrix.
+
+        Returns scores clipped to [0, 1] and (flag, mask) pairs in rule order.
+        """
+        count_1h = X[:, COL_PROOF_COUNT_1H]
+        hour = X[:, COL_HOUR_OF_DAY]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            nullifier_ratio = X[:, COL_UNIQUE_NULLIFIERS_1H] / count_1h
+
+        rules = [
+            # Reputation jump detection
+            (
+                "reputation_jump",
+                0.3,
+                np.abs(X[:, COL_REPUTATION_DELTA]) > self.REPUTATION_JUMP_THRESHOLD,
+            ),
+            # Burst detection
+            ("burst_1h", 0.3, count_1h > self.BURST_THRESHOLD_1H),
+            ("burst_24h", 0.2, X[:, COL_PROOF_COUNT_24H] > self.BURST_THRESHOLD_24H),
+            # Sybil detection (low nullifier diversity)
+            ("sybil_pattern", 0.4, (count_1h > 5) & (nullifier_ratio < self.SYBIL_NULLIFIER_RATIO)),
+            # Unusual timing (late night activity)
+            ("unusual_timing", 0.1, (hour >= 2) & (hour <= 5)),
+            # Rapid-fire proofs (< 1 second apart)
+            ("rapid_fire", 0.2, X[:, COL_TIME_SINCE_LAST] < 1.0),
+            # New capabilities spike
+            ("capability_spike", 0.2, X[:, COL_NEW_CAPABILITIES] > 3),
+        ]
+
+        scores = np.zeros(len(X))
+        for _, weight, mask in rules:
+            scores = scores + weight * mask
+        return np.minimum(scores, 1.0), [(flag, mask) for flag, _, mask in rules]
+
     def _heuristic_score(self, features: ProofFeatures) -> Tuple[float, List[str]]:
         """Calculate anomaly score using heuristics (no ML)."""
-        score = 0.0
-        flags = []
-
-        # Reputation jump detection
-        if abs(features.reputation_delta) > self.REPUTATION_JUMP_THRESHOLD:
-            score += 0.3
-            flags.append("reputation_jump")
-
-        # Burst detection
-        if features.proof_count_1h > self.BURST_THRESHOLD_1H:
-            score += 0.3
-            flags.append("burst_1h")
-        if features.proof_count_24h > self.BURST_THRESHOLD_24H:
-            score += 0.2
-            flags.append("burst_24h")
-
-        # Sybil detection (low nullifier diversity)
-        if features.proof_count_1h > 5:
-            nullifier_ratio = features.unique_nullifiers_1h / features.proof_count_1h
-            if nullifier_ratio < self.SYBIL_NULLIFIER_RATIO:
-                score += 0.4
-                flags.append("sybil_pattern")
-
-        # Unusual timing (late night activity)
-        if features.hour_of_day >= 2 and features.hour_of_day <= 5:
-            score += 0.1
-            flags.append("unusual_timing")
-
-        # Rapid-fire proofs
-        if features.time_since_last_proof < 1.0:  # < 1 second
-            score += 0.2
-            flags.append("rapid_fire")
-
-        # New capabilities spike
-        if features.new_capabilities > 3:
-            score += 0.2
-            flags.append("capability_spike")
-
-        return min(score, 1.0), flags
+        scores, masks = self._heuristic_scores(features.to_array().reshape(1, -1))
+        return float(scores[0]), [flag for flag, mask in masks if mask[0]]
 
-    def _ml_score(self, features: ProofFeatures) -> Tuple[float, float]:
-        """Calculate anomaly score using Isolation Forest."""
+    def _ml_scores(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Isolation Forest scores and confidences for an (N, 10) matrix in one pass."""
+        uncertain = (np.full(len(X), 0.5), np.zeros(len(X)))
         if not self.model or not self.scaler:
-            return 0.5, 0.0  # Uncertain score
+            return uncertain
 
         try:
-            X = features.to_array().reshape(1, -1)
-            X_scaled = self.scaler.transform(X)
-
             # Get anomaly score (-1 = anomaly, 1 = normal)
-            raw_score = self.model.decision_function(X_scaled)[0]
+            if self.compiled is not None:
+                raw_scores = self.compiled.decision_function(X)
+            else:
+                raw_scores = self.model.decision_function(self.scaler.transform(X))
 
             # Convert to 0-1 scale (higher = more anomalous)
-            anomaly_score = max(0, min(1, 0.5 - raw_score * 0.5))
+            anomaly_scores = np.clip(0.5 - raw_scores * 0.5, 0, 1)
 
             # Confidence based on how far from decision boundary
-            confidence = min(1.0, abs(raw_score) / 0.5)
+            confidences = np.minimum(1.0, np.abs(raw_scores) / 0.5)
 
-            return anomaly_score, confidence
+            return anomaly_scores, confidences
         except Exception as e:
             logger.error(f"ML scoring failed: {e}")
-            return 0.5, 0.0
+            return uncertain
+
+    def _ml_score(self, features: ProofFeatures) -> Tuple[float, float]:
+        """Calculate anomaly score using Isolation Forest."""
+        scores, confidences = self._ml_scores(features.to_array().reshape(1, -1))
+        return float(scores[0]), float(confidences[0])
 
     def analyze_proof(
         self,
@@ -331,72 +374,91 @@ class AnomalyDetector:
         Returns:
             AnomalyScore with score, flags, and details
         """
-        features = self._extract_features(proof_data, agent_id, proof_type)
+        proof = {"proof_data": proof_data, "proof_type": proof_type, "agent_id": agent_id}
+        return self.analyze_batch([proof], agent_id, record=record)[0]
 
-        # Get heuristic score (always)
-        heuristic_score, flags = self._heuristic_score(features)
+    def analyze_batch(
+        self,
+        proofs: List[Dict[str, Any]],
+        agent_id: Optional[str] = None,
+        record: bool = True,
+    ) -> List[AnomalyScore]:
+        """
+        Analyze a batch of proofs with one scaler/forest pass.
 
-        # Get ML score if available
-        ml_score = 0.0
-        confidence = 0.0
+        Each item is {"proof_data": ..., "proof_type": ..., "agent_id": ...};
+        `agent_id` is the default for items without one. Features are
+        extracted in order and each proof is recorded before the next is
+        extracted, so repeated agents see their earlier proofs in the batch
+        exactly as with sequential analyze_proof calls.
+        """
+        n = len(proofs)
+        if n == 0:
+            return []
+
+        now_ms = int(time.time() * 1000)
+        X = np.empty((n, len(FEATURE_NAMES)))
+        for i, proof in enumerate(proofs):
+            proof_agent = proof.get("agent_id") or agent_id
+            proof_data = proof.get("proof_data") or {}
+            proof_type = proof.get("proof_type", "age")
+            features = self._extract_features(proof_data, proof_agent, proof_type, now_ms)
+            X[i] = features.to_array()
+            if record:
+                self._record(proof_agent, proof_data, proof_type, features, now_ms)
+
+        # Heuristic score (always)
+        heuristic_scores, flag_masks = self._heuristic_scores(X)
+
+        # ML score if available, combined as a weighted average
         if self.use_ml and self.model:
-            ml_score, confidence = self._ml_score(features)
-            # Combine scores (weighted average)
-            final_score = 0.6 * ml_score + 0.4 * heuristic_score
+            ml_scores, confidences = self._ml_scores(X)
+            final_scores = 0.6 * ml_scores + 0.4 * heuristic_scores
         else:
-            final_score = heuristic_score
-            confidence = 0.8  # High confidence in heuristics
-
-        # Record proof in history
-        if record:
-            if agent_id not in self._history:
-                self._history[agent_id] = []
-
-            self._history[agent_id].append(
-                {
-                    "timestamp": datetime.utcnow(),
-                    "proof_type": proof_type,
-                    "nullifier": proof_data.get("publicSignals", [None])[-1],
-                    "threshold": features.threshold_requested,
-                    "capabilities": proof_data.get("capabilities", []),
-                }
-            )
+            ml_scores = np.zeros(n)
+            confidences = np.full(n, 0.8)  # High confidence in heuristics
+            final_scores = heuristic_scores
 
-            # Trim history (keep last 1000 proofs per agent)
-            if len(self._history[agent_id]) > 1000:
-                self._history[agent_id] = self._history[agent_id][-1000:]
-
-        return AnomalyScore(
-            anomaly_score=final_score,
-            is_anomalous=final_score > self.anomaly_threshold,
-            flags=flags,
-            details={
-                "features": {
-                    "proof_count_1h": features.proof_count_1h,
-                    "proof_count_24h": features.proof_count_24h,
-                    "reputation_delta": features.reputation_delta,
-                    "time_since_last": features.time_since_last_proof,
+        return [
+            AnomalyScore(
+                anomaly_score=float(final_scores[i]),
+                is_anomalous=bool(final_scores[i] > self.anomaly_threshold),
+                flags=[flag for flag, mask in flag_masks if mask[i]],
+                details={
+                    "features": {
+                        "proof_count_1h": int(X[i, COL_PROOF_COUNT_1H]),
+                        "proof_count_24h": int(X[i, COL_PROOF_COUNT_24H]),
+                        "reputation_delta": float(X[i, COL_REPUTATION_DELTA]),
+                        "time_since_last": float(X[i, COL_TIME_SINCE_LAST]),
+                    },
+                    "ml_score": round(float(ml_scores[i]), 4) if self.use_ml else None,
+                    "heuristic_score": round(float(heuristic_scores[i]), 4),
                 },
-                "ml_score": round(ml_score, 4) if self.use_ml else None,
-                "heuristic_score": round(heuristic_score, 4),
-            },
-            confidence=confidence,
-        )
+                confidence=float(confidences[i]),
+            )
+            for i in range(n)
+        ]
 
-    def analyze_batch(
+    def _record(
         self,
-        proofs: List[Dict[str, Any]],
         agent_id: str,
-    ) -> List[AnomalyScore]:
-        """Analyze a batch of proofs."""
-        return [
-            self.analyze_proof(
-                proof.get("proof_data", {}),
-                agent_id,
-                proof.get("proof_type", "age"),
-            )
-            for proof in proofs
-        ]
+        proof_data: Dict[str, Any],
+        proof_type: str,
+        features: ProofFeatures,
+        now_ms: int,
+    ) -> None:
+        """Update an agent's streaming feature state with an analyzed proof."""
+        state = self._state.get(agent_id)
+        if state is None:
+            state = self._state[agent_id] = AgentFeatureState()
+        public_signals = proof_data.get("publicSignals") or [None]
+        state.observe(
+            now_ms,
+            proof_type,
+            nullifier=public_signals[-1],
+            threshold=features.threshold_requested,
+            capabilities=proof_data.get("capabilities", []),
+        )
 
     def train(self, training_data: List[Dict[str, Any]]) -> None:
         """
@@ -430,18 +492,53 @@ class AnomalyDetector:
             )
             X.append(features.to_array())
 
-        X = np.array(X)
+        self._fit(np.array(X))
+
+    def train_on_history(self, proofs: List[Dict[str, Any]]) -> int:
+        """
+        Train on stored proofs, featurised as live analysis would see them.
+
+        Each item is {"agent_id", "timestamp_ms", "proof_data", "proof_type"},
+        oldest first. Proofs are replayed through a fresh streaming state, so
+        window counts, gaps and reputation deltas match `analyze_batch`.
+
+        Returns:
+            Number of samples trained on (0 if training was skipped)
+        """
+        if not self.use_ml:
+            logger.warning("ML not available, skipping training")
+            return 0
+
+        replay = AnomalyDetector(use_ml=False)
+        X = np.empty((len(proofs), len(FEATURE_NAMES)))
+        for i, proof in enumerate(proofs):
+            proof_data = proof.get("proof_data") or {}
+            proof_type = proof.get("proof_type", "age")
+            now_ms = int(proof["timestamp_ms"])
+            features = replay._extract_features(proof_data, proof["agent_id"], proof_type, now_ms)
+            X[i] = features.to_array()
+            replay._record(proof["agent_id"], proof_data, proof_type, features, now_ms)
+        return self._fit(X)
+
+    def _fit(self, X: np.ndarray) -> int:
+        """Fit scaler and model on an (N, 10) feature matrix."""
+        if len(X) < 100:
+            logger.warning(f"Insufficient training data ({len(X)}), need 100+")
+            return 0
+        if self.model is None:
+            self._init_model()
 
-        # Fit scaler and model
         X_scaled = self.scaler.fit_transform(X)
         self.model.fit(X_scaled)
+        self._compile()
 
         logger.info(f"Trained anomaly detection model on {len(X)} samples")
+        return len(X)
 
     def get_stats(self) -> Dict[str, Any]:
         """Get detector statistics."""
-        total_agents = len(self._history)
-        total_proofs = sum(len(h) for h in self._history.values())
+        total_agents = len(self._state)
+        total_proofs = sum(s.total_proofs for s in self._state.values())
 
         return {
             "total_agents_tracked": total_agents,
@@ -466,3 +563,16 @@ def get_detector() -> AnomalyDetector:
             anomaly_threshold=float(os.environ.get("ANOMALY_THRESHOLD", "0.7")),
         )
     return _detector
+
+
+def swap_detector(detector: AnomalyDetector) -> None:
+    """
+    Install a new global detector without locking readers.
+
+    The per-agent feature state carries over (shared, not copied), so
+    history recorded by requests still holding the old instance is kept.
+    """
+    global _detector
+    if _detector is not None:
+        detector._state = _detector._state
+    _detector = detector
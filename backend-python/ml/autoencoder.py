@@ -15,6 +15,8 @@ Integration:
 - Training data: Neo4j agent/claim graph
 - Inference: Real-time during /ai/verify-proof
 - zkML: Export to ONNX → DeepProve for verifiable inference
+- Inference-only pods: AUTOENCODER_BACKEND=onnx serves the ONNX export
+  without importing PyTorch (see ml/inference_backend.py)
 
 Usage:
     from ml.autoencoder import AgentAutoencoder, get_autoencoder
@@ -32,8 +34,15 @@ from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-# Try to import PyTorch
+# "eager" (PyTorch model), "onnx" or "torchscript" (exported, inference only)
+AUTOENCODER_BACKEND = os.getenv("AUTOENCODER_BACKEND", "eager")
+# Intra-op threads for CPU inference (0 = leave the runtime's default)
+AUTOENCODER_INTRA_OP_THREADS = int(os.getenv("AUTOENCODER_INTRA_OP_THREADS", "0"))
+
+# Try to import PyTorch (skipped entirely when serving the ONNX export)
 try:
+    if AUTOENCODER_BACKEND == "onnx":
+        raise ImportError("AUTOENCODER_BACKEND=onnx")
     import torch
     import torch.nn as nn
     from torch.utils.data import DataLoader, TensorDataset
@@ -225,7 +234,6 @@ if TORCH_AVAILABLE:
             score = torch.sigmoid(z_score)
             return score
 
-        @torch.no_grad()
         def detect_anomaly(
             self,
             features: List[List[float]],
@@ -241,30 +249,66 @@ if TORCH_AVAILABLE:
             Returns:
                 AnomalyResult with score and metadata
             """
+            return self.detect_anomaly_batch([features], return_latent=return_latent)[0]
+
+        @torch.inference_mode()
+        def detect_anomaly_batch(
+            self,
+            sequences: List[List[List[float]]],
+            return_latent: bool = False,
+        ) -> List[AnomalyResult]:
+            """
+            Detect anomalies for many agent sequences in one forward pass.
+
+            Sequences of different lengths are zero-padded to the longest.
+            The encoder runs on a packed sequence so each agent's latent comes
+            from its own last timestep, and since the decoder LSTM is causal
+            the first L reconstructed steps do not depend on padding; the
+            error is averaged over each sequence's real timesteps only. Every
+            result therefore matches a batch-of-1 call on the same sequence.
+            """
             self.eval()
+            if not sequences:
+                return []
 
-            # Convert to tensor
-            x = torch.tensor([features], dtype=torch.float32)
+            lengths = torch.tensor([len(seq) for seq in sequences])
+            max_len = int(lengths.max())
+            x = torch.zeros(len(sequences), max_len, self.input_size)
+            for i, seq in enumerate(sequences):
+                x[i, : len(seq)] = torch.tensor(seq, dtype=torch.float32)
 
             # Normalize
             x_norm = self.normalize_features(x)
 
             # Forward pass
-            reconstructed, latent = self.forward(x_norm)
-
-            # Compute error
-            error = self.compute_reconstruction_error(x_norm, reconstructed)
+            if bool((lengths == max_len).all()):
+                reconstructed, latent = self.forward(x_norm)
+            else:
+                packed = nn.utils.rnn.pack_padded_sequence(
+                    x_norm, lengths, batch_first=True, enforce_sorted=False
+                )
+                _, (hidden, _) = self.encoder.lstm(packed)
+                latent = self.encoder.fc(hidden[-1])
+                reconstructed = self.decoder(latent, max_len)
+
+            # Compute error over real timesteps
+            mask = (torch.arange(max_len)[None, :] < lengths[:, None]).unsqueeze(-1)
+            squared = ((x_norm - reconstructed) ** 2) * mask
+            errors = squared.sum(dim=(1, 2)) / (lengths * self.input_size)
 
             # Convert to anomaly score
-            score = self.error_to_anomaly_score(error)
-
-            return AnomalyResult(
-                anomaly_score=score.item(),
-                reconstruction_error=error.item(),
-                threshold=self.anomaly_threshold,
-                is_anomalous=score.item() > self.anomaly_threshold,
-                latent_vector=latent[0].tolist() if return_latent else None,
-            )
+            scores = self.error_to_anomaly_score(errors)
+
+            return [
+                AnomalyResult(
+                    anomaly_score=score,
+                    reconstruction_error=error,
+                    threshold=self.anomaly_threshold,
+                    is_anomalous=score > self.anomaly_threshold,
+                    latent_vector=latent[i].tolist() if return_latent else None,
+                )
+                for i, (score, error) in enumerate(zip(scores.tolist(), errors.tolist()))
+            ]
 
         def fit(
             self,
@@ -354,14 +398,47 @@ if TORCH_AVAILABLE:
 
             return history
 
+        def normalization_stats(self) -> Any:
+            """Running stats exported models need around their graph."""
+            from ml.inference_backend import NormalizationStats
+
+            return NormalizationStats(
+                running_mean=self.running_mean.tolist(),
+                running_std=self.running_std.tolist(),
+                error_mean=float(self.error_mean),
+                error_std=float(self.error_std),
+                anomaly_threshold=self.anomaly_threshold,
+            )
+
+        def export_torchscript(self, path: Path, seq_len: int = 10) -> None:
+            """
+            Export a TorchScript trace for the torchscript inference backend.
+
+            Args:
+                path: Output path for the .pt trace
+                seq_len: Sequence length of the example input
+            """
+            from ml.inference_backend import stats_path
+
+            self.eval()
+            with torch.no_grad():
+                traced = torch.jit.trace(self, torch.randn(1, seq_len, self.input_size))
+            traced.save(str(path))
+            self.normalization_stats().save(stats_path(path))
+            logger.info(f"Exported TorchScript model to {path}")
+
         def export_onnx(self, path: Path, seq_len: int = 10) -> None:
             """
-            Export model to ONNX format for zkML (DeepProve).
+            Export model to ONNX format for zkML (DeepProve) and the onnx backend.
+
+            Normalization stats are written beside it as <name>.stats.json.
 
             Args:
                 path: Output path for .onnx file
                 seq_len: Sequence length for export
             """
+            from ml.inference_backend import stats_path
+
             self.eval()
             dummy_input = torch.randn(1, seq_len, self.input_size)
 
@@ -375,11 +452,12 @@ if TORCH_AVAILABLE:
                 input_names=["input"],
                 output_names=["reconstructed", "latent"],
                 dynamic_axes={
-                    "input": {0: "batch_size"},
-                    "reconstructed": {0: "batch_size"},
+                    "input": {0: "batch_size", 1: "seq_len"},
+                    "reconstructed": {0: "batch_size", 1: "seq_len"},
                     "latent": {0: "batch_size"},
                 },
             )
+            self.normalization_stats().save(stats_path(path))
             logger.info(f"Exported ONNX model to {path}")
 
 
@@ -443,6 +521,14 @@ class StatisticalAutoencoder:
             is_anomalous=score > self.anomaly_threshold,
         )
 
+    def detect_anomaly_batch(
+        self,
+        sequences: List[List[List[float]]],
+        return_latent: bool = False,
+    ) -> List[AnomalyResult]:
+        """Detect anomalies for many sequences (no batching benefit here)."""
+        return [self.detect_anomaly(seq, return_latent) for seq in sequences]
+
     def fit(
         self,
         train_data: List[List[List[float]]],
@@ -512,6 +598,15 @@ def get_autoencoder() -> Any:
     if _autoencoder is None:
         model_path = Path(os.environ.get("AUTOENCODER_MODEL_PATH", ""))
 
+        if AUTOENCODER_BACKEND != "eager":
+            from ml.inference_backend import load_backend
+
+            try:
+                _autoencoder = load_backend(AUTOENCODER_BACKEND, model_path)
+                return _autoencoder
+            except Exception as e:
+                logger.error(f"Failed to load {AUTOENCODER_BACKEND} autoencoder: {e}")
+
         _autoencoder = create_autoencoder()
 
         if TORCH_AVAILABLE and model_path.exists():
@@ -522,3 +617,9 @@ def get_autoencoder() -> Any:
                 logger.error(f"Failed to load autoencoder: {e}")
 
     return _autoencoder
+
+
+def set_autoencoder(model: Any) -> None:
+    """Replace the global autoencoder (a single reference swap; readers never block)."""
+    global _autoencoder
+    _autoencoder = model
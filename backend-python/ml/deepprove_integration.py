@@ -45,10 +45,13 @@ import logging
 import os
 import subprocess
 import time
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+from ml.proof_cache import get_proof_cache, model_fingerprint, proof_key
+from zkp.proving_scheduler import PRIORITY_BATCH, get_proving_scheduler, proving_env
+
 logger = logging.getLogger(__name__)
 
 
@@ -148,6 +151,7 @@ class DeepProveZKML:
         self._model_hash: Optional[str] = None
         self._setup_complete = False
         self._use_mock = not self.deepprove_path.exists()
+        self.proof_cache = get_proof_cache(self.circuit_dir / "proof_cache")
 
         if self._use_mock:
             logger.warning(
@@ -294,6 +298,7 @@ class DeepProveZKML:
         features: List[List[float]],
         threshold: float = 0.8,
         use_rapidsnark: bool = True,
+        priority: int = PRIORITY_BATCH,
     ) -> DeepProveProof:
         """
         Generate ZK proof of anomaly detection result.
@@ -303,31 +308,70 @@ class DeepProveZKML:
         - model weights
         - raw error value
 
+        Proofs are memoized by (model commitment + live model, features,
+        scaled threshold); identical concurrent requests share one run and
+        misses are proved on the shared proving scheduler.
+
         Args:
             features: Sequence of feature vectors
             threshold: Anomaly threshold (0-1)
             use_rapidsnark: Use Rapidsnark for faster proving
+            priority: Proving scheduler priority (batch by default)
 
         Returns:
             DeepProveProof with Groth16 proof
         """
-        _ = time.perf_counter()  # For future performance tracking
+        autoencoder = self._get_autoencoder()
+        threshold_scaled = int(threshold * self.SCALE_FACTOR)
+        backend = "mock" if self._use_mock else "groth16"
+        key = proof_key(
+            "deepprove",
+            f"{self._model_hash or ''}:{backend}:{model_fingerprint(autoencoder)}",
+            features,
+            threshold_scaled,
+        )
+        data, _ = self.proof_cache.get_or_compute(
+            key,
+            lambda: get_proving_scheduler().run(
+                "deepprove_anomaly",
+                self._prove,
+                autoencoder,
+                features,
+                threshold_scaled,
+                use_rapidsnark,
+                priority=priority,
+            ),
+        )
+        return DeepProveProof(**data)
+
+    def _prove(
+        self,
+        autoencoder: Any,
+        features: List[List[float]],
+        threshold_scaled: int,
+        use_rapidsnark: bool,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Inference, witness and proof; returns (DeepProveProof fields, cacheable)."""
+        # The circuit only sees the scaled threshold; compare against the same value
+        threshold = threshold_scaled / self.SCALE_FACTOR
 
         # Step 1: Run inference to get anomaly score
         inference_start = time.perf_counter()
-        anomaly_score, reconstruction_error = self._run_inference(features)
+        anomaly_score, reconstruction_error, inference_ok = self._run_inference(
+            autoencoder, features
+        )
         inference_ms = (time.perf_counter() - inference_start) * 1000
 
         is_above = anomaly_score > threshold
-        threshold_scaled = int(threshold * self.SCALE_FACTOR)
 
         if self._use_mock:
-            return self._generate_mock_proof(
+            proof = self._generate_mock_proof(
                 anomaly_score=anomaly_score,
                 threshold=threshold,
                 is_above=is_above,
                 inference_ms=inference_ms,
             )
+            return asdict(proof), inference_ok
 
         # Step 2: Generate witness
         witness_start = time.perf_counter()
@@ -344,7 +388,7 @@ class DeepProveZKML:
 
         prove_ms = (time.perf_counter() - prove_start) * 1000
 
-        return DeepProveProof(
+        proof = DeepProveProof(
             pi_a=proof_data["pi_a"],
             pi_b=proof_data["pi_b"],
             pi_c=proof_data["pi_c"],
@@ -360,24 +404,32 @@ class DeepProveZKML:
             witness_ms=witness_ms,
             prove_ms=prove_ms,
         )
+        return asdict(proof), inference_ok
+
+    def _get_autoencoder(self) -> Any:
+        try:
+            from ml.autoencoder import get_autoencoder
+
+            return get_autoencoder()
+        except Exception as e:
+            logger.warning(f"Autoencoder unavailable: {e}")
+            return None
 
     def _run_inference(
         self,
+        autoencoder: Any,
         features: List[List[float]],
-    ) -> Tuple[float, float]:
-        """Run model inference to get anomaly score."""
+    ) -> Tuple[float, float, bool]:
+        """Run model inference; returns (anomaly_score, reconstruction_error, succeeded)."""
         try:
-            from ml.autoencoder import get_autoencoder
-
-            autoencoder = get_autoencoder()
             result = autoencoder.detect_anomaly(features)
-            return result.anomaly_score, result.reconstruction_error
+            return result.anomaly_score, result.reconstruction_error, True
         except Exception as e:
             logger.warning(f"Inference failed: {e}, using mock values")
             # Mock inference
             import random
 
-            return random.uniform(0.3, 0.9), random.uniform(0.01, 0.1)
+            return random.uniform(0.3, 0.9), random.uniform(0.01, 0.1), False
 
     def _generate_witness(
         self,
@@ -435,6 +487,7 @@ class DeepProveZKML:
             capture_output=True,
             text=True,
             timeout=60,
+            env=proving_env(),
         )
 
         if result.returncode != 0:
@@ -462,6 +515,7 @@ class DeepProveZKML:
             capture_output=True,
             text=True,
             timeout=120,
+            env=proving_env(),
         )
 
         if result.returncode != 0:
@@ -0,0 +1,155 @@
+"""
+Streaming per-agent feature state for anomaly detection.
+
+Replaces re-scanning a per-agent list of proof dicts on every call with
+state that is updated in O(1) amortized per proof:
+
+- bucketed ring counters for proof counts in the last 1h / 24h
+- a ring buffer of (int ms timestamp, 64-bit nullifier fingerprint) pairs
+  plus per-fingerprint counts for distinct nullifiers in the last hour
+- the last reputation threshold and an incrementally grown capability set
+"""
+
+import hashlib
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set
+
+HOUR_MS = 3_600_000
+DAY_MS = 24 * HOUR_MS
+
+# Upper bound on nullifier observations kept for the 1h distinct count
+MAX_NULLIFIER_WINDOW = 10_000
+
+
+class SlidingWindowCounter:
+    """
+    Event count over a sliding window, kept in `n_buckets` ring buckets.
+
+    Counts are exact to bucket granularity: an event leaves the window
+    between (n_buckets - 1) and n_buckets bucket widths after it happened.
+    Advancing past k buckets costs O(min(k, n_buckets)).
+    """
+
+    __slots__ = ("bucket_ms", "counts", "head", "total")
+
+    def __init__(self, window_ms: int, n_buckets: int):
+        self.bucket_ms = max(1, window_ms // n_buckets)
+        self.counts: List[int] = [0] * n_buckets
+        self.head: Optional[int] = None  # absolute index of the newest bucket
+        self.total = 0
+
+    def _advance(self, now_ms: int) -> int:
+        idx = now_ms // self.bucket_ms
+        if self.head is None or idx <= self.head:
+            if self.head is None:
+                self.head = idx
+            return self.head
+        n = len(self.counts)
+        steps = idx - self.head
+        if steps >= n:
+            self.counts = [0] * n
+            self.total = 0
+        else:
+            for i in range(1, steps + 1):
+                slot = (self.head + i) % n
+                self.total -= self.counts[slot]
+                self.counts[slot] = 0
+        self.head = idx
+        return idx
+
+    def add(self, now_ms: int) -> None:
+        """Record one event at `now_ms`."""
+        idx = self._advance(now_ms)
+        self.counts[idx % len(self.counts)] += 1
+        self.total += 1
+
+    def count(self, now_ms: int) -> int:
+        """Events within the window ending at `now_ms`."""
+        self._advance(now_ms)
+        return self.total
+
+
+def nullifier_fingerprint(nullifier: str) -> int:
+    """64-bit fingerprint of a nullifier (distinct counts are exact up to collisions)."""
+    return int.from_bytes(hashlib.blake2b(str(nullifier).encode(), digest_size=8).digest(), "big")
+
+
+class AgentFeatureState:
+    """Incrementally maintained features for a single agent."""
+
+    __slots__ = (
+        "count_1h",
+        "count_24h",
+        "last_ts",
+        "total_proofs",
+        "last_reputation_threshold",
+        "capabilities",
+        "_null_ts",
+        "_null_fp",
+        "_null_counts",
+    )
+
+    def __init__(self):
+        self.count_1h = SlidingWindowCounter(HOUR_MS, 60)  # 1-minute buckets
+        self.count_24h = SlidingWindowCounter(DAY_MS, 96)  # 15-minute buckets
+        self.last_ts: Optional[int] = None
+        self.total_proofs = 0
+        self.last_reputation_threshold: Optional[int] = None
+        self.capabilities: Set[str] = set()
+        self._null_ts: Deque[int] = deque()
+        self._null_fp: Deque[int] = deque()
+        self._null_counts: Dict[int, int] = {}
+
+    def _expire_nullifiers(self, now_ms: int) -> None:
+        cutoff = now_ms - HOUR_MS
+        while self._null_ts and (
+            self._null_ts[0] <= cutoff or len(self._null_ts) > MAX_NULLIFIER_WINDOW
+        ):
+            self._null_ts.popleft()
+            fp = self._null_fp.popleft()
+            remaining = self._null_counts[fp] - 1
+            if remaining:
+                self._null_counts[fp] = remaining
+            else:
+                del self._null_counts[fp]
+
+    def unique_nullifiers_1h(self, now_ms: int) -> int:
+        """Distinct nullifiers seen in the last hour."""
+        self._expire_nullifiers(now_ms)
+        return len(self._null_counts)
+
+    def seconds_since_last(self, now_ms: int, default: float = 86400.0) -> float:
+        """Seconds since the previous proof, or `default` for a new agent."""
+        if self.last_ts is None:
+            return default
+        return (now_ms - self.last_ts) / 1000.0
+
+    def new_capabilities(self, capabilities: Iterable[str]) -> int:
+        """How many of `capabilities` have not been claimed before."""
+        return len(set(capabilities) - self.capabilities)
+
+    def observe(
+        self,
+        now_ms: int,
+        proof_type: str,
+        nullifier: Optional[str],
+        threshold: int,
+        capabilities: Iterable[str],
+    ) -> None:
+        """Fold one proof into the state."""
+        self.count_1h.add(now_ms)
+        self.count_24h.add(now_ms)
+        self.last_ts = now_ms
+        self.total_proofs += 1
+
+        if nullifier:
+            fp = nullifier_fingerprint(nullifier)
+            self._null_ts.append(now_ms)
+            self._null_fp.append(fp)
+            self._null_counts[fp] = self._null_counts.get(fp, 0) + 1
+            self._expire_nullifiers(now_ms)
+
+        if proof_type == "agent_reputation":
+            self.last_reputation_threshold = threshold
+
+        self.capabilities.update(capabilities)
@@ -0,0 +1,203 @@
+"""
+Flat-array Isolation Forest scorer.
+
+Exports a fitted sklearn `IsolationForest` + `StandardScaler` into
+contiguous NumPy arrays and scores rows by walking every tree at once,
+level by level, instead of going through sklearn's per-call validation,
+joblib dispatch and per-tree `apply`.
+
+Layout (all trees concatenated, node indices are global):
+
+- feature / threshold: split of each node (feature 0 for leaves)
+- children: interleaved (left, right) pairs, so the next node is
+  `children[2 * node + (x > threshold)]`; leaves point to themselves so a
+  fixed number of steps (max tree depth) lands every tree on its leaf
+  without branching
+- value: depth-adjusted leaf value, i.e. edges from the root plus the
+  average path length of an unbuilt subtree with the leaf's sample count
+- roots: index of each tree's root node
+
+Outputs match `scaler.transform` + `model.decision_function` to within
+floating-point summation order. The format is versioned and saved next to
+the detector's pickle as `<name>.forest.npz`, tagged with the pickle's
+digest so a stale export is never paired with a different model.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """Average path length of an unsuccessful BST search over n samples."""
+    n = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n)
+    result[n == 2] = 1.0
+    big = n > 2
+    result[big] = 2.0 * (np.log(n[big] - 1.0) + np.euler_gamma) - 2.0 * (n[big] - 1.0) / n[big]
+    return result
+
+
+def compiled_path(model_path: Path) -> Path:
+    """Where the flat-array export of a pickled model lives."""
+    return Path(model_path).with_suffix(".forest.npz")
+
+
+@dataclass
+class CompiledForest:
+    """Isolation Forest + scaler flattened into contiguous arrays."""
+
+    mean: np.ndarray  # (n_features,) scaler mean
+    scale: np.ndarray  # (n_features,) scaler scale
+    feature: np.ndarray  # (n_nodes,) int, 0 for leaves
+    threshold: np.ndarray  # (n_nodes,) float64
+    children: np.ndarray  # (2 * n_nodes,) int, (left, right) pairs, self for leaves
+    value: np.ndarray  # (n_nodes,) depth-adjusted leaf value, 0 for splits
+    roots: np.ndarray  # (n_trees,) root node index per tree
+    max_depth: int
+    denominator: float  # n_trees * c(max_samples)
+    offset: float  # IsolationForest.offset_
+    source_digest: str = ""  # sha256 of the pickle this was exported alongside
+
+    @property
+    def n_features(self) -> int:
+        return len(self.mean)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """StandardScaler.transform."""
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+    def score_samples(self, X_scaled: np.ndarray) -> np.ndarray:
+        """IsolationForest.score_samples on already-scaled rows."""
+        # Trees were fit on float32 input; compare at the same precision
+        X32 = np.ascontiguousarray(X_scaled, dtype=np.float32)
+        n_rows = len(X32)
+        if n_rows == 1:
+            # Single-row fast path: 1-D gathers, one node per tree
+            row = X32[0]
+            nodes = self.roots
+            for _ in range(self.max_depth):
+                go_right = row[self.feature[nodes]] > self.threshold[nodes]
+                nodes = self.children[2 * nodes + go_right]
+            depths = self.value[nodes].sum(keepdims=True)
+        else:
+            flat = X32.ravel()
+            row_base = (np.arange(n_rows) * X32.shape[1])[:, None]
+            nodes = np.broadcast_to(self.roots, (n_rows, len(self.roots)))
+            for _ in range(self.max_depth):
+                go_right = flat[row_base + self.feature[nodes]] > self.threshold[nodes]
+                nodes = self.children[2 * nodes + go_right]
+            depths = self.value[nodes].sum(axis=1)
+        if self.denominator == 0:
+            return -np.ones(n_rows)
+        return -(2.0 ** (-depths / self.denominator))
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """scaler.transform followed by IsolationForest.decision_function."""
+        return self.score_samples(self.transform(X)) - self.offset
+
+    def save(self, path: Path) -> None:
+        """Write the arrays to a versioned .npz file."""
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                format_version=np.int64(FORMAT_VERSION),
+                mean=self.mean,
+                scale=self.scale,
+                feature=self.feature,
+                threshold=self.threshold,
+                children=self.children,
+                value=self.value,
+                roots=self.roots,
+                max_depth=np.int64(self.max_depth),
+                denominator=np.float64(self.denominator),
+                offset=np.float64(self.offset),
+                source_digest=np.str_(self.source_digest),
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "CompiledForest":
+        """Read a file written by `save`; raises ValueError on a format mismatch."""
+        with np.load(path) as data:
+            version = int(data["format_version"])
+            if version != FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported compiled forest format {version} (expected {FORMAT_VERSION})"
+                )
+            arrays: Dict[str, Any] = {name: data[name] for name in data.files}
+        return cls(
+            mean=arrays["mean"],
+            scale=arrays["scale"],
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            children=arrays["children"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            max_depth=int(arrays["max_depth"]),
+            denominator=float(arrays["denominator"]),
+            offset=float(arrays["offset"]),
+            source_digest=str(arrays["source_digest"]),
+        )
+
+
+def export_forest(model: Any, scaler: Any) -> CompiledForest:
+    """
+    Flatten a fitted IsolationForest and StandardScaler.
+
+    Raises ValueError if either is unfitted or the forest was trained on a
+    feature subsample (max_features < n_features), which this layout does
+    not encode.
+    """
+    if not hasattr(model, "estimators_") or not hasattr(scaler, "mean_"):
+        raise ValueError("Model and scaler must be fitted before export")
+
+    n_features = int(model.n_features_in_)
+    if model._max_features != n_features:
+        raise ValueError("Forests trained with max_features < n_features are not supported")
+
+    features, thresholds, children, values, roots = [], [], [], [], []
+    max_depth = 0
+    base = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        index = np.arange(n)
+
+        # Edges from the root to every node
+        depth = np.zeros(n, dtype=np.int64)
+        for node in range(n):  # children always come after their parent
+            if not is_leaf[node]:
+                depth[tree.children_left[node]] = depth[node] + 1
+                depth[tree.children_right[node]] = depth[node] + 1
+        max_depth = max(max_depth, int(depth.max()))
+
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        pairs = np.empty((n, 2), dtype=np.int64)
+        pairs[:, 0] = np.where(is_leaf, index, tree.children_left)
+        pairs[:, 1] = np.where(is_leaf, index, tree.children_right)
+        children.append(pairs.ravel() + base)
+        values.append(np.where(is_leaf, depth + average_path_length(tree.n_node_samples), 0.0))
+        roots.append(base)
+        base += n
+
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+    return CompiledForest(
+        mean=np.ascontiguousarray(scaler.mean_, dtype=np.float64),
+        scale=np.ascontiguousarray(scale, dtype=np.float64),
+        feature=np.concatenate(features).astype(np.intp),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        children=np.concatenate(children).astype(np.intp),
+        value=np.concatenate(values).astype(np.float64),
+        roots=np.asarray(roots, dtype=np.intp),
+        max_depth=max_depth,
+        denominator=float(
+            len(model.estimators_) * average_path_length(np.array([model._max_samples]))[0]
+        ),
+        offset=float(model.offset_),
+    )
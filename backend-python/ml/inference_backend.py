@@ -0,0 +1,241 @@
+"""
+Inference-only backends for the agent autoencoder.
+
+Scoring with the eager `AgentAutoencoder` means importing PyTorch in every
+API worker. These backends load an exported model instead:
+
+- "onnx": the file written by `AgentAutoencoder.export_onnx`, run with
+  onnxruntime + NumPy (no torch import at all)
+- "torchscript": a trace written by `AgentAutoencoder.export_torchscript`
+  (still needs torch, but no model code or training dependencies)
+
+The ONNX graph only maps normalized input to (reconstructed, latent), so
+the normalization and error statistics are exported beside it as
+`<name>.stats.json`. Both backends expose `detect_anomaly` and
+`detect_anomaly_batch` like the eager model, so they drop in behind
+`get_autoencoder()` and the inference queue. Select with
+AUTOENCODER_BACKEND=onnx|torchscript and point AUTOENCODER_MODEL_PATH at
+the exported file.
+
+Startup comparison (import time and peak RSS per backend):
+    python -m ml.inference_backend --compare model.onnx
+"""
+
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, List, Tuple
+
+import numpy as np
+
+from ml.autoencoder import AUTOENCODER_INTRA_OP_THREADS, AnomalyResult
+
+logger = logging.getLogger(__name__)
+
+STATS_FORMAT_VERSION = 1
+
+
+def stats_path(model_path: Path) -> Path:
+    """Where the normalization stats for an exported model live."""
+    return Path(model_path).with_suffix(".stats.json")
+
+
+@dataclass
+class NormalizationStats:
+    """Running stats an exported autoencoder needs around its graph."""
+
+    running_mean: List[float]
+    running_std: List[float]
+    error_mean: float
+    error_std: float
+    anomaly_threshold: float
+
+    @property
+    def input_size(self) -> int:
+        return len(self.running_mean)
+
+    def save(self, path: Path) -> None:
+        data = {"format_version": STATS_FORMAT_VERSION, **asdict(self)}
+        Path(path).write_text(json.dumps(data, indent=2))
+
+    @classmethod
+    def load(cls, path: Path) -> "NormalizationStats":
+        """Read stats written by `save`; raises ValueError on a format mismatch."""
+        data = json.loads(Path(path).read_text())
+        version = data.pop("format_version", None)
+        if version != STATS_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported stats format {version} (expected {STATS_FORMAT_VERSION})"
+            )
+        return cls(**data)
+
+
+class ExportedAutoencoder:
+    """
+    Shared pre/post-processing for exported models, in NumPy.
+
+    Subclasses implement `_forward(x_norm) -> (reconstructed, latent)` for a
+    (batch, seq_len, input_size) float32 array. Sequences are grouped by
+    length so every forward pass is unpadded and matches the eager model.
+    """
+
+    # sha256 of the exported graph, set by subclasses (identifies the weights)
+    model_digest = ""
+
+    def __init__(self, stats: NormalizationStats):
+        self.stats = stats
+        self.anomaly_threshold = stats.anomaly_threshold
+        self._mean = np.asarray(stats.running_mean, dtype=np.float32)
+        self._std = np.asarray(stats.running_std, dtype=np.float32)
+
+    def _forward(self, x_norm: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def detect_anomaly(
+        self,
+        features: List[List[float]],
+        return_latent: bool = False,
+    ) -> AnomalyResult:
+        """Detect anomaly in one agent activity sequence."""
+        return self.detect_anomaly_batch([features], return_latent=return_latent)[0]
+
+    def detect_anomaly_batch(
+        self,
+        sequences: List[List[List[float]]],
+        return_latent: bool = False,
+    ) -> List[AnomalyResult]:
+        """Detect anomalies for many sequences, one forward pass per distinct length."""
+        by_length = defaultdict(list)
+        for i, seq in enumerate(sequences):
+            by_length[len(seq)].append(i)
+
+        results: List[Any] = [None] * len(sequences)
+        for indices in by_length.values():
+            x = np.asarray([sequences[i] for i in indices], dtype=np.float32)
+            x_norm = (x - self._mean) / (self._std + 1e-8)
+            reconstructed, latent = self._forward(x_norm)
+
+            errors = np.mean((x_norm - reconstructed) ** 2, axis=(1, 2))
+            z_scores = (errors - self.stats.error_mean) / (self.stats.error_std + 1e-8)
+            scores = 1.0 / (1.0 + np.exp(-z_scores))
+
+            for j, i in enumerate(indices):
+                score = float(scores[j])
+                results[i] = AnomalyResult(
+                    anomaly_score=score,
+                    reconstruction_error=float(errors[j]),
+                    threshold=self.anomaly_threshold,
+                    is_anomalous=score > self.anomaly_threshold,
+                    latent_vector=latent[j].tolist() if return_latent else None,
+                )
+        return results
+
+
+class OnnxAutoencoder(ExportedAutoencoder):
+    """Autoencoder served by onnxruntime from `export_onnx` output."""
+
+    def __init__(self, model_path: Path, intra_op_threads: int = AUTOENCODER_INTRA_OP_THREADS):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_name = self.session.get_inputs()[0].name
+        self.model_digest = hashlib.sha256(Path(model_path).read_bytes()).hexdigest()
+        super().__init__(NormalizationStats.load(stats_path(model_path)))
+        logger.info(f"Loaded ONNX autoencoder from {model_path}")
+
+    def _forward(self, x_norm: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        reconstructed, latent = self.session.run(None, {self._input_name: x_norm})
+        return reconstructed, latent
+
+
+class TorchScriptAutoencoder(ExportedAutoencoder):
+    """Autoencoder served from a `export_torchscript` trace."""
+
+    def __init__(self, model_path: Path):
+        import torch
+
+        self._torch = torch
+        self.module = torch.jit.load(str(model_path), map_location="cpu")
+        self.module.eval()
+        self.model_digest = hashlib.sha256(Path(model_path).read_bytes()).hexdigest()
+        super().__init__(NormalizationStats.load(stats_path(model_path)))
+        logger.info(f"Loaded TorchScript autoencoder from {model_path}")
+
+    def _forward(self, x_norm: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        with self._torch.inference_mode():
+            reconstructed, latent = self.module(self._torch.from_numpy(x_norm))
+        return reconstructed.numpy(), latent.numpy()
+
+
+BACKENDS = {
+    "onnx": OnnxAutoencoder,
+    "torchscript": TorchScriptAutoencoder,
+}
+
+
+def load_backend(name: str, model_path: Path) -> ExportedAutoencoder:
+    """Load an exported autoencoder with the named backend."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown autoencoder backend: {name}")
+    return BACKENDS[name](Path(model_path))
+
+
+_PROBE = """
+import resource, sys, time
+start = time.perf_counter()
+{setup}
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(f"{{elapsed:.3f}} {{rss_kb}}")
+"""
+
+_PROBES = {
+    "eager": "from ml.autoencoder import create_autoencoder\nm = create_autoencoder()\n"
+    "m.detect_anomaly([[0.0] * 8] * 10)",
+    "onnx": "from ml.inference_backend import load_backend\n"
+    "m = load_backend('onnx', sys.argv[1])\nm.detect_anomaly([[0.0] * 8] * 10)",
+    "torchscript": "from ml.inference_backend import load_backend\n"
+    "m = load_backend('torchscript', sys.argv[2])\nm.detect_anomaly([[0.0] * 8] * 10)",
+}
+
+
+def compare_startup(onnx_path: str, torchscript_path: str = "") -> None:
+    """Print cold import + first-inference time and peak RSS per backend."""
+    import os
+    import subprocess
+    import sys
+
+    for name, setup in _PROBES.items():
+        # Fresh interpreter per backend; AUTOENCODER_BACKEND=onnx skips the torch import
+        proc = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(setup=setup), onnx_path, torchscript_path],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).resolve().parent.parent,
+            env={**os.environ, "AUTOENCODER_BACKEND": name},
+        )
+        if proc.returncode != 0:
+            last = proc.stderr.strip().splitlines()[-1:] or ["failed"]
+            print(f"{name:12s} unavailable: {last[0]}")
+            continue
+        seconds, rss_kb = proc.stdout.split()[-2:]
+        print(f"{name:12s} startup {float(seconds):6.2f}s  peak RSS {int(rss_kb) / 1024:7.1f} MB")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Autoencoder backend startup comparison")
+    parser.add_argument("--compare", metavar="ONNX_PATH", required=True)
+    parser.add_argument("--torchscript", metavar="TS_PATH", default="")
+    args = parser.parse_args()
+
+    compare_startup(args.compare, args.torchscript)
@@ -0,0 +1,240 @@
+"""
+Micro-batching inference queue for the agent autoencoder.
+
+Concurrent `detect_anomaly` requests (e.g. the per-agent coroutines that
+/ml/anomaly-batch gathers) are collected by a worker thread for up to
+`max_batch` items or `max_wait_ms` after the first one arrives, scored with
+one padded `detect_anomaly_batch` forward pass, and the results scattered
+back to each caller's future. A lone request waits at most `max_wait_ms`.
+
+Usage:
+    from ml.inference_queue import get_inference_queue
+
+    result = await get_inference_queue().submit(features)
+
+Benchmark (batch-of-1 vs queued latency and throughput):
+    python -m ml.inference_queue --requests 512 --concurrency 256
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, List, Optional, Tuple
+
+from ml.autoencoder import (
+    AUTOENCODER_INTRA_OP_THREADS,
+    TORCH_AVAILABLE,
+    AnomalyResult,
+    get_autoencoder,
+    set_autoencoder,
+)
+
+logger = logging.getLogger(__name__)
+
+AUTOENCODER_MAX_BATCH = int(os.getenv("AUTOENCODER_MAX_BATCH", "128"))
+AUTOENCODER_MAX_WAIT_MS = float(os.getenv("AUTOENCODER_MAX_WAIT_MS", "5"))
+
+Request = Tuple[List[List[float]], bool, Future]  # (features, return_latent, future)
+
+
+def configure_threads(intra_op_threads: int = AUTOENCODER_INTRA_OP_THREADS) -> None:
+    """Set torch's intra-op thread pool size (process-wide)."""
+    if TORCH_AVAILABLE and intra_op_threads > 0:
+        import torch
+
+        torch.set_num_threads(intra_op_threads)
+        logger.info(f"Autoencoder inference using {intra_op_threads} intra-op threads")
+
+
+class InferenceQueue:
+    """Collect concurrent autoencoder requests into padded batches."""
+
+    def __init__(
+        self,
+        model: Any,
+        max_batch: int = AUTOENCODER_MAX_BATCH,
+        max_wait_ms: float = AUTOENCODER_MAX_WAIT_MS,
+    ):
+        """
+        Initialize the queue and start its worker thread.
+
+        Args:
+            model: Autoencoder with `detect_anomaly_batch`
+            max_batch: Largest batch per forward pass
+            max_wait_ms: How long the first request waits for company
+        """
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: "queue.Queue[Optional[Request]]" = queue.Queue()
+        # Held for each forward pass; hold it to mutate the model (e.g. fit)
+        self.model_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self._thread = threading.Thread(target=self._run, name="autoencoder-batcher", daemon=True)
+        self._thread.start()
+
+    def swap_model(self, model: Any) -> None:
+        """Score later batches with `model`; the batch in flight finishes on the old one."""
+        self.model = model
+
+    def submit_nowait(self, features: List[List[float]], return_latent: bool = False) -> Future:
+        """Queue a sequence; returns a concurrent.futures.Future of AnomalyResult."""
+        future: Future = Future()
+        self._queue.put((features, return_latent, future))
+        return future
+
+    async def submit(
+        self, features: List[List[float]], return_latent: bool = False
+    ) -> AnomalyResult:
+        """Queue a sequence and await its result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit_nowait(features, return_latent))
+
+    def detect_anomaly(
+        self, features: List[List[float]], return_latent: bool = False
+    ) -> AnomalyResult:
+        """Blocking variant of `submit` for sync callers."""
+        return self.submit_nowait(features, return_latent).result()
+
+    def _collect(self, first: Request) -> List[Request]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = (
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _score(self, batch: List[Request]) -> None:
+        # Requests that asked for latents are rare; score them separately
+        for want_latent in (False, True):
+            group = [
+                r for r in batch if r[1] == want_latent and r[2].set_running_or_notify_cancel()
+            ]
+            if not group:
+                continue
+            try:
+                with self.model_lock:
+                    results = self.model.detect_anomaly_batch(
+                        [features for features, _, _ in group], return_latent=want_latent
+                    )
+            except Exception as e:
+                for _, _, future in group:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(group, results):
+                future.set_result(result)
+            self.batches += 1
+            self.items += len(group)
+
+    def _run(self) -> None:
+        configure_threads()
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            self._score(self._collect(first))
+
+    def close(self) -> None:
+        """Score anything already queued, then stop the worker."""
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def stats(self) -> dict:
+        """Batches run and average batch size so far."""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+
+_inference_queue: Optional[InferenceQueue] = None
+_inference_queue_lock = threading.Lock()
+
+
+def get_inference_queue() -> InferenceQueue:
+    """Global queue in front of `get_autoencoder()`."""
+    global _inference_queue
+    with _inference_queue_lock:
+        if _inference_queue is None:
+            _inference_queue = InferenceQueue(get_autoencoder())
+        return _inference_queue
+
+
+def swap_autoencoder(model: Any) -> None:
+    """Install a new global autoencoder, including behind a running queue."""
+    set_autoencoder(model)
+    if _inference_queue is not None:
+        _inference_queue.swap_model(model)
+
+
+def _benchmark(requests: int, concurrency: int, seq_len: int) -> None:
+    import random
+
+    model = get_autoencoder()
+    sequences = [
+        [[random.gauss(50, 10)] + [random.random() for _ in range(7)] for _ in range(seq_len)]
+        for _ in range(requests)
+    ]
+
+    start = time.perf_counter()
+    for seq in sequences:
+        model.detect_anomaly(seq)
+    serial = time.perf_counter() - start
+    print(f"batch-of-1: {requests / serial:8.1f} req/s  {serial / requests * 1000:7.2f} ms/req")
+
+    batcher = InferenceQueue(model)
+
+    async def run() -> List[float]:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(seq: List[List[float]]) -> float:
+            async with semaphore:
+                t0 = time.perf_counter()
+                await batcher.submit(seq)
+                return time.perf_counter() - t0
+
+        return await asyncio.gather(*(one(seq) for seq in sequences))
+
+    start = time.perf_counter()
+    latencies = sorted(asyncio.run(run()))
+    queued = time.perf_counter() - start
+    batcher.close()
+
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(
+        f"queued:     {requests / queued:8.1f} req/s  p50 {p50:.2f} ms  p99 {p99:.2f} ms  "
+        f"avg batch {batcher.stats()['avg_batch_size']}"
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Autoencoder micro-batching benchmark")
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--seq-len", type=int, default=30)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    _benchmark(args.requests, args.concurrency, args.seq_len)
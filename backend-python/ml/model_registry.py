@@ -0,0 +1,387 @@
+"""
+Versioned Model Registry with Hot-Swap
+======================================
+
+Each model lives in its own registry directory (default
+`$ML_REGISTRY_DIR/<name>`, e.g. `models/autoencoder`):
+
+    models/autoencoder/
+        manifest.json      # active version, activation history, per-version info
+        v0001/             # immutable artifact directory (metadata.json + files)
+        v0002/
+
+`manifest.json` records each version's sha256 (over every file in its
+directory), metrics and created_at, plus which version is active. Writers
+(training jobs, the rollback CLI) serialise on a lock file and replace the
+manifest atomically, so readers always see a complete one.
+
+Every API worker runs a `ModelWatcher` thread that stats the manifests
+every few seconds. When the active version changes it loads and verifies
+the new model off the request path, then swaps it in with a single
+reference assignment; requests never take a lock and see either the old
+or the new model, never a mix.
+
+CLI:
+    python -m ml.model_registry list autoencoder
+    python -m ml.model_registry rollback autoencoder            # previous version
+    python -m ml.model_registry activate detector --version v0003
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FORMAT_VERSION = 1
+REGISTRY_DIR = Path(os.getenv("ML_REGISTRY_DIR", "models"))
+MODEL_WATCH_INTERVAL = float(os.getenv("ML_MODEL_WATCH_INTERVAL", "10"))
+
+
+def registry_path(name: str) -> Path:
+    """Registry directory for a named model."""
+    return REGISTRY_DIR / name
+
+
+def hash_directory(path: Path) -> str:
+    """sha256 over every file in a version directory (relative names + contents)."""
+    digest = hashlib.sha256()
+    for file in sorted(p for p in Path(path).rglob("*") if p.is_file()):
+        digest.update(file.relative_to(path).as_posix().encode())
+        digest.update(b"\0")
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """Versions and the active pointer for one model."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.manifest_path = self.root / "manifest.json"
+
+    @contextmanager
+    def _locked(self) -> Iterator[Dict[str, Any]]:
+        """Hold the registry lock and yield the manifest; it is written back on exit."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            manifest = self.read_manifest()
+            yield manifest
+            tmp = self.root / f".manifest.{uuid.uuid4().hex}.tmp"
+            tmp.write_text(json.dumps(manifest, indent=2))
+            os.replace(tmp, self.manifest_path)
+
+    def read_manifest(self) -> Dict[str, Any]:
+        """Current manifest (an empty one if nothing was published yet)."""
+        if not self.manifest_path.exists():
+            return {
+                "format_version": MANIFEST_FORMAT_VERSION,
+                "active": None,
+                "history": [],
+                "versions": {},
+            }
+        manifest = json.loads(self.manifest_path.read_text())
+        if manifest.get("format_version") != MANIFEST_FORMAT_VERSION:
+            raise ValueError(f"Unsupported registry manifest {manifest.get('format_version')}")
+        return manifest
+
+    def publish(
+        self,
+        staging: Path,
+        metadata: Dict[str, Any],
+        metrics: Optional[Dict[str, Any]] = None,
+        activate: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Move a fully written staging directory in as the next version.
+
+        `metadata` is written to `metadata.json` with the allocated version
+        filled in. Returns the manifest entry for the new version.
+        """
+        with self._locked() as manifest:
+            numbers = [int(v[1:]) for v in manifest["versions"]]
+            numbers += [int(p.name[1:]) for p in self.root.glob("v[0-9]*") if p.name[1:].isdigit()]
+            version = f"v{max(numbers, default=0) + 1:04d}"
+
+            metadata = {**metadata, "version": version}
+            (Path(staging) / "metadata.json").write_text(json.dumps(metadata, indent=2))
+            entry = {
+                "version": version,
+                "sha256": hash_directory(staging),
+                "created_at": metadata.get("created_at") or datetime.now(timezone.utc).isoformat(),
+                "model_type": metadata.get("model_type"),
+                "metrics": metrics or {},
+            }
+            Path(staging).rename(self.root / version)
+            manifest["versions"][version] = entry
+            if activate:
+                self._activate(manifest, version)
+
+        logger.info(f"Registered {self.root.name} {version}" + (" (active)" if activate else ""))
+        return entry
+
+    def _activate(self, manifest: Dict[str, Any], version: str) -> None:
+        if version not in manifest["versions"]:
+            raise KeyError(f"Unknown {self.root.name} version {version}")
+        manifest["active"] = version
+        manifest["history"].append(version)
+
+    def activate(self, version: str) -> Dict[str, Any]:
+        """Make an existing version active."""
+        with self._locked() as manifest:
+            self._activate(manifest, version)
+            return manifest["versions"][version]
+
+    def rollback(self, version: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Re-activate `version`, or the version active before the current one.
+
+        Raises ValueError when there is nothing to roll back to.
+        """
+        with self._locked() as manifest:
+            if version is None:
+                history = manifest["history"]
+                previous = [v for v in reversed(history) if v != manifest["active"]]
+                if not previous:
+                    raise ValueError(f"No earlier {self.root.name} version to roll back to")
+                version = previous[0]
+                # Drop the rolled-back activation so a second rollback keeps going back
+                while history and history[-1] != version:
+                    history.pop()
+                manifest["active"] = version
+            else:
+                self._activate(manifest, version)
+            return manifest["versions"][version]
+
+    def active(self) -> Optional[Tuple[str, Path, Dict[str, Any]]]:
+        """(version, directory, manifest entry) of the active version, if any."""
+        manifest = self.read_manifest()
+        version = manifest["active"]
+        if version is None:
+            return None
+        return version, self.root / version, manifest["versions"][version]
+
+    def verify(self, version: str, entry: Dict[str, Any]) -> None:
+        """Raise ValueError if a version directory no longer matches its recorded hash."""
+        actual = hash_directory(self.root / version)
+        if actual != entry["sha256"]:
+            raise ValueError(f"{self.root.name} {version} hash mismatch: {actual[:12]}")
+
+
+@dataclass
+class WatchedModel:
+    """A registry plus how to load a version directory and install the result."""
+
+    registry: ModelRegistry
+    load: Callable[[Path], Any]
+    swap: Callable[[Any], None]
+    version: Optional[str] = None
+    stamp: Optional[Tuple[int, int]] = None  # manifest (mtime_ns, size) last seen
+
+
+class ModelWatcher:
+    """Background thread that hot-swaps models when their registry changes."""
+
+    def __init__(self, interval: float = MODEL_WATCH_INTERVAL):
+        self.interval = interval
+        self.models: Dict[str, WatchedModel] = {}
+        self.swaps = 0
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, name: str, registry: ModelRegistry, load: Callable, swap: Callable) -> None:
+        """Register a model to keep in sync with its registry."""
+        self.models[name] = WatchedModel(registry, load, swap)
+
+    def check(self) -> List[str]:
+        """Swap in any newly activated versions now; returns the models swapped."""
+        swapped = []
+        for name, watched in self.models.items():
+            try:
+                stat = watched.registry.manifest_path.stat()
+            except FileNotFoundError:
+                continue
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if stamp == watched.stamp:
+                continue
+
+            try:
+                active = watched.registry.active()
+                if active is not None and active[0] != watched.version:
+                    version, path, entry = active
+                    watched.registry.verify(version, entry)
+                    model = watched.load(path)
+                    watched.swap(model)
+                    watched.version = version
+                    self.swaps += 1
+                    swapped.append(name)
+                    logger.info(f"Hot-swapped {name} to {version}")
+                watched.stamp = stamp
+            except Exception as e:
+                # Keep serving the current model; retry on the next change
+                self.errors += 1
+                watched.stamp = stamp
+                logger.error(f"Failed to swap {name}: {e}")
+        return swapped
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> None:
+        """Load the active versions, then start polling."""
+        self.check()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def status(self) -> Dict[str, Any]:
+        """Loaded version per model plus swap counters."""
+        return {
+            "models": {name: w.version for name, w in self.models.items()},
+            "swaps": self.swaps,
+            "errors": self.errors,
+            "interval_seconds": self.interval,
+        }
+
+
+def load_autoencoder_version(path: Path) -> Any:
+    """Build an autoencoder from a published version directory."""
+    from ml.autoencoder import AUTOENCODER_BACKEND, StatisticalAutoencoder, create_autoencoder
+    from ml.training_pipeline import apply_artifact
+
+    metadata = json.loads((Path(path) / "metadata.json").read_text())
+    files = metadata["files"]
+    if AUTOENCODER_BACKEND != "eager" and AUTOENCODER_BACKEND in files:
+        from ml.inference_backend import load_backend
+
+        return load_backend(AUTOENCODER_BACKEND, Path(path) / files[AUTOENCODER_BACKEND])
+
+    if metadata["model_type"] == "statistical":
+        model = StatisticalAutoencoder()
+    else:
+        model = create_autoencoder()
+    apply_artifact(model, path)
+    if hasattr(model, "eval"):
+        model.eval()
+    return model
+
+
+def load_detector_version(path: Path) -> Any:
+    """Build an anomaly detector from a published version directory."""
+    from ml.anomaly_detector import AnomalyDetector
+
+    return AnomalyDetector(
+        model_path=Path(path) / "detector.pkl",
+        anomaly_threshold=float(os.environ.get("ANOMALY_THRESHOLD", "0.7")),
+    )
+
+
+def publish_detector(
+    detector: Any,
+    registry: ModelRegistry,
+    metrics: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Save a trained detector (pickle + flat forest) as a new registry version."""
+    registry.root.mkdir(parents=True, exist_ok=True)
+    staging = registry.root / f".staging-{uuid.uuid4().hex}"
+    staging.mkdir()
+    detector.save_model(staging / "detector.pkl")
+    metadata = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "model_type": "isolation_forest",
+        "files": {"model": "detector.pkl"},
+        "metrics": metrics or {},
+    }
+    return registry.publish(staging, metadata, metrics=metrics)
+
+
+_watcher: Optional[ModelWatcher] = None
+_watcher_lock = threading.Lock()
+
+
+def start_model_watcher() -> ModelWatcher:
+    """Start this process's watcher over the autoencoder and detector registries."""
+    global _watcher
+    from ml.anomaly_detector import swap_detector
+    from ml.inference_queue import swap_autoencoder
+
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = ModelWatcher()
+            _watcher.watch(
+                "autoencoder",
+                ModelRegistry(registry_path("autoencoder")),
+                load_autoencoder_version,
+                swap_autoencoder,
+            )
+            _watcher.watch(
+                "detector",
+                ModelRegistry(registry_path("detector")),
+                load_detector_version,
+                swap_detector,
+            )
+            _watcher.start()
+        return _watcher
+
+
+def get_model_watcher() -> Optional[ModelWatcher]:
+    """The running watcher, if `start_model_watcher` was called."""
+    return _watcher
+
+
+def stop_model_watcher() -> None:
+    global _watcher
+    with _watcher_lock:
+        if _watcher is not None:
+            _watcher.stop()
+            _watcher = None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Anomaly model registry")
+    parser.add_argument("command", choices=["list", "activate", "rollback"])
+    parser.add_argument("model", help="Registry name, e.g. autoencoder or detector")
+    parser.add_argument("--version", help="Target version (rollback defaults to previous)")
+    parser.add_argument("--root", help="Registry directory (default $ML_REGISTRY_DIR/<model>)")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(Path(args.root) if args.root else registry_path(args.model))
+    if args.command == "list":
+        manifest = registry.read_manifest()
+        for version, entry in sorted(manifest["versions"].items()):
+            marker = "*" if version == manifest["active"] else " "
+            print(f"{marker} {version}  {entry['created_at']}  {json.dumps(entry['metrics'])}")
+        return
+    if args.command == "activate":
+        if not args.version:
+            parser.error("activate needs --version")
+        entry = registry.activate(args.version)
+    else:
+        entry = registry.rollback(args.version)
+    print(f"{args.model} active version: {entry['version']}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
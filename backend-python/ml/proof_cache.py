@@ -0,0 +1,273 @@
+"""
+Content-addressed zkML Proof Cache
+==================================
+
+A zkML proof is a pure function of the model, the input features and the
+(scaled) threshold, and costs seconds of CPU to produce. Dashboards polling
+`/ai/anomaly-detect?include_zkml_proof` ask for the same proof over and over,
+so results are memoized under
+
+    sha256(namespace, model fingerprint, feature digest, threshold_scaled)
+
+- model fingerprint: the prover's circuit/model hash plus a digest of the
+  live autoencoder's weights and normalization stats, so a retrained or
+  hot-swapped model never reuses an old proof
+- feature digest: sha256 of the features as a little-endian float64 array
+  (list/tuple/ndarray, int/float inputs all canonicalize the same way)
+
+Entries are JSON files in a shared directory (one per key, written
+atomically) so every worker and restarts reuse them. Eviction is LRU by
+access time, bounded by entry count, total bytes and a TTL. Identical
+concurrent requests in a process are coalesced: the first computes, the
+others wait for its result.
+
+Configuration:
+    ZKML_PROOF_CACHE_MAX_ENTRIES  (default 10000, 0 disables the cache)
+    ZKML_PROOF_CACHE_MAX_MB       (default 256)
+    ZKML_PROOF_CACHE_TTL          (seconds, default 86400)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ZKML_PROOF_CACHE_MAX_ENTRIES = int(os.getenv("ZKML_PROOF_CACHE_MAX_ENTRIES", "10000"))
+ZKML_PROOF_CACHE_MAX_MB = float(os.getenv("ZKML_PROOF_CACHE_MAX_MB", "256"))
+ZKML_PROOF_CACHE_TTL = float(os.getenv("ZKML_PROOF_CACHE_TTL", "86400"))
+
+
+def feature_digest(features: Any) -> str:
+    """sha256 of features in canonical form (shape + little-endian float64 bytes)."""
+    x = np.ascontiguousarray(np.asarray(features, dtype="<f8")) + 0.0  # -0.0 -> 0.0
+    digest = hashlib.sha256(repr(x.shape).encode())
+    digest.update(x.tobytes())
+    return digest.hexdigest()
+
+
+_fingerprints: "weakref.WeakKeyDictionary[Any, Tuple[Any, str]]" = weakref.WeakKeyDictionary()
+
+
+def model_fingerprint(model: Any) -> str:
+    """
+    Digest of everything that determines a model's anomaly scores.
+
+    Hashing torch weights costs a few milliseconds, so the digest is kept
+    per instance and reused while every tensor's version counter (bumped by
+    in-place updates such as optimizer steps or load_state_dict) is unchanged.
+    """
+    if not hasattr(model, "state_dict"):
+        digest = hashlib.sha256(type(model).__name__.encode())
+        digest.update(str(getattr(model, "model_digest", "")).encode())
+        stats = getattr(model, "stats", None)
+        params = (
+            vars(stats)
+            if stats is not None
+            else {
+                name: getattr(model, name, None)
+                for name in ("mean", "std", "error_mean", "error_std", "anomaly_threshold")
+            }
+        )
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    state = sorted(model.state_dict().items())
+    token = tuple(tensor._version for _, tensor in state)
+    cached = _fingerprints.get(model)
+    if cached is not None and cached[0] == token:
+        return cached[1]
+
+    digest = hashlib.sha256(type(model).__name__.encode())
+    for name, tensor in state:
+        digest.update(name.encode())
+        digest.update(tensor.detach().cpu().numpy().tobytes())
+    fingerprint = digest.hexdigest()
+    _fingerprints[model] = (token, fingerprint)
+    return fingerprint
+
+
+def proof_key(namespace: str, model_hash: str, features: Any, threshold_scaled: int) -> str:
+    """Cache key for a proof."""
+    parts = (namespace, model_hash, feature_digest(features), str(int(threshold_scaled)))
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+class ProofCache:
+    """On-disk LRU cache of proof dicts with in-process request coalescing."""
+
+    def __init__(
+        self,
+        directory: Path,
+        max_entries: int = ZKML_PROOF_CACHE_MAX_ENTRIES,
+        max_bytes: int = int(ZKML_PROOF_CACHE_MAX_MB * 1024 * 1024),
+        ttl: float = ZKML_PROOF_CACHE_TTL,
+    ):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = max_entries > 0
+
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()  # key -> (mtime, size)
+        self._bytes = 0
+        self._inflight: Dict[str, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+        if self.enabled:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._load_index()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _load_index(self) -> None:
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for mtime, key, size in sorted(entries):
+            self._index[key] = (mtime, size)
+            self._bytes += size
+        self._evict()
+
+    def _drop(self, key: str) -> None:
+        _, size = self._index.pop(key, (0.0, 0))
+        self._bytes -= size
+        self._path(key).unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        now = time.time()
+        while self._index:
+            key, (mtime, _) = next(iter(self._index.items()))
+            expired = self.ttl > 0 and now - mtime > self.ttl
+            within_bounds = len(self._index) <= self.max_entries and self._bytes <= self.max_bytes
+            if within_bounds and not expired:
+                break
+            self._drop(key)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached value for `key`, or None."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            stat = path.stat()
+            if self.ttl > 0 and time.time() - stat.st_mtime > self.ttl:
+                with self._lock:
+                    self._drop(key)
+                return None
+            value = json.loads(path.read_text())
+            os.utime(path)  # LRU across processes and restarts
+        except (FileNotFoundError, ValueError):
+            return None
+        with self._lock:
+            self._index[key] = (time.time(), stat.st_size)
+            self._index.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store `value` (JSON-serializable) under `key`."""
+        if not self.enabled:
+            return
+        data = json.dumps(value, separators=(",", ":"))
+        tmp = self.directory / f".{key}.{uuid.uuid4().hex}.tmp"
+        tmp.write_text(data)
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            _, old_size = self._index.pop(key, (0.0, 0))
+            self._bytes += len(data) - old_size
+            self._index[key] = (time.time(), len(data))
+            self._evict()
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Tuple[Dict[str, Any], bool]],
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Return (value, cached) for `key`, computing it at most once at a time.
+
+        `compute` returns (value, cacheable); values from degraded paths
+        (e.g. inference failed) should not be cached. Concurrent callers for
+        the same key wait for the in-flight computation instead of repeating it.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value, True
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self.coalesced += 1
+            return future.result(), True
+
+        self.misses += 1
+        try:
+            value, cacheable = compute()
+            if cacheable:
+                self.put(key, value)
+            future.set_result(value)
+            return value, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            for key in list(self._index):
+                self._drop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._index),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+_caches: Dict[Path, ProofCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_proof_cache(directory: Path) -> ProofCache:
+    """Shared cache instance per directory."""
+    directory = Path(directory).resolve()
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = ProofCache(directory)
+        return _caches[directory]
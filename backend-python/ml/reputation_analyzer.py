@@ -10,21 +10,112 @@ Features:
 - Sudden jump detection
 - Consistency scoring
 - Cross-agent comparison
+- Bulk analytics: one query and one NumPy pass for many agents
 
 Usage:
     from ml.reputation_analyzer import ReputationAnalyzer
 
     analyzer = ReputationAnalyzer(neo4j_driver)
     analysis = analyzer.analyze_agent("did:honestly:agent:xyz")
+    trends = analyzer.analyze_agents(agent_ids)  # {agent_id: ReputationTrend}
 """
 
 import logging
+import os
+import threading
+import time
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from api.queries import BULK_HISTORY_QUERY, BULK_STATS_QUERY
 
 logger = logging.getLogger(__name__)
 
+REPUTATION_CACHE_TTL = float(os.getenv("REPUTATION_CACHE_TTL", "60"))
+
+STAT_COLUMNS = (
+    "n",
+    "current",
+    "mean",
+    "volatility",
+    "slope",
+    "last_delta",
+    "perfect_streak",
+    "alternating",
+    "max_abs_diff",
+)
+
+
+def trend_stats(histories: Sequence[Sequence[float]]) -> Dict[str, np.ndarray]:
+    """
+    Per-agent trend statistics for ragged score histories (oldest first).
+
+    All agents are processed together: scores are concatenated into one
+    array with a segment id per value, and every statistic is a bincount or
+    ufunc.at reduction over segments. Returns one array per STAT_COLUMNS
+    entry, aligned with `histories`.
+    """
+    n_agents = len(histories)
+    n = np.array([len(h) for h in histories], dtype=np.int64)
+    values = (
+        np.concatenate([np.asarray(h, dtype=np.float64) for h in histories])
+        if n.sum()
+        else np.empty(0)
+    )
+    seg = np.repeat(np.arange(n_agents), n)
+    starts = np.cumsum(n) - n
+    pos = np.arange(len(values)) - starts[seg]  # index within each history
+    has_two = n > 1
+
+    mean = np.bincount(seg, weights=values, minlength=n_agents) / np.maximum(n, 1)
+    dev = values - mean[seg]
+    sum_sq = np.bincount(seg, weights=dev**2, minlength=n_agents)
+    volatility = np.where(has_two, np.sqrt(sum_sq / np.maximum(n - 1, 1)), 0.0)
+
+    # Least-squares slope against 0..n-1; sum((x - x_mean)^2) = n(n^2 - 1)/12
+    x_dev = pos - (n[seg] - 1) / 2.0
+    numerator = np.bincount(seg, weights=x_dev * dev, minlength=n_agents)
+    denominator = n * (n**2 - 1) / 12.0
+    slope = np.where(has_two, numerator / np.where(has_two, denominator, 1.0), 0.0)
+
+    # Padded so empty histories index in bounds (their results are masked out)
+    padded = np.append(values, [0.0, 0.0])
+    last = starts + n - 1
+    current = np.where(n > 0, padded[last], 0.0)
+    last_delta = np.where(has_two, np.abs(padded[last] - padded[last - 1]), 0.0)
+
+    # Consecutive differences within a history (pos >= 1 excludes cross-agent pairs)
+    diffs = np.diff(values)
+    in_seg = pos[1:] >= 1
+    max_abs_diff = np.zeros(n_agents)
+    np.maximum.at(max_abs_diff, seg[1:][in_seg], np.abs(diffs[in_seg]))
+
+    pair_in_seg = pos[2:] >= 2
+    not_alternating = (diffs[:-1] * diffs[1:])[pair_in_seg] >= 0
+    broken = np.bincount(seg[2:][pair_in_seg], weights=not_alternating, minlength=n_agents)
+    alternating = (n >= 4) & (broken == 0)
+
+    # Trailing run of perfect scores: everything after the last non-100 value
+    last_imperfect = np.full(n_agents, -1, dtype=np.int64)
+    imperfect = values != 100
+    np.maximum.at(last_imperfect, seg[imperfect], pos[imperfect])
+    perfect_streak = n - 1 - last_imperfect
+
+    return {
+        "n": n,
+        "current": current,
+        "mean": mean,
+        "volatility": volatility,
+        "slope": slope,
+        "last_delta": last_delta,
+        "perfect_streak": perfect_streak,
+        "alternating": alternating,
+        "max_abs_diff": max_abs_diff,
+    }
+
 
 @dataclass
 class ReputationTrend:
@@ -77,6 +168,12 @@ class ReputationAnalyzer:
             neo4j_driver: Neo4j driver instance (optional, will use default if None)
         """
         self.driver = neo4j_driver
+        # (agent_id, days, limit) -> (expires_at, trend); dropped on new proofs
+        self._cache: Dict[Tuple[str, int, int], Tuple[float, ReputationTrend]] = {}
+        # Bumped by invalidate(); a fetch that raced an invalidation is not cached
+        self._generations: Dict[str, int] = {}
+        self._cache_lock = threading.Lock()
+        self.cache_ttl = REPUTATION_CACHE_TTL
         self._init_schema()
 
     def _init_schema(self) -> None:
@@ -163,6 +260,7 @@ class ReputationAnalyzer:
                         "metadata": metadata or {},
                     },
                 )
+            self.invalidate(agent_id)
             return True
         except Exception as e:
             logger.error(f"Failed to record reputation proof: {e}")
@@ -223,52 +321,89 @@ class ReputationAnalyzer:
             logger.error(f"Failed to get reputation history: {e}")
             return []
 
-    def analyze_agent(self, agent_id: str) -> ReputationTrend:
-        """
-        Analyze reputation trend for an agent.
+    def invalidate(self, agent_id: str) -> None:
+        """Drop cached trends for an agent and any fetch still in flight."""
+        with self._cache_lock:
+            self._generations[agent_id] = self._generations.get(agent_id, 0) + 1
+            for key in [k for k in self._cache if k[0] == agent_id]:
+                del self._cache[key]
 
-        Args:
-            agent_id: Agent identifier
+    def get_reputation_histories(
+        self,
+        agent_ids: List[str],
+        days: int = 30,
+        limit: int = 100,
+    ) -> Dict[str, List[float]]:
+        """
+        Threshold histories (oldest first) for many agents in one query.
 
-        Returns:
-            ReputationTrend with analysis results
+        Agents without proofs in the window map to an empty list.
         """
-        history = self.get_reputation_history(agent_id, days=30)
+        histories: Dict[str, List[float]] = {agent_id: [] for agent_id in agent_ids}
+        if not self.driver or not agent_ids:
+            return histories
+
+        try:
+            with self.driver.session() as session:
+                result = session.run(
+                    BULK_HISTORY_QUERY,
+                    {"agent_ids": list(histories), "days": days, "limit": limit},
+                )
+                for record in result:
+                    histories[record["agent_id"]] = list(record["scores"])
+        except Exception as e:
+            logger.error(f"Failed to get reputation histories: {e}")
+        return histories
+
+    def _fetch_stats(
+        self,
+        agent_ids: List[str],
+        days: int,
+        limit: int,
+        aggregate_in_db: bool,
+    ) -> Dict[str, Dict[str, float]]:
+        """STAT_COLUMNS per agent, computed in NumPy or by BULK_STATS_QUERY."""
+        if aggregate_in_db and self.driver:
+            try:
+                with self.driver.session() as session:
+                    result = session.run(
+                        BULK_STATS_QUERY,
+                        {"agent_ids": agent_ids, "days": days, "limit": limit},
+                    )
+                    return {
+                        record["agent_id"]: {col: record[col] for col in STAT_COLUMNS}
+                        for record in result
+                    }
+            except Exception as e:
+                logger.error(f"Reputation aggregation query failed, using NumPy: {e}")
+
+        histories = self.get_reputation_histories(agent_ids, days=days, limit=limit)
+        stats = trend_stats([histories[agent_id] for agent_id in agent_ids])
+        return {
+            agent_id: {col: stats[col][i] for col in STAT_COLUMNS}
+            for i, agent_id in enumerate(agent_ids)
+        }
+
+    def _trend_from_stats(self, agent_id: str, stats: Dict[str, float]) -> ReputationTrend:
+        """Apply the trend/anomaly rules to one agent's statistics."""
+        n = int(stats["n"])
+        current = int(stats["current"])
 
-        if len(history) < self.MIN_PROOFS_FOR_ANALYSIS:
+        if n < self.MIN_PROOFS_FOR_ANALYSIS:
             return ReputationTrend(
                 agent_id=agent_id,
-                current_reputation=history[0]["threshold"] if history else 0,
-                average_reputation=history[0]["threshold"] if history else 0,
+                current_reputation=current,
+                average_reputation=current,
                 trend_direction="stable",
                 trend_magnitude=0.0,
                 volatility=0.0,
-                proof_count=len(history),
+                proof_count=n,
                 time_span_days=0,
                 anomaly_flags=["insufficient_data"],
             )
 
-        # Extract scores (use threshold as proxy for reputation)
-        scores = [h["threshold"] for h in history]
-        scores.reverse()  # Oldest first
-
-        # Calculate statistics
-        import statistics
-
-        current = scores[-1]
-        average = statistics.mean(scores)
-        volatility = statistics.stdev(scores) if len(scores) > 1 else 0
-
-        # Calculate trend (simple linear regression slope)
-        n = len(scores)
-        x = list(range(n))
-        x_mean = sum(x) / n
-        y_mean = average
-
-        numerator = sum((x[i] - x_mean) * (scores[i] - y_mean) for i in range(n))
-        denominator = sum((x[i] - x_mean) ** 2 for i in range(n))
-
-        slope = numerator / denominator if denominator != 0 else 0
+        slope = float(stats["slope"])
+        volatility = float(stats["volatility"])
 
         # Determine trend direction
         if slope > 0.5:
@@ -278,59 +413,116 @@ class ReputationAnalyzer:
         else:
             trend_direction = "stable"
 
-        # Calculate time span
-        time_span = 30  # Default assumption
-
         # Detect anomalies
         anomaly_flags = []
 
         # Sudden jump detection
-        if len(scores) >= 2:
-            recent_delta = abs(scores[-1] - scores[-2])
-            if recent_delta > self.SUDDEN_JUMP_THRESHOLD:
-                anomaly_flags.append("sudden_jump")
+        if stats["last_delta"] > self.SUDDEN_JUMP_THRESHOLD:
+            anomaly_flags.append("sudden_jump")
 
         # High volatility
         if volatility > self.HIGH_VOLATILITY_THRESHOLD:
             anomaly_flags.append("high_volatility")
 
-        # Suspiciously perfect scores
-        if all(s == 100 for s in scores[-5:]) and len(scores) >= 5:
+        # Suspiciously perfect scores (last 5 all 100)
+        if stats["perfect_streak"] >= 5:
             anomaly_flags.append("perfect_scores")
 
         # Gaming pattern (alternating high/low)
-        if len(scores) >= 4:
-            diffs = [scores[i + 1] - scores[i] for i in range(len(scores) - 1)]
-            alternating = all(diffs[i] * diffs[i + 1] < 0 for i in range(len(diffs) - 1))
-            if alternating and max(abs(d) for d in diffs) > 10:
-                anomaly_flags.append("gaming_pattern")
+        if stats["alternating"] and stats["max_abs_diff"] > 10:
+            anomaly_flags.append("gaming_pattern")
 
         return ReputationTrend(
             agent_id=agent_id,
             current_reputation=current,
-            average_reputation=average,
+            average_reputation=float(stats["mean"]),
             trend_direction=trend_direction,
             trend_magnitude=slope,
             volatility=volatility,
-            proof_count=len(history),
-            time_span_days=time_span,
+            proof_count=n,
+            time_span_days=30,  # Default assumption
             anomaly_flags=anomaly_flags,
         )
 
+    def analyze_agents(
+        self,
+        agent_ids: List[str],
+        days: int = 30,
+        limit: int = 100,
+        aggregate_in_db: bool = False,
+    ) -> Dict[str, ReputationTrend]:
+        """
+        Analyze reputation trends for many agents at once.
+
+        Cached agents are served from memory; the rest are fetched with one
+        query and analyzed in one vectorized pass (or aggregated by Neo4j
+        when `aggregate_in_db` is set).
+
+        Args:
+            agent_ids: Agent identifiers
+            days: Number of days to look back
+            limit: Most recent proofs per agent to consider
+            aggregate_in_db: Compute the statistics in Cypher instead of NumPy
+
+        Returns:
+            ReputationTrend per agent id
+        """
+        now = time.monotonic()
+        trends: Dict[str, ReputationTrend] = {}
+        missing: List[str] = []
+        with self._cache_lock:
+            for agent_id in dict.fromkeys(agent_ids):
+                cached = self._cache.get((agent_id, days, limit))
+                if cached and cached[0] > now:
+                    trends[agent_id] = cached[1]
+                else:
+                    missing.append(agent_id)
+            generations = {agent_id: self._generations.get(agent_id, 0) for agent_id in missing}
+
+        if missing:
+            stats = self._fetch_stats(missing, days, limit, aggregate_in_db)
+            empty = dict.fromkeys(STAT_COLUMNS, 0)
+            fresh = {
+                agent_id: self._trend_from_stats(agent_id, stats.get(agent_id, empty))
+                for agent_id in missing
+            }
+            trends.update(fresh)
+            expires_at = time.monotonic() + self.cache_ttl
+            with self._cache_lock:
+                for agent_id, trend in fresh.items():
+                    if self._generations.get(agent_id, 0) == generations[agent_id]:
+                        self._cache[(agent_id, days, limit)] = (expires_at, trend)
+
+        return {agent_id: trends[agent_id] for agent_id in agent_ids}
+
+    def analyze_agent(self, agent_id: str) -> ReputationTrend:
+        """
+        Analyze reputation trend for an agent.
+
+        Args:
+            agent_id: Agent identifier
+
+        Returns:
+            ReputationTrend with analysis results
+        """
+        return self.analyze_agents([agent_id])[agent_id]
+
     def compare_agents(
         self,
         agent_ids: List[str],
+        aggregate_in_db: bool = False,
     ) -> Dict[str, Any]:
         """
         Compare reputation trends across multiple agents.
 
         Args:
             agent_ids: List of agent identifiers
+            aggregate_in_db: Compute the statistics in Cypher instead of NumPy
 
         Returns:
             Comparison results with rankings
         """
-        analyses = {agent_id: self.analyze_agent(agent_id) for agent_id in agent_ids}
+        analyses = self.analyze_agents(agent_ids, aggregate_in_db=aggregate_in_db)
 
         # Rank by current reputation
         ranked_by_reputation = sorted(
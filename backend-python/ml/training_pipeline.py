@@ -0,0 +1,657 @@
+"""
+Out-of-core Training Pipeline for the Agent Autoencoder
+=======================================================
+
+Trains without ever holding the full dataset in memory:
+
+1. export: page through Agent nodes with keyset pagination (`a.id > $after`)
+   and write fixed-size float32 `.npy` shards, folding every page into
+   Welford running statistics as it goes. A `manifest.json` records the
+   shards and the per-feature mean/std.
+2. train: stream memory-mapped shards through an `IterableDataset` (shards
+   are split across DataLoader workers), normalise with the manifest stats,
+   then make one more streaming pass for the reconstruction-error stats.
+3. publish: register a new version `<root>/vNNNN/` (model, metadata.json)
+   in the autoencoder's `ModelRegistry` and make it active; every API
+   worker's `ModelWatcher` then hot-swaps it in.
+4. detector: replay recent reputation proofs through the anomaly
+   detector's streaming features, fit its Isolation Forest and publish it
+   to the detector registry the same way (skipped without Neo4j).
+
+Run as a job, outside the API process:
+    python -m ml.training_pipeline run --data-dir data/agent_sequences \\
+        --epochs 50 --workers 4
+
+The last line printed is a JSON summary (version, paths, samples, loss).
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ml.autoencoder import TORCH_AVAILABLE, StatisticalAutoencoder, create_autoencoder
+from ml.anomaly_detector import AnomalyDetector
+from ml.model_registry import ModelRegistry, publish_detector, registry_path
+
+logger = logging.getLogger(__name__)
+
+if TORCH_AVAILABLE:
+    import torch
+    import torch.nn as nn
+    from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+
+N_FEATURES = 8
+MANIFEST_VERSION = 1
+ARTIFACT_FORMAT_VERSION = 1
+
+AGENT_PAGE_QUERY = """
+MATCH (a:Agent)
+WHERE a.id > $after AND a.created_at > datetime() - duration({days: $days})
+WITH a
+ORDER BY a.id
+LIMIT $page_size
+CALL {
+    WITH a
+    OPTIONAL MATCH (a)-[:HAS_CLAIM]->(c:Claim)
+    WHERE c.created_at > datetime() - duration({days: $days})
+    RETURN count(DISTINCT c) AS claim_count
+}
+CALL {
+    WITH a
+    OPTIONAL MATCH (a)-[:HAS_PROOF]->(p:Proof)
+    WHERE p.created_at > datetime() - duration({days: $days})
+    RETURN count(DISTINCT p) AS proof_count
+}
+CALL {
+    WITH a
+    OPTIONAL MATCH (a)-[:INTERACTS_WITH]->(other:Agent)
+    RETURN count(DISTINCT other) AS interactions
+}
+RETURN a.id AS agent_id,
+       a.reputation AS reputation,
+       claim_count,
+       proof_count,
+       interactions
+ORDER BY agent_id
+"""
+
+# Most recent reputation proofs; replayed oldest first to train the detector
+DETECTOR_PROOFS_QUERY = """
+MATCH (r:ReputationProof)
+WHERE r.timestamp > datetime() - duration({days: $days})
+RETURN r.agent_id AS agent_id,
+       r.timestamp.epochMillis AS timestamp_ms,
+       r.threshold AS threshold,
+       r.nullifier AS nullifier
+ORDER BY r.timestamp DESC
+LIMIT $limit
+"""
+
+
+class WelfordStats:
+    """Streaming per-feature mean/variance (Chan et al. batch merge)."""
+
+    def __init__(self, n_features: int = N_FEATURES):
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+
+    def update(self, batch: np.ndarray) -> None:
+        """Fold an (n, n_features) batch into the running stats."""
+        batch = np.asarray(batch, dtype=np.float64).reshape(-1, len(self.mean))
+        n_b = len(batch)
+        if n_b == 0:
+            return
+        mean_b = batch.mean(axis=0)
+        m2_b = ((batch - mean_b) ** 2).sum(axis=0)
+
+        n = self.count + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * (n_b / n)
+        self.m2 = self.m2 + m2_b + delta**2 * (self.count * n_b / n)
+        self.count = n
+
+    def std(self, ddof: int = 1) -> np.ndarray:
+        """Standard deviation (ddof=1 matches torch.std, ddof=0 the population std)."""
+        if self.count <= ddof:
+            return np.zeros_like(self.mean)
+        return np.sqrt(self.m2 / (self.count - ddof))
+
+
+def iter_agent_pages(
+    graph: Any,
+    days: int = 30,
+    page_size: int = 1000,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield pages of agent aggregates in id order, resuming after the last id seen."""
+    after = ""
+    while True:
+        records = graph.run(
+            AGENT_PAGE_QUERY, {"after": after, "days": days, "page_size": page_size}
+        ).data()
+        if not records:
+            return
+        yield records
+        if len(records) < page_size:
+            return
+        after = records[-1]["agent_id"]
+
+
+def sequences_from_records(
+    records: List[Dict[str, Any]],
+    seq_len: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Vectorised `Neo4jDataLoader._create_sequence` for a page of agents.
+
+    Returns a (len(records), seq_len, 8) float32 array.
+    """
+    n = len(records)
+    reputation = np.array([r.get("reputation") or 50 for r in records], dtype=np.float64)
+    claims = np.array([r.get("claim_count") or 0 for r in records], dtype=np.float64)
+    proofs = np.array([r.get("proof_count") or 0 for r in records], dtype=np.float64)
+    interactions = np.array([r.get("interactions") or 0 for r in records], dtype=np.float64)
+
+    t = np.arange(seq_len)
+    out = np.empty((n, seq_len, N_FEATURES))
+    out[:, :, 0] = reputation[:, None] + rng.normal(0, 5, (n, seq_len))
+    out[:, :, 1] = (claims / seq_len)[:, None] + rng.normal(0, 1, (n, seq_len))
+    out[:, :, 2] = (proofs / seq_len)[:, None] + rng.normal(0, 0.5, (n, seq_len))
+    out[:, :, 3] = (interactions / seq_len)[:, None] + rng.normal(0, 0.3, (n, seq_len))
+    out[:, :, 4] = ((t * 2) % 24) / 24
+    out[:, :, 5] = (t % 7) / 7
+    out[:, :, 6] = rng.normal(100, 20, (n, seq_len))
+    out[:, :, 7] = rng.normal(0.02, 0.01, (n, seq_len))
+    return out.astype(np.float32)
+
+
+class ShardWriter:
+    """Append sequence batches to fixed-size .npy shards while tracking stats."""
+
+    def __init__(self, data_dir: Path, seq_len: int, shard_size: int = 50_000):
+        self.data_dir = Path(data_dir)
+        self.seq_len = seq_len
+        self.shard_size = shard_size
+        self.stats = WelfordStats()
+        self.shards: List[Dict[str, Any]] = []
+        self._buffer: List[np.ndarray] = []
+        self._buffered = 0
+
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        for old in self.data_dir.glob("shard-*.npy"):
+            old.unlink()
+
+    def add(self, sequences: np.ndarray) -> None:
+        """Buffer a (n, seq_len, 8) batch, spilling full shards to disk."""
+        self.stats.update(sequences.reshape(-1, N_FEATURES))
+        self._buffer.append(sequences.astype(np.float32, copy=False))
+        self._buffered += len(sequences)
+        while self._buffered >= self.shard_size:
+            self._spill(self.shard_size)
+
+    def _spill(self, size: int) -> None:
+        data = np.concatenate(self._buffer) if len(self._buffer) > 1 else self._buffer[0]
+        shard, rest = data[:size], data[size:]
+        name = f"shard-{len(self.shards):05d}.npy"
+        tmp = self.data_dir / f".{name}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, shard)
+        os.replace(tmp, self.data_dir / name)
+        self.shards.append({"file": name, "samples": len(shard)})
+        self._buffer = [rest] if len(rest) else []
+        self._buffered = len(rest)
+
+    def close(self, **metadata: Any) -> Dict[str, Any]:
+        """Flush the last partial shard and write manifest.json."""
+        if self._buffered:
+            self._spill(self._buffered)
+        manifest = {
+            "manifest_version": MANIFEST_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "seq_len": self.seq_len,
+            "n_features": N_FEATURES,
+            "samples": sum(s["samples"] for s in self.shards),
+            "shards": self.shards,
+            "stats": {
+                "count": self.stats.count,
+                "mean": self.stats.mean.tolist(),
+                "std": self.stats.std(ddof=1).tolist(),
+                "std_population": self.stats.std(ddof=0).tolist(),
+            },
+            **metadata,
+        }
+        _write_json_atomic(self.data_dir / "manifest.json", manifest)
+        return manifest
+
+
+def export_sequences(
+    graph: Any,
+    data_dir: Path,
+    days: int = 30,
+    seq_len: int = 10,
+    min_samples: int = 100,
+    page_size: int = 1000,
+    shard_size: int = 50_000,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Stream agent sequences from Neo4j into sharded .npy files.
+
+    Pads with synthetic sequences up to `min_samples` (as
+    `Neo4jDataLoader.load_agent_sequences` does) and falls back to fully
+    synthetic data when `graph` is None or the query fails.
+    """
+    from ml.neo4j_loader import Neo4jDataLoader
+
+    rng = np.random.default_rng(seed)
+    writer = ShardWriter(data_dir, seq_len, shard_size)
+    from_graph = 0
+
+    if graph is not None:
+        try:
+            for page in iter_agent_pages(graph, days=days, page_size=page_size):
+                writer.add(sequences_from_records(page, seq_len, rng))
+                from_graph += len(page)
+        except Exception as e:
+            logger.error(f"Neo4j export failed after {from_graph} agents: {e}")
+
+    if from_graph < min_samples:
+        logger.warning(f"Only {from_graph} samples from Neo4j, adding synthetic to {min_samples}")
+        loader = Neo4jDataLoader(None)
+        remaining = min_samples - from_graph
+        while remaining > 0:
+            n = min(remaining, page_size)
+            writer.add(np.asarray(loader._generate_synthetic_data(n, seq_len), dtype=np.float32))
+            remaining -= n
+
+    manifest = writer.close(days=days, from_graph=from_graph)
+    logger.info(f"Exported {manifest['samples']} sequences in {len(manifest['shards'])} shards")
+    return manifest
+
+
+def load_manifest(data_dir: Path) -> Dict[str, Any]:
+    """Read and validate a shard directory's manifest."""
+    manifest = json.loads((Path(data_dir) / "manifest.json").read_text())
+    if manifest.get("manifest_version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version {manifest.get('manifest_version')}")
+    return manifest
+
+
+class ShardReader:
+    """
+    Memory-mapped iteration over exported shards.
+
+    Shards are assigned round-robin to workers; within a shard the sample
+    order is shuffled per epoch. Samples are normalised with `mean`/`std`.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        mean: Optional[np.ndarray] = None,
+        std: Optional[np.ndarray] = None,
+        shuffle: bool = True,
+        seed: int = 0,
+    ):
+        self.data_dir = Path(data_dir)
+        self.manifest = load_manifest(self.data_dir)
+        self.mean = np.asarray(
+            self.manifest["stats"]["mean"] if mean is None else mean, dtype=np.float32
+        )
+        self.std = np.asarray(
+            self.manifest["stats"]["std"] if std is None else std, dtype=np.float32
+        )
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+
+    def __len__(self) -> int:
+        return int(self.manifest["samples"])
+
+    def iter_samples(self, worker_id: int = 0, num_workers: int = 1) -> Iterator[np.ndarray]:
+        """Yield normalised (seq_len, 8) float32 samples for one worker."""
+        rng = np.random.default_rng([self.seed, self.epoch, worker_id])
+        for shard in self.manifest["shards"][worker_id::num_workers]:
+            data = np.load(self.data_dir / shard["file"], mmap_mode="r")
+            order = rng.permutation(len(data)) if self.shuffle else range(len(data))
+            for i in order:
+                yield (data[i] - self.mean) / (self.std + 1e-8)
+
+
+if TORCH_AVAILABLE:
+
+    class ShardedSequenceDataset(IterableDataset):
+        """IterableDataset over exported shards, split across DataLoader workers."""
+
+        def __init__(self, reader: ShardReader):
+            super().__init__()
+            self.reader = reader
+
+        def set_epoch(self, epoch: int) -> None:
+            """Reshuffle for the next epoch (workers pick this up on their next iterator)."""
+            self.reader.epoch = epoch
+
+        def __iter__(self):
+            info = get_worker_info()
+            worker_id, num_workers = (info.id, info.num_workers) if info else (0, 1)
+            for sample in self.reader.iter_samples(worker_id, num_workers):
+                yield torch.from_numpy(np.ascontiguousarray(sample, dtype=np.float32))
+
+
+def _train_torch(
+    data_dir: Path,
+    epochs: int,
+    batch_size: int,
+    num_workers: int,
+    learning_rate: float,
+) -> Tuple[Any, Dict[str, List[float]]]:
+    manifest = load_manifest(data_dir)
+    model = create_autoencoder(anomaly_threshold=0.7)
+    model.running_mean = torch.tensor(manifest["stats"]["mean"], dtype=torch.float32)
+    model.running_std = torch.tensor(manifest["stats"]["std"], dtype=torch.float32)
+
+    dataset = ShardedSequenceDataset(ShardReader(data_dir))
+    loader = DataLoader(dataset, batch_size=batch_size, num_workers=num_workers)
+    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+    criterion = nn.MSELoss()
+
+    history: Dict[str, List[float]] = {"train_loss": []}
+    for epoch in range(epochs):
+        model.train()
+        dataset.set_epoch(epoch)
+        total, batches = 0.0, 0
+        for batch_x in loader:
+            optimizer.zero_grad()
+            reconstructed, _ = model(batch_x)
+            loss = criterion(reconstructed, batch_x)
+            loss.backward()
+            optimizer.step()
+            total += loss.item()
+            batches += 1
+        history["train_loss"].append(total / max(batches, 1))
+        if (epoch + 1) % 10 == 0:
+            logger.info(f"Epoch {epoch+1}/{epochs}, Loss: {history['train_loss'][-1]:.6f}")
+
+    # Reconstruction-error stats in one more streaming pass
+    model.eval()
+    errors = WelfordStats(n_features=1)
+    eval_loader = DataLoader(
+        ShardedSequenceDataset(ShardReader(data_dir, shuffle=False)),
+        batch_size=max(batch_size, 256),
+        num_workers=num_workers,
+    )
+    with torch.inference_mode():
+        for batch_x in eval_loader:
+            reconstructed, _ = model(batch_x)
+            errors.update(model.compute_reconstruction_error(batch_x, reconstructed).numpy())
+    model.error_mean = torch.tensor(float(errors.mean[0]))
+    model.error_std = torch.tensor(float(errors.std(ddof=1)[0]))
+    return model, history
+
+
+def _train_statistical(data_dir: Path) -> Tuple[Any, Dict[str, List[float]]]:
+    """Streaming equivalent of `StatisticalAutoencoder.fit` (population stats)."""
+    manifest = load_manifest(data_dir)
+    model = StatisticalAutoencoder()
+    model.mean = list(manifest["stats"]["mean"])
+    model.std = list(manifest["stats"]["std_population"])
+
+    reader = ShardReader(data_dir, std=np.asarray(model.std), shuffle=False)
+    errors = WelfordStats(n_features=1)
+    chunk: List[float] = []
+    for sample in reader.iter_samples():
+        chunk.append(float(np.mean(np.mean(sample.astype(np.float64) ** 2, axis=1))))
+        if len(chunk) >= 4096:
+            errors.update(np.array(chunk))
+            chunk = []
+    errors.update(np.array(chunk))
+
+    model.error_mean = float(errors.mean[0])
+    model.error_std = float(errors.std(ddof=0)[0])
+    return model, {"train_loss": [model.error_mean]}
+
+
+def train_from_shards(
+    data_dir: Path,
+    epochs: int = 50,
+    batch_size: int = 32,
+    num_workers: int = 0,
+    learning_rate: float = 0.001,
+) -> Tuple[Any, Dict[str, List[float]]]:
+    """Train the autoencoder from exported shards; returns (model, history)."""
+    if TORCH_AVAILABLE:
+        return _train_torch(data_dir, epochs, batch_size, num_workers, learning_rate)
+    return _train_statistical(data_dir)
+
+
+def _write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    os.replace(tmp, path)
+
+
+def publish_artifacts(
+    model: Any,
+    history: Dict[str, List[float]],
+    manifest: Dict[str, Any],
+    artifacts_root: Path,
+    params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Publish the trained model as the next version in its model registry.
+
+    The version directory is assembled in a temp dir and renamed into place
+    by `ModelRegistry.publish`, so readers never see a partial artifact.
+    """
+    registry = ModelRegistry(artifacts_root)
+    registry.root.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=registry.root))
+
+    try:
+        files: Dict[str, str] = {}
+        if TORCH_AVAILABLE and hasattr(model, "state_dict"):
+            model_type = "lstm"
+            torch.save(model.state_dict(), staging / "autoencoder.pt")
+            files["state_dict"] = "autoencoder.pt"
+            try:
+                model.export_onnx(staging / "autoencoder.onnx", seq_len=manifest["seq_len"])
+                files["onnx"] = "autoencoder.onnx"
+                files["stats"] = "autoencoder.stats.json"
+            except Exception as e:
+                logger.warning(f"ONNX export skipped: {e}")
+        else:
+            model_type = "statistical"
+            (staging / "statistical.json").write_text(
+                json.dumps(
+                    {
+                        "mean": model.mean,
+                        "std": model.std,
+                        "error_mean": model.error_mean,
+                        "error_std": model.error_std,
+                        "anomaly_threshold": model.anomaly_threshold,
+                    },
+                    indent=2,
+                )
+            )
+            files["statistical"] = "statistical.json"
+
+        final_loss = history["train_loss"][-1] if history.get("train_loss") else None
+        metadata = {
+            "format_version": ARTIFACT_FORMAT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "model_type": model_type,
+            "files": files,
+            "samples": manifest["samples"],
+            "seq_len": manifest["seq_len"],
+            "normalization": manifest["stats"],
+            "final_loss": final_loss,
+            "history": history,
+            "params": params or {},
+        }
+        entry = registry.publish(
+            staging, metadata, metrics={"final_loss": final_loss, "samples": manifest["samples"]}
+        )
+    finally:
+        if staging.exists():
+            shutil.rmtree(staging, ignore_errors=True)
+
+    path = registry.root / entry["version"]
+    logger.info(f"Published autoencoder {entry['version']} to {path}")
+    return {**metadata, "version": entry["version"], "sha256": entry["sha256"], "path": str(path)}
+
+
+def apply_artifact(model: Any, artifact_dir: Path) -> None:
+    """Load a published artifact's weights/stats into an existing model in place."""
+    artifact_dir = Path(artifact_dir)
+    metadata = json.loads((artifact_dir / "metadata.json").read_text())
+    files = metadata["files"]
+    if metadata["model_type"] == "lstm":
+        if not (TORCH_AVAILABLE and hasattr(model, "load_state_dict")):
+            raise ValueError("LSTM artifact needs an eager torch autoencoder")
+        model.load_state_dict(torch.load(artifact_dir / files["state_dict"]))
+    else:
+        data = json.loads((artifact_dir / files["statistical"]).read_text())
+        model.mean = data["mean"]
+        model.std = data["std"]
+        model.error_mean = data["error_mean"]
+        model.error_std = data["error_std"]
+
+
+def train_detector(
+    graph: Any, days: int = 30, limit: int = 50_000
+) -> Tuple[Optional[AnomalyDetector], int]:
+    """
+    Fit the anomaly detector on the last `limit` reputation proofs.
+
+    Returns (detector, samples), or (None, 0) when there is too little data
+    or scikit-learn is missing.
+    """
+    rows = graph.run(DETECTOR_PROOFS_QUERY, {"days": days, "limit": limit}).data()
+    proofs = [
+        {
+            "agent_id": row["agent_id"],
+            "timestamp_ms": row["timestamp_ms"],
+            "proof_type": "agent_reputation",
+            # Same layout as verified proofs: [.., threshold, nullifier]
+            "proof_data": {
+                "publicSignals": ["1", str(int(row["threshold"] or 0)), row["nullifier"]]
+            },
+        }
+        for row in reversed(rows)
+    ]
+    detector = AnomalyDetector(use_ml=True)
+    samples = detector.train_on_history(proofs)
+    return (detector, samples) if samples else (None, 0)
+
+
+def _graph_or_none() -> Any:
+    try:
+        from api.database import get_graph
+
+        return get_graph()
+    except Exception as e:
+        logger.warning(f"Neo4j unavailable, exporting synthetic data: {e}")
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Out-of-core autoencoder training")
+    parser.add_argument("command", choices=["export", "train", "run"])
+    parser.add_argument("--data-dir", default=os.getenv("ML_TRAIN_DATA_DIR", "data/agent_seqs"))
+    parser.add_argument(
+        "--artifacts",
+        default=str(registry_path("autoencoder")),
+        help="Registry directory to publish to (default $ML_REGISTRY_DIR/autoencoder)",
+    )
+    parser.add_argument(
+        "--detector-artifacts",
+        default=str(registry_path("detector")),
+        help="Detector registry directory (default $ML_REGISTRY_DIR/detector)",
+    )
+    parser.add_argument("--detector-samples", type=int, default=50_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seq-len", type=int, default=10)
+    parser.add_argument("--min-samples", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--shard-size", type=int, default=50_000)
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--learning-rate", type=float, default=0.001)
+    args = parser.parse_args(argv)
+
+    data_dir = Path(args.data_dir)
+    summary: Dict[str, Any] = {"command": args.command}
+
+    if args.command in ("export", "run"):
+        manifest = export_sequences(
+            _graph_or_none(),
+            data_dir,
+            days=args.days,
+            seq_len=args.seq_len,
+            min_samples=args.min_samples,
+            page_size=args.page_size,
+            shard_size=args.shard_size,
+        )
+        summary.update(samples=manifest["samples"], shards=len(manifest["shards"]))
+
+    if args.command in ("train", "run"):
+        model, history = train_from_shards(
+            data_dir,
+            epochs=args.epochs,
+            batch_size=args.batch_size,
+            num_workers=args.workers,
+            learning_rate=args.learning_rate,
+        )
+        published = publish_artifacts(
+            model,
+            history,
+            load_manifest(data_dir),
+            Path(args.artifacts),
+            params={"epochs": args.epochs, "batch_size": args.batch_size, "days": args.days},
+        )
+        summary.update(
+            version=published["version"],
+            path=published["path"],
+            model_type=published["model_type"],
+            files=published["files"],
+            samples=published["samples"],
+            final_loss=published["final_loss"],
+        )
+
+        graph = _graph_or_none()
+        detector, samples = (
+            train_detector(graph, days=args.days, limit=args.detector_samples)
+            if graph is not None
+            else (None, 0)
+        )
+        if detector is not None:
+            registry = ModelRegistry(Path(args.detector_artifacts))
+            entry = publish_detector(detector, registry, metrics={"samples": samples})
+            summary.update(
+                detector_version=entry["version"],
+                detector_path=str(registry.root / entry["version"]),
+                detector_samples=samples,
+            )
+        else:
+            logger.warning("Anomaly detector not retrained (no Neo4j or too few proofs)")
+            summary.update(detector_version=None)
+
+    print(json.dumps(summary))
+    return summary
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -36,9 +36,12 @@ import json
 import logging
 import os
 import subprocess
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+from ml.proof_cache import get_proof_cache, model_fingerprint, proof_key
+from zkp.proving_scheduler import PRIORITY_BATCH, get_proving_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -95,6 +98,7 @@ class ZKMLProver:
 
         self._model_hash: Optional[str] = None
         self._circuit_compiled = False
+        self.proof_cache = get_proof_cache(self.circuit_dir / "proof_cache")
 
     @property
     def model_hash(self) -> str:
@@ -162,22 +166,26 @@ class ZKMLProver:
         include_latent: bool = False,
         use_quantum: bool = False,
         VERIDICUS_payment: int = 0,
+        priority: int = PRIORITY_BATCH,
     ) -> ZKMLProof:
         """
         Generate ZK proof that anomaly_score > threshold.
 
+        Proofs are memoized by (model, features, threshold scaled to 1/1000),
+        and identical concurrent requests share one proving run. Cache misses
+        are proved on the shared proving scheduler.
+
         Args:
             agent_features: Sequence of feature vectors
             threshold: Anomaly threshold (0-1)
             include_latent: Include latent vector in proof (increases size)
             use_quantum: Use quantum acceleration (requires VERIDICUS)
             VERIDICUS_payment: VERIDICUS tokens to pay for quantum compute
+            priority: Proving scheduler priority (batch by default)
 
         Returns:
             ZKMLProof with Groth16 proof
         """
-        import time
-
         # Try quantum acceleration if requested
         if use_quantum and VERIDICUS_payment > 0:
             try:
@@ -188,18 +196,63 @@ class ZKMLProver:
             except ImportError:
                 logger.warning("Quantum acceleration not available, using classical")
 
-        # Run inference
-        inference_start = time.perf_counter()
-
         try:
             from ml.autoencoder import get_autoencoder
 
             autoencoder = get_autoencoder()
+        except Exception as e:
+            logger.warning(f"Autoencoder unavailable: {e}")
+            autoencoder = None
+
+        # The circuit only sees the scaled threshold; compare against the same value
+        threshold_scaled = int(threshold * 1000)
+        # Development mock proofs must never be served once the circuit is compiled
+        backend = "deepprove" if self._circuit_compiled and self.deepprove_path.exists() else "mock"
+        key = proof_key(
+            "zkml_prover",
+            f"{self.model_hash}:{backend}:{model_fingerprint(autoencoder)}",
+            agent_features,
+            threshold_scaled,
+        )
+        data, _ = self.proof_cache.get_or_compute(
+            key,
+            lambda: get_proving_scheduler().run(
+                "zkml_prover",
+                self._prove,
+                autoencoder,
+                agent_features,
+                threshold_scaled,
+                include_latent,
+                backend,
+                priority=priority,
+            ),
+        )
+        return ZKMLProof(**data)
+
+    def _prove(
+        self,
+        autoencoder: Any,
+        agent_features: List[List[float]],
+        threshold_scaled: int,
+        include_latent: bool,
+        backend: str,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Run inference and proving; returns (ZKMLProof fields, cacheable)."""
+        import time
+
+        threshold = threshold_scaled / 1000
+
+        # Run inference
+        inference_start = time.perf_counter()
+
+        try:
             result = autoencoder.detect_anomaly(agent_features, return_latent=include_latent)
             anomaly_score = result.anomaly_score
+            cacheable = True
         except Exception as e:
             logger.warning(f"Autoencoder inference failed: {e}, using mock score")
             anomaly_score = 0.5
+            cacheable = False
 
         inference_time = (time.perf_counter() - inference_start) * 1000
 
@@ -208,13 +261,15 @@ class ZKMLProver:
 
         is_above_threshold = anomaly_score > threshold
 
-        if self._circuit_compiled and self.deepprove_path.exists():
+        if backend == "deepprove":
             # Real DeepProve proof generation
             proof = self._generate_deepprove_proof(
                 agent_features,
                 threshold,
                 is_above_threshold,
             )
+            # A mock here means proving failed; don't pin it in the cache
+            cacheable = cacheable and not proof.get("_mock")
         else:
             # Mock proof for development
             proof = self._generate_mock_proof(
@@ -225,16 +280,17 @@ class ZKMLProver:
 
         prove_time = (time.perf_counter() - prove_start) * 1000
 
-        return ZKMLProof(
+        zkml_proof = ZKMLProof(
             proof=proof,
             public_inputs=[
-                str(int(threshold * 1000)),  # Scale for circuit
+                str(threshold_scaled),  # Scale for circuit
                 "1" if is_above_threshold else "0",
             ],
             inference_time_ms=inference_time,
             prove_time_ms=prove_time,
             model_hash=self.model_hash,
         )
+        return asdict(zkml_proof), cacheable
 
     def _generate_deepprove_proof(
         self,
@@ -250,7 +306,7 @@ class ZKMLProver:
                 json.dump(
                     {
                         "input": features,
-                        "threshold": int(threshold * 1000),
+                        "threshold": round(threshold * 1000),
                     },
                     f,
                 )
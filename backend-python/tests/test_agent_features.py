@@ -0,0 +1,118 @@
+"""
+Tests for the bulk agent feature loader behind /ai/anomaly-batch.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from api import cache, ml_router
+from api.ml_router import NO_ACTIVITY_FEATURES, assemble_agent_features
+
+
+def _activity(i):
+    return {
+        "claim_count": 2 + i,
+        "proof_count": 1,
+        "interaction_count": 3,
+        "hour": 6,
+        "day_of_week": 1,
+        "response_time": 80,
+        "error_rate": 0.01,
+    }
+
+
+class TestAssembleAgentFeatures:
+    """Test padding and default semantics of the feature array."""
+
+    def test_shape_and_order(self):
+        records = [
+            {"agent_id": "b", "reputation": 70, "activities": [_activity(i) for i in range(10)]},
+            {"agent_id": "a", "reputation": 60, "activities": [_activity(0)]},
+        ]
+        out = assemble_agent_features(["a", "b", "c"], records, 10)
+        assert out.shape == (3, 10, 8)
+        assert out[0, 0].tolist() == [60, 2, 1, 3, 6 / 24, 1 / 7, 80, 0.01]
+        assert out[1, :, 1].tolist() == [2 + i for i in range(10)]
+
+    def test_short_sequence_repeats_last_row(self):
+        records = [{"agent_id": "a", "reputation": 60, "activities": [_activity(0), _activity(1)]}]
+        out = assemble_agent_features(["a"], records, 5)
+        assert (out[0, 2:] == out[0, 1]).all()
+        assert out[0, 1, 1] == 3
+
+    def test_agent_without_activity_gets_default_row_with_reputation(self):
+        out = assemble_agent_features(["a"], [{"agent_id": "a", "reputation": 90}], 4)
+        assert out[0].tolist() == [[90, 1, 0.5, 1, 0.5, 3 / 7, 100, 0.02]] * 4
+
+    def test_unknown_agent_gets_no_activity_defaults(self):
+        out = assemble_agent_features(["ghost"], [], 3)
+        np.testing.assert_allclose(out[0], [NO_ACTIVITY_FEATURES] * 3)
+
+    def test_nulls_fall_back_to_defaults(self):
+        records = [
+            {"agent_id": "a", "reputation": None, "activities": [{"claim_count": None, "hour": 0}]}
+        ]
+        out = assemble_agent_features(["a"], records, 1)
+        assert out[0, 0].tolist() == [50, 1, 0.5, 1, 0.5, 3 / 7, 100, 0.02]
+
+    def test_truncates_to_seq_len(self):
+        records = [
+            {"agent_id": "a", "reputation": 1, "activities": [_activity(i) for i in range(8)]}
+        ]
+        assert assemble_agent_features(["a"], records, 3)[0, :, 1].tolist() == [2, 3, 4]
+
+
+class TestFetchAgentFeaturesBulk:
+    """Test one query per batch and the per-agent cache."""
+
+    @pytest.fixture
+    def queries(self, monkeypatch):
+        calls = []
+
+        async def fake_read(query, parameters=None):
+            calls.append(parameters["agent_ids"])
+            return [
+                {"agent_id": a, "reputation": 40 + i, "activities": [_activity(i)]}
+                for i, a in enumerate(parameters["agent_ids"])
+            ]
+
+        cache.clear()
+        monkeypatch.setattr(ml_router, "NEO4J_AVAILABLE", True)
+        monkeypatch.setattr(ml_router, "neo4j_read", fake_read)
+        yield calls
+        cache.clear()
+
+    def test_one_query_for_batch(self, queries):
+        out = asyncio.run(ml_router.fetch_agent_features_bulk(["a", "b", "a", "c"]))
+        assert queries == [["a", "b", "c"]]
+        assert out.shape == (4, 10, 8)
+        assert (out[0] == out[2]).all()
+        assert out[1, 0, 0] == 41
+
+    def test_cached_agents_skip_the_query(self, queries):
+        asyncio.run(ml_router.fetch_agent_features_bulk(["a", "b"]))
+        asyncio.run(ml_router.fetch_agent_features_bulk(["a", "b", "c"]))
+        assert queries == [["a", "b"], ["c"]]
+
+    def test_one_expiry_sweep_per_lookup_and_store(self, monkeypatch, queries):
+        sweeps = []
+        evict = cache._evict_expired
+        monkeypatch.setattr(cache, "_evict_expired", lambda: sweeps.append(1) or evict())
+        asyncio.run(ml_router.fetch_agent_features_bulk([f"agent-{i}" for i in range(50)]))
+        assert len(sweeps) == 2
+
+    def test_query_failure_falls_back_without_caching(self, monkeypatch, queries):
+        async def failing_read(query, parameters=None):
+            raise RuntimeError("bolt unavailable")
+
+        monkeypatch.setattr(ml_router, "neo4j_read", failing_read)
+        out = asyncio.run(ml_router.fetch_agent_features_bulk(["a"]))
+        assert out.shape == (1, 10, 8)
+        assert cache.get("agent_features:10:a") is None
+
+    def test_single_agent_helper_returns_lists(self, queries):
+        features = asyncio.run(ml_router.fetch_agent_features("a", 4))
+        assert isinstance(features, list) and len(features) == 4
+        assert features[0][0] == 40
@@ -0,0 +1,136 @@
+"""
+Tests for vectorized AnomalyDetector batch scoring.
+"""
+
+import types
+
+import numpy as np
+import pytest
+
+from ml import anomaly_detector
+from ml.anomaly_detector import FEATURE_NAMES, AnomalyDetector
+
+
+def _proofs(n, agents=3):
+    proofs = []
+    for i in range(n):
+        proofs.append(
+            {
+                "agent_id": f"agent-{i % agents}",
+                "proof_data": {
+                    "publicSignals": ["0", str(20 + (i * 17) % 70), f"n{i % 4}"],
+                    "capabilities": [f"cap{j}" for j in range(i % 6)],
+                },
+                "proof_type": "agent_reputation" if i % 2 else "agent_capability",
+            }
+        )
+    return proofs
+
+
+def _trained_detector():
+    detector = AnomalyDetector(use_ml=True)
+    rng = np.random.default_rng(0)
+    detector.train(
+        [dict(zip(FEATURE_NAMES, row)) for row in rng.normal(10, 3, (200, len(FEATURE_NAMES)))]
+    )
+    return detector
+
+
+class TestBatchParity:
+    """Test that a batch scores exactly like sequential analyze_proof calls."""
+
+    @pytest.fixture(autouse=True)
+    def frozen_clock(self, monkeypatch):
+        # A batch shares one timestamp; freeze the clock so sequential calls do too
+        monkeypatch.setattr(anomaly_detector, "time", types.SimpleNamespace(time=lambda: 1.7e9))
+
+    @pytest.mark.parametrize("use_ml", [False, True])
+    def test_matches_sequential(self, use_ml):
+        proofs = _proofs(40)
+        batched = _trained_detector() if use_ml else AnomalyDetector(use_ml=False)
+        sequential = _trained_detector() if use_ml else AnomalyDetector(use_ml=False)
+
+        got = batched.analyze_batch(proofs)
+        want = [
+            sequential.analyze_proof(p["proof_data"], p["agent_id"], p["proof_type"])
+            for p in proofs
+        ]
+
+        for g, w in zip(got, want):
+            assert g.flags == w.flags
+            assert g.anomaly_score == pytest.approx(w.anomaly_score)
+            assert g.details["features"] == w.details["features"]
+        assert batched.get_stats() == sequential.get_stats()
+
+    def test_repeated_agent_sees_earlier_proofs(self):
+        detector = AnomalyDetector(use_ml=False)
+        proof = {"proof_data": {"publicSignals": ["same"]}, "proof_type": "age"}
+        scores = detector.analyze_batch([proof] * 8, agent_id="a")
+
+        counts = [s.details["features"]["proof_count_1h"] for s in scores]
+        assert counts == list(range(8))
+        assert "rapid_fire" not in scores[0].flags
+        assert "rapid_fire" in scores[1].flags
+        assert "sybil_pattern" in scores[-1].flags
+
+    def test_record_false(self):
+        detector = AnomalyDetector(use_ml=False)
+        proof = {"proof_data": {"publicSignals": ["n"]}}
+        scores = detector.analyze_batch([proof] * 3, agent_id="a", record=False)
+        assert [s.details["features"]["proof_count_1h"] for s in scores] == [0, 0, 0]
+        assert detector.get_stats()["total_agents_tracked"] == 0
+
+    def test_empty_batch(self):
+        assert AnomalyDetector(use_ml=False).analyze_batch([]) == []
+
+
+class TestVectorizedRules:
+    """Test the heuristic masks and the single model pass."""
+
+    def test_masks_match_rules(self):
+        detector = AnomalyDetector(use_ml=False)
+        X = np.zeros((3, len(FEATURE_NAMES)))
+        col = FEATURE_NAMES.index
+        X[:, col("time_since_last_proof")] = 60
+        X[:, col("hour_of_day")] = 12
+        X[0, col("reputation_delta")] = -30
+        X[1, col("proof_count_1h")] = 10
+        X[1, col("unique_nullifiers_1h")] = 2
+        X[2, col("hour_of_day")] = 3
+        X[2, col("new_capabilities")] = 4
+
+        scores, masks = detector._heuristic_scores(X)
+        flags = [[f for f, m in masks if m[i]] for i in range(3)]
+        assert flags == [
+            ["reputation_jump"],
+            ["sybil_pattern"],
+            ["unusual_timing", "capability_spike"],
+        ]
+        np.testing.assert_allclose(scores, [0.3, 0.4, 0.3])
+
+    def test_one_scaler_and_forest_call(self):
+        detector = _trained_detector()
+        detector.compiled = None  # sklearn path
+        calls = _count_calls((detector.scaler, "transform"), (detector.model, "decision_function"))
+        detector.analyze_batch(_proofs(25))
+        assert calls == {"transform": 1, "decision_function": 1}
+
+    def test_one_compiled_call(self):
+        detector = _trained_detector()
+        calls = _count_calls((detector.compiled, "decision_function"))
+        detector.analyze_batch(_proofs(25))
+        assert calls == {"decision_function": 1}
+
+
+def _count_calls(*targets):
+    calls = {}
+    for obj, name in targets:
+        original = getattr(obj, name)
+        calls[name] = 0
+
+        def wrapper(X, name=name, original=original):
+            calls[name] += 1
+            return original(X)
+
+        setattr(obj, name, wrapper)
+    return calls
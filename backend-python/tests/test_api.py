@@ -6,7 +6,7 @@ Run with: pytest tests/test_api.py -v
 
 import pytest
 import os
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, patch
 from fastapi.testclient import TestClient
 
 # Set test environment before importing app
@@ -24,12 +24,11 @@ os.environ["RATE_LIMIT_ENABLED"] = "false"
 
 @pytest.fixture(scope="module")
 def mock_graph():
-    """Mock Neo4j graph connection."""
-    with patch("api.app.Graph") as mock:
-        mock_instance = MagicMock()
-        mock_instance.run.return_value.data.return_value = []
-        mock.return_value = mock_instance
-        yield mock_instance
+    """Mock the shared Neo4j data-access layer."""
+    with patch("api.app.read", new_callable=AsyncMock, return_value=[]) as mock_read, patch(
+        "api.app.verify_connectivity", new_callable=AsyncMock, return_value=True
+    ):
+        yield mock_read
 
 
 @pytest.fixture(scope="module")
@@ -73,7 +72,6 @@ class TestHealthEndpoints:
 
     def test_readiness_probe_healthy(self, client, mock_graph):
         """Test /health/ready when all services are healthy."""
-        mock_graph.run.return_value.evaluate.return_value = 1
         response = client.get("/health/ready")
         data = response.json()
         assert response.status_code in [200, 503]  # Depends on mock state
@@ -0,0 +1,136 @@
+"""
+Tests for the circuit artifact manager.
+"""
+
+import hashlib
+import json
+
+import pytest
+
+from zkp.artifact_manager import (
+    MISMATCH,
+    MISSING,
+    UNPINNED,
+    VERIFIED,
+    ArtifactIntegrityError,
+    ArtifactManager,
+    canonical_json_digest,
+)
+
+VKEY = {"protocol": "groth16", "nPublic": 4, "IC": [["1", "2"]]}
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    root = tmp_path / "artifacts"
+    age = root / "age"
+    (age / "age_js").mkdir(parents=True)
+    (age / "verification_key.json").write_text(json.dumps(VKEY, indent=2))
+    (age / "age_final.zkey").write_bytes(b"zkey" * 1000)
+    (age / "age_js" / "age.wasm").write_bytes(b"\0asm")
+    (root / "level3_inequality").mkdir()
+    (root / "level3_inequality" / "Level3Inequality_final.zkey").write_bytes(b"l3")
+    (root / "INTEGRITY.json").write_text(
+        json.dumps(
+            {
+                "age": {
+                    "vkey": canonical_json_digest(VKEY),
+                    "zkey": hashlib.sha256(b"zkey" * 1000).hexdigest(),
+                }
+            }
+        )
+    )
+    return root
+
+
+def _manager(artifacts, tmp_path, **kwargs):
+    kwargs.setdefault("digest_cache", tmp_path / "digests.json")
+    return ArtifactManager(artifacts, **kwargs)
+
+
+class TestPaths:
+    """Test manifest-driven artifact paths."""
+
+    def test_stems_come_from_manifest(self, artifacts, tmp_path):
+        manager = _manager(artifacts, tmp_path)
+        paths = manager.paths("level3_inequality")
+        assert paths["zkey"].name == "Level3Inequality_final.zkey"
+        assert paths["wasm"].parts[-2:] == ("Level3Inequality_js", "Level3Inequality.wasm")
+        assert manager.available("level3_inequality")
+        assert not manager.available("authenticity")
+        assert manager.spec("level3_inequality").use_rapidsnark
+
+
+class TestIntegrity:
+    """Test pinned-hash verification and digest caching."""
+
+    def test_verifies_canonical_and_raw_pins(self, artifacts, tmp_path):
+        manager = _manager(artifacts, tmp_path)
+        assert manager.integrity("age", "vkey") == VERIFIED
+        assert manager.integrity("age", "zkey") == VERIFIED
+        assert manager.integrity("age", "wasm") == UNPINNED
+        assert manager.integrity("authenticity", "vkey") == MISSING
+        assert manager.vkey("age") == VKEY
+
+    def test_legacy_plain_pin(self, artifacts, tmp_path):
+        (artifacts / "INTEGRITY.json").write_text(json.dumps({"age": canonical_json_digest(VKEY)}))
+        assert _manager(artifacts, tmp_path).integrity("age") == VERIFIED
+
+    def test_tampered_vkey_is_rejected(self, artifacts, tmp_path):
+        (artifacts / "age" / "verification_key.json").write_text(json.dumps({**VKEY, "nPublic": 5}))
+        manager = _manager(artifacts, tmp_path)
+        assert manager.integrity("age") == MISMATCH
+        with pytest.raises(ArtifactIntegrityError):
+            manager.vkey("age")
+
+    def test_hashes_once_per_file_version(self, artifacts, tmp_path):
+        manager = _manager(artifacts, tmp_path)
+        zkey = artifacts / "age" / "age_final.zkey"
+        first = manager.file_digest(zkey)
+        manager.preload()
+        assert manager.file_digest(zkey) == first
+        assert manager.stats()["files_hashed"] == 2  # zkey + vkey
+
+        zkey.write_bytes(b"rebuilt")
+        assert manager.file_digest(zkey) == hashlib.sha256(b"rebuilt").hexdigest()
+        assert manager.integrity("age", "zkey") == MISMATCH
+
+    def test_digests_shared_across_processes(self, artifacts, tmp_path):
+        _manager(artifacts, tmp_path).preload()
+        other = _manager(artifacts, tmp_path)
+        assert other.preload()["age"] == {"vkey": VERIFIED, "zkey": VERIFIED, "wasm": UNPINNED}
+        assert other.stats()["files_hashed"] == 0
+
+
+class TestBuffers:
+    """Test memory-mapped artifact buffers."""
+
+    def test_zkey_is_mapped_once(self, artifacts, tmp_path):
+        manager = _manager(artifacts, tmp_path)
+        buf = manager.buffer("age", "zkey")
+        assert buf.readonly and bytes(buf[:4]) == b"zkey" and len(buf) == 4000
+        assert manager.buffer("age", "zkey").obj is buf.obj
+        assert manager.stats()["mapped_files"] == 1
+
+    def test_tampered_zkey_is_not_mapped(self, artifacts, tmp_path):
+        zkey = artifacts / "age" / "age_final.zkey"
+        zkey.write_bytes(b"evil")
+        with pytest.raises(ArtifactIntegrityError):
+            _manager(artifacts, tmp_path).buffer("age", "zkey")
+
+    def test_capabilities(self, artifacts, tmp_path):
+        proofs = _manager(artifacts, tmp_path).capabilities()
+        assert [p["circuit"] for p in proofs] == ["age"]
+        age = proofs[0]
+        assert age["type"] == "age_proof" and age["integrity"] == VERIFIED
+        assert age["public_inputs"][-1] == "nullifier"
+        raw = (artifacts / "age" / "verification_key.json").read_bytes()
+        assert age["vk_sha256"] == hashlib.sha256(raw).hexdigest()
+
+
+def test_repository_artifacts_verify():
+    """Committed verification keys match INTEGRITY.json."""
+    manager = ArtifactManager(digest_cache=None)
+    report = manager.preload()
+    assert report["age"]["vkey"] == VERIFIED
+    assert all(MISMATCH not in states.values() for states in report.values())
@@ -0,0 +1,100 @@
+"""
+Tests for the cross-chain bridge identity Merkle tree.
+"""
+
+import hashlib
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+# Load the bridge module on its own: the identity package __init__ imports
+# every identity module, and the bridge has no dependencies on them
+_spec = importlib.util.spec_from_file_location(
+    "cross_chain_bridge",
+    Path(__file__).resolve().parent.parent / "identity" / "cross_chain_bridge.py",
+)
+bridge_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(bridge_module)
+
+Chain = bridge_module.Chain
+CrossChainBridge = bridge_module.CrossChainBridge
+EVMChainAdapter = bridge_module.EVMChainAdapter
+FixedDepthMerkleTree = bridge_module.FixedDepthMerkleTree
+
+
+def _leaf(i):
+    return hashlib.sha256(f"identity {i}".encode()).hexdigest()
+
+
+def _full_root(leaves, depth):
+    level = leaves + ["0" * 64] * (2**depth - len(leaves))
+    while len(level) > 1:
+        level = [
+            hashlib.sha256(bytes.fromhex(a) + bytes.fromhex(b)).hexdigest()
+            for a, b in zip(level[::2], level[1::2])
+        ]
+    return level[0]
+
+
+class TestFixedDepthMerkleTree:
+    """Test appends, batches and proofs against a full rebuild."""
+
+    @pytest.mark.parametrize("size", [0, 1, 2, 3, 7, 16])
+    def test_matches_full_rebuild(self, size):
+        tree = FixedDepthMerkleTree(depth=5)
+        leaves = [_leaf(i) for i in range(size)]
+        for leaf in leaves:
+            tree.append(leaf)
+        assert tree.root == _full_root(leaves, 5)
+        assert all(tree.proof(i).verify() for i in range(size))
+
+    def test_batched_extend_equals_appends(self):
+        one, batch = FixedDepthMerkleTree(depth=8), FixedDepthMerkleTree(depth=8)
+        for i in range(3):
+            one.append(_leaf(i))
+        batch.extend([_leaf(i) for i in range(3)])
+        assert batch.extend([_leaf(i) for i in range(3, 40)]) == 3
+        for i in range(3, 40):
+            one.append(_leaf(i))
+        assert batch.root == one.root
+        assert batch.proof(17).path == one.proof(17).path
+
+    def test_snapshot_round_trip(self):
+        tree = FixedDepthMerkleTree(depth=6)
+        tree.extend([_leaf(i) for i in range(9)])
+        restored = FixedDepthMerkleTree.from_dict(tree.to_dict())
+        restored.append(_leaf(9))
+        tree.append(_leaf(9))
+        assert restored.root == tree.root and len(restored) == 10
+
+    def test_full_tree_rejects_appends(self):
+        tree = FixedDepthMerkleTree(depth=2)
+        tree.extend([_leaf(i) for i in range(4)])
+        with pytest.raises(ValueError):
+            tree.append(_leaf(4))
+
+
+class TestBridgeProofs:
+    """Test that bridging carries a real inclusion proof."""
+
+    def test_bridge_proof_verifies_against_primary_root(self):
+        bridge = CrossChainBridge()
+        identities = [
+            bridge.create_universal_identity(f"secret-{i}", Chain.ETHEREUM, f"0x{i:040x}")
+            for i in range(5)
+        ]
+        _, proof = bridge.bridge_identity(identities[3].universal_did, Chain.POLYGON, "0xabc")
+
+        assert proof.verify()
+        assert proof.leaf == identities[3].identity_commitment
+        assert proof.root == bridge.adapters[Chain.ETHEREUM].get_identity_root()
+
+    def test_reregistration_keeps_leaf(self):
+        adapter = EVMChainAdapter(Chain.BASE)
+        adapter.register_identities([(_leaf(0), {}), (_leaf(1), {})])
+        root = adapter.get_identity_root()
+        adapter.register_identity(_leaf(0), {"updated": True})
+        assert adapter.get_identity_root() == root
+        assert adapter.get_merkle_proof(_leaf(1)).verify()
+        assert adapter.get_merkle_proof(_leaf(2)) is None
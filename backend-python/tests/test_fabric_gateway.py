@@ -0,0 +1,156 @@
+"""
+Tests for the local Fabric ledger and the pooled async gateway client.
+"""
+
+import asyncio
+import json
+
+from blockchain.sdk.fabric_client import FabricClient
+from blockchain.sdk.fabric_gateway import AsyncFabricClient, LocalPeerConnection
+from blockchain.sdk.local_peer import LocalLedger
+from vault.anchoring import get_attestation_async
+
+
+def _documents(n, prefix="doc"):
+    return [{"document_id": f"{prefix}_{i}", "document_hash": f"{i:064x}"} for i in range(n)]
+
+
+class CountingPeer(LocalPeerConnection):
+    """Local peer recording each submitted batch size."""
+
+    def __init__(self, path, batches):
+        super().__init__(path)
+        self.batches = batches
+
+    async def submit(self, function, invocations):
+        self.batches.append(len(invocations))
+        return await super().submit(function, invocations)
+
+
+class TestLocalLedger:
+    """Test chaincode rules and indexed lookups."""
+
+    def test_batch_rejects_invalid_and_duplicates(self, tmp_path):
+        ledger = LocalLedger(str(tmp_path / "ledger.db"))
+        anchor = {"documentID": "doc_1", "merkleRoot": "r", "hash": "h", "fabricTxId": "tx1"}
+        errors = ledger.put_anchors([anchor, dict(anchor), {**anchor, "documentID": ""}])
+        assert errors[0] is None
+        assert "already anchored" in errors[1]
+        assert "documentID cannot be empty" in errors[2]
+
+        assert ledger.get_anchor("doc_1")["merkleRoot"] == "r"
+        assert ledger.get_anchor("doc_2") is None
+        assert [a["documentID"] for a in ledger.find_by_hash("h")] == ["doc_1"]
+        assert ledger.find_by_tx_id("tx1")["documentID"] == "doc_1"
+
+    def test_sync_client_batches_into_ledger(self, tmp_path):
+        client = FabricClient(ledger=LocalLedger(str(tmp_path / "ledger.db")))
+        result = client.anchor_document("doc_1", "ab" * 32)
+        assert result["success"] and result["anchor"]["merkleRoot"] == "ab" * 32
+        assert client.query_attestation("doc_1")["fabricTxId"] == result["transactionId"]
+        assert client.verify_attestation("doc_1", "ab" * 32)
+
+        assert client.anchor_document("doc_1", "cd" * 32)["success"] is False
+        results = client.anchor_documents(_documents(3, prefix="batch"))
+        assert all(r["success"] for r in results)
+        assert len(client.query_attestations(["batch_0", "batch_2", "missing"])) == 2
+
+    def test_imports_legacy_files(self, tmp_path, monkeypatch):
+        import blockchain.sdk.local_peer as local_peer
+
+        monkeypatch.setattr(local_peer, "STORAGE_DIR", tmp_path)
+        anchor = {"documentID": "old", "merkleRoot": "r", "hash": "h"}
+        (tmp_path / "old.json").write_text(json.dumps(anchor, indent=2))
+        ledger = LocalLedger(str(tmp_path / "fabric_ledger.db"))
+        assert ledger.get_anchor("old") == anchor
+
+
+class TestAsyncFabricClient:
+    """Test pooled, batched anchoring and concurrent queries."""
+
+    def test_concurrent_anchors_are_batched(self, tmp_path):
+        batches = []
+        path = str(tmp_path / "ledger.db")
+
+        async def run():
+            client = AsyncFabricClient(
+                connection_factory=lambda: CountingPeer(path, batches), pool_size=2, linger=0.05
+            )
+            async with client:
+                results = await asyncio.gather(
+                    *(client.anchor_document(**d) for d in _documents(10))
+                )
+                duplicate = await client.anchor_document("doc_0", "ff" * 32)
+                found = await client.query_attestations(["doc_3", "doc_9", "missing"])
+                verified = await client.verify_attestation("doc_3", f"{3:064x}")
+            return results, duplicate, found, verified
+
+        results, duplicate, found, verified = asyncio.run(run())
+        assert batches == [10, 1]
+        assert all(r["success"] for r in results)
+        assert results[3]["anchor"]["documentID"] == "doc_3"
+        assert duplicate["success"] is False and "already anchored" in duplicate["error"]
+        assert set(found) == {"doc_3", "doc_9"}
+        assert verified
+
+    def test_bulk_anchor_splits_across_pool(self, tmp_path):
+        batches = []
+        path = str(tmp_path / "ledger.db")
+
+        async def run():
+            client = AsyncFabricClient(
+                connection_factory=lambda: CountingPeer(path, batches), pool_size=3, max_batch=4
+            )
+            async with client:
+                documents = _documents(9) + [{"document_id": "bad", "document_hash": ""}]
+                return await client.anchor_documents(documents)
+
+        results = asyncio.run(run())
+        # The invalid document is rejected before submission
+        assert sorted(batches) == [1, 4, 4]
+        assert [r["success"] for r in results] == [True] * 9 + [False]
+        assert LocalLedger(path).count() == 9
+
+    def test_close_waits_for_inflight_batches(self, tmp_path):
+        path = str(tmp_path / "ledger.db")
+
+        class SlowPeer(LocalPeerConnection):
+            async def submit(self, function, invocations):
+                await asyncio.sleep(0.05)
+                return await super().submit(function, invocations)
+
+        async def run():
+            client = AsyncFabricClient(
+                connection_factory=lambda: SlowPeer(path), pool_size=1, max_batch=2
+            )
+            await client.connect()
+            pending = [asyncio.ensure_future(client.anchor_document(**d)) for d in _documents(3)]
+            await asyncio.sleep(0)  # first batch of two is now in flight
+            await client.close()
+            return await asyncio.gather(*pending)
+
+        results = asyncio.run(run())
+        assert all(r["success"] for r in results)
+        assert LocalLedger(path).count() == 3
+
+
+def test_async_attestation_falls_back_to_inclusion_proof(tmp_path):
+    path = str(tmp_path / "ledger.db")
+
+    class Batcher:
+        def get_proof(self, document_id):
+            return None
+
+    async def run():
+        async with AsyncFabricClient(
+            connection_factory=lambda: LocalPeerConnection(path), pool_size=1
+        ) as client:
+            await client.anchor_document("doc_1", "ab" * 32)
+            return (
+                await get_attestation_async(client, Batcher(), "doc_1"),
+                await get_attestation_async(client, Batcher(), "doc_2"),
+            )
+
+    anchored, pending = asyncio.run(run())
+    assert anchored["hash"] == "ab" * 32
+    assert pending is None
@@ -0,0 +1,101 @@
+"""
+Tests for streaming anomaly-detection feature state.
+"""
+
+import random
+
+import pytest
+
+from ml.anomaly_detector import AnomalyDetector
+from ml.feature_state import DAY_MS, HOUR_MS, AgentFeatureState, SlidingWindowCounter
+
+
+class TestSlidingWindowCounter:
+    """Test bucketed window counts against a brute-force scan."""
+
+    def test_matches_brute_force_within_one_bucket(self):
+        rng = random.Random(7)
+        counter = SlidingWindowCounter(HOUR_MS, 60)
+        bucket = HOUR_MS // 60
+        events = []
+        now = 1_700_000_000_000
+        for _ in range(600):
+            now += rng.randint(0, 120_000)
+            counter.add(now)
+            events.append(now)
+
+            got = counter.count(now)
+            lower = sum(1 for t in events if now - t < HOUR_MS - bucket)
+            upper = sum(1 for t in events if now - t < HOUR_MS + bucket)
+            assert lower <= got <= upper
+
+    def test_long_gap_resets(self):
+        counter = SlidingWindowCounter(DAY_MS, 96)
+        for i in range(50):
+            counter.add(i * 1000)
+        assert counter.count(50_000) == 50
+        assert counter.count(3 * DAY_MS) == 0
+
+    def test_out_of_order_event_counted(self):
+        counter = SlidingWindowCounter(HOUR_MS, 60)
+        counter.add(10 * 60_000)
+        counter.add(9 * 60_000)
+        assert counter.count(10 * 60_000) == 2
+
+
+class TestAgentFeatureState:
+    """Test incremental per-agent features."""
+
+    def test_unique_nullifiers_expire(self):
+        state = AgentFeatureState()
+        state.observe(0, "age", "n1", 0, [])
+        state.observe(1000, "age", "n1", 0, [])
+        state.observe(2000, "age", "n2", 0, [])
+        assert state.unique_nullifiers_1h(3000) == 2
+        # First n1 expires but the second keeps it alive
+        assert state.unique_nullifiers_1h(HOUR_MS + 500) == 2
+        assert state.unique_nullifiers_1h(HOUR_MS + 1500) == 1
+        assert state.unique_nullifiers_1h(HOUR_MS + 2500) == 0
+
+    def test_reputation_and_capabilities(self):
+        state = AgentFeatureState()
+        state.observe(0, "agent_capability", None, 0, ["read", "write"])
+        state.observe(1, "agent_reputation", None, 60, [])
+        assert state.last_reputation_threshold == 60
+        assert state.new_capabilities(["read", "sign", "deploy"]) == 2
+
+    def test_seconds_since_last(self):
+        state = AgentFeatureState()
+        assert state.seconds_since_last(5000) == 86400.0
+        state.observe(1000, "age", None, 0, [])
+        assert state.seconds_since_last(1500) == pytest.approx(0.5)
+
+
+class TestDetectorFeatures:
+    """Test AnomalyDetector on top of the streaming state."""
+
+    def test_counts_and_flags(self):
+        detector = AnomalyDetector(use_ml=False)
+        proof = {"publicSignals": ["1", "same-nullifier"]}
+        for _ in range(25):
+            score = detector.analyze_proof(proof, "agent-1")
+
+        assert score.details["features"]["proof_count_1h"] == 24
+        assert "burst_1h" in score.flags
+        assert "sybil_pattern" in score.flags
+        assert "rapid_fire" in score.flags
+        assert detector.get_stats()["total_proofs_analyzed"] == 25
+
+    def test_reputation_delta(self):
+        detector = AnomalyDetector(use_ml=False)
+        detector.analyze_proof({"publicSignals": ["0", "40", "n1"]}, "a", "agent_reputation")
+        score = detector.analyze_proof(
+            {"publicSignals": ["0", "90", "n2"]}, "a", "agent_reputation"
+        )
+        assert score.details["features"]["reputation_delta"] == 50
+        assert "reputation_jump" in score.flags
+
+    def test_record_false_leaves_state_untouched(self):
+        detector = AnomalyDetector(use_ml=False)
+        detector.analyze_proof({"publicSignals": ["n"]}, "a", record=False)
+        assert detector.get_stats()["total_agents_tracked"] == 0
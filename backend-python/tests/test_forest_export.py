@@ -0,0 +1,142 @@
+"""
+Tests for the flat-array Isolation Forest export.
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from ml.anomaly_detector import FEATURE_NAMES, AnomalyDetector
+from ml.forest_export import FORMAT_VERSION, CompiledForest, compiled_path, export_forest
+
+sklearn = pytest.importorskip("sklearn")
+from sklearn.ensemble import IsolationForest  # noqa: E402
+from sklearn.preprocessing import StandardScaler  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(1)
+    X = rng.normal(10, 3, (600, len(FEATURE_NAMES)))
+    scaler = StandardScaler().fit(X)
+    model = IsolationForest(n_estimators=100, contamination=0.1, random_state=42)
+    model.fit(scaler.transform(X))
+    return model, scaler
+
+
+def _rows(n, seed=2):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(10, 6, (n, len(FEATURE_NAMES)))
+    X[: n // 4] *= 10  # far outliers
+    return X
+
+
+class TestParity:
+    """Test that the compiled scorer matches sklearn."""
+
+    def test_batch_matches_sklearn(self, fitted):
+        model, scaler = fitted
+        X = _rows(2000)
+        compiled = export_forest(model, scaler)
+        np.testing.assert_allclose(
+            compiled.decision_function(X),
+            model.decision_function(scaler.transform(X)),
+            rtol=0,
+            atol=1e-12,
+        )
+
+    def test_single_row_matches_sklearn(self, fitted):
+        model, scaler = fitted
+        compiled = export_forest(model, scaler)
+        for row in _rows(50, seed=3):
+            want = model.decision_function(scaler.transform(row[None]))
+            np.testing.assert_allclose(compiled.decision_function(row[None]), want, atol=1e-12)
+
+    def test_rows_on_split_thresholds(self, fitted):
+        # Values exactly at a split must go left, as in sklearn
+        model, scaler = fitted
+        tree = model.estimators_[0].tree_
+        X_scaled = np.zeros((2, len(FEATURE_NAMES)), dtype=np.float32)
+        X_scaled[:, tree.feature[0]] = tree.threshold[0]
+        compiled = export_forest(model, scaler)
+        np.testing.assert_allclose(
+            compiled.score_samples(X_scaled), model.score_samples(X_scaled), atol=1e-12
+        )
+
+    def test_unfitted_rejected(self):
+        with pytest.raises(ValueError):
+            export_forest(IsolationForest(), StandardScaler())
+
+
+class TestFormat:
+    """Test the versioned on-disk format."""
+
+    def test_roundtrip(self, fitted, tmp_path):
+        compiled = export_forest(*fitted)
+        compiled.save(tmp_path / "m.forest.npz")
+        loaded = CompiledForest.load(tmp_path / "m.forest.npz")
+        X = _rows(100)
+        np.testing.assert_array_equal(loaded.decision_function(X), compiled.decision_function(X))
+
+    def test_version_mismatch(self, fitted, tmp_path):
+        path = tmp_path / "m.forest.npz"
+        export_forest(*fitted).save(path)
+        with np.load(path) as data:
+            arrays = dict(data)
+        arrays["format_version"] = np.int64(FORMAT_VERSION + 1)
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+        with pytest.raises(ValueError):
+            CompiledForest.load(path)
+
+
+class TestDetectorIntegration:
+    """Test that AnomalyDetector saves, loads and scores through the export."""
+
+    def _trained(self):
+        detector = AnomalyDetector(use_ml=True)
+        rng = np.random.default_rng(0)
+        rows = rng.normal(10, 3, (200, len(FEATURE_NAMES)))
+        detector.train([dict(zip(FEATURE_NAMES, row)) for row in rows])
+        return detector
+
+    def test_saved_beside_pickle_and_reloaded(self, tmp_path):
+        detector = self._trained()
+        path = tmp_path / "anomaly.pkl"
+        detector.save_model(path)
+        assert compiled_path(path).exists()
+
+        loaded = AnomalyDetector(model_path=path)
+        assert loaded.compiled is not None
+        assert loaded.compiled.source_digest
+        X = _rows(20)
+        np.testing.assert_allclose(
+            loaded._ml_scores(X)[0], detector._ml_scores(X)[0], rtol=0, atol=1e-12
+        )
+
+    def test_stale_export_is_rebuilt(self, tmp_path):
+        path = tmp_path / "anomaly.pkl"
+        self._trained().save_model(path)
+
+        # Replace the pickle with a different model, leaving the old export
+        other = AnomalyDetector(use_ml=True)
+        rng = np.random.default_rng(5)
+        other.train(
+            [dict(zip(FEATURE_NAMES, r)) for r in rng.normal(0, 1, (200, len(FEATURE_NAMES)))]
+        )
+        path.write_bytes(pickle.dumps({"model": other.model, "scaler": other.scaler}))
+
+        loaded = AnomalyDetector(model_path=path)
+        X = _rows(20)
+        want = other.model.decision_function(other.scaler.transform(X))
+        np.testing.assert_allclose(loaded.compiled.decision_function(X), want, atol=1e-12)
+
+    def test_scores_match_sklearn_path(self):
+        detector = self._trained()
+        X = _rows(200)
+        compiled_scores = detector._ml_scores(X)
+        detector.compiled = None
+        sklearn_scores = detector._ml_scores(X)
+        for got, want in zip(compiled_scores, sklearn_scores):
+            np.testing.assert_allclose(got, want, atol=1e-12)
@@ -0,0 +1,126 @@
+"""
+Tests for GraphQL cost analysis, depth/alias limits and persisted queries.
+"""
+
+from pathlib import Path
+
+import pytest
+from ariadne import QueryType, make_executable_schema
+from ariadne.asgi import GraphQL
+from starlette.testclient import TestClient
+
+from api.graphql_limits import (
+    PersistedQueryCache,
+    PersistedQueryHTTPHandler,
+    graphql_validation_rules,
+    persisted_queries,
+    validate_with_cache,
+)
+
+SCHEMA_PATH = Path(__file__).resolve().parents[1] / "api" / "schema.graphql"
+
+
+@pytest.fixture
+def client():
+    query = QueryType()
+
+    @query.field("apps")
+    def resolve_apps(*_, **__):
+        return {"edges": [], "pageInfo": {"hasNextPage": False, "endCursor": None}}
+
+    schema = make_executable_schema(SCHEMA_PATH.read_text(), query)
+    app = GraphQL(
+        schema,
+        http_handler=PersistedQueryHTTPHandler(),
+        query_validator=validate_with_cache,
+        validation_rules=graphql_validation_rules,
+    )
+    persisted_queries.clear()
+    yield TestClient(app)
+    persisted_queries.clear()
+
+
+def _errors(response):
+    return response.json().get("errors") or []
+
+
+class TestLimits:
+    """Test cost, depth and alias rejection."""
+
+    def test_cheap_query_allowed(self, client):
+        response = client.post("/", json={"query": "{ apps(first: 5) { edges { cursor } } }"})
+        assert _errors(response) == []
+
+    def test_expensive_nested_query_rejected(self, client):
+        query = "{ apps(first: 100) { edges { node { claims { id } reviews { id } } } } }"
+        errors = _errors(client.post("/", json={"query": query}))
+        assert errors and "cost" in errors[0]["extensions"]
+
+    def test_cost_uses_variables(self, client):
+        query = "query($n: Int) { apps(first: $n) { edges { node { claims { id } } } } }"
+        assert _errors(client.post("/", json={"query": query, "variables": {"n": 2}})) == []
+        errors = _errors(client.post("/", json={"query": query, "variables": {"n": 100}}))
+        assert errors and "cost" in errors[0]["extensions"]
+
+    def test_depth_limit(self, client):
+        nested = "{ id }"
+        for _ in range(12):
+            nested = "{ edges { node " + nested + " } }"
+        errors = _errors(client.post("/", json={"query": "{ apps(first: 1) " + nested + " }"}))
+        assert any(e["extensions"].get("code") == "QUERY_TOO_DEEP" for e in errors)
+
+    def test_alias_limit(self, client):
+        fields = " ".join(f"a{i}: apps(first: 1) {{ edges {{ cursor }} }}" for i in range(20))
+        errors = _errors(client.post("/", json={"query": "{ " + fields + " }"}))
+        assert any(e["extensions"].get("code") == "TOO_MANY_ALIASES" for e in errors)
+
+
+class TestPersistedQueries:
+    """Test automatic persisted query protocol."""
+
+    def test_unknown_hash_not_found(self, client):
+        data = {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": "0" * 64}}}
+        errors = _errors(client.post("/", json=data))
+        assert errors[0]["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
+
+    def test_register_then_hash_only(self, client):
+        query = "{ apps(first: 1) { edges { cursor } } }"
+        sha = PersistedQueryCache.hash_query(query)
+        ext = {"persistedQuery": {"version": 1, "sha256Hash": sha}}
+
+        assert _errors(client.post("/", json={"query": query, "extensions": ext})) == []
+        response = client.post("/", json={"extensions": ext})
+        assert _errors(response) == []
+        assert response.json()["data"]["apps"]["edges"] == []
+
+    def test_hash_mismatch_rejected(self, client):
+        ext = {"persistedQuery": {"version": 1, "sha256Hash": "f" * 64}}
+        errors = _errors(
+            client.post("/", json={"query": "{ apps { edges { cursor } } }", "extensions": ext})
+        )
+        assert errors[0]["extensions"]["code"] == "PERSISTED_QUERY_HASH_MISMATCH"
+
+    def test_syntax_error_not_cached(self, client):
+        response = client.post("/", json={"query": "invalid query syntax"})
+        assert _errors(response)
+        assert len(persisted_queries) == 0
+
+
+class TestPersistedQueryCache:
+    """Test cache bookkeeping."""
+
+    def test_lru_eviction_drops_validation_mark(self):
+        cache = PersistedQueryCache(max_size=1)
+        _, doc = cache.resolve({"query": "{ apps { edges { cursor } } }"})
+        cache.mark_validated(doc)
+        assert cache.is_validated(doc)
+
+        cache.resolve({"query": "{ claim(id: 1) { id } }"})
+        assert len(cache) == 1
+        assert not cache.is_validated(doc)
+
+    def test_parse_is_skipped_on_hit(self):
+        cache = PersistedQueryCache()
+        _, first = cache.resolve({"query": "{ apps { edges { cursor } } }"})
+        _, second = cache.resolve({"query": "{ apps { edges { cursor } } }"})
+        assert first is second
@@ -0,0 +1,142 @@
+"""
+Tests for exported (ONNX / TorchScript) autoencoder backends.
+
+Export parity tests need PyTorch (and onnxruntime for ONNX); they are
+skipped when those are not installed.
+"""
+
+import json
+import math
+import random
+
+import numpy as np
+import pytest
+
+from ml.inference_backend import (
+    STATS_FORMAT_VERSION,
+    ExportedAutoencoder,
+    NormalizationStats,
+    load_backend,
+    stats_path,
+)
+
+
+def _stats():
+    return NormalizationStats(
+        running_mean=[50.0, 2, 1, 1, 0.5, 0.5, 100, 0.02],
+        running_std=[10.0, 1, 1, 1, 0.3, 0.3, 20, 0.01],
+        error_mean=0.4,
+        error_std=0.2,
+        anomaly_threshold=0.7,
+    )
+
+
+def _sequences(lengths, seed=0):
+    rng = random.Random(seed)
+    return [
+        [[rng.gauss(50, 10)] + [rng.random() for _ in range(7)] for _ in range(length)]
+        for length in lengths
+    ]
+
+
+class HalfBackend(ExportedAutoencoder):
+    """Reconstructs every input as half of itself."""
+
+    def __init__(self, stats):
+        super().__init__(stats)
+        self.batch_shapes = []
+
+    def _forward(self, x_norm):
+        self.batch_shapes.append(x_norm.shape)
+        return x_norm * 0.5, x_norm[:, -1, :4]
+
+
+class TestNormalizationStats:
+    """Test the stats sidecar format."""
+
+    def test_roundtrip(self, tmp_path):
+        path = stats_path(tmp_path / "model.onnx")
+        assert path.name == "model.stats.json"
+        _stats().save(path)
+        assert NormalizationStats.load(path) == _stats()
+
+    def test_version_mismatch(self, tmp_path):
+        path = tmp_path / "model.stats.json"
+        _stats().save(path)
+        data = json.loads(path.read_text())
+        data["format_version"] = STATS_FORMAT_VERSION + 1
+        path.write_text(json.dumps(data))
+        with pytest.raises(ValueError):
+            NormalizationStats.load(path)
+
+
+class TestExportedAutoencoder:
+    """Test the shared NumPy pre/post-processing."""
+
+    def test_scores_match_reference(self):
+        stats = _stats()
+        backend = HalfBackend(stats)
+        seq = _sequences([10])[0]
+        result = backend.detect_anomaly(seq, return_latent=True)
+
+        x_norm = (np.array(seq) - stats.running_mean) / (np.array(stats.running_std) + 1e-8)
+        error = float(np.mean((0.5 * x_norm) ** 2))
+        score = 1 / (1 + math.exp(-(error - stats.error_mean) / (stats.error_std + 1e-8)))
+        assert result.reconstruction_error == pytest.approx(error, rel=1e-5)
+        assert result.anomaly_score == pytest.approx(score, rel=1e-5)
+        assert result.is_anomalous == (result.anomaly_score > 0.7)
+        assert len(result.latent_vector) == 4
+
+    def test_batch_groups_by_length_and_keeps_order(self):
+        backend = HalfBackend(_stats())
+        sequences = _sequences([10, 4, 10, 7, 4])
+        batched = backend.detect_anomaly_batch(sequences)
+
+        assert sorted(shape[:2] for shape in backend.batch_shapes) == [(1, 7), (2, 4), (2, 10)]
+        for seq, got in zip(sequences, batched):
+            want = HalfBackend(_stats()).detect_anomaly(seq)
+            assert got.reconstruction_error == pytest.approx(want.reconstruction_error)
+
+    def test_unknown_backend(self, tmp_path):
+        with pytest.raises(ValueError):
+            load_backend("tensorrt", tmp_path / "model.onnx")
+
+
+@pytest.fixture(scope="module")
+def trained():
+    torch = pytest.importorskip("torch")
+    from ml.autoencoder import AgentAutoencoder
+
+    torch.manual_seed(0)
+    model = AgentAutoencoder(anomaly_threshold=0.7)
+    model.fit(_sequences([10] * 64, seed=1), epochs=2, batch_size=16)
+    return model
+
+
+class TestExportParity:
+    """Test exported backends against the eager model."""
+
+    def _check(self, model, backend):
+        np.testing.assert_allclose(
+            backend.stats.running_mean, model.running_mean.tolist(), rtol=1e-6
+        )
+        np.testing.assert_allclose(backend.stats.running_std, model.running_std.tolist(), rtol=1e-6)
+        assert backend.stats.error_mean == pytest.approx(float(model.error_mean), rel=1e-6)
+        assert backend.stats.error_std == pytest.approx(float(model.error_std), rel=1e-6)
+
+        for seq in _sequences([10, 10, 6], seed=2):
+            want = model.detect_anomaly(seq)
+            got = backend.detect_anomaly(seq)
+            assert got.reconstruction_error == pytest.approx(want.reconstruction_error, rel=1e-4)
+            assert got.anomaly_score == pytest.approx(want.anomaly_score, abs=1e-5)
+
+    def test_onnx(self, trained, tmp_path):
+        pytest.importorskip("onnxruntime")
+        path = tmp_path / "autoencoder.onnx"
+        trained.export_onnx(path)
+        self._check(trained, load_backend("onnx", path))
+
+    def test_torchscript(self, trained, tmp_path):
+        path = tmp_path / "autoencoder.pt"
+        trained.export_torchscript(path)
+        self._check(trained, load_backend("torchscript", path))
@@ -0,0 +1,155 @@
+"""
+Tests for the autoencoder micro-batching inference queue.
+
+The padded-batch parity test needs PyTorch and is skipped without it.
+"""
+
+import asyncio
+import random
+import time
+
+import pytest
+
+from ml.autoencoder import AnomalyResult, StatisticalAutoencoder
+from ml.inference_queue import InferenceQueue
+
+
+class FakeModel:
+    def __init__(self, fail=False):
+        self.batch_sizes = []
+        self.fail = fail
+
+    def detect_anomaly_batch(self, sequences, return_latent=False):
+        if self.fail:
+            raise RuntimeError("forward failed")
+        self.batch_sizes.append(len(sequences))
+        return [
+            AnomalyResult(
+                anomaly_score=seq[0][0] / 100,
+                reconstruction_error=float(len(seq)),
+                threshold=0.7,
+                is_anomalous=False,
+                latent_vector=[seq[0][0]] if return_latent else None,
+            )
+            for seq in sequences
+        ]
+
+
+def _gather(batcher, sequences, **kwargs):
+    async def run():
+        return await asyncio.gather(*(batcher.submit(s, **kwargs) for s in sequences))
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def model():
+    return FakeModel()
+
+
+class TestInferenceQueue:
+    """Test batching, scattering and failure handling."""
+
+    def test_concurrent_requests_share_a_batch(self, model):
+        batcher = InferenceQueue(model, max_batch=64, max_wait_ms=100)
+        try:
+            sequences = [[[float(i)] * 8] * 3 for i in range(40)]
+            results = _gather(batcher, sequences)
+        finally:
+            batcher.close()
+
+        assert [r.anomaly_score for r in results] == [i / 100 for i in range(40)]
+        assert sum(model.batch_sizes) == 40
+        assert len(model.batch_sizes) <= 2
+
+    def test_max_batch_respected(self, model):
+        batcher = InferenceQueue(model, max_batch=8, max_wait_ms=100)
+        try:
+            _gather(batcher, [[[1.0] * 8]] * 30)
+        finally:
+            batcher.close()
+        assert max(model.batch_sizes) <= 8
+        assert sum(model.batch_sizes) == 30
+
+    def test_lone_request_not_held_past_deadline(self, model):
+        batcher = InferenceQueue(model, max_batch=64, max_wait_ms=20)
+        try:
+            start = time.perf_counter()
+            batcher.detect_anomaly([[5.0] * 8])
+            assert time.perf_counter() - start < 1.0
+        finally:
+            batcher.close()
+        assert model.batch_sizes == [1]
+
+    def test_latent_requests_grouped_separately(self, model):
+        batcher = InferenceQueue(model, max_batch=64, max_wait_ms=50)
+        try:
+            futures = [batcher.submit_nowait([[float(i)] * 8], i % 2 == 0) for i in range(6)]
+            results = [f.result(timeout=5) for f in futures]
+        finally:
+            batcher.close()
+        assert [r.latent_vector is not None for r in results] == [i % 2 == 0 for i in range(6)]
+
+    def test_errors_reach_every_caller(self):
+        batcher = InferenceQueue(FakeModel(fail=True), max_wait_ms=10)
+        try:
+            futures = [batcher.submit_nowait([[1.0] * 8]) for _ in range(3)]
+            for future in futures:
+                with pytest.raises(RuntimeError):
+                    future.result(timeout=5)
+        finally:
+            batcher.close()
+
+    def test_model_lock_pauses_inference(self, model):
+        batcher = InferenceQueue(model, max_wait_ms=1)
+        try:
+            with batcher.model_lock:
+                future = batcher.submit_nowait([[1.0] * 8])
+                time.sleep(0.05)
+                assert not future.done()
+            assert future.result(timeout=5).anomaly_score == 0.01
+        finally:
+            batcher.close()
+
+    def test_close_drains_queue(self, model):
+        batcher = InferenceQueue(model, max_wait_ms=1)
+        futures = [batcher.submit_nowait([[1.0] * 8]) for _ in range(5)]
+        batcher.close()
+        assert all(f.done() for f in futures)
+
+    def test_statistical_fallback_matches_direct(self):
+        fallback = StatisticalAutoencoder()
+        rng = random.Random(3)
+        sequences = [[[rng.gauss(50, 10) for _ in range(8)] for _ in range(5)] for _ in range(10)]
+        fallback.fit(sequences)
+
+        batcher = InferenceQueue(fallback, max_wait_ms=20)
+        try:
+            results = _gather(batcher, sequences)
+        finally:
+            batcher.close()
+        assert [r.anomaly_score for r in results] == [
+            fallback.detect_anomaly(s).anomaly_score for s in sequences
+        ]
+
+
+class TestPaddedBatch:
+    """Test that a padded LSTM batch matches batch-of-1 inference."""
+
+    def test_mixed_lengths_match_single(self):
+        torch = pytest.importorskip("torch")
+        from ml.autoencoder import AgentAutoencoder
+
+        torch.manual_seed(0)
+        model = AgentAutoencoder()
+        rng = random.Random(1)
+        sequences = [
+            [[rng.gauss(0, 1) for _ in range(8)] for _ in range(length)]
+            for length in (10, 4, 10, 7, 1)
+        ]
+
+        batched = model.detect_anomaly_batch(sequences, return_latent=True)
+        for seq, got in zip(sequences, batched):
+            want = model.detect_anomaly(seq, return_latent=True)
+            assert got.reconstruction_error == pytest.approx(want.reconstruction_error, rel=1e-5)
+            assert got.latent_vector == pytest.approx(want.latent_vector, rel=1e-4, abs=1e-6)
@@ -0,0 +1,227 @@
+"""
+Tests for Merkle-batched document anchoring.
+"""
+
+import hashlib
+import time
+
+import pytest
+
+from blockchain.l2.anchor_client import AnchorError, FabricAnchorClient, LocalAnchorClient
+from blockchain.l2.merkle_batcher import (
+    IncrementalMerkleTree,
+    InclusionProof,
+    MerkleBatcher,
+    ProofStore,
+    leaf_hash,
+    node_hash,
+)
+from blockchain.sdk.fabric_gateway import AsyncFabricClient, LocalPeerConnection
+
+
+def _doc(i):
+    return f"doc_{i}", hashlib.sha256(f"content {i}".encode()).hexdigest()
+
+
+def _naive_root(leaves):
+    level = list(leaves)
+    while len(level) > 1:
+        pairs = [level[i : i + 2] for i in range(0, len(level), 2)]
+        level = [node_hash(*p) if len(p) == 2 else p[0] for p in pairs]
+    return level[0]
+
+
+class FlakyAnchorClient(LocalAnchorClient):
+    def __init__(self, path):
+        super().__init__(path)
+        self.fail = False
+
+    def anchor_root(self, batch_id, merkle_root, leaf_count):
+        if self.fail:
+            raise AnchorError("ledger unavailable")
+        return super().anchor_root(batch_id, merkle_root, leaf_count)
+
+
+@pytest.fixture
+def batcher(tmp_path):
+    return MerkleBatcher(
+        anchor_client=FlakyAnchorClient(str(tmp_path / "anchors.jsonl")),
+        proof_store=ProofStore(str(tmp_path / "proofs")),
+        autostart=False,
+    )
+
+
+class TestIncrementalMerkleTree:
+    """Test the append-only tree against a from-scratch build."""
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 13, 64])
+    def test_root_and_proofs(self, size):
+        tree = IncrementalMerkleTree()
+        leaves = [leaf_hash(*_doc(i)) for i in range(size)]
+        for leaf in leaves:
+            tree.append(leaf)
+        assert tree.root == _naive_root(leaves)
+
+        for i in range(size):
+            proof = InclusionProof(*_doc(i), i, tree.proof(i), tree.root, "b")
+            assert proof.verify()
+
+
+class TestMerkleBatcher:
+    """Test batching, anchoring and proof storage."""
+
+    def test_one_anchor_per_batch(self, batcher):
+        entries = [batcher.add(*_doc(i), user_id="u1") for i in range(10)]
+        receipt = batcher.flush()
+
+        assert receipt.leaf_count == 10
+        assert len(batcher.anchor_client._load()) == 1
+        assert {e.batch_id for e in entries} == {receipt.batch_id}
+        for i in range(10):
+            assert batcher.verify(*_doc(i))
+        assert not batcher.verify(_doc(0)[0], _doc(1)[1])
+        assert batcher.flush() is None
+
+    def test_proofs_survive_reload(self, batcher, tmp_path):
+        batcher.add(*_doc(0))
+        batcher.flush()
+        stored = ProofStore(str(tmp_path / "proofs")).get("doc_0")
+        assert stored.verify(_doc(0)[1])
+        assert LocalAnchorClient(str(tmp_path / "anchors.jsonl")).get_anchor(stored.batch_id)
+
+    def test_size_window_wakes_flusher(self, tmp_path):
+        batcher = MerkleBatcher(
+            anchor_client=LocalAnchorClient(str(tmp_path / "anchors.jsonl")),
+            proof_store=ProofStore(str(tmp_path / "proofs")),
+            max_batch=3,
+            flush_interval=60,
+        )
+        try:
+            for i in range(3):
+                batcher.add(*_doc(i))
+            for _ in range(100):
+                if batcher.get_proof("doc_2"):
+                    break
+                time.sleep(0.02)
+            assert batcher.verify(*_doc(2))
+        finally:
+            batcher.close()
+
+    def test_failed_anchor_is_retried(self, batcher):
+        batcher.add(*_doc(0))
+        batcher.anchor_client.fail = True
+        with pytest.raises(AnchorError):
+            batcher.flush()
+        batcher.add(*_doc(1))
+        assert batcher.pending() == 2
+
+        batcher.anchor_client.fail = False
+        anchored = []
+        batcher.on_anchored = lambda receipt, items: anchored.extend(items)
+        receipt = batcher.flush()
+        assert receipt.leaf_count == 2
+        assert [entry.document_id for entry, _ in anchored] == ["doc_0", "doc_1"]
+        assert all(entry.batch_id == receipt.batch_id for entry, _ in anchored)
+        assert batcher.verify(*_doc(0)) and batcher.verify(*_doc(1))
+
+    def test_fabric_anchoring_goes_through_pooled_client(self, tmp_path):
+        batches = []
+
+        class CountingPeer(LocalPeerConnection):
+            async def submit(self, function, invocations):
+                batches.append([inv.args[0] for inv in invocations])
+                return await super().submit(function, invocations)
+
+        ledger = str(tmp_path / "ledger.db")
+        anchor_client = FabricAnchorClient(
+            AsyncFabricClient(connection_factory=lambda: CountingPeer(ledger), pool_size=1)
+        )
+        batcher = MerkleBatcher(
+            anchor_client=anchor_client,
+            proof_store=ProofStore(str(tmp_path / "proofs")),
+            autostart=False,
+        )
+        try:
+            docs = [_doc(i) for i in range(3)]
+            for doc in docs:
+                batcher.add(*doc)
+            receipt = batcher.flush()
+            assert receipt.backend == "fabric"
+            assert batches == [[f"batch_{receipt.batch_id}"]]
+            assert all(batcher.verify(*doc) for doc in docs)
+            assert anchor_client.get_anchor(receipt.batch_id).tx_id == receipt.tx_id
+        finally:
+            batcher.close()
+            anchor_client.close()
+
+
+class TestDurability:
+    """Test the pending journal and on_anchored retries."""
+
+    def _batcher(self, tmp_path, **kwargs):
+        return MerkleBatcher(
+            anchor_client=LocalAnchorClient(str(tmp_path / "anchors.jsonl")),
+            proof_store=ProofStore(str(tmp_path / "proofs")),
+            autostart=False,
+            **kwargs,
+        )
+
+    def test_pending_documents_replayed_after_restart(self, tmp_path):
+        crashed = self._batcher(tmp_path)
+        crashed.add(*_doc(0), user_id="u1")
+        crashed.add(*_doc(1), user_id="u2")
+        # No flush: the process dies with both documents queued, releasing its lock
+        crashed.journal.close()
+
+        restarted = self._batcher(tmp_path)
+        assert restarted.pending() == 2
+        anchored = []
+        restarted.on_anchored = lambda receipt, items: anchored.extend(items)
+        restarted.flush()
+        assert [entry.context["user_id"] for entry, _ in anchored] == ["u1", "u2"]
+        assert restarted.verify(*_doc(1))
+
+        assert self._batcher(tmp_path).pending() == 0
+
+    def test_failed_callback_is_retried(self, tmp_path):
+        calls = []
+
+        def on_anchored(receipt, items):
+            calls.append([entry.document_id for entry, _ in items])
+            if len(calls) == 1:
+                raise RuntimeError("neo4j unavailable")
+
+        batcher = self._batcher(tmp_path, on_anchored=on_anchored)
+        batcher.add(*_doc(0))
+        batcher.flush()
+        assert batcher.unrecorded() == 1
+        # Still journaled: a restart now would re-anchor and re-record it
+        assert [r["document_id"] for r in batcher.journal.load()] == ["doc_0"]
+
+        batcher.flush()
+        assert calls == [["doc_0"], ["doc_0"]]
+        assert batcher.unrecorded() == 0
+        assert batcher.journal.load() == []
+
+    def test_workers_keep_their_own_journals(self, tmp_path):
+        # The scenario from the shared-journal bug: A's flush must not drop B's document
+        a, b = self._batcher(tmp_path), self._batcher(tmp_path)
+        a.add(*_doc(0))
+        b.add(*_doc(1))
+        a.flush()
+        assert a.journal.load() == []
+        assert [r["document_id"] for r in b.journal.load()] == ["doc_1"]
+
+        b.journal.close()
+        restarted = self._batcher(tmp_path)
+        assert restarted.journal.adopted == 1 and restarted.pending() == 1
+
+    def test_orphan_is_replayed_once(self, tmp_path):
+        crashed = self._batcher(tmp_path)
+        crashed.add(*_doc(0))
+        crashed.journal.close()
+
+        first, second = self._batcher(tmp_path), self._batcher(tmp_path)
+        assert (first.pending(), second.pending()) == (1, 0)
+        # A live worker's journal is never adopted
+        assert self._batcher(tmp_path).pending() == 0
@@ -0,0 +1,166 @@
+"""
+Tests for the versioned model registry and hot-swap watcher.
+"""
+
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from ml import anomaly_detector, autoencoder, inference_queue
+from ml.anomaly_detector import FEATURE_NAMES, AnomalyDetector, swap_detector
+from ml.autoencoder import StatisticalAutoencoder
+from ml.inference_queue import InferenceQueue, swap_autoencoder
+from ml.model_registry import (
+    ModelRegistry,
+    ModelWatcher,
+    hash_directory,
+    load_detector_version,
+    main,
+    publish_detector,
+)
+
+
+def _publish(registry, tag, **metrics):
+    staging = registry.root / f".staging-{tag}"
+    staging.mkdir(parents=True)
+    (staging / "model.json").write_text(json.dumps({"tag": tag}))
+    return registry.publish(staging, {"model_type": "test", "tag": tag}, metrics=metrics)
+
+
+def _load(path):
+    return json.loads((path / "model.json").read_text())["tag"]
+
+
+class TestModelRegistry:
+    """Test versions, hashes, activation and rollback."""
+
+    def test_publish_records_hash_and_metrics(self, tmp_path):
+        registry = ModelRegistry(tmp_path)
+        entry = _publish(registry, "a", final_loss=0.5)
+
+        assert entry["version"] == "v0001"
+        assert entry["metrics"] == {"final_loss": 0.5}
+        assert entry["sha256"] == hash_directory(tmp_path / "v0001")
+        metadata = json.loads((tmp_path / "v0001" / "metadata.json").read_text())
+        assert metadata["version"] == "v0001"
+        assert registry.active()[0] == "v0001"
+
+    def test_rollback_walks_history(self, tmp_path):
+        registry = ModelRegistry(tmp_path)
+        for tag in "abc":
+            _publish(registry, tag)
+
+        assert registry.rollback()["version"] == "v0002"
+        assert registry.rollback()["version"] == "v0001"
+        with pytest.raises(ValueError):
+            registry.rollback()
+        assert registry.rollback("v0003")["version"] == "v0003"
+
+    def test_publish_without_activate(self, tmp_path):
+        registry = ModelRegistry(tmp_path)
+        _publish(registry, "a")
+        staging = tmp_path / ".staging-b"
+        staging.mkdir()
+        registry.publish(staging, {}, activate=False)
+        assert registry.active()[0] == "v0001"
+        assert registry.activate("v0002")["version"] == "v0002"
+
+    def test_verify_detects_tampering(self, tmp_path):
+        registry = ModelRegistry(tmp_path)
+        entry = _publish(registry, "a")
+        registry.verify("v0001", entry)
+        (tmp_path / "v0001" / "model.json").write_text("{}")
+        with pytest.raises(ValueError, match="hash mismatch"):
+            registry.verify("v0001", entry)
+
+    def test_concurrent_publishers_get_distinct_versions(self, tmp_path):
+        registry = ModelRegistry(tmp_path)
+        threads = [threading.Thread(target=_publish, args=(registry, str(i))) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(registry.read_manifest()["versions"]) == [f"v{i:04d}" for i in range(1, 9)]
+
+    def test_cli_rollback(self, tmp_path, capsys):
+        registry = ModelRegistry(tmp_path)
+        _publish(registry, "a")
+        _publish(registry, "b")
+        main(["rollback", "autoencoder", "--root", str(tmp_path)])
+        assert "v0001" in capsys.readouterr().out
+        assert registry.active()[0] == "v0001"
+
+
+class TestModelWatcher:
+    """Test that activation changes are swapped in once, and failures keep the old model."""
+
+    def test_swaps_on_change_only(self, tmp_path):
+        registry = ModelRegistry(tmp_path)
+        live = []
+        watcher = ModelWatcher(interval=60)
+        watcher.watch("m", registry, _load, live.append)
+
+        assert watcher.check() == []  # nothing published yet
+        _publish(registry, "a")
+        assert watcher.check() == ["m"]
+        assert watcher.check() == []
+        _publish(registry, "b")
+        registry.rollback()
+        assert watcher.check() == []  # active is back to the loaded version
+        registry.rollback("v0002")
+        watcher.check()
+        assert live == ["a", "b"]
+        assert watcher.status()["models"] == {"m": "v0002"}
+
+    def test_bad_version_keeps_current(self, tmp_path):
+        registry = ModelRegistry(tmp_path)
+        live = []
+        watcher = ModelWatcher(interval=60)
+        watcher.watch("m", registry, _load, live.append)
+        _publish(registry, "a")
+        watcher.check()
+
+        _publish(registry, "b")
+        (tmp_path / "v0002" / "model.json").write_text("tampered")
+        assert watcher.check() == []
+        assert live == ["a"]
+        assert watcher.status()["errors"] == 1
+
+
+class TestSwaps:
+    """Test the global swap hooks for the autoencoder and detector."""
+
+    def test_swap_autoencoder_updates_queue(self, monkeypatch):
+        old, new = StatisticalAutoencoder(), StatisticalAutoencoder()
+        queue = InferenceQueue(old, max_wait_ms=1)
+        monkeypatch.setattr(autoencoder, "_autoencoder", old)
+        monkeypatch.setattr(inference_queue, "_inference_queue", queue)
+        try:
+            swap_autoencoder(new)
+            assert autoencoder.get_autoencoder() is new
+            assert queue.model is new
+        finally:
+            queue.close()
+
+    def test_detector_round_trip_keeps_agent_state(self, tmp_path, monkeypatch):
+        pytest.importorskip("sklearn")
+        trained = AnomalyDetector(use_ml=True)
+        rng = np.random.default_rng(0)
+        trained.train(
+            [dict(zip(FEATURE_NAMES, row)) for row in rng.normal(10, 3, (150, len(FEATURE_NAMES)))]
+        )
+        registry = ModelRegistry(tmp_path)
+        publish_detector(trained, registry, metrics={"samples": 150})
+
+        current = AnomalyDetector(use_ml=False)
+        current.analyze_proof({"publicSignals": ["n"]}, "agent-1")
+        monkeypatch.setattr(anomaly_detector, "_detector", current)
+
+        loaded = load_detector_version(registry.active()[1])
+        swap_detector(loaded)
+
+        assert anomaly_detector.get_detector() is loaded
+        assert loaded.compiled is not None
+        assert loaded.get_stats()["total_proofs_analyzed"] == 1
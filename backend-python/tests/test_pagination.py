@@ -0,0 +1,82 @@
+"""
+Tests for GraphQL cursor pagination helpers.
+"""
+
+import pytest
+from graphql import build_schema, graphql_sync
+
+from api.pagination import (
+    MAX_PAGE_SIZE,
+    clamp_page_size,
+    decode_cursor,
+    encode_cursor,
+    selected_fields,
+)
+
+SCHEMA = build_schema(
+    """
+    type Review { id: ID! }
+    type Claim { id: ID! }
+    type App { id: ID! name: String claims: [Claim!]! reviews: [Review!]! }
+    type AppEdge { cursor: String! node: App! }
+    type AppConnection { edges: [AppEdge!]! }
+    type Query { apps: AppConnection! }
+    """
+)
+
+
+def _capture_fields(source: str) -> set:
+    captured = {}
+
+    def resolve_apps(_, info):
+        captured["fields"] = selected_fields(info, "edges", "node")
+        return {"edges": []}
+
+    SCHEMA.query_type.fields["apps"].resolve = resolve_apps
+    result = graphql_sync(SCHEMA, source)
+    assert result.errors is None
+    return captured["fields"]
+
+
+class TestCursors:
+    """Test opaque cursor encoding."""
+
+    def test_round_trip(self):
+        cursor = encode_cursor("app_123")
+        assert "app_123" not in cursor
+        assert decode_cursor(cursor) == "app_123"
+
+    def test_none_cursor(self):
+        assert decode_cursor(None) is None
+        assert decode_cursor("") is None
+
+    def test_malformed_cursor_rejected(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_clamp_page_size(self):
+        assert clamp_page_size(0) == 1
+        assert clamp_page_size(10) == 10
+        assert clamp_page_size(10_000) == MAX_PAGE_SIZE
+
+
+class TestSelectedFields:
+    """Test projection detection from the GraphQL selection set."""
+
+    def test_scalar_only_selection(self):
+        fields = _capture_fields("{ apps { edges { node { id name } } } }")
+        assert fields == {"id", "name"}
+
+    def test_nested_list_selection(self):
+        fields = _capture_fields("{ apps { edges { node { id claims { id } } } } }")
+        assert "claims" in fields
+        assert "reviews" not in fields
+
+    def test_fragments_are_flattened(self):
+        fields = _capture_fields(
+            """
+            fragment AppBits on App { reviews { id } }
+            { apps { edges { node { id ...AppBits ... on App { name } } } } }
+            """
+        )
+        assert fields == {"id", "reviews", "name"}
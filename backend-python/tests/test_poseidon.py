@@ -0,0 +1,188 @@
+"""
+Tests for native Poseidon hashing and the sparse Poseidon Merkle tree.
+"""
+
+import json
+import random
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+from zkp.poseidon import (
+    FIELD_MODULUS,
+    N_ROUNDS_F,
+    N_ROUNDS_P,
+    field_to_hex,
+    poseidon,
+    poseidon_hex,
+    poseidon_many,
+    poseidon_params,
+)
+from zkp.sparse_merkle import SparseMerkleTree
+
+ZKP_DIR = Path(__file__).resolve().parent.parent / "zkp"
+
+# Reference outputs of circomlibjs poseidon() / circomlib Poseidon(n)
+CIRCOMLIB_VECTORS = [
+    ([1], 18586133768512220936620570745912940619677854269274689475585506675881198879027),
+    ([1, 2], 7853200120776062878684798364095072458815029376092732009249414926327459813530),
+    ([3, 4], 14763215145315200506921711489642608356394854266165572616578112107564877678998),
+    ([1, 2, 3], 6542985608222806190361240322586112750744169038454362455181422643027100751666),
+    ([1, 2, 3, 4], 18821383157269793795438455681495246036402687001665670618754263018637548127333),
+    (
+        [1, 2, 0, 0, 0],
+        1018317224307729531995786483840663576608797660851238720571059489595066344487,
+    ),
+    (
+        [1, 2, 3, 4, 5, 6],
+        20400040500897583745843009878988256314335038853985262692600694741116813247201,
+    ),
+]
+
+JS_AVAILABLE = (
+    shutil.which("node") is not None and (ZKP_DIR / "node_modules" / "circomlibjs").exists()
+)
+
+
+def _reference_poseidon(inputs):
+    """Unoptimised rounds straight from the reference parameters."""
+    p = FIELD_MODULUS
+    t = len(inputs) + 1
+    constants, mds = poseidon_params(t)
+    rounds_p = N_ROUNDS_P[t - 2]
+    state = [0] + list(inputs)
+    for r in range(N_ROUNDS_F + rounds_p):
+        state = [(v + constants[r * t + i]) % p for i, v in enumerate(state)]
+        full = r < N_ROUNDS_F // 2 or r >= N_ROUNDS_F // 2 + rounds_p
+        state = [pow(v, 5, p) if full or i == 0 else v for i, v in enumerate(state)]
+        state = [sum(m * v for m, v in zip(row, state)) % p for row in mds]
+    return state[0]
+
+
+class TestPoseidon:
+    """Test Poseidon against circomlib outputs."""
+
+    @pytest.mark.parametrize("inputs,expected", CIRCOMLIB_VECTORS)
+    def test_matches_circomlib(self, inputs, expected):
+        assert poseidon(inputs) == expected
+
+    def test_input_encodings(self):
+        expected = poseidon([1, 2])
+        assert poseidon(["0x01", "2"]) == expected
+        assert poseidon([b"\x01", FIELD_MODULUS + 2]) == expected
+        assert poseidon_hex([1, 2]) == field_to_hex(expected)
+
+    def test_many_matches_scalar(self):
+        rows = [[i, i * 7 + 1, 3] for i in range(5)]
+        assert poseidon_many(rows) == [poseidon(row) for row in rows]
+        with pytest.raises(ValueError):
+            poseidon_many([[1], [1, 2]])
+
+    def test_optimised_rounds_match_reference(self):
+        rng = random.Random(46)
+        for width in range(1, 17):
+            inputs = [rng.randrange(FIELD_MODULUS) for _ in range(width)]
+            assert poseidon(inputs) == _reference_poseidon(inputs)
+
+    def test_rejects_unsupported_widths(self):
+        with pytest.raises(ValueError):
+            poseidon([])
+        with pytest.raises(ValueError):
+            poseidon(list(range(17)))
+
+    @pytest.mark.skipif(not JS_AVAILABLE, reason="node and circomlibjs required")
+    def test_parity_with_js_helper(self):
+        rng = random.Random(46)
+        for width in (1, 2, 3, 4):
+            inputs = [rng.randrange(FIELD_MODULUS) for _ in range(width)]
+            result = subprocess.run(
+                ["node", "poseidon-hash.js", "--inputs", ",".join(map(str, inputs))],
+                cwd=ZKP_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            assert int(json.loads(result.stdout)["poseidon"], 16) == poseidon(inputs)
+
+    @pytest.mark.skipif(not JS_AVAILABLE, reason="node and circomlibjs required")
+    def test_faster_than_js_helper(self):
+        rows = [[i, i + 1] for i in range(200)]
+        poseidon(rows[0])
+        start = time.perf_counter()
+        poseidon_many(rows)
+        native = (time.perf_counter() - start) / len(rows)
+
+        start = time.perf_counter()
+        subprocess.run(
+            ["node", "poseidon-hash.js", "--inputs", "1,2"],
+            cwd=ZKP_DIR,
+            capture_output=True,
+            check=True,
+        )
+        assert native < time.perf_counter() - start
+
+
+def _full_root(leaves, depth):
+    level = leaves + [0] * ((1 << depth) - len(leaves))
+    for _ in range(depth):
+        level = [poseidon([level[i], level[i + 1]]) for i in range(0, len(level), 2)]
+    return level[0]
+
+
+class TestSparseMerkleTree:
+    """Test the sparse tree against a dense build and the circuit's path rules."""
+
+    def test_root_matches_dense_tree(self):
+        leaves = [11, 22, 33, 44, 55]
+        tree = SparseMerkleTree(depth=3)
+        tree.insert_many(leaves)
+        assert tree.root == _full_root(leaves, 3)
+
+        tree.update(6, 77)
+        assert tree.root == _full_root(leaves + [0, 77], 3)
+        assert len(tree) == 7
+
+    def test_paths_verify(self):
+        tree = SparseMerkleTree(depth=4)
+        indices = tree.insert_many(["0xaa", "0xbb", "0xcc"])
+        for index in indices:
+            elements, path_indices = tree.path(index)
+            assert SparseMerkleTree.verify_path(
+                tree.node(0, index), tree.root, elements, path_indices
+            )
+        elements, path_indices = tree.path(2)
+        assert path_indices == [0, 1, 0, 0]
+        assert not SparseMerkleTree.verify_path(0xBB, tree.root, elements, path_indices)
+
+    def test_proof_payload_for_authenticity_circuit(self):
+        tree = SparseMerkleTree()
+        digest = "ab" * 32
+        index = tree.insert(digest)
+        proof = tree.proof(index)
+        assert len(proof["pathElementsHex"]) == len(proof["pathIndices"]) == 16
+        assert int(proof["leafHex"], 16) == int(digest, 16) % FIELD_MODULUS
+        assert proof["rootHex"] == tree.root_hex
+        assert proof["pathElementsHex"][1] == field_to_hex(tree.zeros[1])
+        assert SparseMerkleTree.verify_path(
+            proof["leafHex"], proof["rootHex"], proof["pathElementsHex"], proof["pathIndices"]
+        )
+
+    def test_stores_only_non_default_nodes(self):
+        tree = SparseMerkleTree()
+        tree.insert_many([1, 2, 3])
+        # Leaves 0-2, their two parents, then one node per level up to the root
+        assert tree.stored_nodes() == 3 + 2 + 15
+        tree.update_many({0: 0, 1: 0, 2: 0})
+        assert tree.stored_nodes() == 0
+        assert tree.root == tree.zeros[16]
+
+    def test_bounds(self):
+        tree = SparseMerkleTree(depth=2)
+        tree.insert_many([1, 2, 3, 4])
+        with pytest.raises(IndexError):
+            tree.insert(5)
+        with pytest.raises(IndexError):
+            tree.path(4)
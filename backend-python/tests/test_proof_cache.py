@@ -0,0 +1,197 @@
+"""
+Tests for the content-addressed zkML proof cache.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from ml import autoencoder
+from ml.autoencoder import StatisticalAutoencoder
+from ml.deepprove_integration import DeepProveZKML
+from ml.proof_cache import ProofCache, feature_digest, model_fingerprint, proof_key
+from ml.zkml_prover import ZKMLProver
+
+FEATURES = [[50.0, 1.0, 0.5, 0.2, 0.1, 0.3, 100.0, 0.02]] * 10
+
+
+class CountingAutoencoder(StatisticalAutoencoder):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def detect_anomaly(self, features, return_latent=False):
+        self.calls += 1
+        return super().detect_anomaly(features, return_latent)
+
+
+@pytest.fixture
+def live_model(monkeypatch):
+    model = CountingAutoencoder()
+    monkeypatch.setattr(autoencoder, "_autoencoder", model)
+    return model
+
+
+class TestKeys:
+    """Test canonical feature digests and model fingerprints."""
+
+    def test_feature_digest_is_canonical(self):
+        as_ints = [[1, 2], [3, 4]]
+        assert feature_digest(as_ints) == feature_digest([[1.0, 2.0], [3.0, 4.0]])
+        assert feature_digest(as_ints) == feature_digest(np.array(as_ints, dtype=np.float32))
+        assert feature_digest([[0.0]]) == feature_digest([[-0.0]])
+        assert feature_digest(as_ints) != feature_digest([[1, 2, 3, 4]])
+        assert feature_digest(as_ints) != feature_digest([[1, 2], [3, 5]])
+
+    def test_threshold_and_model_change_key(self):
+        base = proof_key("ns", "m1", FEATURES, 800)
+        assert base == proof_key("ns", "m1", FEATURES, 800)
+        assert base != proof_key("ns", "m1", FEATURES, 801)
+        assert base != proof_key("ns", "m2", FEATURES, 800)
+        assert base != proof_key("other", "m1", FEATURES, 800)
+
+    def test_model_fingerprint_tracks_weights(self):
+        a, b = StatisticalAutoencoder(), StatisticalAutoencoder()
+        assert model_fingerprint(a) == model_fingerprint(b)
+        b.mean, b.std = [1.0] * 8, [2.0] * 8
+        c = StatisticalAutoencoder()
+        c.mean, c.std = [1.0] * 8, [2.0] * 8
+        assert model_fingerprint(b) != model_fingerprint(a)
+        assert model_fingerprint(b) == model_fingerprint(c)
+
+
+class TestProofCache:
+    """Test persistence, eviction and coalescing."""
+
+    def test_persists_across_instances(self, tmp_path):
+        ProofCache(tmp_path).put("k", {"proof": [1, 2]})
+        reopened = ProofCache(tmp_path)
+        assert reopened.get("k") == {"proof": [1, 2]}
+        assert reopened.stats()["entries"] == 1
+
+    def test_lru_eviction_by_count(self, tmp_path):
+        cache = ProofCache(tmp_path, max_entries=2)
+        cache.put("a", {"v": 1})
+        cache.put("b", {"v": 2})
+        cache.get("a")  # b is now least recently used
+        cache.put("c", {"v": 3})
+        assert cache.get("b") is None
+        assert cache.get("a") == {"v": 1}
+        assert cache.evictions == 1
+        assert not (tmp_path / "b.json").exists()
+
+    def test_eviction_by_bytes(self, tmp_path):
+        cache = ProofCache(tmp_path, max_bytes=100)
+        for i in range(5):
+            cache.put(f"k{i}", {"blob": "x" * 30})
+        assert cache.stats()["bytes"] <= 100
+        assert cache.get("k4") is not None
+
+    def test_ttl(self, tmp_path):
+        cache = ProofCache(tmp_path, ttl=60)
+        cache.put("k", {"v": 1})
+        old = time.time() - 120
+        os.utime(tmp_path / "k.json", (old, old))
+        assert cache.get("k") is None
+
+    def test_disabled(self, tmp_path):
+        cache = ProofCache(tmp_path / "off", max_entries=0)
+        value, cached = cache.get_or_compute("k", lambda: ({"v": 1}, True))
+        assert (value, cached) == ({"v": 1}, False)
+        assert cache.get("k") is None
+
+    def test_uncacheable_results_are_not_stored(self, tmp_path):
+        cache = ProofCache(tmp_path)
+        cache.get_or_compute("k", lambda: ({"v": 1}, False))
+        assert cache.get("k") is None
+
+    def test_concurrent_requests_coalesce(self, tmp_path):
+        cache = ProofCache(tmp_path)
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"v": 42}, True
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+            for _ in range(4)
+        ]
+        for t in followers:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in [leader, *followers]:
+            t.join(5)
+
+        assert len(calls) == 1
+        assert [v for v, _ in results] == [{"v": 42}] * 5
+        assert cache.misses == 1
+        assert cache.hits + cache.coalesced == 4
+
+    def test_errors_reach_waiters_and_are_not_cached(self, tmp_path):
+        cache = ProofCache(tmp_path)
+
+        def fail():
+            raise RuntimeError("prover crashed")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute("k", fail)
+        value, cached = cache.get_or_compute("k", lambda: ({"v": 1}, True))
+        assert (value, cached) == ({"v": 1}, False)
+
+
+class TestProvers:
+    """Test that repeated proofs skip inference and proving."""
+
+    def test_zkml_prover_memoizes(self, tmp_path, live_model):
+        prover = ZKMLProver(circuit_dir=tmp_path)
+        first = prover.prove_anomaly_threshold(FEATURES, threshold=0.8)
+        second = prover.prove_anomaly_threshold(FEATURES, threshold=0.8)
+        prover.prove_anomaly_threshold(FEATURES, threshold=0.6)
+
+        assert second.to_dict() == first.to_dict()
+        assert live_model.calls == 2
+        assert prover.proof_cache.stats()["hits"] == 1
+
+    def test_swapped_model_misses(self, tmp_path, live_model, monkeypatch):
+        prover = ZKMLProver(circuit_dir=tmp_path)
+        prover.prove_anomaly_threshold(FEATURES, threshold=0.8)
+
+        retrained = CountingAutoencoder()
+        retrained.mean, retrained.std = [1.0] * 8, [1.0] * 8
+        monkeypatch.setattr(autoencoder, "_autoencoder", retrained)
+        prover.prove_anomaly_threshold(FEATURES, threshold=0.8)
+        assert retrained.calls == 1
+
+    def test_zkml_mock_proof_not_served_after_compile(self, tmp_path, live_model, monkeypatch):
+        prover = ZKMLProver(circuit_dir=tmp_path)
+        mock = prover.prove_anomaly_threshold(FEATURES, threshold=0.8)
+
+        prover._circuit_compiled = True
+        monkeypatch.setattr(prover, "deepprove_path", tmp_path)
+        monkeypatch.setattr(
+            prover, "_generate_deepprove_proof", lambda *args: {"protocol": "groth16"}
+        )
+        real = prover.prove_anomaly_threshold(FEATURES, threshold=0.8)
+        assert real.proof == {"protocol": "groth16"} != mock.proof
+        assert live_model.calls == 2
+
+    def test_deepprove_memoizes(self, tmp_path, live_model):
+        zkml = DeepProveZKML(deepprove_path=tmp_path / "missing", circuit_dir=tmp_path)
+        first = zkml.prove_anomaly(FEATURES, threshold=0.75)
+        second = zkml.prove_anomaly(FEATURES, threshold=0.75)
+
+        assert second.to_dict() == first.to_dict()
+        assert second.threshold_scaled == 750
+        assert live_model.calls == 1
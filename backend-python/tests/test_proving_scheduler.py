@@ -0,0 +1,179 @@
+"""
+Tests for the priority proving scheduler.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from zkp.proving_scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    AdmissionRejected,
+    JobNotFound,
+    ProvingScheduler,
+    current_cpu_budget,
+    proving_env,
+)
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    s = ProvingScheduler(
+        workers=1,
+        threads_per_job=2,
+        max_queue_seconds=30,
+        default_estimate=1,
+        state_dir=str(tmp_path),
+    )
+    yield s
+    s.close()
+
+
+def _block(scheduler):
+    """Occupy the single worker until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    scheduler.submit("blocker", hold)
+    started.wait(5)
+    return release
+
+
+class TestScheduling:
+    """Test ordering, CPU budgets and results."""
+
+    def test_interactive_runs_before_batch(self, scheduler):
+        release = _block(scheduler)
+        order = []
+        batch = [
+            scheduler.submit("zkml", order.append, f"batch-{i}", priority=PRIORITY_BATCH)
+            for i in range(3)
+        ]
+        interactive = scheduler.submit("age", order.append, "share", priority=PRIORITY_INTERACTIVE)
+        release.set()
+        for job_id in batch + [interactive]:
+            scheduler.result(job_id, 5)
+
+        assert order == ["share", "batch-0", "batch-1", "batch-2"]
+
+    def test_jobs_see_cpu_budget(self, scheduler):
+        job_id = scheduler.submit("age", lambda: (current_cpu_budget(), proving_env({})))
+        budget, env = scheduler.result(job_id, 5)
+        assert budget == 2
+        assert env == {"OMP_NUM_THREADS": "2"}
+        assert current_cpu_budget() is None
+        assert "OMP_NUM_THREADS" not in proving_env({})
+
+    def test_poll_reports_timings_and_result(self, scheduler):
+        job_id = scheduler.submit("age", lambda: {"proof": 1})
+        scheduler.result(job_id, 5)
+        info = scheduler.poll(job_id)
+        assert info["status"] == "done"
+        assert info["result"] == {"proof": 1}
+        assert info["queue_wait_ms"] >= 0 and info["prove_time_ms"] >= 0
+
+    def test_failures_propagate(self, scheduler):
+        def fail():
+            raise RuntimeError("witness generation failed")
+
+        job_id = scheduler.submit("age", fail)
+        with pytest.raises(RuntimeError, match="witness"):
+            scheduler.result(job_id, 5)
+        assert scheduler.poll(job_id)["status"] == "failed"
+        assert scheduler.stats()["circuits"]["age"]["failed"] == 1
+
+    def test_await(self, scheduler):
+        job_id = scheduler.submit("age", lambda: 42)
+        assert asyncio.run(scheduler.wait(job_id, timeout=5)) == 42
+
+    def test_nested_run_is_inline(self, scheduler):
+        job_id = scheduler.submit("outer", lambda: scheduler.run("inner", lambda: "ok"))
+        assert scheduler.result(job_id, 5) == "ok"
+
+    def test_results_expire(self, tmp_path):
+        s = ProvingScheduler(workers=1, result_ttl=0.05, state_dir=str(tmp_path))
+        try:
+            job_id = s.submit("age", lambda: 1)
+            s.result(job_id, 5)
+            time.sleep(0.1)
+            with pytest.raises(JobNotFound):
+                s.poll(job_id)
+        finally:
+            s.close()
+
+
+class TestAdmission:
+    """Test rejection by expected queue wait."""
+
+    def test_rejects_over_budget(self, tmp_path):
+        s = ProvingScheduler(
+            workers=1, max_queue_seconds=3, default_estimate=1, state_dir=str(tmp_path)
+        )
+        try:
+            release = _block(s)
+            for _ in range(3):
+                s.submit("zkml", lambda: None, priority=PRIORITY_BATCH)
+            with pytest.raises(AdmissionRejected) as exc:
+                s.submit("zkml", lambda: None, priority=PRIORITY_BATCH)
+            assert exc.value.retry_after >= 1
+            # Interactive jobs only wait behind the running job
+            s.submit("age", lambda: None, priority=PRIORITY_INTERACTIVE)
+            assert s.stats()["circuits"]["zkml"]["rejected"] == 1
+            release.set()
+        finally:
+            s.close()
+
+    def test_estimates_learn_prove_time(self, scheduler):
+        scheduler.result(scheduler.submit("slow", time.sleep, 0.05), 5)
+        assert scheduler.estimate("slow") == pytest.approx(0.05, abs=0.04)
+        assert scheduler.estimate("unseen") == 1
+
+
+class TestHostSharing:
+    """Test state and CPU slots shared by the schedulers of several processes."""
+
+    def test_poll_from_another_process(self, tmp_path):
+        submitter = ProvingScheduler(workers=1, state_dir=str(tmp_path))
+        other = ProvingScheduler(workers=1, state_dir=str(tmp_path))
+        try:
+            release = _block(submitter)
+            job_id = submitter.submit("zkml", lambda: {"proof": 1})
+            assert other.poll(job_id)["status"] == "queued"
+            release.set()
+            submitter.result(job_id, 5)
+            deadline = time.monotonic() + 5
+            while other.poll(job_id)["status"] != "done" and time.monotonic() < deadline:
+                time.sleep(0.01)
+            info = other.poll(job_id)
+            assert info["status"] == "done"
+            assert info["result"] == {"proof": 1}
+            with pytest.raises(JobNotFound):
+                other.poll("0" * 32)
+        finally:
+            submitter.close()
+            other.close()
+
+    def test_slots_are_host_wide(self, tmp_path):
+        first = ProvingScheduler(workers=1, state_dir=str(tmp_path))
+        second = ProvingScheduler(workers=1, state_dir=str(tmp_path))
+        try:
+            release = _block(first)
+            job_id = second.submit("age", lambda: "ok")
+            time.sleep(0.2)
+            # The only host slot is held by the other scheduler's job
+            assert second.poll(job_id)["status"] == "queued"
+            release.set()
+            assert second.result(job_id, 5) == "ok"
+        finally:
+            first.close()
+            second.close()
+
+    def test_blocking_runs_are_not_stored(self, scheduler, tmp_path):
+        assert scheduler.run("age", lambda: 1) == 1
+        assert list((tmp_path / "jobs").glob("*.json")) == []
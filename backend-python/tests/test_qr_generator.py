@@ -0,0 +1,87 @@
+"""
+Tests for cached QR rendering and conditional responses.
+"""
+
+import base64
+import hashlib
+import io
+
+import pytest
+from PIL import Image
+
+import api.qr_generator as qr_generator
+from api.qr_generator import (
+    etag_matches,
+    generate_qr_code,
+    generate_qr_response,
+    generate_svg_qr_code,
+    get_qr_cache_stats,
+    render_qr,
+)
+
+URL = "http://localhost:8000/vault/share/abc123"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    qr_generator._rendered.clear()
+    qr_generator._render_stats.update(hits=0, misses=0)
+    yield
+    qr_generator._rendered.clear()
+
+
+class TestRenderCache:
+    """Test that each QR is rendered once per parameter set."""
+
+    def test_variants_rendered_once(self):
+        png = render_qr(URL, "png")
+        svg = render_qr(URL, "svg")
+        assert render_qr(URL, "png") is png
+        assert get_qr_cache_stats()["misses"] == 1
+        assert get_qr_cache_stats()["hits"] == 2
+
+        image = Image.open(io.BytesIO(png.content))
+        assert image.format == "PNG" and image.size[0] % 10 == 0
+        assert svg.media_type == "image/svg+xml" and b"<svg" in svg.content
+        assert generate_qr_code(URL) == png.content
+        assert generate_svg_qr_code(URL) == svg.content.decode()
+
+    def test_keyed_by_parameters(self):
+        small = render_qr(URL, size=2, border=1)
+        large = render_qr(URL)
+        assert small.etag != large.etag
+        assert Image.open(io.BytesIO(small.content)).size[0] < 200
+        with pytest.raises(ValueError):
+            render_qr(URL, "gif")
+
+    def test_lru_bound(self, monkeypatch):
+        monkeypatch.setattr(qr_generator, "QR_CACHE_SIZE", 2)
+        for i in range(3):
+            render_qr(f"{URL}/{i}")
+        assert get_qr_cache_stats()["size"] == 2
+
+
+class TestConditionalResponse:
+    """Test ETag and Cache-Control handling."""
+
+    def test_headers_and_not_modified(self):
+        response = generate_qr_response(URL)
+        etag = response.headers["etag"]
+        assert etag.startswith('"') and etag.endswith('"')
+        assert "max-age" in response.headers["cache-control"]
+        assert response.media_type == "image/png"
+        digest = base64.b64encode(hashlib.sha256(response.body).digest()).decode()
+        assert response.headers["content-digest"] == f"sha-256=:{digest}:"
+
+        cached = generate_qr_response(URL, if_none_match=f'"other", W/{etag}')
+        assert cached.status_code == 304 and cached.body == b""
+        assert cached.headers["etag"] == etag
+        assert "content-digest" not in cached.headers
+
+        svg = generate_qr_response(URL, fmt="svg", if_none_match=etag)
+        assert svg.status_code == 200 and svg.headers["etag"] != etag
+
+    def test_etag_matching(self):
+        assert etag_matches("*", '"a"')
+        assert not etag_matches(None, '"a"')
+        assert not etag_matches('"b"', '"a"')
@@ -0,0 +1,154 @@
+"""
+Tests for the in-memory witness/proof pipeline of RapidsnarkProver.
+
+Fake rapidsnark, C++ witness, snarkjs and witness-server executables stand in
+for the real toolchain; they record what they were given in the outputs.
+"""
+
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from zkp.rapidsnark_prover import (
+    MemFile,
+    RapidsnarkProver,
+    WitnessGenerationError,
+    WitnessServerPool,
+    resolve_snarkjs,
+)
+
+FAKE_RAPIDSNARK = """
+import json, os, sys
+if sys.argv[1] == "--version":
+    sys.exit(0)
+zkey, witness, proof, public = sys.argv[1:5]
+data = open(witness, "rb").read()
+json.dump({"witness": data.decode(), "omp": os.environ.get("OMP_NUM_THREADS"),
+           "paths": [witness, proof, public]}, open(proof, "w"))
+json.dump(["1", str(len(data))], open(public, "w"))
+"""
+
+FAKE_CPP_WITNESS = """
+import json, sys
+inputs = json.load(open(sys.argv[1]))
+open(sys.argv[2], "wb").write(("cpp:" + json.dumps(inputs, sort_keys=True)).encode())
+"""
+
+FAKE_SNARKJS = """
+import sys
+if sys.argv[1:3] == ["wtns", "calculate"]:
+    open(sys.argv[5], "wb").write(b"cli:" + open(sys.argv[4], "rb").read())
+"""
+
+FAKE_WITNESS_SERVER = """
+import json, os, sys
+for line in sys.stdin.buffer:
+    req = json.loads(line)
+    if req["input"].get("crash"):
+        sys.exit(1)
+    if req["input"].get("fail"):
+        status, body = 1, b"Assert Failed"
+    else:
+        status, body = 0, f"wasm:{os.getpid()}:{req['input']['x']}".encode()
+    sys.stdout.buffer.write(bytes([status]) + len(body).to_bytes(4, "big") + body)
+    sys.stdout.buffer.flush()
+"""
+
+
+def _script(path, body):
+    path.write_text(f"#!{sys.executable}\n" + textwrap.dedent(body))
+    path.chmod(0o755)
+    return path
+
+
+@pytest.fixture
+def toolchain(tmp_path):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    artifacts = tmp_path / "artifacts"
+    (artifacts / "age_level3").mkdir(parents=True)
+    _script(artifacts / "age_level3" / "age_level3", FAKE_CPP_WITNESS)
+    return {
+        "artifacts": artifacts,
+        "rapidsnark": str(_script(bin_dir / "rapidsnark", FAKE_RAPIDSNARK)),
+        "snarkjs": str(_script(bin_dir / "snarkjs", FAKE_SNARKJS)),
+        "server": [sys.executable, str(_script(bin_dir / "server.py", FAKE_WITNESS_SERVER))],
+    }
+
+
+def _prover(toolchain, server_command=None, size=1):
+    pool = WitnessServerPool(size=size, command=server_command or toolchain["server"])
+    return RapidsnarkProver(
+        artifacts_dir=toolchain["artifacts"],
+        rapidsnark_bin=toolchain["rapidsnark"],
+        snarkjs_path=toolchain["snarkjs"],
+        thread_count=3,
+        witness_servers=pool,
+    )
+
+
+class TestMemFile:
+    """Test in-memory files shared with subprocesses by path."""
+
+    def test_subprocess_round_trip(self):
+        with MemFile("in", b"hello") as src, MemFile("out") as dst:
+            code = f"open({dst.path!r}, 'wb').write(open({src.path!r}, 'rb').read()[::-1])"
+            subprocess.run([sys.executable, "-c", code], check=True, pass_fds=[src.fd, dst.fd])
+            assert dst.read() == b"olleh"
+
+    def test_resolve_snarkjs(self, monkeypatch):
+        monkeypatch.setenv("SNARKJS_BIN", "/opt/snarkjs/cli.js")
+        assert resolve_snarkjs() == ["/opt/snarkjs/cli.js"]
+        assert resolve_snarkjs("node /x/cli.cjs") == ["node", "/x/cli.cjs"]
+
+
+class TestPipeline:
+    """Test witness -> proof without temp files or npx."""
+
+    def test_cpp_witness_to_rapidsnark(self, toolchain):
+        prover = _prover(toolchain)
+        proof, public, timings = prover.prove_with_timings("age_level3", {"minAge": "18"})
+
+        assert proof["witness"] == 'cpp:{"minAge": "18"}'
+        assert proof["omp"] == "3"
+        assert all(p.startswith("/proc/self/fd/") for p in proof["paths"])
+        assert public == ["1", str(len(proof["witness"]))]
+        assert timings.prover == "rapidsnark" and timings.witness_type == "cpp"
+        assert timings.total_ms >= timings.witness_ms + timings.prove_ms
+        prover.close()
+
+    def test_wasm_witness_server_is_reused(self, toolchain):
+        prover = _prover(toolchain)
+        first, _ = prover.prove("age", {"x": 1}, force_rapidsnark=True)
+        second, _ = prover.prove("age", {"x": 2}, force_rapidsnark=True)
+
+        pid = first["witness"].split(":")[1]
+        assert first["witness"] == f"wasm:{pid}:1"
+        assert second["witness"] == f"wasm:{pid}:2"
+        prover.close()
+
+    def test_witness_errors_surface(self, toolchain):
+        prover = _prover(toolchain)
+        with pytest.raises(WitnessGenerationError, match="Assert Failed"):
+            prover.prove("age", {"x": 1, "fail": True}, force_rapidsnark=True)
+        # The server survives a failed witness
+        proof, _ = prover.prove("age", {"x": 3}, force_rapidsnark=True)
+        assert proof["witness"].endswith(":3")
+        prover.close()
+
+    def test_crashed_server_is_restarted(self, toolchain):
+        prover = _prover(toolchain)
+        first, _ = prover.prove("age", {"x": 1}, force_rapidsnark=True)
+        with pytest.raises(WitnessGenerationError):
+            prover.prove("age", {"x": 1, "crash": True}, force_rapidsnark=True)
+        second, _ = prover.prove("age", {"x": 2}, force_rapidsnark=True)
+        assert second["witness"].split(":")[1] != first["witness"].split(":")[1]
+        prover.close()
+
+    def test_falls_back_to_snarkjs_cli(self, toolchain):
+        prover = _prover(toolchain, server_command=["/nonexistent/node"])
+        proof, _ = prover.prove("age", {"x": 1}, force_rapidsnark=True)
+        assert proof["witness"] == 'cli:{"x": 1}'
+        assert prover._witness_servers is None
@@ -0,0 +1,178 @@
+"""
+Tests for vectorized bulk reputation analytics.
+"""
+
+import statistics
+
+import numpy as np
+import pytest
+
+from ml.reputation_analyzer import (
+    BULK_HISTORY_QUERY,
+    STAT_COLUMNS,
+    ReputationAnalyzer,
+    trend_stats,
+)
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, params=None):
+        self.driver.queries.append(query)
+        if query == BULK_HISTORY_QUERY:
+            return [
+                {"agent_id": agent_id, "scores": self.driver.histories[agent_id]}
+                for agent_id in params["agent_ids"]
+                if agent_id in self.driver.histories
+            ]
+        if "CREATE (r:ReputationProof" in query:
+            self.driver.histories.setdefault(params["agent_id"], []).append(params["threshold"])
+        return []
+
+
+class FakeDriver:
+    """Neo4j driver stand-in serving histories (oldest first) per agent."""
+
+    def __init__(self, histories):
+        self.histories = histories
+        self.queries = []
+
+    def session(self):
+        return FakeSession(self)
+
+
+def reference_stats(scores):
+    """The per-agent pure-Python statistics the bulk path replaces."""
+    n = len(scores)
+    if n == 0:
+        return dict.fromkeys(STAT_COLUMNS, 0)
+    mean = statistics.mean(scores)
+    x_mean = (n - 1) / 2
+    denominator = sum((i - x_mean) ** 2 for i in range(n))
+    diffs = [scores[i + 1] - scores[i] for i in range(n - 1)]
+    streak = 0
+    for s in scores:
+        streak = streak + 1 if s == 100 else 0
+    return {
+        "n": n,
+        "current": scores[-1],
+        "mean": mean,
+        "volatility": statistics.stdev(scores) if n > 1 else 0,
+        "slope": (
+            sum((i - x_mean) * (scores[i] - mean) for i in range(n)) / denominator
+            if denominator
+            else 0
+        ),
+        "last_delta": abs(scores[-1] - scores[-2]) if n > 1 else 0,
+        "perfect_streak": streak,
+        "alternating": n >= 4 and all(diffs[i] * diffs[i + 1] < 0 for i in range(n - 2)),
+        "max_abs_diff": max((abs(d) for d in diffs), default=0),
+    }
+
+
+def _histories():
+    rng = np.random.default_rng(3)
+    histories = [rng.integers(0, 101, size=int(rng.integers(0, 40))).tolist() for _ in range(60)]
+    histories += [
+        [],
+        [70],
+        [50, 80],
+        [90, 100, 100, 100, 100, 100],
+        [30, 60, 30, 60, 30, 60],
+        [100, 100, 100, 100],
+        [40, 40, 40, 40, 40],
+    ]
+    return histories
+
+
+class TestTrendStats:
+    """Test the ragged NumPy statistics against the per-agent loops."""
+
+    def test_matches_reference(self):
+        histories = _histories()
+        stats = trend_stats(histories)
+        for i, scores in enumerate(histories):
+            want = reference_stats(scores)
+            for col in STAT_COLUMNS:
+                assert stats[col][i] == pytest.approx(want[col]), (col, scores)
+
+    def test_no_agents(self):
+        assert all(len(v) == 0 for v in trend_stats([]).values())
+
+
+class TestBulkAnalysis:
+    """Test one query per batch, rule parity and cache invalidation."""
+
+    def test_flags(self):
+        histories = {
+            "jumpy": [50, 52, 51, 53, 90],
+            "perfect": [80, 100, 100, 100, 100, 100],
+            "gaming": [30, 60, 30, 60, 30, 60],
+            "new": [70, 72],
+            "steady": [40, 41, 42, 43, 44, 45],
+        }
+        trends = ReputationAnalyzer(FakeDriver(histories)).analyze_agents(list(histories))
+
+        assert "sudden_jump" in trends["jumpy"].anomaly_flags
+        assert "perfect_scores" in trends["perfect"].anomaly_flags
+        assert "gaming_pattern" in trends["gaming"].anomaly_flags
+        assert trends["new"].anomaly_flags == ["insufficient_data"]
+        assert trends["new"].current_reputation == 72
+        assert trends["steady"].trend_direction == "rising"
+        assert trends["steady"].trend_magnitude == pytest.approx(1.0)
+        assert trends["steady"].anomaly_flags == []
+
+    def test_one_query_for_many_agents(self):
+        histories = {f"agent-{i}": [50 + i % 7] * (i % 9) for i in range(300)}
+        driver = FakeDriver(histories)
+        analyzer = ReputationAnalyzer(driver)
+        driver.queries.clear()
+
+        comparison = analyzer.compare_agents(list(histories) + ["unknown"])
+
+        assert driver.queries == [BULK_HISTORY_QUERY]
+        assert comparison["total_analyzed"] == 301
+
+    def test_cache_and_invalidation(self):
+        driver = FakeDriver({"a": [60] * 6, "b": [70] * 6})
+        analyzer = ReputationAnalyzer(driver)
+        analyzer.analyze_agents(["a", "b"])
+        driver.queries.clear()
+
+        assert analyzer.analyze_agent("a").proof_count == 6
+        assert driver.queries == []
+
+        assert analyzer.record_reputation_proof("a", 95, 95, "n1")
+        trend = analyzer.analyze_agent("a")
+        assert trend.proof_count == 7
+        assert trend.current_reputation == 95
+        # Only the invalidated agent was refetched
+        assert driver.queries[-1] == BULK_HISTORY_QUERY
+        analyzer.analyze_agent("b")
+        assert driver.queries.count(BULK_HISTORY_QUERY) == 1
+
+    def test_fetch_racing_a_new_proof_is_not_cached(self):
+        driver = FakeDriver({"a": [60] * 6})
+        analyzer = ReputationAnalyzer(driver)
+        fetch = analyzer._fetch_stats
+
+        def record_during_fetch(*args):
+            stats = fetch(*args)
+            analyzer.record_reputation_proof("a", 95, 95, "n1")
+            return stats
+
+        analyzer._fetch_stats = record_during_fetch
+        assert analyzer.analyze_agent("a").proof_count == 6
+
+        analyzer._fetch_stats = fetch
+        trend = analyzer.analyze_agent("a")
+        assert trend.proof_count == 7
+        assert trend.current_reputation == 95
@@ -0,0 +1,142 @@
+"""
+Tests for versioned Neo4j schema migrations and hot-query plan checks.
+
+The EXPLAIN test needs a live Neo4j: run with NEO4J_TESTS=1 and NEO4J_URI set.
+"""
+
+import asyncio
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from api import schema_migrations
+from api.schema_migrations import HOT_QUERIES, MIGRATIONS, find_scans
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HOT_KEYS = [
+    ("Claim", "c.id"),
+    ("App", "a.id"),
+    ("User", "u.id"),
+    ("Document", "d.id"),
+    ("Nullifier", "n.hash"),
+    ("ProofLink", "p.share_token_hash"),
+    ("ProofLink", "p.share_token"),
+    ("TimelineEvent", "t.id"),
+    ("ReputationProof", "r.agent_id, r.timestamp"),
+    ("Agent", "a.id"),
+]
+
+
+def _all_statements():
+    return [stmt for m in MIGRATIONS for stmt in m.statements]
+
+
+class TestMigrationDefinitions:
+    """Test the migration list itself."""
+
+    def test_versions_strictly_increasing(self):
+        versions = [m.version for m in MIGRATIONS]
+        assert versions == sorted(set(versions))
+
+    def test_statements_are_idempotent(self):
+        for stmt in _all_statements():
+            assert "IF NOT EXISTS" in stmt
+
+    def test_schema_names_unique(self):
+        names = [re.search(r"(?:CONSTRAINT|INDEX) (\w+)", s).group(1) for s in _all_statements()]
+        assert len(names) == len(set(names))
+
+    @pytest.mark.parametrize("label,props", HOT_KEYS)
+    def test_hot_key_covered(self, label, props):
+        pattern = re.compile(rf":{label}\) (?:REQUIRE|ON) \(?{re.escape(props)}\)?(?: IS UNIQUE)?$")
+        assert any(pattern.search(s) for s in _all_statements()), f"{label}({props})"
+
+    def test_reputation_query_matches_analyzer(self):
+        from ml.reputation_analyzer import BULK_HISTORY_QUERY
+
+        assert HOT_QUERIES["reputation_histories"] == BULK_HISTORY_QUERY
+
+    def test_does_not_import_ml(self):
+        code = "import sys, api.schema_migrations; sys.exit('ml' in sys.modules)"
+        assert subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR).returncode == 0
+
+
+class TestFindScans:
+    """Test plan-tree inspection."""
+
+    def test_detects_nested_label_scan(self):
+        plan = {
+            "operatorType": "ProduceResults@neo4j",
+            "children": [
+                {
+                    "operatorType": "Filter@neo4j",
+                    "children": [{"operatorType": "NodeByLabelScan@neo4j"}],
+                }
+            ],
+        }
+        assert find_scans(plan) == ["NodeByLabelScan@neo4j"]
+
+    def test_index_seek_is_clean(self):
+        plan = {
+            "operatorType": "ProduceResults",
+            "children": [{"operatorType": "NodeUniqueIndexSeek", "children": []}],
+        }
+        assert find_scans(plan) == []
+
+    def test_empty_plan(self):
+        assert find_scans(None) == []
+
+
+class TestMigrate:
+    """Test pending-version selection against a recorded state."""
+
+    @pytest.fixture
+    def recorded(self, monkeypatch):
+        state = {"versions": {1}, "writes": []}
+
+        async def fake_read(query, parameters=None):
+            return [{"version": v} for v in state["versions"]]
+
+        async def fake_write(query, parameters=None):
+            state["writes"].append(query)
+            if parameters and "version" in parameters:
+                state["versions"].add(parameters["version"])
+            return []
+
+        monkeypatch.setattr(schema_migrations, "read", fake_read)
+        monkeypatch.setattr(schema_migrations, "write", fake_write)
+        return state
+
+    def test_applies_only_pending(self, recorded):
+        applied = asyncio.run(schema_migrations.migrate())
+        assert applied == [m.version for m in MIGRATIONS if m.version != 1]
+        assert recorded["versions"] == {m.version for m in MIGRATIONS}
+        assert asyncio.run(schema_migrations.migrate()) == []
+
+    def test_dry_run_writes_nothing(self, recorded):
+        applied = asyncio.run(schema_migrations.migrate(dry_run=True))
+        assert applied
+        assert recorded["writes"] == []
+
+
+@pytest.mark.skipif(os.getenv("NEO4J_TESTS", "0") != "1", reason="NEO4J_TESTS not enabled")
+class TestQueryPlans:
+    """EXPLAIN every hot query against a migrated database."""
+
+    def test_no_hot_query_uses_label_scan(self):
+        from api.database import close_driver
+
+        async def run():
+            try:
+                await schema_migrations.migrate()
+                return await schema_migrations.check_query_plans()
+            finally:
+                await close_driver()
+
+        offenders = asyncio.run(run())
+        assert offenders == {}, f"label scans in hot queries: {offenders}"
+        assert len(HOT_QUERIES) >= len(HOT_KEYS)
@@ -0,0 +1,139 @@
+"""
+Tests for cached share-link bundles.
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import api.cache as cache
+import api.share_bundles as share_bundles
+from api.share_bundles import ShareBundleService, bundle_cache_key
+from vault.models import AccessLevel, ProofLink
+from vault.share_links import hash_share_token
+
+ATTESTATION = {"fabricTxId": "tx1", "merkleRoot": "ab" * 32, "inclusionProof": {"siblings": []}}
+
+
+class FakeStorage:
+    def __init__(self):
+        self.calls = 0
+
+    def get_document_metadata(self, document_id):
+        self.calls += 1
+        return {"hash": "cd" * 32} if document_id == "doc_1" else None
+
+
+@pytest.fixture(autouse=True)
+def vkeys(monkeypatch):
+    cache.clear()
+    monkeypatch.setattr(share_bundles, "get_verification_key_hash", lambda circuit: "vk" * 32)
+    monkeypatch.setattr(share_bundles, "hmac_sign", lambda payload: "sig")
+    yield
+    cache.clear()
+
+
+def _link(**kwargs):
+    kwargs.setdefault("expires_at", datetime.utcnow() + timedelta(days=30))
+    return ProofLink(share_token="tok", document_id="doc_1", proof_type="age", **kwargs)
+
+
+def _service(attestation=ATTESTATION):
+    lookups = []
+
+    def lookup(document_id):
+        lookups.append(document_id)
+        return attestation
+
+    return ShareBundleService(FakeStorage(), lookup), lookups
+
+
+class TestShareBundles:
+    """Test bundle caching per token hash and access level."""
+
+    def test_bundle_is_built_once(self):
+        service, lookups = _service()
+        first = service.get(_link())
+        assert service.get(_link()) is first
+        assert first["signature"] == "sig"
+        assert first["verification"]["attestation"] == ATTESTATION
+        assert lookups == ["doc_1"] and service.vault_storage.calls == 1
+
+    def test_keyed_by_token_hash_and_access_level(self):
+        service, _ = _service()
+        service.get(_link())
+        key = bundle_cache_key(hash_share_token("tok"), AccessLevel.PROOF_ONLY)
+        assert cache.get(key) is not None
+        assert cache.get(bundle_cache_key(hash_share_token("tok"), AccessLevel.METADATA)) is None
+        metadata = service.get(_link(access_level=AccessLevel.METADATA))
+        assert metadata["access_level"] == AccessLevel.METADATA.value
+
+    def test_last_allowed_access_drops_entry(self):
+        service, _ = _service()
+        service.get(_link(max_accesses=3, access_count=0))
+        key = bundle_cache_key(hash_share_token("tok"), AccessLevel.PROOF_ONLY)
+        assert cache.get(key) is not None
+        service.get(_link(max_accesses=3, access_count=2))
+        assert cache.get(key) is None
+
+    def test_ttl_follows_expiry_and_pending_attestation(self):
+        service, _ = _service()
+        link = _link(expires_at=datetime.utcnow() + timedelta(hours=1))
+        assert 3500 < service._ttl(link, service.build(link)) <= 3600
+
+        pending, _ = _service(attestation=None)
+        bundle = pending.build(link)
+        assert pending._ttl(link, bundle) == share_bundles.SHARE_BUNDLE_PENDING_TTL
+
+        expired = _link(expires_at=datetime.utcnow() - timedelta(seconds=1))
+        pending.get(expired)
+        assert cache.get_stats()["size"] == 0
+
+    def test_warm_populates_cache(self):
+        service, _ = _service()
+        service.warm(_link()).result(timeout=5)
+        assert cache.get(bundle_cache_key(hash_share_token("tok"), AccessLevel.PROOF_ONLY))
+
+    def test_errors(self, monkeypatch):
+        service, _ = _service()
+        with pytest.raises(HTTPException) as missing:
+            service.get(ProofLink(share_token="tok", document_id="doc_2"))
+        assert missing.value.status_code == 404
+
+        monkeypatch.setattr(share_bundles, "get_verification_key_hash", lambda circuit: "")
+        with pytest.raises(HTTPException) as no_vkey:
+            service.get(_link())
+        assert no_vkey.value.status_code == 503
+        # Failed warm-ups are logged, not raised
+        service.warm(_link()).result(timeout=5)
+
+    def test_concurrent_warm_and_get(self):
+        service, _ = _service()
+        links = [
+            ProofLink(share_token=f"tok{i}", document_id="doc_1", proof_type="age")
+            for i in range(200)
+        ]
+        # Short-lived entries make every get/set sweep expired keys
+        for i in range(500):
+            cache.set(f"filler{i}", i, ttl=0.001)
+        errors = []
+
+        def hammer(batch):
+            try:
+                for link in batch:
+                    service.get(link)
+                    cache.set(f"churn:{link.share_token}", 1, ttl=0.001)
+            except Exception as e:
+                errors.append(e)
+
+        warmed = [service.warm(link) for link in links]
+        threads = [threading.Thread(target=hammer, args=(links[i::4],)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for future in warmed:
+            future.result(timeout=5)
+        assert errors == []
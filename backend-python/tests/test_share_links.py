@@ -0,0 +1,248 @@
+"""
+Tests for cached share-link validation and access-count writeback.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import vault.share_links as share_links
+from vault.share_link_cache import (
+    ALLOWED,
+    EXHAUSTED,
+    EXPIRED,
+    MISS,
+    ShareLinkCache,
+    link_record,
+)
+from vault.share_links import ShareLinkService, hash_share_token, migrate_plaintext_tokens
+from vault.write_behind import STATEMENTS, WriteBehindBuffer
+
+KIND_OF = {query: kind for kind, query in STATEMENTS.items()}
+
+
+def _link(**overrides):
+    link = {
+        "document_id": "doc_1",
+        "access_level": "metadata",
+        "proof_type": "age",
+        "created_at": "2026-01-01T00:00:00",
+        "expires_at": (datetime.utcnow() + timedelta(days=1)).isoformat(),
+        "max_accesses": None,
+        "access_count": 0,
+    }
+    link.update(overrides)
+    return link
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def data(self):
+        return self.rows
+
+
+class FakeTx:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def run(self, query, **params):
+        self.graph.writes.append((KIND_OF[query], params["rows"]))
+
+    def commit(self):
+        pass
+
+
+class FakeGraph:
+    """Holds ProofLink nodes keyed by token hash and counts graph reads."""
+
+    def __init__(self, links=None):
+        self.links = links or {}
+        self.reads = 0
+        self.writes = []
+
+    def run(self, query, params=None):
+        self.reads += 1
+        link = self.links.get(params["token_hash"])
+        return FakeCursor([{"p": link}] if link else [])
+
+    def begin(self):
+        return FakeTx(self)
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    buffers = {}
+
+    def get_writer(graph):
+        return buffers.setdefault(id(graph), WriteBehindBuffer(graph, autostart=False))
+
+    monkeypatch.setattr(share_links, "get_write_behind", get_writer)
+    return get_writer
+
+
+def _service(graph, cache=None):
+    return ShareLinkService(graph, link_cache=cache or ShareLinkCache())
+
+
+class TestShareLinkCache:
+    """Test atomic check-and-count in the in-process cache."""
+
+    def test_counts_until_exhausted(self):
+        cache = ShareLinkCache()
+        assert cache.access("h").status == MISS
+        record = link_record(_link(max_accesses=2))
+        assert cache.access("h", record=record).access_count == 1
+        assert cache.access("h").status == ALLOWED
+        assert cache.access("h").status == EXHAUSTED
+        assert cache.take_counts() == {"h": 2}
+        assert cache.take_counts() == {}
+
+    def test_expiry_and_revocation(self):
+        cache = ShareLinkCache(memory_ttl=float("inf"))
+        record = link_record(_link())
+        expires_ts = float(record["expires_ts"])
+        assert abs(expires_ts - (time.time() + 86400)) < 5
+        assert cache.access("h", record=record).status == ALLOWED
+        assert cache.access("h", now=expires_ts).status == EXPIRED
+        cache.expire("h")
+        assert cache.access("h").status == EXPIRED
+
+    def test_revocation_tombstones_uncached_link(self):
+        cache = ShareLinkCache()
+        # A validation that read the link before the revoke committed
+        stale = link_record(_link())
+        cache.expire("h")
+        assert cache.access("h", record=stale).status == EXPIRED
+
+    def test_records_refreshed_after_memory_ttl(self):
+        cache = ShareLinkCache(memory_ttl=30)
+        now = time.time()
+        cache.access("h", now=now, record=link_record(_link()))
+        assert cache.access("h", now=now + 10).status == ALLOWED
+        assert cache.access("h", now=now + 31).status == MISS
+        revoked = link_record(_link(expires_at="2020-01-01T00:00:00"))
+        assert cache.access("h", now=now + 31, record=revoked).status == EXPIRED
+
+    def test_reload_keeps_unwritten_counts(self):
+        cache = ShareLinkCache(max_size=1)
+        cache.access("a", record=link_record(_link(max_accesses=2)))
+        cache.access("b", record=link_record(_link()))  # evicts "a"
+        # Stored record still says 0 accesses; the pending count wins
+        assert cache.access("a", record=link_record(_link(max_accesses=2))).access_count == 2
+        assert cache.access("a").status == EXHAUSTED
+
+
+class TestRedisShareLinkCache:
+    """Test the Lua scripts against fakeredis when it is installed."""
+
+    @pytest.fixture
+    def cache(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        return ShareLinkCache(fakeredis.FakeStrictRedis(decode_responses=True))
+
+    def test_counts_until_exhausted(self, cache):
+        assert cache.access("h").status == MISS
+        first = cache.access("h", record=link_record(_link(max_accesses=2)))
+        assert (first.status, first.access_count) == (ALLOWED, 1)
+        assert first.record["document_id"] == "doc_1"
+        assert cache.access("h").status == ALLOWED
+        assert cache.access("h").status == EXHAUSTED
+        assert cache.take_counts() == {"h": 2}
+        assert cache.redis_client.ttl("share_link:h") > 86000
+
+    def test_revocation(self, cache):
+        cache.access("h", record=link_record(_link()))
+        cache.expire("h")
+        assert cache.access("h").status == EXPIRED
+
+    def test_revocation_tombstones_uncached_link(self, cache):
+        cache.expire("h")
+        assert cache.access("h", record=link_record(_link())).status == EXPIRED
+        assert 0 < cache.redis_client.ttl("share_link:h") <= 86400
+
+
+class TestShareLinkService:
+    """Test validation through the cache and batched count writeback."""
+
+    def test_cached_hit_skips_graph(self, writer):
+        token_hash = hash_share_token("tok")
+        graph = FakeGraph({token_hash: _link()})
+        service = _service(graph)
+        first = service.validate_token("tok")
+        second = service.validate_token("tok")
+        assert graph.reads == 1
+        assert first.document_id == "doc_1" and first.access_level.value == "metadata"
+        assert (first.access_count, second.access_count) == (0, 1)
+        assert service.validate_token("unknown") is None
+
+    def test_max_accesses_and_expiry(self, writer):
+        graph = FakeGraph(
+            {
+                hash_share_token("once"): _link(max_accesses=1),
+                hash_share_token("old"): _link(expires_at="2020-01-01T00:00:00"),
+            }
+        )
+        service = _service(graph)
+        assert service.validate_token("once") is not None
+        assert service.validate_token("once") is None
+        assert service.validate_token("old") is None
+
+    def test_counts_written_back_in_one_batch(self, writer):
+        graph = FakeGraph({hash_share_token(t): _link() for t in ("a", "b")})
+        service = _service(graph)
+        for token in ("a", "b", "a", "a"):
+            service.validate_token(token)
+        assert service.flush_access_counts() == 0  # within the flush interval
+        assert service.flush_access_counts(force=True) == 2
+
+        writer(graph).flush()
+        assert graph.writes == [
+            (
+                "share_access",
+                [
+                    {"token_hash": hash_share_token("a"), "access_count": 3},
+                    {"token_hash": hash_share_token("b"), "access_count": 1},
+                ],
+            )
+        ]
+
+    def test_one_exit_flush_per_counter_store(self, writer, monkeypatch):
+        monkeypatch.setattr(share_links, "_exit_flushes", {})
+        graph = FakeGraph({hash_share_token("a"): _link()})
+        cache = ShareLinkCache()
+        services = [_service(graph, cache) for _ in range(3)]
+        assert len(share_links._exit_flushes) == 1
+
+        services[1].validate_token("a")
+        del services
+        share_links._flush_access_counts_at_exit()
+        writer(graph).flush()
+        assert graph.writes == [
+            ("share_access", [{"token_hash": hash_share_token("a"), "access_count": 1}])
+        ]
+
+
+class MigrationGraph:
+    def __init__(self, tokens):
+        self.tokens = list(tokens)
+        self.hashed = []
+
+    def run(self, query, params):
+        if "UNWIND" in query:
+            for row in params["rows"]:
+                self.tokens.remove(row["token"])
+                self.hashed.append(row["token_hash"])
+            return FakeCursor([])
+        return FakeCursor([{"token": t} for t in self.tokens[: params["limit"]]])
+
+
+def test_migrate_plaintext_tokens():
+    graph = MigrationGraph(["t1", "t2", "t3"])
+    assert migrate_plaintext_tokens(graph, batch_size=2) == 3
+    assert graph.tokens == []
+    assert graph.hashed == [hash_share_token(t) for t in ("t1", "t2", "t3")]
+    assert migrate_plaintext_tokens(graph) == 0
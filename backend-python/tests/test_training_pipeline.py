@@ -0,0 +1,243 @@
+"""
+Tests for the out-of-core autoencoder training pipeline.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from ml import training_pipeline
+from ml.autoencoder import StatisticalAutoencoder
+from ml.model_registry import ModelRegistry, load_detector_version
+from ml.training_pipeline import (
+    N_FEATURES,
+    ShardReader,
+    WelfordStats,
+    apply_artifact,
+    export_sequences,
+    iter_agent_pages,
+    load_manifest,
+    publish_artifacts,
+    sequences_from_records,
+)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def data(self):
+        return self.rows
+
+
+class FakeGraph:
+    """Serves `AGENT_PAGE_QUERY` pages from an in-memory agent list."""
+
+    def __init__(self, n_agents, n_proofs=0):
+        # Newest first, as DETECTOR_PROOFS_QUERY returns them
+        self.proofs = [
+            {
+                "agent_id": f"agent-{i % 5:04d}",
+                "timestamp_ms": 1_700_000_000_000 + (n_proofs - i) * 600_000,
+                "threshold": 50 + i % 20,
+                "nullifier": f"n{i}",
+            }
+            for i in range(n_proofs)
+        ]
+        self.agents = [
+            {
+                "agent_id": f"agent-{i:04d}",
+                "reputation": 40 + i % 50,
+                "claim_count": i % 7,
+                "proof_count": i % 3,
+                "interactions": i % 5,
+            }
+            for i in range(n_agents)
+        ]
+        self.calls = []
+
+    def run(self, query, params):
+        if query == training_pipeline.DETECTOR_PROOFS_QUERY:
+            return FakeResult(self.proofs[: params["limit"]])
+        self.calls.append(params)
+        after = [a for a in self.agents if a["agent_id"] > params["after"]]
+        return FakeResult(after[: params["page_size"]])
+
+
+class TestWelfordStats:
+    """Test streaming mean/std against NumPy on the whole array."""
+
+    def test_matches_numpy(self):
+        data = np.random.default_rng(0).normal(50, 10, (1000, N_FEATURES))
+        stats = WelfordStats()
+        for chunk in np.array_split(data, 7):
+            stats.update(chunk)
+
+        assert stats.count == 1000
+        np.testing.assert_allclose(stats.mean, data.mean(axis=0))
+        np.testing.assert_allclose(stats.std(), data.std(axis=0, ddof=1))
+        np.testing.assert_allclose(stats.std(ddof=0), data.std(axis=0))
+
+    def test_empty_update(self):
+        stats = WelfordStats()
+        stats.update(np.empty((0, N_FEATURES)))
+        assert stats.count == 0
+        assert stats.std().tolist() == [0.0] * N_FEATURES
+
+
+class TestExport:
+    """Test keyset paging, sharding and the manifest."""
+
+    def test_keyset_pages(self):
+        graph = FakeGraph(25)
+        pages = list(iter_agent_pages(graph, page_size=10))
+
+        assert [len(p) for p in pages] == [10, 10, 5]
+        assert [c["after"] for c in graph.calls] == ["", "agent-0009", "agent-0019"]
+
+    def test_exact_multiple_stops_on_empty_page(self):
+        graph = FakeGraph(20)
+        assert [len(p) for p in iter_agent_pages(graph, page_size=10)] == [10, 10]
+        assert len(graph.calls) == 3
+
+    def test_sequences_shape(self):
+        records = FakeGraph(4).agents
+        seqs = sequences_from_records(records, 6, np.random.default_rng(0))
+        assert seqs.shape == (4, 6, N_FEATURES)
+        assert seqs.dtype == np.float32
+        np.testing.assert_allclose(seqs[0, :, 4], [(t * 2 % 24) / 24 for t in range(6)])
+
+    def test_shards_and_manifest(self, tmp_path):
+        manifest = export_sequences(
+            FakeGraph(250), tmp_path, seq_len=5, min_samples=10, page_size=40, shard_size=100
+        )
+
+        assert manifest["samples"] == 250
+        assert manifest["from_graph"] == 250
+        assert [s["samples"] for s in manifest["shards"]] == [100, 100, 50]
+
+        data = np.concatenate([np.load(tmp_path / s["file"]) for s in manifest["shards"]])
+        flat = data.reshape(-1, N_FEATURES).astype(np.float64)
+        np.testing.assert_allclose(manifest["stats"]["mean"], flat.mean(axis=0), rtol=1e-6)
+        np.testing.assert_allclose(manifest["stats"]["std"], flat.std(axis=0, ddof=1), rtol=1e-6)
+        assert load_manifest(tmp_path) == manifest
+
+    def test_pads_with_synthetic(self, tmp_path):
+        manifest = export_sequences(None, tmp_path, seq_len=5, min_samples=30)
+        assert manifest["samples"] == 30
+        assert manifest["from_graph"] == 0
+
+
+class TestShardReader:
+    """Test worker sharding and per-epoch shuffling."""
+
+    @pytest.fixture
+    def data_dir(self, tmp_path):
+        export_sequences(FakeGraph(100), tmp_path, seq_len=4, min_samples=0, shard_size=20)
+        return tmp_path
+
+    def test_workers_cover_every_sample_once(self, data_dir):
+        reader = ShardReader(data_dir, mean=np.zeros(N_FEATURES), std=np.ones(N_FEATURES))
+        seen = [
+            tuple(s.ravel().round(4))
+            for worker in range(3)
+            for s in reader.iter_samples(worker_id=worker, num_workers=3)
+        ]
+        assert len(seen) == len(reader) == 100
+        assert len(set(seen)) == 100
+
+    def test_epoch_changes_order(self, data_dir):
+        reader = ShardReader(data_dir)
+        first = np.stack(list(reader.iter_samples()))
+        reader.epoch = 1
+        second = np.stack(list(reader.iter_samples()))
+        assert not np.array_equal(first, second)
+        np.testing.assert_allclose(np.sort(first, axis=0), np.sort(second, axis=0))
+
+
+class TestTrainAndPublish:
+    """Test statistical streaming training and versioned artifacts."""
+
+    def test_statistical_matches_in_memory_fit(self, tmp_path):
+        export_sequences(FakeGraph(60), tmp_path, seq_len=5, min_samples=0)
+        streamed, _ = training_pipeline._train_statistical(tmp_path)
+
+        manifest = load_manifest(tmp_path)
+        data = np.concatenate([np.load(tmp_path / s["file"]) for s in manifest["shards"]])
+        fitted = StatisticalAutoencoder()
+        fitted.fit(data.astype(np.float64).tolist())
+
+        np.testing.assert_allclose(streamed.mean, fitted.mean, rtol=1e-6)
+        np.testing.assert_allclose(streamed.std, fitted.std, rtol=1e-6)
+        assert streamed.error_mean == pytest.approx(fitted.error_mean, rel=1e-4)
+        assert streamed.error_std == pytest.approx(fitted.error_std, rel=1e-4)
+
+    def test_versions_and_active(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(training_pipeline, "TORCH_AVAILABLE", False)
+        data_dir, root = tmp_path / "data", tmp_path / "artifacts"
+        manifest = export_sequences(None, data_dir, seq_len=5, min_samples=20)
+        model, history = training_pipeline._train_statistical(data_dir)
+
+        first = publish_artifacts(model, history, manifest, root)
+        second = publish_artifacts(model, history, manifest, root)
+
+        assert (first["version"], second["version"]) == ("v0001", "v0002")
+        assert ModelRegistry(root).read_manifest()["active"] == "v0002"
+        assert not list(root.glob(".staging-*"))
+        metadata = json.loads((root / "v0001" / "metadata.json").read_text())
+        assert metadata["model_type"] == "statistical"
+        assert metadata["samples"] == 20
+
+        live = StatisticalAutoencoder()
+        apply_artifact(live, root / "v0002")
+        assert live.mean == model.mean
+        assert live.error_std == model.error_std
+
+    def test_cli_run(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.setattr(training_pipeline, "TORCH_AVAILABLE", False)
+        monkeypatch.setattr(training_pipeline, "_graph_or_none", lambda: None)
+        summary = training_pipeline.main(
+            [
+                "run",
+                "--data-dir",
+                str(tmp_path / "data"),
+                "--artifacts",
+                str(tmp_path / "artifacts"),
+                "--min-samples",
+                "15",
+                "--seq-len",
+                "4",
+            ]
+        )
+        printed = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+        assert printed == summary
+        assert summary["version"] == "v0001"
+        assert summary["samples"] == 15
+        assert summary["detector_version"] is None
+
+    def test_cli_run_publishes_detector(self, tmp_path, monkeypatch):
+        pytest.importorskip("sklearn")
+        monkeypatch.setattr(training_pipeline, "TORCH_AVAILABLE", False)
+        monkeypatch.setattr(training_pipeline, "_graph_or_none", lambda: FakeGraph(20, 150))
+        summary = training_pipeline.main(
+            [
+                "run",
+                "--data-dir",
+                str(tmp_path / "data"),
+                "--artifacts",
+                str(tmp_path / "autoencoder"),
+                "--detector-artifacts",
+                str(tmp_path / "detector"),
+                "--min-samples",
+                "15",
+                "--seq-len",
+                "4",
+            ]
+        )
+        assert summary["detector_version"] == "v0001"
+        assert summary["detector_samples"] == 150
+        registry = ModelRegistry(tmp_path / "detector")
+        assert registry.read_manifest()["active"] == "v0001"
+        detector = load_detector_version(registry.active()[1])
+        assert detector.get_stats()["model_trained"]
@@ -0,0 +1,209 @@
+"""
+Tests for the vault write-behind buffer.
+"""
+
+import time
+
+import pytest
+
+from vault.decisions import DecisionService
+from vault.timeline import TimelineService
+from vault.write_behind import STATEMENTS, WriteBehindBuffer, plan_batches
+
+KIND_OF = {query: kind for kind, query in STATEMENTS.items()}
+
+
+class FakeTx:
+    def __init__(self, graph):
+        self.graph = graph
+        self.runs = []
+
+    def run(self, query, **params):
+        if self.graph.fail:
+            raise RuntimeError("neo4j unavailable")
+        self.runs.append((query, params["rows"]))
+
+    def commit(self):
+        self.graph.commits.append(self.runs)
+
+    def rollback(self):
+        pass
+
+
+class FakeCursor:
+    def data(self):
+        return []
+
+
+class FakeGraph:
+    def __init__(self):
+        self.commits = []
+        self.fail = False
+
+    def begin(self):
+        return FakeTx(self)
+
+    def run(self, query, params=None):
+        return FakeCursor()
+
+
+@pytest.fixture
+def graph():
+    return FakeGraph()
+
+
+@pytest.fixture
+def buffer(graph):
+    return WriteBehindBuffer(graph, autostart=False)
+
+
+class TestPlanBatches:
+    """Test wave planning."""
+
+    def test_same_kind_across_users_shares_unwind(self):
+        pending = [("timeline_event", f"u{i}", {"i": i}) for i in range(5)]
+        assert plan_batches(pending) == [("timeline_event", [{"i": i} for i in range(5)])]
+
+    def test_per_user_order_preserved(self):
+        pending = [
+            ("document", "alice", {"user": "alice", "step": 1}),
+            ("timeline_event", "alice", {"user": "alice", "step": 2}),
+            ("document", "bob", {"user": "bob", "step": 1}),
+            ("timeline_event", "alice", {"user": "alice", "step": 3}),
+        ]
+        batches = plan_batches(pending)
+        assert [kind for kind, _ in batches] == ["document", "timeline_event", "timeline_event"]
+        assert len(batches[0][1]) == 2
+        alice_steps = [r["step"] for _, rows in batches for r in rows if r["user"] == "alice"]
+        assert alice_steps == [1, 2, 3]
+
+
+class TestWriteBehindBuffer:
+    """Test buffering, flushing and failure handling."""
+
+    def test_flush_is_one_transaction(self, buffer, graph):
+        for i in range(3):
+            buffer.enqueue("timeline_event", f"u{i}", {"i": i})
+        buffer.enqueue("document", "u0", {"i": "doc"})
+
+        assert buffer.flush() == 4
+        assert len(graph.commits) == 1
+        assert [len(rows) for _, rows in graph.commits[0]] == [3, 1]
+        assert buffer.pending() == 0
+
+    def test_flush_single_user(self, buffer, graph):
+        buffer.enqueue("timeline_event", "alice", {"i": 1})
+        buffer.enqueue("timeline_event", "bob", {"i": 2})
+
+        assert buffer.flush("alice") == 1
+        assert buffer.pending() == 1
+        assert graph.commits[0][0][1] == [{"i": 1}]
+
+    def test_failure_requeues_in_order(self, buffer, graph):
+        buffer.enqueue("timeline_event", "alice", {"i": 1})
+        graph.fail = True
+        with pytest.raises(RuntimeError):
+            buffer.flush()
+        buffer.enqueue("timeline_event", "alice", {"i": 2})
+
+        graph.fail = False
+        buffer.flush()
+        assert graph.commits[0][0][1] == [{"i": 1}]
+        assert graph.commits[0][1][1] == [{"i": 2}]
+
+    def test_failing_row_is_dead_lettered(self, graph):
+        buffer = WriteBehindBuffer(graph, max_attempts=2, autostart=False)
+        buffer.enqueue("timeline_event", "alice", {"bad": True})
+        graph.fail = True
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                buffer.flush()
+        assert buffer.pending() == 0
+        assert buffer.dead_letters() == [("timeline_event", "alice", {"bad": True})]
+
+        # Later writes are no longer blocked
+        graph.fail = False
+        buffer.enqueue("timeline_event", "alice", {"i": 2})
+        assert buffer.flush() == 1
+        assert buffer.retry_dead_letters() == 1
+        assert buffer.flush() == 1 and buffer.dead_letters() == []
+
+    def test_exhausted_batch_isolates_bad_row(self, graph):
+        class PoisonTx(FakeTx):
+            def run(self, query, **params):
+                if any(row.get("bad") for row in params["rows"]):
+                    raise RuntimeError("constraint violation")
+                super().run(query, **params)
+
+        graph.begin = lambda: PoisonTx(graph)
+        buffer = WriteBehindBuffer(graph, max_attempts=1, autostart=False)
+        buffer.enqueue("timeline_event", "alice", {"i": 1})
+        buffer.enqueue("timeline_event", "bob", {"bad": True})
+        with pytest.raises(RuntimeError):
+            buffer.flush()
+        assert graph.commits == [[(STATEMENTS["timeline_event"], [{"i": 1}])]]
+        assert [row for _, _, row in buffer.dead_letters()] == [{"bad": True}]
+
+    def test_full_queue_waits_for_flusher(self, graph):
+        graph.fail = True
+        buffer = WriteBehindBuffer(graph, max_pending=2, flush_interval=0.01, retry_backoff=0.01)
+        try:
+            buffer.enqueue("timeline_event", "a", {"i": 1})
+            buffer.enqueue("timeline_event", "b", {"i": 2})
+            graph.fail = False
+            # Waits for the background flush instead of flushing (or raising) here
+            buffer.enqueue("timeline_event", "c", {"i": 3})
+            deadline = time.time() + 2
+            while buffer.pending() and time.time() < deadline:
+                time.sleep(0.01)
+            assert buffer.pending() == 0
+        finally:
+            buffer.close()
+
+    def test_unknown_kind_rejected(self, buffer):
+        with pytest.raises(ValueError):
+            buffer.enqueue("nope", "alice", {})
+
+    def test_background_size_trigger(self, graph):
+        buffer = WriteBehindBuffer(graph, max_batch=2, flush_interval=60)
+        try:
+            buffer.enqueue("timeline_event", "a", {})
+            buffer.enqueue("timeline_event", "b", {})
+            deadline = time.time() + 2
+            while buffer.pending() and time.time() < deadline:
+                time.sleep(0.01)
+            assert buffer.pending() == 0
+            assert len(graph.commits) == 1
+        finally:
+            buffer.close()
+
+    def test_close_flushes(self, graph):
+        buffer = WriteBehindBuffer(graph, flush_interval=60)
+        buffer.enqueue("timeline_event", "a", {})
+        buffer.close()
+        assert buffer.pending() == 0
+
+
+class TestServices:
+    """Test that vault services write through the buffer."""
+
+    def test_upload_style_writes_share_a_transaction(self, buffer, graph):
+        timeline = TimelineService(graph, writer=buffer)
+        decisions = DecisionService(graph, timeline)
+
+        buffer.enqueue("document", "alice", {"user_id": "alice", "props": {"id": "d1"}})
+        timeline.log_event("alice", "document_uploaded", document_id="d1")
+        decisions.log_decision("alice", "identity_verification", {}, document_ids=["d1"])
+        assert graph.commits == []
+
+        buffer.flush()
+        assert len(graph.commits) == 1
+        kinds = [KIND_OF[query] for query, _ in graph.commits[0]]
+        assert kinds == ["document", "timeline_event", "timeline_event", "decision"]
+
+    def test_reads_flush_user_first(self, buffer, graph):
+        timeline = TimelineService(graph, writer=buffer)
+        timeline.log_event("alice", "document_uploaded")
+        timeline.get_timeline("alice")
+        assert buffer.pending() == 0
+        assert len(graph.commits) == 1
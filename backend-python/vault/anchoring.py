@@ -0,0 +1,117 @@
+"""
+Batched Fabric anchoring for vault documents.
+
+Uploads queue their document hash on the shared `MerkleBatcher` instead of
+anchoring it synchronously; when a batch root is anchored, each document's
+Attestation node and `attestation_created` timeline event are queued on the
+write-behind buffer. Attestation lookups read the per-document Fabric anchor
+when one exists (documents anchored before batching) and the stored
+inclusion proof otherwise; async callers use `get_attestation_async`, which
+queries through the pooled `AsyncFabricClient`.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from py2neo import Graph
+
+# Imported before the batcher so that at exit the batcher's final anchor (and
+# the attestations it queues) runs before the write-behind buffer's last flush
+from vault.write_behind import get_write_behind
+from blockchain.l2.anchor_client import AnchorReceipt
+from blockchain.l2.merkle_batcher import (
+    BatchEntry,
+    InclusionProof,
+    MerkleBatcher,
+    OnAnchored,
+    get_merkle_batcher,
+)
+from blockchain.sdk.fabric_client import FabricClient
+from blockchain.sdk.fabric_gateway import AsyncFabricClient
+from vault.timeline import TimelineService
+
+logger = logging.getLogger(__name__)
+
+
+def record_attestations(graph: Graph) -> OnAnchored:
+    """Callback that records an Attestation per document of an anchored batch."""
+
+    def on_anchored(receipt: AnchorReceipt, anchored: List[Tuple[BatchEntry, InclusionProof]]):
+        writer = get_write_behind(graph)
+        timeline = TimelineService(graph, writer)
+        for entry, proof in anchored:
+            user_id = entry.context.get("user_id")
+            att_id = f"att_{entry.document_id}"
+            writer.enqueue(
+                "attestation",
+                user_id or "",
+                {
+                    "document_id": entry.document_id,
+                    "props": {
+                        "id": att_id,
+                        "document_id": entry.document_id,
+                        "fabric_tx_id": receipt.tx_id,
+                        "merkle_root": receipt.merkle_root,
+                        "batch_id": receipt.batch_id,
+                        "leaf_index": proof.leaf_index,
+                        "timestamp": receipt.timestamp,
+                    },
+                },
+            )
+            if user_id:
+                timeline.log_event(
+                    user_id=user_id,
+                    event_type="attestation_created",
+                    document_id=entry.document_id,
+                    attestation_id=att_id,
+                    metadata={"fabric_tx_id": receipt.tx_id, "batch_id": receipt.batch_id},
+                )
+
+    return on_anchored
+
+
+def get_document_batcher(graph: Graph) -> MerkleBatcher:
+    """Shared batcher for vault documents, recording attestations in `graph`."""
+    return get_merkle_batcher(on_anchored=record_attestations(graph))
+
+
+def queue_document_anchor(graph: Graph, document_id: str, document_hash: str, user_id: str):
+    """Queue a document for the next anchored batch; returns its batch id."""
+    entry = get_document_batcher(graph).add(document_id, document_hash, user_id=user_id)
+    return entry.batch_id
+
+
+def get_attestation(
+    fabric_client: FabricClient, batcher: MerkleBatcher, document_id: str
+) -> Optional[Dict[str, Any]]:
+    """Fabric-shaped attestation for a document, or None while it is pending."""
+    anchor = fabric_client.query_attestation(document_id)
+    if anchor:
+        return anchor
+    return _proof_attestation(batcher, document_id)
+
+
+async def get_attestation_async(
+    fabric_client: AsyncFabricClient, batcher: MerkleBatcher, document_id: str
+) -> Optional[Dict[str, Any]]:
+    """`get_attestation` through the pooled async Fabric client."""
+    anchor = await fabric_client.query_attestation(document_id)
+    if anchor:
+        return anchor
+    return await asyncio.to_thread(_proof_attestation, batcher, document_id)
+
+
+def _proof_attestation(batcher: MerkleBatcher, document_id: str) -> Optional[Dict[str, Any]]:
+    proof = batcher.get_proof(document_id)
+    if proof is None:
+        return None
+    return {
+        "documentID": document_id,
+        "hash": proof.document_hash,
+        "merkleRoot": proof.merkle_root,
+        "fabricTxId": proof.tx_id,
+        "timestamp": proof.anchored_at,
+        "batchId": proof.batch_id,
+        "inclusionProof": proof.to_dict(),
+    }
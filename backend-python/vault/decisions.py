@@ -22,6 +22,8 @@ class DecisionService:
         """
         self.graph = graph
         self.timeline = timeline_service
+        # Share the timeline's buffer so a user's event and decision stay ordered
+        self.writer = timeline_service.writer
 
     def log_decision(
         self,
@@ -55,35 +57,21 @@ class DecisionService:
             user_id=user_id, event_type="decision_logged", metadata=metadata
         )
 
-        # Optionally create a Decision node in Neo4j
-        tx = self.graph.begin()
-
-        from py2neo import Node, Relationship
-
-        decision_node = Node(
-            "Decision",
-            id=f"decision_{event_id}",
-            user_id=user_id,
-            decision_type=decision_type,
-            timestamp=datetime.utcnow().isoformat(),
+        # Create a Decision node linked to the user and its documents
+        self.writer.enqueue(
+            "decision",
+            user_id,
+            {
+                "user_id": user_id,
+                "props": {
+                    "id": f"decision_{event_id}",
+                    "user_id": user_id,
+                    "decision_type": decision_type,
+                    "timestamp": datetime.utcnow().isoformat(),
+                },
+                "document_ids": document_ids or [],
+            },
         )
-        tx.merge(decision_node, "Decision", "id")
-
-        # Link to user
-        user_node = Node("User", id=user_id)
-        tx.merge(user_node, "User", "id")
-        user_decision_rel = Relationship(user_node, "MADE_DECISION", decision_node)
-        tx.merge(user_decision_rel)
-
-        # Link to documents
-        if document_ids:
-            for doc_id in document_ids:
-                doc_node = Node("Document", id=doc_id)
-                tx.merge(doc_node, "Document", "id")
-                decision_doc_rel = Relationship(decision_node, "USES", doc_node)
-                tx.merge(decision_doc_rel)
-
-        tx.commit()
 
         return event_id
 
@@ -119,6 +107,7 @@ class DecisionService:
         if decision_type:
             params["decision_type"] = decision_type
 
+        self.writer.flush(user_id)
         results = self.graph.run(query, params).data()
 
         decisions = []
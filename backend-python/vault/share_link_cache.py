@@ -0,0 +1,285 @@
+"""
+Share-link validation fast path.
+
+Validated links are cached as Redis hashes (`share_link:{token_hash}`) that
+expire with the link. Each access runs one Lua script that checks expiry and
+`max_accesses` and increments the count atomically, so a cached hit costs a
+single Redis round trip and no graph query, and concurrent verifiers can
+never exceed `max_accesses`.
+
+Counted accesses are recorded in a pending-counts hash; `take_counts()`
+drains it so the latest count per link can be written back to Neo4j in one
+batch. Without REDIS_URL an in-process cache with the same semantics is used
+(atomic within one process only); its records are reloaded from Neo4j after
+SHARE_LINK_MEMORY_TTL seconds so revocations in other processes take effect.
+
+Revocation writes a tombstone (an expired record) whether or not the link
+is cached, so a validation that read the link before the revoke committed
+cannot cache it as valid afterwards.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "")
+SHARE_LINK_CACHE_SIZE = int(os.getenv("SHARE_LINK_CACHE_SIZE", "10000"))
+SHARE_LINK_MEMORY_TTL = float(os.getenv("SHARE_LINK_MEMORY_TTL", "30"))
+SHARE_LINK_TOMBSTONE_TTL = int(os.getenv("SHARE_LINK_TOMBSTONE_TTL", "86400"))
+
+RECORD_PREFIX = "share_link:"
+PENDING_COUNTS_KEY = "share_link_access:pending"
+
+# Access outcomes
+ALLOWED = "allowed"
+MISS = "miss"
+EXPIRED = "expired"
+EXHAUSTED = "exhausted"
+
+# KEYS[1] = link record, KEYS[2] = pending counts
+# ARGV[1] = now (epoch seconds), ARGV[2] = token hash,
+# ARGV[3] = record TTL deadline (0 = none), ARGV[4..] = record fields to load on a miss
+_ACCESS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    if #ARGV < 5 then
+        return {'miss', 0, {}}
+    end
+    redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+    -- Counts not yet written back are newer than the stored record's
+    local pending = tonumber(redis.call('HGET', KEYS[2], ARGV[2]) or '0')
+    if pending > tonumber(redis.call('HGET', KEYS[1], 'access_count') or '0') then
+        redis.call('HSET', KEYS[1], 'access_count', pending)
+    end
+    if tonumber(ARGV[3]) > 0 then
+        redis.call('EXPIREAT', KEYS[1], ARGV[3])
+    end
+end
+local fields = redis.call('HGETALL', KEYS[1])
+if #fields == 0 then
+    return {'expired', 0, {}}
+end
+local expires_ts = tonumber(redis.call('HGET', KEYS[1], 'expires_ts') or '0')
+if expires_ts > 0 and tonumber(ARGV[1]) >= expires_ts then
+    return {'expired', 0, fields}
+end
+local max_accesses = tonumber(redis.call('HGET', KEYS[1], 'max_accesses') or '0')
+local count = tonumber(redis.call('HGET', KEYS[1], 'access_count') or '0')
+if max_accesses > 0 and count >= max_accesses then
+    return {'exhausted', count, fields}
+end
+count = redis.call('HINCRBY', KEYS[1], 'access_count', 1)
+redis.call('HSET', KEYS[2], ARGV[2], count)
+return {'allowed', count, fields}
+"""
+
+_TAKE_COUNTS_SCRIPT = """
+local counts = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return counts
+"""
+
+# KEYS[1] = link record; ARGV[1] = new expires_ts, ARGV[2] = tombstone TTL
+# Creates the record if absent so a concurrent miss cannot load the live link
+_EXPIRE_SCRIPT = """
+redis.call('HSET', KEYS[1], 'expires_ts', ARGV[1], 'revoked', '1')
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+@dataclass
+class AccessResult:
+    """Outcome of one counted access."""
+
+    status: str
+    access_count: int = 0  # count including this access when allowed
+    record: Optional[Dict[str, str]] = None
+
+
+def _epoch(iso: str) -> float:
+    """Epoch seconds for a stored timestamp; naive values are UTC (utcnow)."""
+    dt = datetime.fromisoformat(iso)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def link_record(link: Dict[str, Any]) -> Dict[str, str]:
+    """Cacheable form of a ProofLink node: flat string fields, expiry as epoch seconds."""
+    expires_at = link.get("expires_at")
+    return {
+        "document_id": link["document_id"],
+        "access_level": link.get("access_level") or "",
+        "proof_type": link.get("proof_type") or "",
+        "created_at": link.get("created_at") or "",
+        "expires_at": expires_at or "",
+        "expires_ts": str(_epoch(expires_at) if expires_at else 0),
+        "max_accesses": str(link.get("max_accesses") or 0),
+        "access_count": str(link.get("access_count") or 0),
+    }
+
+
+def _get_redis():
+    """Redis client from REDIS_URL, or None to use the in-process cache."""
+    if not REDIS_URL:
+        return None
+    try:
+        import redis
+
+        client = redis.from_url(REDIS_URL, decode_responses=True)
+        client.ping()
+        logger.info("Redis share-link cache initialized")
+        return client
+    except Exception as e:
+        logger.warning(f"Redis unavailable, using in-memory share-link cache: {e}")
+        return None
+
+
+class ShareLinkCache:
+    """Cached share-link records with atomic access counting."""
+
+    def __init__(
+        self,
+        redis_client=None,
+        max_size: int = SHARE_LINK_CACHE_SIZE,
+        memory_ttl: float = SHARE_LINK_MEMORY_TTL,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            redis_client: Redis client (decode_responses=True); None keeps
+                records in process memory
+            max_size: Records kept by the in-process cache (LRU)
+            memory_ttl: Seconds an in-process record is trusted before it
+                is reloaded
+        """
+        self.redis_client = redis_client
+        self.max_size = max_size
+        self.memory_ttl = memory_ttl
+        self._lock = threading.Lock()
+        self._records: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._cached_at: Dict[str, float] = {}
+        self._pending: Dict[str, int] = {}
+        if redis_client is not None:
+            self._access = redis_client.register_script(_ACCESS_SCRIPT)
+            self._take_counts = redis_client.register_script(_TAKE_COUNTS_SCRIPT)
+            self._expire = redis_client.register_script(_EXPIRE_SCRIPT)
+
+    @property
+    def backend(self) -> str:
+        return "redis" if self.redis_client is not None else "memory"
+
+    def access(
+        self, token_hash: str, now: Optional[float] = None, record: Optional[Dict[str, str]] = None
+    ) -> AccessResult:
+        """
+        Check expiry and `max_accesses` and count one access, atomically.
+
+        Returns MISS when the link is not cached and no `record` is given;
+        with `record`, it is cached first (unless another caller already did).
+        """
+        now = time.time() if now is None else now
+        if self.redis_client is None:
+            return self._memory_access(token_hash, now, record)
+
+        args = [now, token_hash, 0]
+        if record is not None:
+            expires_ts = float(record["expires_ts"])
+            args[2] = int(expires_ts) + 1 if expires_ts else 0
+            for field, value in record.items():
+                args.extend((field, value))
+        status, count, fields = self._access(
+            keys=[RECORD_PREFIX + token_hash, PENDING_COUNTS_KEY], args=args
+        )
+        record = dict(zip(fields[::2], fields[1::2])) if fields else None
+        return AccessResult(status, int(count), record)
+
+    def expire(self, token_hash: str, now: Optional[float] = None) -> None:
+        """
+        Mark a link expired (revocation), cached or not; its counts still drain.
+
+        The tombstone outlives any validation that loaded the link before the
+        revoke, then lapses so the next miss reads the revoked link from Neo4j.
+        """
+        now = time.time() if now is None else now
+        if self.redis_client is not None:
+            self._expire(keys=[RECORD_PREFIX + token_hash], args=[now, SHARE_LINK_TOMBSTONE_TTL])
+            return
+        with self._lock:
+            record = self._records.get(token_hash)
+            if record is None:
+                record = {"expires_ts": str(now), "revoked": "1"}
+                self._store(token_hash, record, now)
+            else:
+                record["expires_ts"] = str(now)
+                record["revoked"] = "1"
+                self._cached_at[token_hash] = now
+
+    def take_counts(self) -> Dict[str, int]:
+        """Drain the latest access count of every link counted since the last call."""
+        if self.redis_client is not None:
+            flat = self._take_counts(keys=[PENDING_COUNTS_KEY])
+            return {flat[i]: int(flat[i + 1]) for i in range(0, len(flat), 2)}
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            return pending
+
+    def _memory_access(
+        self, token_hash: str, now: float, record: Optional[Dict[str, str]]
+    ) -> AccessResult:
+        with self._lock:
+            cached = self._records.get(token_hash)
+            if cached is not None and now - self._cached_at[token_hash] >= self.memory_ttl:
+                # Stale: another process may have revoked or counted it
+                cached = None
+            if cached is None:
+                if record is None:
+                    return AccessResult(MISS)
+                cached = dict(record)
+                # Counts not yet written back are newer than the stored record's
+                pending = self._pending.get(token_hash, 0)
+                if pending > int(cached["access_count"]):
+                    cached["access_count"] = str(pending)
+                self._store(token_hash, cached, now)
+            self._records.move_to_end(token_hash)
+
+            expires_ts = float(cached["expires_ts"])
+            if expires_ts and now >= expires_ts:
+                return AccessResult(EXPIRED, 0, dict(cached))
+            max_accesses = int(cached["max_accesses"])
+            count = int(cached["access_count"])
+            if max_accesses and count >= max_accesses:
+                return AccessResult(EXHAUSTED, count, dict(cached))
+            count += 1
+            cached["access_count"] = str(count)
+            self._pending[token_hash] = count
+            return AccessResult(ALLOWED, count, dict(cached))
+
+    def _store(self, token_hash: str, record: Dict[str, str], now: float) -> None:
+        """Cache a record (caller holds the lock), evicting the least recently used."""
+        self._records[token_hash] = record
+        self._cached_at[token_hash] = now
+        if len(self._records) > self.max_size:
+            evicted, _ = self._records.popitem(last=False)
+            self._cached_at.pop(evicted, None)
+
+
+_cache: Optional[ShareLinkCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_share_link_cache() -> ShareLinkCache:
+    """Shared cache: Redis when REDIS_URL is reachable, process memory otherwise."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ShareLinkCache(_get_redis())
+        return _cache
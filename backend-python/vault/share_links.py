@@ -1,32 +1,103 @@
 """
 Share link generation and validation service for proof sharing.
+
+Validation goes through `ShareLinkCache`: a cached link is checked and
+counted in one atomic step without touching Neo4j, and a miss costs one
+graph query by token hash. Access counts are written back to Neo4j in
+batches through the write-behind buffer.
+
+Links created before tokens were hashed must be migrated once:
+
+    python -m vault.share_links --migrate-tokens
 """
 
+import atexit
+import logging
 import os
 import secrets
 import hashlib
-from typing import Optional
+import threading
+import time
+from typing import Dict, Optional, Tuple
 from datetime import datetime, timedelta
 from py2neo import Graph, Node
 
 from vault.models import ProofLink, AccessLevel
+from vault.share_link_cache import ALLOWED, MISS, ShareLinkCache, get_share_link_cache, link_record
+from vault.write_behind import get_write_behind
+
+logger = logging.getLogger(__name__)
+
+SHARE_ACCESS_FLUSH_INTERVAL = float(os.getenv("SHARE_ACCESS_FLUSH_INTERVAL", "5"))
+
+
+# Counter stores drained at exit, with the graph their counts are written to.
+# One entry per store, not per service, so services are never pinned.
+_exit_flushes: Dict[int, Tuple[ShareLinkCache, Graph]] = {}
+_exit_flushes_lock = threading.Lock()
+
+
+def hash_share_token(token: str) -> str:
+    """Hash a token using SHA-256 (no raw token stored)."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def queue_access_counts(link_cache: ShareLinkCache, graph: Graph) -> int:
+    """Drain a store's counted accesses into the write-behind buffer."""
+    counts = link_cache.take_counts()
+    if not counts:
+        return 0
+    writer = get_write_behind(graph)
+    for token_hash, access_count in counts.items():
+        # Keyed per link so each link's rows share one UNWIND wave
+        writer.enqueue(
+            "share_access",
+            f"share_link:{token_hash}",
+            {"token_hash": token_hash, "access_count": access_count},
+        )
+    return len(counts)
+
+
+# Registered after vault.write_behind's hook, so it runs before the buffer's
+# final flush (atexit is LIFO)
+@atexit.register
+def _flush_access_counts_at_exit() -> None:
+    with _exit_flushes_lock:
+        targets = list(_exit_flushes.values())
+    for link_cache, graph in targets:
+        try:
+            queue_access_counts(link_cache, graph)
+        except Exception as e:
+            logger.error(f"Share access count shutdown flush failed: {e}")
 
 
 class ShareLinkService:
     """Service for generating and managing shareable proof links."""
 
-    def __init__(self, graph: Graph, base_url: Optional[str] = None):
+    def __init__(
+        self,
+        graph: Graph,
+        base_url: Optional[str] = None,
+        link_cache: Optional[ShareLinkCache] = None,
+    ):
         """
         Initialize share link service.
 
         Args:
             graph: Neo4j graph connection
             base_url: Base URL for share links (defaults to env var)
+            link_cache: Validation cache (defaults to the shared Redis or
+                in-process cache)
         """
         self.graph = graph
         self.base_url = base_url or os.getenv(
             "SHARE_LINK_BASE_URL", "http://localhost:8000/vault/share"
         )
+        self.link_cache = link_cache or get_share_link_cache()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        with _exit_flushes_lock:
+            _exit_flushes.setdefault(id(self.link_cache), (self.link_cache, graph))
 
     def create_share_link(
         self,
@@ -78,6 +149,9 @@ class ShareLinkService:
         """
         Validate a share token and return proof link if valid.
 
+        Expiry and max_accesses are checked and the access is counted in
+        one atomic step, so concurrent verifiers cannot exceed the limit.
+
         Args:
             token: Share token
 
@@ -86,61 +160,52 @@ class ShareLinkService:
         """
         token_hash = self._hash_token(token)
 
-        query = """
-        MATCH (p:ProofLink {share_token_hash: $token_hash})
-        RETURN p
-        LIMIT 1
-        """
-
-        results = self.graph.run(query, {"token_hash": token_hash}).data()
-        if not results:
-            # Legacy fallback: if hash not found, try plaintext (should be migrated)
-            fallback_query = """
-            MATCH (p:ProofLink {share_token: $token})
-            RETURN p
-            LIMIT 1
-            """
-            results = self.graph.run(fallback_query, {"token": token}).data()
-            if not results:
+        result = self.link_cache.access(token_hash)
+        if result.status == MISS:
+            link_dict = self._load_link(token_hash)
+            if link_dict is None:
                 return None
-
-        link_node = results[0]["p"]
-        link_dict = dict(link_node)
-
-        # Check expiration
-        if link_dict.get("expires_at"):
-            expires_at = datetime.fromisoformat(link_dict["expires_at"])
-            if datetime.utcnow() > expires_at:
+            record = link_record(link_dict)
+            expires_ts = float(record["expires_ts"])
+            if expires_ts and time.time() >= expires_ts:
                 return None
+            result = self.link_cache.access(token_hash, record=record)
 
-        # Check max accesses
-        if link_dict.get("max_accesses"):
-            access_count = link_dict.get("access_count", 0)
-            if access_count >= link_dict["max_accesses"]:
-                return None
+        if result.status != ALLOWED:
+            return None
 
-        # Increment access count
-        self._increment_access_count(token_hash)
+        self.flush_access_counts()
 
-        # Convert to ProofLink object
-        proof_link = ProofLink(
+        record = result.record
+        return ProofLink(
             share_token=token,  # return the presented token; we store hash
-            document_id=link_dict["document_id"],
+            document_id=record["document_id"],
             expires_at=(
-                datetime.fromisoformat(link_dict["expires_at"])
-                if link_dict.get("expires_at")
-                else None
+                datetime.fromisoformat(record["expires_at"]) if record["expires_at"] else None
             ),
-            access_level=AccessLevel(link_dict.get("access_level", "PROOF_ONLY")),
-            proof_type=link_dict.get("proof_type"),
-            created_at=datetime.fromisoformat(
-                link_dict.get("created_at", datetime.utcnow().isoformat())
+            access_level=AccessLevel(record["access_level"] or AccessLevel.PROOF_ONLY.value),
+            proof_type=record["proof_type"] or None,
+            created_at=(
+                datetime.fromisoformat(record["created_at"])
+                if record["created_at"]
+                else datetime.utcnow()
             ),
-            access_count=link_dict.get("access_count", 0),
-            max_accesses=link_dict.get("max_accesses"),
+            access_count=result.access_count - 1,  # accesses before this one
+            max_accesses=int(record["max_accesses"]) or None,
         )
 
-        return proof_link
+    def flush_access_counts(self, force: bool = False) -> int:
+        """
+        Queue counted accesses for Neo4j, at most once per flush interval.
+
+        Returns the number of links whose count was queued.
+        """
+        with self._flush_lock:
+            now = time.monotonic()
+            if not force and now - self._last_flush < SHARE_ACCESS_FLUSH_INTERVAL:
+                return 0
+            self._last_flush = now
+            return queue_access_counts(self.link_cache, self.graph)
 
     def get_share_url(self, token: str) -> str:
         """Get full share URL for a token."""
@@ -169,6 +234,8 @@ class ShareLinkService:
             query, {"user_id": user_id, "token_hash": token_hash, "now": now}
         ).data()
 
+        if results:
+            self.link_cache.expire(token_hash)
         return len(results) > 0
 
     def _generate_token(self) -> str:
@@ -211,14 +278,68 @@ class ShareLinkService:
 
         tx.commit()
 
-    def _increment_access_count(self, token_hash: str):
-        """Increment access count for a link."""
+    def _load_link(self, token_hash: str) -> Optional[Dict]:
+        """Stored link properties by token hash, or None."""
         query = """
         MATCH (p:ProofLink {share_token_hash: $token_hash})
-        SET p.access_count = coalesce(p.access_count, 0) + 1
+        RETURN p
+        LIMIT 1
         """
-        self.graph.run(query, {"token_hash": token_hash})
+        results = self.graph.run(query, {"token_hash": token_hash}).data()
+        return dict(results[0]["p"]) if results else None
 
     def _hash_token(self, token: str) -> str:
         """Hash a token using SHA-256 (no raw token stored)."""
-        return hashlib.sha256(token.encode()).hexdigest()
+        return hash_share_token(token)
+
+
+def migrate_plaintext_tokens(graph: Graph, batch_size: int = 500) -> int:
+    """
+    Replace plaintext `share_token` properties with `share_token_hash`.
+
+    Idempotent; runs in batches until no plaintext token is left and
+    returns the number of links migrated.
+    """
+    select = """
+    MATCH (p:ProofLink)
+    WHERE p.share_token IS NOT NULL
+    RETURN p.share_token AS token
+    LIMIT $limit
+    """
+    update = """
+    UNWIND $rows AS row
+    MATCH (p:ProofLink {share_token: row.token})
+    SET p.share_token_hash = coalesce(p.share_token_hash, row.token_hash)
+    REMOVE p.share_token
+    """
+    migrated = 0
+    while True:
+        tokens = [row["token"] for row in graph.run(select, {"limit": batch_size}).data()]
+        if not tokens:
+            return migrated
+        rows = [{"token": t, "token_hash": hash_share_token(t)} for t in tokens]
+        graph.run(update, {"rows": rows})
+        migrated += len(rows)
+        logger.info(f"Migrated {migrated} plaintext share tokens")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from api.database import get_graph
+
+    parser = argparse.ArgumentParser(description="Share link maintenance")
+    parser.add_argument(
+        "--migrate-tokens",
+        action="store_true",
+        help="Hash legacy plaintext share tokens (one-time)",
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.migrate_tokens:
+        count = migrate_plaintext_tokens(get_graph(), args.batch_size)
+        print(f"Migrated {count} share links")
+    else:
+        parser.print_help()
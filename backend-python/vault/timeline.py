@@ -6,7 +6,9 @@ import json
 import logging
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from py2neo import Graph, Node
+from py2neo import Graph
+
+from vault.write_behind import WriteBehindBuffer, get_write_behind
 
 logger = logging.getLogger(__name__)
 
@@ -14,14 +16,16 @@ logger = logging.getLogger(__name__)
 class TimelineService:
     """Service for managing user verification timeline."""
 
-    def __init__(self, graph: Graph):
+    def __init__(self, graph: Graph, writer: Optional[WriteBehindBuffer] = None):
         """
         Initialize timeline service.
 
         Args:
             graph: Neo4j graph connection
+            writer: Write-behind buffer (defaults to the shared one for `graph`)
         """
         self.graph = graph
+        self.writer = writer or get_write_behind(graph)
 
     def log_event(
         self,
@@ -35,6 +39,9 @@ class TimelineService:
         """
         Log an event to the timeline.
 
+        The write is queued on the write-behind buffer and committed with the
+        next batch; reads through this service flush the user's queue first.
+
         Args:
             user_id: User identifier
             event_type: Type of event (from EventType enum)
@@ -50,9 +57,6 @@ class TimelineService:
         event_id = f"event_{user_id}_{int(datetime.utcnow().timestamp() * 1000)}"
         timestamp = datetime.utcnow().isoformat()
 
-        tx = self.graph.begin()
-
-        # Create TimelineEvent node
         event_props = {
             "id": event_id,
             "user_id": user_id,
@@ -69,33 +73,17 @@ class TimelineService:
         if metadata:
             event_props["metadata"] = json.dumps(metadata)
 
-        event_node = Node("TimelineEvent", **event_props)
-        tx.merge(event_node, "TimelineEvent", "id")
-
-        # Link to User
-        user_node = Node("User", id=user_id)
-        tx.merge(user_node, "User", "id")
-
-        from py2neo import Relationship
-
-        user_event_rel = Relationship(user_node, "HAS_EVENT", event_node)
-        tx.merge(user_event_rel)
-
-        # Link to Document if provided
-        if document_id:
-            doc_node = Node("Document", id=document_id)
-            tx.merge(doc_node, "Document", "id")
-            doc_event_rel = Relationship(event_node, "REFERENCES", doc_node)
-            tx.merge(doc_event_rel)
-
-        # Link to Attestation if provided
-        if attestation_id:
-            att_node = Node("Attestation", id=attestation_id)
-            tx.merge(att_node, "Attestation", "id")
-            att_event_rel = Relationship(event_node, "REFERENCES", att_node)
-            tx.merge(att_event_rel)
-
-        tx.commit()
+        # Linked to the User, and to the Document/Attestation if provided
+        self.writer.enqueue(
+            "timeline_event",
+            user_id,
+            {
+                "user_id": user_id,
+                "props": event_props,
+                "document_id": document_id,
+                "attestation_id": attestation_id,
+            },
+        )
 
         return event_id
 
@@ -131,6 +119,7 @@ class TimelineService:
         if event_type:
             params["event_type"] = event_type
 
+        self.writer.flush(user_id)
         results = self.graph.run(query, params).data()
 
         events = []
@@ -171,6 +160,7 @@ class TimelineService:
         LIMIT $limit
         """
 
+        self.writer.flush(user_id)
         results = self.graph.run(query, {"user_id": user_id, "limit": limit}).data()
 
         events = []
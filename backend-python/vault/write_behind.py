@@ -0,0 +1,351 @@
+"""
+Write-behind buffer for vault graph mutations.
+
+Timeline events, decisions, document/attestation writes and share-link
+access counts are queued and flushed by a background thread as
+parameterised `UNWIND` batches, one transaction per flush, instead of one
+transaction per call.
+
+Ordering: mutations for the same user are applied in the order they were
+queued. Each flush splits pending mutations into "waves" where wave N holds
+every user's N-th mutation; waves run in order, and within a wave mutations
+are grouped by kind into a single UNWIND statement.
+
+Failures: a failed batch is put back at the head of the queue and retried
+with exponential backoff. A mutation that has failed WRITE_BEHIND_MAX_ATTEMPTS
+times is retried on its own; if it still fails it is logged and moved to a
+dead-letter list (see `dead_letters()` / `retry_dead_letters()`) so one bad
+row cannot block every later write.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from py2neo import Graph
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "500"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.05"))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+WRITE_BEHIND_RETRY_BACKOFF = float(os.getenv("WRITE_BEHIND_RETRY_BACKOFF", "1.0"))
+# Longest a producer waits for the flusher when the queue is full
+WRITE_BEHIND_ENQUEUE_TIMEOUT = float(os.getenv("WRITE_BEHIND_ENQUEUE_TIMEOUT", "5.0"))
+_MAX_RETRY_DELAY = 30.0
+
+# Mutation kinds -> UNWIND statement. Each row carries the kind's parameters.
+STATEMENTS: Dict[str, str] = {
+    "timeline_event": """
+        UNWIND $rows AS row
+        MERGE (e:TimelineEvent {id: row.props.id})
+        SET e += row.props
+        MERGE (u:User {id: row.user_id})
+        MERGE (u)-[:HAS_EVENT]->(e)
+        FOREACH (doc_id IN CASE WHEN row.document_id IS NULL THEN [] ELSE [row.document_id] END |
+            MERGE (d:Document {id: doc_id})
+            MERGE (e)-[:REFERENCES]->(d)
+        )
+        FOREACH (att_id IN CASE WHEN row.attestation_id IS NULL
+                            THEN [] ELSE [row.attestation_id] END |
+            MERGE (a:Attestation {id: att_id})
+            MERGE (e)-[:REFERENCES]->(a)
+        )
+    """,
+    "decision": """
+        UNWIND $rows AS row
+        MERGE (d:Decision {id: row.props.id})
+        SET d += row.props
+        MERGE (u:User {id: row.user_id})
+        MERGE (u)-[:MADE_DECISION]->(d)
+        FOREACH (doc_id IN row.document_ids |
+            MERGE (doc:Document {id: doc_id})
+            MERGE (d)-[:USES]->(doc)
+        )
+    """,
+    "document": """
+        UNWIND $rows AS row
+        MERGE (u:User {id: row.user_id})
+        MERGE (d:Document {id: row.props.id})
+        SET d += row.props
+        MERGE (u)-[:OWNS]->(d)
+        FOREACH (att IN CASE WHEN row.attestation IS NULL THEN [] ELSE [row.attestation] END |
+            MERGE (a:Attestation {id: att.id})
+            SET a += att
+            MERGE (a)-[:ATTESTS]->(d)
+        )
+    """,
+    "attestation": """
+        UNWIND $rows AS row
+        MERGE (d:Document {id: row.document_id})
+        MERGE (a:Attestation {id: row.props.id})
+        SET a += row.props
+        MERGE (a)-[:ATTESTS]->(d)
+    """,
+    # Absolute counts, so replays and out-of-order batches never lower them
+    "share_access": """
+        UNWIND $rows AS row
+        MATCH (p:ProofLink {share_token_hash: row.token_hash})
+        SET p.access_count = CASE
+            WHEN coalesce(p.access_count, 0) < row.access_count THEN row.access_count
+            ELSE p.access_count
+        END
+    """,
+}
+
+Mutation = Tuple[str, str, Dict[str, Any]]  # (kind, user_id, row)
+
+
+@dataclass
+class QueuedMutation:
+    """A queued mutation and the number of failed writes it was part of."""
+
+    kind: str
+    user_id: str
+    row: Dict[str, Any]
+    attempts: int = 0
+
+    def as_tuple(self) -> Mutation:
+        return self.kind, self.user_id, self.row
+
+
+def plan_batches(pending: List[Mutation]) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Turn queued mutations into an ordered list of (statement kind, rows).
+
+    A user's N-th mutation lands in wave N, so per-user order is preserved
+    while mutations of the same kind across users share one UNWIND.
+    """
+    waves: List[Dict[str, List[Dict[str, Any]]]] = []
+    depth: Dict[str, int] = defaultdict(int)
+    for kind, user_id, row in pending:
+        wave = depth[user_id]
+        depth[user_id] += 1
+        if wave == len(waves):
+            waves.append({})
+        waves[wave].setdefault(kind, []).append(row)
+
+    return [(kind, rows) for wave in waves for kind, rows in wave.items()]
+
+
+class WriteBehindBuffer:
+    """Queue graph mutations and flush them in batches on size or time."""
+
+    def __init__(
+        self,
+        graph: Graph,
+        max_batch: int = WRITE_BEHIND_MAX_BATCH,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        max_attempts: int = WRITE_BEHIND_MAX_ATTEMPTS,
+        retry_backoff: float = WRITE_BEHIND_RETRY_BACKOFF,
+        autostart: bool = True,
+    ):
+        """
+        Initialize the buffer.
+
+        Args:
+            graph: Neo4j graph connection
+            max_batch: Pending mutations that trigger an immediate flush
+            flush_interval: Seconds between background flushes
+            max_pending: Queue size at which enqueue waits for the flusher
+            max_attempts: Failed writes before a mutation is dead-lettered
+            retry_backoff: Seconds before the first background retry (doubles)
+            autostart: Start the background flush thread
+        """
+        self.graph = graph
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+
+        self._pending: List[QueuedMutation] = []
+        self._dead: List[QueuedMutation] = []
+        self._cond = threading.Condition()
+        # Serialises flushes so batches commit in queue order
+        self._flush_lock = threading.Lock()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        if autostart:
+            self.start()
+
+    def start(self) -> None:
+        """Start the background flush thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, kind: str, user_id: str, row: Dict[str, Any]) -> None:
+        """
+        Queue a mutation of `kind` for `user_id`.
+
+        When `max_pending` mutations are queued, waits (up to
+        WRITE_BEHIND_ENQUEUE_TIMEOUT) for the background flusher to drain the
+        queue. The mutation is always accepted; write errors never reach the
+        producer.
+        """
+        if kind not in STATEMENTS:
+            raise ValueError(f"Unknown mutation kind: {kind}")
+        with self._cond:
+            deadline = time.monotonic() + WRITE_BEHIND_ENQUEUE_TIMEOUT
+            while len(self._pending) >= self.max_pending and self._flusher_running():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"Write-behind queue full ({len(self._pending)} pending)")
+                    break
+                self._cond.notify_all()
+                self._cond.wait(remaining)
+            self._pending.append(QueuedMutation(kind, user_id, row))
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+
+    def pending(self) -> int:
+        """Number of queued mutations."""
+        with self._cond:
+            return len(self._pending)
+
+    def dead_letters(self) -> List[Mutation]:
+        """Mutations dropped after `max_attempts` failed writes."""
+        with self._cond:
+            return [m.as_tuple() for m in self._dead]
+
+    def retry_dead_letters(self) -> int:
+        """Re-queue dead-lettered mutations with a fresh attempt count."""
+        with self._cond:
+            dead, self._dead = self._dead, []
+            for mutation in dead:
+                mutation.attempts = 0
+            self._pending.extend(dead)
+            return len(dead)
+
+    def flush(self, user_id: Optional[str] = None) -> int:
+        """
+        Synchronously write queued mutations; returns the number written.
+
+        With `user_id`, only that user's mutations are flushed (used for
+        read-your-writes before reads). On failure the mutations are put back
+        at the head of the queue, except those that reached `max_attempts`
+        and still fail on their own (dead-lettered), and the error is raised.
+        """
+        with self._flush_lock:
+            with self._cond:
+                if user_id is None:
+                    batch, self._pending = self._pending, []
+                else:
+                    batch = [m for m in self._pending if m.user_id == user_id]
+                    self._pending = [m for m in self._pending if m.user_id != user_id]
+                # Wake producers waiting for room
+                self._cond.notify_all()
+            if not batch:
+                return 0
+
+            try:
+                self._write(batch)
+            except Exception:
+                retry = self._after_failure(batch)
+                with self._cond:
+                    self._pending[:0] = retry
+                raise
+            return len(batch)
+
+    def _after_failure(self, batch: List[QueuedMutation]) -> List[QueuedMutation]:
+        """Count the failed attempt; returns the mutations to retry."""
+        retry = []
+        for mutation in batch:
+            mutation.attempts += 1
+            if mutation.attempts < self.max_attempts:
+                retry.append(mutation)
+                continue
+            # Written alone so only the rows that actually fail are dropped
+            try:
+                self._write([mutation])
+            except Exception as e:
+                logger.error(
+                    f"Write-behind dropped {mutation.kind} mutation for {mutation.user_id} "
+                    f"after {mutation.attempts} attempts: {e}; row={mutation.row!r}"
+                )
+                with self._cond:
+                    self._dead.append(mutation)
+        return retry
+
+    def _write(self, batch: List[QueuedMutation]) -> None:
+        tx = self.graph.begin()
+        try:
+            for kind, rows in plan_batches([m.as_tuple() for m in batch]):
+                tx.run(STATEMENTS[kind], rows=rows)
+            tx.commit()
+        except Exception:
+            try:
+                tx.rollback()
+            except Exception:
+                pass
+            raise
+
+    def _flusher_running(self) -> bool:
+        return not self._stopped and self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        failures = 0
+        while True:
+            with self._cond:
+                if failures:
+                    delay = min(self.retry_backoff * 2 ** (failures - 1), _MAX_RETRY_DELAY)
+                else:
+                    delay = self.flush_interval
+                deadline = time.monotonic() + delay
+                while not self._stopped:
+                    remaining = deadline - time.monotonic()
+                    # A full batch flushes early, but not while backing off
+                    if remaining <= 0 or (not failures and len(self._pending) >= self.max_batch):
+                        break
+                    self._cond.wait(remaining)
+                stopped = self._stopped
+            try:
+                self.flush()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                logger.error(f"Write-behind flush failed ({failures} in a row), will retry: {e}")
+            if stopped:
+                return
+
+    def close(self) -> None:
+        """Stop the background thread after a final flush."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+_buffers: Dict[int, WriteBehindBuffer] = {}
+_buffers_lock = threading.Lock()
+
+
+def get_write_behind(graph: Graph) -> WriteBehindBuffer:
+    """Shared buffer per graph, so services writing for one user stay ordered."""
+    with _buffers_lock:
+        buffer = _buffers.get(id(graph))
+        if buffer is None:
+            buffer = WriteBehindBuffer(graph)
+            _buffers[id(graph)] = buffer
+        return buffer
+
+
+@atexit.register
+def _close_all() -> None:
+    for buffer in list(_buffers.values()):
+        try:
+            buffer.close()
+        except Exception as e:
+            logger.error(f"Write-behind shutdown flush failed: {e}")
@@ -14,7 +14,9 @@ import secrets
 import subprocess
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional
+
+from zkp.proving_scheduler import PRIORITY_INTERACTIVE, get_proving_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -32,17 +34,21 @@ class ZKProofService:
     Service for generating and verifying zkSNARK proofs.
 
     Automatically uses rapidsnark for Level 3/AAIP circuits when available,
-    falls back to SnarkJS otherwise.
+    falls back to SnarkJS otherwise. Proof generation runs on the shared
+    proving scheduler at `priority` (interactive by default: these back
+    user-facing document proofs).
     """
 
     def __init__(
         self,
         runner_path: Optional[str] = None,
         use_rapidsnark: bool = True,
+        priority: int = PRIORITY_INTERACTIVE,
     ):
         base_dir = Path(__file__).resolve().parent.parent / "zkp"
         self.runner_path = Path(runner_path) if runner_path else base_dir / "snark-runner.js"
         self.use_rapidsnark = use_rapidsnark
+        self.priority = priority
         self._rapidsnark_prover = None
 
         # Lazy-load rapidsnark prover
@@ -63,6 +69,10 @@ class ZKProofService:
         """Determine if rapidsnark should be used for this circuit."""
         return self._rapidsnark_prover is not None and circuit in RAPIDSNARK_CIRCUITS
 
+    def _schedule(self, circuit: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run proving work on the proving scheduler and wait for it."""
+        return get_proving_scheduler().run(circuit, fn, *args, priority=self.priority)
+
     def _run(self, action: str, circuit: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Invoke the Node snark-runner with JSON payload via stdin."""
         if not self.runner_path.exists():
@@ -114,7 +124,7 @@ class ZKProofService:
             "epoch": str(epoch),  # Private epoch for age circuit
         }
 
-        bundle = self._run("prove", "age", payload)
+        bundle = self._schedule("age", self._run, "prove", "age", payload)
         public_inputs = bundle.get("namedSignals", {})
 
         # Extract nullifier from public signals (last signal)
@@ -209,7 +219,7 @@ class ZKProofService:
             "epoch": str(epoch),  # Public epoch for authenticity circuit
         }
 
-        bundle = self._run("prove", "authenticity", payload)
+        bundle = self._schedule("authenticity", self._run, "prove", "authenticity", payload)
         public_inputs = bundle.get("namedSignals", {})
 
         # Extract epoch and nullifier from public signals
@@ -314,7 +324,9 @@ class ZKProofService:
 
         if self._should_use_rapidsnark("age_level3"):
             logger.info("Using rapidsnark for age_level3 proof")
-            proof, public_signals = self._rapidsnark_prover.prove("age_level3", payload)
+            proof, public_signals = self._schedule(
+                "age_level3", self._rapidsnark_prover.prove, "age_level3", payload
+            )
             nullifier = public_signals[-1] if public_signals else None
             return {
                 "proof_data": json.dumps({"proof": proof, "publicSignals": public_signals}),
@@ -323,7 +335,7 @@ class ZKProofService:
                 "nullifier": nullifier,
             }
         else:
-            bundle = self._run("prove", "age_level3", payload)
+            bundle = self._schedule("age_level3", self._run, "prove", "age_level3", payload)
             nullifier = bundle.get("publicSignals", [])[-1] if bundle.get("publicSignals") else None
             return {
                 "proof_data": json.dumps(bundle),
@@ -377,7 +389,9 @@ class ZKProofService:
 
         if self._should_use_rapidsnark("agent_capability"):
             logger.info("Using rapidsnark for agent_capability proof")
-            proof, public_signals = self._rapidsnark_prover.prove("agent_capability", payload)
+            proof, public_signals = self._schedule(
+                "agent_capability", self._rapidsnark_prover.prove, "agent_capability", payload
+            )
             nullifier = public_signals[0] if public_signals else None
             return {
                 "proof_data": json.dumps({"proof": proof, "publicSignals": public_signals}),
@@ -386,7 +400,9 @@ class ZKProofService:
                 "verified": public_signals[1] == "1" if len(public_signals) > 1 else False,
             }
         else:
-            bundle = self._run("prove", "agent_capability", payload)
+            bundle = self._schedule(
+                "agent_capability", self._run, "prove", "agent_capability", payload
+            )
             public_signals = bundle.get("publicSignals", [])
             return {
                 "proof_data": json.dumps(bundle),
@@ -433,7 +449,9 @@ class ZKProofService:
 
         if self._should_use_rapidsnark("agent_reputation"):
             logger.info("Using rapidsnark for agent_reputation proof")
-            proof, public_signals = self._rapidsnark_prover.prove("agent_reputation", payload)
+            proof, public_signals = self._schedule(
+                "agent_reputation", self._rapidsnark_prover.prove, "agent_reputation", payload
+            )
             return {
                 "proof_data": json.dumps({"proof": proof, "publicSignals": public_signals}),
                 "proof_type": "agent_reputation_proof",
@@ -442,7 +460,9 @@ class ZKProofService:
                 "reputation_commitment": public_signals[2] if len(public_signals) > 2 else None,
             }
         else:
-            bundle = self._run("prove", "agent_reputation", payload)
+            bundle = self._schedule(
+                "agent_reputation", self._run, "prove", "agent_reputation", payload
+            )
             public_signals = bundle.get("publicSignals", [])
             return {
                 "proof_data": json.dumps(bundle),
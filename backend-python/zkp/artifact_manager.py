@@ -0,0 +1,423 @@
+"""
+Circuit Artifact Manager
+========================
+
+Single owner of circuit artifact paths, integrity checks and buffers.
+
+Circuit names, file stems and public signals come from `zkp/circuits.json`
+(also read by snark-runner.js); pinned hashes from
+`zkp/artifacts/INTEGRITY.json`, loaded once. Every digest is computed by
+streaming the file and cached by (mtime, size), so an artifact is hashed
+once per build rather than once per consumer, and the digests are
+persisted to ZKP_DIGEST_CACHE so other workers and restarts reuse them.
+
+zkey and wasm files are memory-mapped read-only: all workers share the
+page cache instead of each holding its own copy.
+
+Usage:
+    from zkp.artifact_manager import get_artifact_manager
+
+    manager = get_artifact_manager()
+    manager.preload()                       # verify everything at startup
+    vkey = manager.vkey("age")              # parsed, integrity-checked
+    zkey = manager.buffer("age", "zkey")    # memoryview over an mmap
+    manager.capabilities()                  # /capabilities document
+
+INTEGRITY.json maps each circuit to the canonical vkey hash written by
+scripts/verify_key_integrity.py (SHA-256 of the key-sorted JSON), or to an
+object pinning raw SHA-256 digests per artifact:
+    {"age": {"vkey": "<canonical>", "zkey": "<sha256>", "wasm": "<sha256>"}}
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ZKP_DIR = Path(__file__).resolve().parent
+ARTIFACTS_DIR = ZKP_DIR / "artifacts"
+CIRCUITS_MANIFEST = ZKP_DIR / "circuits.json"
+INTEGRITY_FILE = "INTEGRITY.json"
+DIGEST_CACHE = Path(os.getenv("ZKP_DIGEST_CACHE", str(ZKP_DIR / ".artifact-digests.json")))
+
+HASH_CHUNK = 1 << 20
+ARTIFACT_KINDS = ("zkey", "wasm", "cpp_witness", "vkey")
+MAPPABLE_KINDS = ("zkey", "wasm")
+
+# Integrity states
+VERIFIED = "verified"
+UNPINNED = "unpinned"
+MISMATCH = "mismatch"
+MISSING = "missing"
+
+
+class ArtifactIntegrityError(Exception):
+    """Raised when an artifact does not match its pinned hash"""
+
+    pass
+
+
+@dataclass(frozen=True)
+class CircuitSpec:
+    """One circuit from circuits.json."""
+
+    name: str
+    stem: str
+    public_signals: Tuple[str, ...] = ()
+    proof_type: Optional[str] = None
+    endpoint: Optional[str] = None
+    use_rapidsnark: bool = False
+    witness_type: str = "wasm"
+
+    @classmethod
+    def from_manifest(cls, name: str, entry: Dict[str, Any]) -> "CircuitSpec":
+        return cls(
+            name=name,
+            stem=entry.get("stem", name),
+            public_signals=tuple(entry.get("publicSignals", ())),
+            proof_type=entry.get("proofType"),
+            endpoint=entry.get("endpoint"),
+            use_rapidsnark=bool(entry.get("rapidsnark", False)),
+            witness_type=entry.get("witness", "wasm"),
+        )
+
+
+def load_circuit_specs(manifest: Path = CIRCUITS_MANIFEST) -> Dict[str, CircuitSpec]:
+    """Read circuits.json into specs keyed by circuit name."""
+    with open(manifest, "r") as f:
+        entries = json.load(f)
+    return {name: CircuitSpec.from_manifest(name, entry) for name, entry in entries.items()}
+
+
+def canonical_json_digest(data: Any) -> str:
+    """SHA-256 of key-sorted JSON, as pinned in INTEGRITY.json."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def _stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+@dataclass
+class _Entry:
+    """Per-file cache entry, valid while (mtime_ns, size) is unchanged."""
+
+    stamp: Tuple[int, int]
+    sha256: Optional[str] = None
+    canonical: Optional[str] = None
+    data: Any = None
+    mapped: Optional[mmap.mmap] = field(default=None, repr=False)
+
+
+class ArtifactManager:
+    """
+    Resolves, verifies and maps circuit artifacts for one artifacts directory.
+
+    Thread-safe; a file is re-hashed only when its mtime or size changes.
+    """
+
+    def __init__(
+        self,
+        artifacts_dir: Optional[Path] = None,
+        manifest: Optional[Path] = None,
+        digest_cache: Optional[Path] = DIGEST_CACHE,
+    ):
+        """
+        Args:
+            artifacts_dir: Circuit artifacts root (default: zkp/artifacts)
+            manifest: Circuit manifest (default: zkp/circuits.json)
+            digest_cache: JSON file persisting digests across processes,
+                or None to keep them in memory only
+        """
+        self.artifacts_dir = Path(artifacts_dir or ARTIFACTS_DIR)
+        self.specs = load_circuit_specs(manifest or CIRCUITS_MANIFEST)
+        self._digest_cache = Path(digest_cache) if digest_cache else None
+        self._lock = threading.RLock()
+        self._entries: Dict[Path, _Entry] = {}
+        self._integrity: Optional[Dict[str, Any]] = None
+        self._persisted: Optional[Dict[str, Dict[str, Any]]] = None
+        self._hashed = 0
+
+    # ------------------------------------------------------------------
+    # Paths
+    # ------------------------------------------------------------------
+
+    def spec(self, circuit: str) -> CircuitSpec:
+        """Spec for a circuit; unknown circuits use their name as the stem."""
+        return self.specs.get(circuit) or CircuitSpec(name=circuit, stem=circuit)
+
+    def paths(self, circuit: str) -> Dict[str, Path]:
+        """Paths to a circuit's zkey, wasm, C++ witness binary and vkey."""
+        base = self.artifacts_dir / circuit
+        stem = self.spec(circuit).stem
+        return {
+            "zkey": base / f"{stem}_final.zkey",
+            "wasm": base / f"{stem}_js" / f"{stem}.wasm",
+            "cpp_witness": base / stem,
+            "vkey": base / "verification_key.json",
+        }
+
+    def available(self, circuit: str, kind: str = "zkey") -> bool:
+        """Whether an artifact has been built."""
+        return self.paths(circuit)[kind].exists()
+
+    # ------------------------------------------------------------------
+    # Digests
+    # ------------------------------------------------------------------
+
+    def _entry(self, path: Path) -> Optional[_Entry]:
+        """Cache entry for a file, dropped when the file changes."""
+        stamp = _stamp(path)
+        if stamp is None:
+            self._entries.pop(path, None)
+            return None
+        entry = self._entries.get(path)
+        if entry is None or entry.stamp != stamp:
+            entry = _Entry(stamp=stamp)
+            persisted = self._load_persisted().get(str(path))
+            if persisted and tuple(persisted.get("stamp", ())) == stamp:
+                entry.sha256 = persisted.get("sha256")
+                entry.canonical = persisted.get("canonical")
+            self._entries[path] = entry
+        return entry
+
+    def file_digest(self, path: Path) -> Optional[str]:
+        """Streaming SHA-256 of a file, cached by mtime and size."""
+        path = Path(path)
+        with self._lock:
+            entry = self._entry(path)
+            if entry is None:
+                return None
+            if entry.sha256 is None:
+                digest = hashlib.sha256()
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                        digest.update(chunk)
+                entry.sha256 = digest.hexdigest()
+                self._hashed += 1
+                self._persist(path, entry)
+            return entry.sha256
+
+    def _load_json(self, path: Path) -> Optional[Tuple[Any, str]]:
+        """Parsed JSON and its canonical digest, cached by mtime and size."""
+        with self._lock:
+            entry = self._entry(path)
+            if entry is None:
+                return None
+            if entry.data is None:
+                with open(path, "r") as f:
+                    entry.data = json.load(f)
+                if entry.canonical is None:
+                    entry.canonical = canonical_json_digest(entry.data)
+                    self._persist(path, entry)
+            return entry.data, entry.canonical
+
+    def _load_persisted(self) -> Dict[str, Dict[str, Any]]:
+        if self._persisted is None:
+            self._persisted = {}
+            if self._digest_cache and self._digest_cache.exists():
+                try:
+                    self._persisted = json.loads(self._digest_cache.read_text())
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable digest cache {self._digest_cache}: {e}")
+        return self._persisted
+
+    def _persist(self, path: Path, entry: _Entry) -> None:
+        """Record digests so other workers skip hashing; best effort."""
+        if not self._digest_cache:
+            return
+        persisted = self._load_persisted()
+        persisted[str(path)] = {
+            "stamp": list(entry.stamp),
+            "sha256": entry.sha256,
+            "canonical": entry.canonical,
+        }
+        tmp = self._digest_cache.with_name(f"{self._digest_cache.name}.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(persisted, sort_keys=True))
+            os.replace(tmp, self._digest_cache)
+        except OSError as e:
+            logger.debug(f"Digest cache not written: {e}")
+
+    # ------------------------------------------------------------------
+    # Integrity
+    # ------------------------------------------------------------------
+
+    def pinned(self) -> Dict[str, Any]:
+        """INTEGRITY.json contents, loaded once."""
+        with self._lock:
+            if self._integrity is None:
+                path = self.artifacts_dir / INTEGRITY_FILE
+                self._integrity = {}
+                if path.exists():
+                    with open(path, "r") as f:
+                        self._integrity = json.load(f)
+            return self._integrity
+
+    def _expected(self, circuit: str, kind: str) -> Optional[str]:
+        pins = self.pinned().get(circuit)
+        if isinstance(pins, dict):
+            return pins.get(kind)
+        if kind == "vkey":
+            if pins:
+                return pins
+            # Per-circuit hash file predating INTEGRITY.json
+            hash_path = self.artifacts_dir / circuit / "verification_key.sha256"
+            if hash_path.exists():
+                return hash_path.read_text().strip()
+        return None
+
+    def integrity(self, circuit: str, kind: str = "vkey") -> str:
+        """
+        Integrity state of one artifact: verified, unpinned, mismatch or missing.
+
+        Verification keys are pinned by canonical JSON digest (raw digests
+        are accepted too); other artifacts by raw file digest.
+        """
+        path = self.paths(circuit)[kind]
+        if not path.exists():
+            return MISSING
+        expected = self._expected(circuit, kind)
+        if not expected:
+            return UNPINNED
+        if kind == "vkey":
+            _, canonical = self._load_json(path)
+            if expected == canonical:
+                return VERIFIED
+        if expected == self.file_digest(path):
+            return VERIFIED
+        logger.error(f"Integrity check FAILED for {circuit} {kind}: expected {expected}")
+        return MISMATCH
+
+    def vkey(self, circuit: str) -> Optional[Dict[str, Any]]:
+        """
+        Parsed verification key, or None if not built.
+
+        Raises:
+            ArtifactIntegrityError: If the key does not match its pinned hash
+        """
+        path = self.paths(circuit)["vkey"]
+        loaded = self._load_json(path)
+        if loaded is None:
+            return None
+        if self.integrity(circuit, "vkey") == MISMATCH:
+            raise ArtifactIntegrityError(f"Verification key integrity check failed for {circuit}")
+        return loaded[0]
+
+    def vkey_hash(self, circuit: str) -> str:
+        """Raw SHA-256 of the verification key file (its ETag), or ''."""
+        return self.file_digest(self.paths(circuit)["vkey"]) or ""
+
+    # ------------------------------------------------------------------
+    # Buffers
+    # ------------------------------------------------------------------
+
+    def buffer(self, circuit: str, kind: str = "zkey") -> Optional[memoryview]:
+        """
+        Read-only memoryview over a memory-mapped zkey or wasm, or None.
+
+        The mapping is shared by all callers and remapped when the file
+        changes; pinned artifacts are verified before they are handed out.
+
+        Raises:
+            ArtifactIntegrityError: If the artifact does not match its pin
+        """
+        if kind not in MAPPABLE_KINDS:
+            raise ValueError(f"Cannot map {kind}; expected one of {MAPPABLE_KINDS}")
+        path = self.paths(circuit)[kind]
+        with self._lock:
+            entry = self._entry(path)
+            if entry is None:
+                return None
+            if entry.mapped is None:
+                if self.integrity(circuit, kind) == MISMATCH:
+                    raise ArtifactIntegrityError(f"{kind} integrity check failed for {circuit}")
+                if entry.stamp[1] == 0:
+                    return memoryview(b"")
+                with open(path, "rb") as f:
+                    entry.mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return memoryview(entry.mapped)
+
+    # ------------------------------------------------------------------
+    # Startup and views
+    # ------------------------------------------------------------------
+
+    def preload(self, circuits: Optional[Iterable[str]] = None, mmap_buffers: bool = False):
+        """
+        Verify every built artifact once, e.g. at startup.
+
+        Args:
+            circuits: Circuits to load (default: all in the manifest)
+            mmap_buffers: Also map zkey and wasm files
+
+        Returns:
+            Integrity state per circuit and artifact kind
+        """
+        report: Dict[str, Dict[str, str]] = {}
+        for circuit in circuits or self.specs:
+            states = {}
+            for kind in ("vkey",) + MAPPABLE_KINDS:
+                state = self.integrity(circuit, kind)
+                if state == MISSING:
+                    continue
+                if kind == "vkey":
+                    self.vkey_hash(circuit)
+                elif mmap_buffers and state != MISMATCH:
+                    self.buffer(circuit, kind)
+                states[kind] = state
+            report[circuit] = states
+        return report
+
+    def capabilities(self) -> List[Dict[str, Any]]:
+        """Proof types that can be verified, for the /capabilities endpoint."""
+        proofs = []
+        for name, spec in self.specs.items():
+            if not spec.proof_type or not self.available(name, "vkey"):
+                continue
+            proofs.append(
+                {
+                    "type": spec.proof_type,
+                    "circuit": name,
+                    "public_inputs": list(spec.public_signals),
+                    "endpoint": spec.endpoint,
+                    "vk": f"/zkp/artifacts/{name}/verification_key.json",
+                    "vk_sha256": self.vkey_hash(name),
+                    "integrity": self.integrity(name, "vkey"),
+                    "prover": "rapidsnark" if spec.use_rapidsnark else "snarkjs",
+                    "zkey_available": self.available(name, "zkey"),
+                }
+            )
+        return proofs
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "artifacts_dir": str(self.artifacts_dir),
+                "tracked_files": len(self._entries),
+                "mapped_files": sum(1 for e in self._entries.values() if e.mapped is not None),
+                "files_hashed": self._hashed,
+            }
+
+
+_managers: Dict[Path, ArtifactManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_artifact_manager(artifacts_dir: Optional[Path] = None) -> ArtifactManager:
+    """Shared manager for an artifacts directory (default: zkp/artifacts)."""
+    key = Path(artifacts_dir or ARTIFACTS_DIR).resolve()
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = ArtifactManager(key)
+        return _managers[key]
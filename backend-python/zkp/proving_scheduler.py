@@ -0,0 +1,640 @@
+"""
+Proving Job Scheduler
+=====================
+
+Groth16/zkML proving is CPU-bound and takes seconds. Running it inline in
+request handlers, with every rapidsnark process told to use all cores,
+lets a burst of batch zkML proofs oversubscribe the machine and starve the
+interactive proofs users are waiting on. All proofs go through one scheduler
+instead:
+
+- at most `workers` jobs proving at once on the host, across every API
+  process: a job runs only while holding one of `workers` slot locks in
+  PROVING_STATE_DIR, so the CPU budget of `cpu_count // workers` threads
+  per job (exported as OMP_NUM_THREADS to the prover subprocess via
+  `proving_env()`) adds up to the host's cores however many processes run
+- jobs ordered by priority (interactive before default before batch), FIFO
+  within a priority
+- admission control: the expected queue wait of a new job (EWMA prove time
+  per circuit of everything ahead of it, spread over the workers) must fit
+  the queue budget, otherwise `AdmissionRejected` is raised with a
+  retry-after hint instead of queueing work that would time out anyway
+- submit/poll/await by job id; finished results are kept for `result_ttl`.
+  Jobs run in the process that submitted them, but their state is written
+  to PROVING_STATE_DIR/jobs, so any process on the host can `poll` them
+
+Usage:
+    from zkp.proving_scheduler import PRIORITY_BATCH, get_proving_scheduler
+
+    scheduler = get_proving_scheduler()
+    job_id = scheduler.submit("zkml_anomaly", prover.prove_anomaly, features,
+                              priority=PRIORITY_BATCH)
+    scheduler.poll(job_id)            # {"status": "queued", ...}
+    proof = await scheduler.wait(job_id)
+
+    # Or block until done (runs inline when already inside a proving job)
+    proof = scheduler.run("age", service._run, "prove", "age", payload)
+
+Configuration:
+    PROVING_WORKERS              concurrent proving jobs per host (default 2)
+    PROVING_THREADS_PER_JOB      CPU budget per job (default cpu_count // workers)
+    PROVING_STATE_DIR            host slot locks and pollable job state
+                                 (default zkp/.proving)
+    PROVING_MAX_QUEUE_SECONDS    admission budget for expected queue wait (default 30)
+    PROVING_DEFAULT_ESTIMATE     prove-time guess for unseen circuits (seconds, default 2)
+    PROVING_RESULT_TTL           how long finished jobs can be polled (seconds, default 600)
+"""
+
+import asyncio
+import fcntl
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 5
+PRIORITY_BATCH = 10
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_DEFAULT: "default",
+    PRIORITY_BATCH: "batch",
+}
+
+PROVING_WORKERS = int(os.getenv("PROVING_WORKERS", "2"))
+PROVING_THREADS_PER_JOB = int(os.getenv("PROVING_THREADS_PER_JOB", "0"))
+PROVING_MAX_QUEUE_SECONDS = float(os.getenv("PROVING_MAX_QUEUE_SECONDS", "30"))
+PROVING_DEFAULT_ESTIMATE = float(os.getenv("PROVING_DEFAULT_ESTIMATE", "2"))
+PROVING_RESULT_TTL = float(os.getenv("PROVING_RESULT_TTL", "600"))
+PROVING_STATE_DIR = os.getenv(
+    "PROVING_STATE_DIR", str(Path(__file__).resolve().parent / ".proving")
+)
+
+EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Raised when a job's expected queue wait exceeds the budget."""
+
+    def __init__(self, circuit: str, expected_wait: float, budget: float):
+        self.circuit = circuit
+        self.expected_wait = expected_wait
+        self.budget = budget
+        self.retry_after = max(1, int(expected_wait - budget + 0.999))
+        super().__init__(
+            f"proving queue full for {circuit}: expected wait {expected_wait:.1f}s "
+            f"exceeds budget {budget:.1f}s"
+        )
+
+
+class JobNotFound(KeyError):
+    """Raised for unknown or expired job ids."""
+
+
+@dataclass
+class ProvingJob:
+    """A unit of proving work and its timings."""
+
+    job_id: str
+    circuit: str
+    priority: int
+    fn: Callable[..., Any]
+    args: tuple
+    kwargs: dict
+    estimate: float
+    submitted_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    status: str = "queued"  # queued | running | done | failed
+    shared: bool = True  # written to the job store for other processes
+    future: Future = field(default_factory=Future)
+
+    @property
+    def queue_wait(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return self.started_at - self.submitted_at
+
+    @property
+    def prove_time(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+_local = threading.local()
+
+
+def current_cpu_budget() -> Optional[int]:
+    """Thread budget of the proving job running on this thread, if any."""
+    return getattr(_local, "cpu_budget", None)
+
+
+def proving_env(base: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Environment for a prover subprocess, capped to the current job's CPU budget."""
+    env = dict(os.environ if base is None else base)
+    budget = current_cpu_budget()
+    if budget is not None:
+        env["OMP_NUM_THREADS"] = str(budget)
+    return env
+
+
+def _priority_name(priority: int) -> str:
+    return PRIORITY_NAMES.get(priority, str(priority))
+
+
+def _record_metric(method: str, *args: Any) -> None:
+    try:
+        from api.prometheus import metrics
+
+        getattr(metrics, method)(*args)
+    except Exception:
+        pass
+
+
+def _serialize(value: Any) -> Any:
+    return value.to_dict() if hasattr(value, "to_dict") else value
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class HostSlots:
+    """
+    `count` proving slots shared by every process on the host.
+
+    A slot is an exclusive flock on `slot-<i>.lock`; the kernel drops it if
+    the holder dies, so a crashed worker never leaks a slot.
+    """
+
+    def __init__(self, directory: Path, count: int, poll_interval: float = 0.05):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.count = count
+        self.poll_interval = poll_interval
+
+    def acquire(self) -> int:
+        """Block until a slot is free; returns its locked fd."""
+        while True:
+            for i in range(self.count):
+                fd = os.open(self.directory / f"slot-{i}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except BlockingIOError:
+                    os.close(fd)
+            time.sleep(self.poll_interval)
+
+    @staticmethod
+    def release(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class JobStore:
+    """Job state as one JSON file per job, readable by every process on the host."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.json"
+
+    def put(self, info: Dict[str, Any]) -> None:
+        """Write a job's state atomically (readers never see a partial file)."""
+        path = self._path(info["job_id"])
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({**info, "pid": os.getpid()}, default=str))
+        os.replace(tmp, path)
+
+    def get(self, job_id: str, ttl: float = 0) -> Optional[Dict[str, Any]]:
+        """A job's state, or None if unknown or finished more than `ttl` ago."""
+        if not job_id.isalnum():
+            return None
+        path = self._path(job_id)
+        try:
+            info = json.loads(path.read_text())
+            age = time.time() - path.stat().st_mtime
+        except (FileNotFoundError, ValueError):
+            return None
+        if ttl > 0 and age > ttl and info.get("status") in ("done", "failed"):
+            return None
+        return info
+
+    def delete(self, job_id: str) -> None:
+        self._path(job_id).unlink(missing_ok=True)
+
+    def expire(self, ttl: float) -> None:
+        """Drop finished jobs older than `ttl`, and jobs whose process died."""
+        cutoff = time.time() - ttl
+        for path in self.directory.glob("*.json"):
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                info = json.loads(path.read_text())
+            except (FileNotFoundError, ValueError):
+                continue
+            if info.get("status") in ("done", "failed") or not _pid_alive(info.get("pid")):
+                path.unlink(missing_ok=True)
+
+
+class ProvingScheduler:
+    """Priority queue of proving jobs run by a CPU-budgeted worker pool."""
+
+    def __init__(
+        self,
+        workers: int = PROVING_WORKERS,
+        threads_per_job: int = PROVING_THREADS_PER_JOB,
+        max_queue_seconds: float = PROVING_MAX_QUEUE_SECONDS,
+        default_estimate: float = PROVING_DEFAULT_ESTIMATE,
+        result_ttl: float = PROVING_RESULT_TTL,
+        state_dir: str = PROVING_STATE_DIR,
+    ):
+        """
+        Initialize the scheduler and start its workers.
+
+        Args:
+            workers: Number of jobs proving at once on the host
+            threads_per_job: CPU budget per job (0 = cpu_count // workers)
+            max_queue_seconds: Reject jobs expected to wait longer than this
+            default_estimate: Prove-time estimate before a circuit has been timed
+            result_ttl: Seconds finished jobs stay pollable
+            state_dir: Directory shared by the host's schedulers (slots, job state)
+        """
+        self.workers = max(1, workers)
+        self.threads_per_job = threads_per_job or max(1, (os.cpu_count() or 1) // self.workers)
+        self.max_queue_seconds = max_queue_seconds
+        self.default_estimate = default_estimate
+        self.result_ttl = result_ttl
+        self._slots = HostSlots(Path(state_dir) / "slots", self.workers)
+        self._store = JobStore(Path(state_dir) / "jobs")
+
+        self._cond = threading.Condition()
+        self._heap: List[tuple] = []  # (priority, seq, job)
+        self._seq = itertools.count()
+        self._jobs: Dict[str, ProvingJob] = {}
+        self._running: Dict[str, ProvingJob] = {}
+        self._estimates: Dict[str, float] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._closed = False
+
+        self._threads = [
+            threading.Thread(target=self._run_worker, name=f"proving-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    # ------------------------------------------------------------------
+    # Admission and submission
+    # ------------------------------------------------------------------
+
+    def estimate(self, circuit: str) -> float:
+        """Current prove-time estimate (seconds) for `circuit`."""
+        return self._estimates.get(circuit, self.default_estimate)
+
+    def _expected_wait(self, priority: int) -> float:
+        now = time.monotonic()
+        ahead = sum(job.estimate for p, _, job in self._heap if p <= priority)
+        remaining = sum(
+            max(0.0, job.estimate - (now - job.started_at)) for job in self._running.values()
+        )
+        if len(self._running) < self.workers and not ahead:
+            return 0.0
+        return (ahead + remaining) / self.workers
+
+    def expected_wait(self, priority: int = PRIORITY_DEFAULT) -> float:
+        """Expected queue wait (seconds) for a job submitted now at `priority`."""
+        with self._cond:
+            return self._expected_wait(priority)
+
+    def _circuit_stats(self, circuit: str) -> Dict[str, float]:
+        return self._stats.setdefault(
+            circuit,
+            dict.fromkeys(
+                ("submitted", "completed", "failed", "rejected", "queue_wait_s", "prove_s"), 0
+            ),
+        )
+
+    def submit(
+        self,
+        circuit: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        priority: int = PRIORITY_DEFAULT,
+        max_wait: Optional[float] = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Queue `fn(*args, **kwargs)` as a proving job and return its id.
+
+        Args:
+            circuit: Circuit name (queues and estimates are tracked per circuit)
+            fn: Callable doing the proving work
+            priority: PRIORITY_INTERACTIVE / PRIORITY_DEFAULT / PRIORITY_BATCH (lower runs first)
+            max_wait: Queue budget for this job (default: max_queue_seconds)
+
+        Raises:
+            AdmissionRejected: If the expected queue wait exceeds the budget
+        """
+        return self._submit(circuit, fn, args, kwargs, priority, max_wait, shared=True)
+
+    def _submit(
+        self,
+        circuit: str,
+        fn: Callable[..., Any],
+        args: tuple,
+        kwargs: dict,
+        priority: int,
+        max_wait: Optional[float],
+        shared: bool,
+    ) -> str:
+        budget = self.max_queue_seconds if max_wait is None else max_wait
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("proving scheduler is closed")
+            self._expire()
+            stats = self._circuit_stats(circuit)
+            expected = self._expected_wait(priority)
+            if expected > budget:
+                stats["rejected"] += 1
+                _record_metric("record_proving_rejection", circuit, _priority_name(priority))
+                raise AdmissionRejected(circuit, expected, budget)
+
+            job = ProvingJob(
+                job_id=uuid.uuid4().hex,
+                circuit=circuit,
+                priority=priority,
+                fn=fn,
+                args=args,
+                kwargs=kwargs,
+                estimate=self.estimate(circuit),
+                shared=shared,
+            )
+            if shared:
+                self._publish(job, expected)
+            self._jobs[job.job_id] = job
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+            stats["submitted"] += 1
+            self._cond.notify()
+        return job.job_id
+
+    def run(
+        self,
+        circuit: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        priority: int = PRIORITY_DEFAULT,
+        max_wait: Optional[float] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Submit a job and block for its result.
+
+        Called from inside a proving job (e.g. a scheduled zkML request whose
+        prover schedules its own proof) the work runs inline on the current
+        worker, so nested scheduling never deadlocks the pool.
+        """
+        if current_cpu_budget() is not None:
+            return fn(*args, **kwargs)
+        # Only the caller waits on this job, so it is not written to the job store
+        job_id = self._submit(circuit, fn, args, kwargs, priority, max_wait, shared=False)
+        try:
+            return self.result(job_id, timeout)
+        finally:
+            with self._cond:
+                job = self._jobs.get(job_id)
+                if job is not None and job.future.done():
+                    del self._jobs[job_id]
+
+    # ------------------------------------------------------------------
+    # Results
+    # ------------------------------------------------------------------
+
+    def _get(self, job_id: str) -> ProvingJob:
+        with self._cond:
+            self._expire()
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFound(job_id)
+        return job
+
+    @staticmethod
+    def _info(job: ProvingJob, expected_wait: Optional[float] = None) -> Dict[str, Any]:
+        info: Dict[str, Any] = {
+            "job_id": job.job_id,
+            "circuit": job.circuit,
+            "priority": _priority_name(job.priority),
+            "status": job.status,
+            "queue_wait_ms": None if job.queue_wait is None else round(job.queue_wait * 1000, 2),
+            "prove_time_ms": None if job.prove_time is None else round(job.prove_time * 1000, 2),
+        }
+        if job.status == "queued" and expected_wait is not None:
+            info["expected_wait_s"] = round(expected_wait, 2)
+        elif job.status == "done":
+            info["result"] = _serialize(job.future.result())
+        elif job.status == "failed":
+            info["error"] = str(job.future.exception())
+        return info
+
+    def _publish(self, job: ProvingJob, expected_wait: Optional[float] = None) -> None:
+        """Write a job's state to the host's job store (best effort)."""
+        try:
+            self._store.put(self._info(job, expected_wait))
+            if job.finished_at is not None:
+                self._store.expire(self.result_ttl)
+        except Exception as e:
+            logger.warning(f"Could not store proving job {job.job_id}: {e}")
+
+    def poll(self, job_id: str) -> Dict[str, Any]:
+        """
+        Status, timings and (when finished) result or error of a job.
+
+        Jobs submitted by other processes on the host are read from the job
+        store; their expected wait is the one estimated at submission.
+        """
+        try:
+            job = self._get(job_id)
+        except JobNotFound:
+            info = self._store.get(job_id, self.result_ttl)
+            if info is None:
+                raise
+            info.pop("pid", None)
+            return info
+        with self._cond:
+            expected = self._expected_wait(job.priority) if job.status == "queued" else None
+        return self._info(job, expected)
+
+    def result(self, job_id: str, timeout: Optional[float] = None) -> Any:
+        """Block until a job finishes; returns its result or raises its error."""
+        return self._get(job_id).future.result(timeout)
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Any:
+        """Await a job's result from the event loop."""
+        future = asyncio.wrap_future(self._get(job_id).future)
+        return await asyncio.wait_for(future, timeout)
+
+    def _expire(self) -> None:
+        if self.result_ttl <= 0:
+            return
+        cutoff = time.monotonic() - self.result_ttl
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def _run_worker(self) -> None:
+        _local.cpu_budget = self.threads_per_job
+        while True:
+            with self._cond:
+                while not self._heap and not self._closed:
+                    self._cond.wait()
+                if not self._heap:
+                    return
+            # Wait for a host slot before taking a job, so the most urgent
+            # job queued by then is the one that gets it
+            slot = self._slots.acquire()
+            try:
+                with self._cond:
+                    if not self._heap:
+                        continue
+                    _, _, job = heapq.heappop(self._heap)
+                    job.started_at = time.monotonic()
+                    job.status = "running"
+                    self._running[job.job_id] = job
+                if job.shared:
+                    self._publish(job)
+                self._execute(job)
+            finally:
+                self._slots.release(slot)
+
+    def _execute(self, job: ProvingJob) -> None:
+        try:
+            value = job.fn(*job.args, **job.kwargs)
+            error = None
+        except BaseException as e:
+            value, error = None, e
+
+        with self._cond:
+            job.finished_at = time.monotonic()
+            self._running.pop(job.job_id, None)
+            stats = self._circuit_stats(job.circuit)
+            stats["queue_wait_s"] += job.queue_wait
+            stats["prove_s"] += job.prove_time
+            if error is None:
+                job.status = "done"
+                stats["completed"] += 1
+                previous = self._estimates.get(job.circuit)
+                self._estimates[job.circuit] = (
+                    job.prove_time
+                    if previous is None
+                    else EWMA_ALPHA * job.prove_time + (1 - EWMA_ALPHA) * previous
+                )
+            else:
+                job.status = "failed"
+                stats["failed"] += 1
+            job.fn, job.args, job.kwargs = None, (), {}
+
+        _record_metric(
+            "record_proving_job",
+            job.circuit,
+            _priority_name(job.priority),
+            job.status,
+            job.queue_wait,
+            job.prove_time,
+        )
+        if error is None:
+            job.future.set_result(value)
+        else:
+            logger.warning(f"Proving job {job.job_id} ({job.circuit}) failed: {error}")
+            job.future.set_exception(error)
+        if job.shared:
+            self._publish(job)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop accepting jobs; workers exit once the queue drains."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, pool size and per-circuit wait vs prove time."""
+        with self._cond:
+            depth: Dict[str, int] = {}
+            for _, _, job in self._heap:
+                depth[job.circuit] = depth.get(job.circuit, 0) + 1
+            circuits = {}
+            for circuit, s in self._stats.items():
+                finished = s["completed"] + s["failed"]
+                circuits[circuit] = {
+                    "queued": depth.get(circuit, 0),
+                    "running": sum(1 for j in self._running.values() if j.circuit == circuit),
+                    "submitted": int(s["submitted"]),
+                    "completed": int(s["completed"]),
+                    "failed": int(s["failed"]),
+                    "rejected": int(s["rejected"]),
+                    "avg_queue_wait_ms": (
+                        round(s["queue_wait_s"] / finished * 1000, 2) if finished else 0.0
+                    ),
+                    "avg_prove_time_ms": (
+                        round(s["prove_s"] / finished * 1000, 2) if finished else 0.0
+                    ),
+                    "estimate_s": round(self.estimate(circuit), 3),
+                }
+            return {
+                "workers": self.workers,
+                "threads_per_job": self.threads_per_job,
+                "max_queue_seconds": self.max_queue_seconds,
+                "queued": len(self._heap),
+                "running": len(self._running),
+                "jobs_tracked": len(self._jobs),
+                "circuits": circuits,
+            }
+
+
+_scheduler: Optional[ProvingScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_proving_scheduler() -> ProvingScheduler:
+    """Get the process-wide proving scheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ProvingScheduler()
+            logger.info(
+                f"Proving scheduler: {_scheduler.workers} workers x "
+                f"{_scheduler.threads_per_job} threads"
+            )
+        return _scheduler
@@ -12,33 +12,57 @@ Usage:
     prover = RapidsnarkProver()
     proof, public_signals = prover.prove("age_level3", witness_data)
 
+    # With a per-stage timing breakdown
+    proof, public_signals, timings = prover.prove_with_timings("age_level3", witness_data)
+
+Pipeline (no temp-file round trips):
+    - WASM witnesses come from persistent `witness-server.js` processes that
+      keep each circuit's calculator compiled; C++ witness binaries read
+      their input from and write the witness to in-memory files
+    - witness, proof and public signals live in memfd buffers (tmpfs files
+      where memfd is unavailable) handed to subprocesses as /proc paths
+    - snarkjs is resolved once (SNARKJS_BIN, zkp/node_modules/.bin, PATH)
+      and run without a shell or per-call npx resolution
+
 Requirements:
     - rapidsnark binary in PATH or RAPIDSNARK_BIN env var
     - Compiled .zkey files in artifacts directory
     - C++ witness generator (for Level 3 circuits)
+    - `npm install` in zkp/ for the WASM witness server and snarkjs
 """
 
 import json
 import os
+import queue
+import select
+import shlex
+import shutil
 import subprocess
 import tempfile
+import time
 import logging
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, List
+
+try:
+    from zkp.artifact_manager import get_artifact_manager, load_circuit_specs
+    from zkp.proving_scheduler import PROVING_WORKERS, current_cpu_budget
+except ImportError:  # run as a script from zkp/
+    from artifact_manager import get_artifact_manager, load_circuit_specs
+    from proving_scheduler import PROVING_WORKERS, current_cpu_budget
 
 logger = logging.getLogger(__name__)
 
-# Circuit configurations
+ZKP_DIR = Path(__file__).resolve().parent
+WITNESS_SERVER_SCRIPT = ZKP_DIR / "witness-server.js"
+WITNESS_SERVERS = int(os.getenv("WITNESS_SERVERS", str(PROVING_WORKERS)))
+
+# Circuit configurations (zkp/circuits.json): Level 3 and AAIP circuits use
+# rapidsnark (5-10x faster), simple circuits use SnarkJS (fast enough)
 CIRCUIT_CONFIG = {
-    # Simple circuits - use SnarkJS (fast enough)
-    "age": {"use_rapidsnark": False, "witness_type": "wasm"},
-    "authenticity": {"use_rapidsnark": False, "witness_type": "wasm"},
-    # Level 3 circuits - use Rapidsnark (5-10x faster)
-    "age_level3": {"use_rapidsnark": True, "witness_type": "cpp"},
-    "level3_inequality": {"use_rapidsnark": True, "witness_type": "cpp"},
-    # AAIP circuits - use Rapidsnark (production performance)
-    "agent_capability": {"use_rapidsnark": True, "witness_type": "cpp"},
-    "agent_reputation": {"use_rapidsnark": True, "witness_type": "cpp"},
+    name: {"use_rapidsnark": spec.use_rapidsnark, "witness_type": spec.witness_type}
+    for name, spec in load_circuit_specs().items()
 }
 
 
@@ -54,6 +78,227 @@ class WitnessGenerationError(Exception):
     pass
 
 
+_TMPFS_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def resolve_snarkjs(snarkjs_path: Optional[str] = None) -> List[str]:
+    """
+    argv prefix for snarkjs, resolved once instead of `npx snarkjs` per call.
+
+    Order: explicit path, SNARKJS_BIN, zkp/node_modules/.bin/snarkjs, PATH,
+    and `npx --no-install snarkjs` as a last resort.
+    """
+    configured = snarkjs_path or os.environ.get("SNARKJS_BIN")
+    if configured:
+        return shlex.split(configured)
+    for candidate in (ZKP_DIR / "node_modules" / ".bin" / "snarkjs", shutil.which("snarkjs")):
+        if candidate and Path(candidate).exists():
+            return [str(candidate)]
+    return ["npx", "--no-install", "snarkjs"]
+
+
+class MemFile:
+    """
+    Anonymous in-memory file that a subprocess can open by path.
+
+    Backed by memfd_create on Linux and handed to children as
+    /proc/self/fd/N (see `_run_with_files`); elsewhere a temp file on tmpfs
+    (/dev/shm when present). Closing releases it.
+    """
+
+    def __init__(self, name: str, data: bytes = b""):
+        self._tmp: Optional[str] = None
+        if hasattr(os, "memfd_create") and os.path.isdir("/proc/self/fd"):
+            self.fd = os.memfd_create(name)
+            self.path = f"/proc/self/fd/{self.fd}"
+        else:
+            self.fd, self._tmp = tempfile.mkstemp(suffix=f"-{name}", dir=_TMPFS_DIR)
+            self.path = self._tmp
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view) :]
+
+    def read(self) -> bytes:
+        """Current contents (as written by a subprocess through `path`)."""
+        return os.pread(self.fd, os.fstat(self.fd).st_size, 0)
+
+    def close(self) -> None:
+        os.close(self.fd)
+        if self._tmp:
+            os.unlink(self._tmp)
+
+    def __enter__(self) -> "MemFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _run_with_files(
+    cmd: List[str],
+    files: List[MemFile],
+    timeout: float,
+    env: Optional[Dict[str, str]] = None,
+) -> subprocess.CompletedProcess:
+    """Run `cmd` (no shell) with the memfds behind `files` inherited at the same numbers."""
+    return subprocess.run(
+        cmd,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+        env=env,
+        pass_fds=[f.fd for f in files],
+    )
+
+
+@dataclass
+class ProofTimings:
+    """Per-stage wall time of one proof, in milliseconds."""
+
+    circuit: str
+    prover: str
+    witness_type: str
+    witness_ms: float = 0.0
+    prove_ms: float = 0.0
+    read_ms: float = 0.0
+    total_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: round(v, 2) if isinstance(v, float) else v for k, v in asdict(self).items()}
+
+    def summary(self) -> str:
+        return (
+            f"witness {self.witness_ms:.0f}ms ({self.witness_type}), "
+            f"prove {self.prove_ms:.0f}ms ({self.prover}), "
+            f"read {self.read_ms:.1f}ms, total {self.total_ms:.0f}ms"
+        )
+
+    def record(self) -> None:
+        """Export the stages as Prometheus metrics when the API is loaded."""
+        try:
+            from api.prometheus import metrics
+
+            for stage in ("witness", "prove", "read"):
+                metrics.record_proving_stage(
+                    self.circuit, stage, getattr(self, f"{stage}_ms") / 1000
+                )
+        except Exception:
+            pass
+
+
+class WitnessServerUnavailable(WitnessGenerationError):
+    """Raised when a witness server cannot be started or exits mid-request."""
+
+    pass
+
+
+class WitnessServer:
+    """One long-running `witness-server.js` process; one request at a time."""
+
+    def __init__(self, command: Optional[List[str]] = None, timeout: float = 120):
+        self.command = command or ["node", str(WITNESS_SERVER_SCRIPT)]
+        self.timeout = timeout
+        self.requests = 0
+        self._proc: Optional[subprocess.Popen] = None
+
+    def _ensure_started(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            return
+        try:
+            self._proc = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                bufsize=0,
+                cwd=ZKP_DIR,
+            )
+        except OSError as e:
+            raise WitnessServerUnavailable(f"cannot start {self.command[0]}: {e}") from e
+
+    def _read_exact(self, n: int, deadline: float) -> bytes:
+        fd = self._proc.stdout.fileno()
+        chunks = []
+        while n:
+            wait = deadline - time.monotonic()
+            if wait <= 0 or not select.select([fd], [], [], wait)[0]:
+                raise TimeoutError(f"witness server did not answer within {self.timeout}s")
+            chunk = os.read(fd, n)
+            if not chunk:
+                try:
+                    code = self._proc.wait(1)
+                except subprocess.TimeoutExpired:
+                    code = None
+                raise WitnessServerUnavailable(f"witness server exited (code {code})")
+            chunks.append(chunk)
+            n -= len(chunk)
+        return b"".join(chunks)
+
+    def calculate(self, wasm_path: Path, input_data: Dict[str, Any]) -> bytes:
+        """Witness (.wtns bytes) for `input_data` on the circuit at `wasm_path`."""
+        request = json.dumps({"wasm": str(wasm_path), "input": input_data}).encode() + b"\n"
+        self._ensure_started()
+        try:
+            self._proc.stdin.write(request)
+            deadline = time.monotonic() + self.timeout
+            header = self._read_exact(5, deadline)
+            payload = self._read_exact(int.from_bytes(header[1:5], "big"), deadline)
+        except TimeoutError as e:
+            self.close()
+            raise WitnessGenerationError(str(e)) from e
+        except (OSError, WitnessServerUnavailable) as e:
+            # Never answered: the server cannot run here. Otherwise it died on
+            # this input; it is restarted for the next request.
+            self.close()
+            if not self.requests:
+                raise WitnessServerUnavailable(str(e)) from e
+            raise WitnessGenerationError(f"witness server exited mid-request: {e}") from e
+
+        self.requests += 1
+        if header[0] != 0:
+            raise WitnessGenerationError(
+                f"WASM witness generation failed: {payload.decode(errors='replace')}"
+            )
+        return payload
+
+    def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdin.close()
+        proc.stdout.close()
+
+
+class WitnessServerPool:
+    """Up to `size` witness servers shared by concurrent proving jobs."""
+
+    def __init__(
+        self,
+        size: int = WITNESS_SERVERS,
+        command: Optional[List[str]] = None,
+        timeout: float = 120,
+    ):
+        self._servers = [WitnessServer(command, timeout) for _ in range(max(1, size))]
+        # LIFO: reuse the warmest server (circuits already compiled) first
+        self._idle: "queue.LifoQueue[WitnessServer]" = queue.LifoQueue()
+        for server in self._servers:
+            self._idle.put(server)
+
+    def calculate(self, wasm_path: Path, input_data: Dict[str, Any]) -> bytes:
+        """Witness bytes from the next free server."""
+        server = self._idle.get()
+        try:
+            return server.calculate(wasm_path, input_data)
+        finally:
+            self._idle.put(server)
+
+    def close(self) -> None:
+        for server in self._servers:
+            server.close()
+
+
 class RapidsnarkProver:
     """
     High-performance Groth16 prover using rapidsnark.
@@ -68,6 +313,7 @@ class RapidsnarkProver:
         rapidsnark_bin: Optional[str] = None,
         snarkjs_path: Optional[str] = None,
         thread_count: Optional[int] = None,
+        witness_servers: Optional["WitnessServerPool"] = None,
     ):
         """
         Initialize the prover.
@@ -75,14 +321,23 @@ class RapidsnarkProver:
         Args:
             artifacts_dir: Path to ZKP artifacts (default: ./artifacts)
             rapidsnark_bin: Path to rapidsnark binary (default: from PATH or env)
-            snarkjs_path: Path to snarkjs (default: npx snarkjs)
-            thread_count: Number of threads for rapidsnark (default: auto)
+            snarkjs_path: snarkjs command (default: resolved once, see `resolve_snarkjs`)
+            thread_count: Number of threads for rapidsnark outside the proving
+                scheduler (default: auto); scheduled jobs use their CPU budget
+            witness_servers: Pool for WASM witnesses (default: WITNESS_SERVERS
+                `witness-server.js` processes, started on first use)
         """
         self.artifacts_dir = artifacts_dir or Path(__file__).parent / "artifacts"
+        self.artifacts = get_artifact_manager(self.artifacts_dir)
         self.rapidsnark_bin = rapidsnark_bin or os.environ.get("RAPIDSNARK_BIN", "rapidsnark")
-        self.snarkjs_path = snarkjs_path or "npx snarkjs"
+        self.snarkjs_cmd = resolve_snarkjs(snarkjs_path)
+        self.snarkjs_path = shlex.join(self.snarkjs_cmd)
         self.thread_count = thread_count or os.cpu_count() or 4
 
+        if witness_servers is None and WITNESS_SERVERS > 0 and WITNESS_SERVER_SCRIPT.exists():
+            witness_servers = WitnessServerPool(WITNESS_SERVERS)
+        self._witness_servers = witness_servers
+
         # Check rapidsnark availability
         self._rapidsnark_available = self._check_rapidsnark()
         if self._rapidsnark_available:
@@ -102,69 +357,60 @@ class RapidsnarkProver:
 
     def _get_circuit_paths(self, circuit: str) -> Dict[str, Path]:
         """Get paths to circuit artifacts."""
-        base = self.artifacts_dir / circuit
-
-        # Handle different naming conventions
-        circuit_name = circuit
-        if circuit == "level3_inequality":
-            circuit_name = "Level3Inequality"
-
-        return {
-            "zkey": base / f"{circuit_name}_final.zkey",
-            "wasm": base / f"{circuit_name}_js" / f"{circuit_name}.wasm",
-            "cpp_witness": base / circuit_name,  # C++ binary
-            "vkey": base / "verification_key.json",
-        }
-
-    def _generate_witness_wasm(
-        self, circuit: str, input_data: Dict[str, Any], output_path: Path
-    ) -> None:
-        """Generate witness using WASM (SnarkJS)."""
-        paths = self._get_circuit_paths(circuit)
+        return self.artifacts.paths(circuit)
 
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
-            json.dump(input_data, f)
-            input_file = f.name
+    def _generate_witness_wasm(self, circuit: str, input_data: Dict[str, Any]) -> bytes:
+        """Generate witness using WASM (persistent witness server, snarkjs CLI fallback)."""
+        paths = self._get_circuit_paths(circuit)
 
-        try:
-            cmd = f"{self.snarkjs_path} wtns calculate {paths['wasm']} {input_file} {output_path}"
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=120)
+        if self._witness_servers is not None:
+            try:
+                return self._witness_servers.calculate(paths["wasm"], input_data)
+            except WitnessServerUnavailable as e:
+                logger.warning(f"Witness server unavailable ({e}), using snarkjs wtns calculate")
+                self._witness_servers = None
+
+        with MemFile("input.json", json.dumps(input_data).encode()) as input_file, MemFile(
+            "witness.wtns"
+        ) as witness_file:
+            cmd = [
+                *self.snarkjs_cmd,
+                "wtns",
+                "calculate",
+                str(paths["wasm"]),
+                input_file.path,
+                witness_file.path,
+            ]
+            result = _run_with_files(cmd, [input_file, witness_file], timeout=120)
 
             if result.returncode != 0:
                 raise WitnessGenerationError(f"WASM witness generation failed: {result.stderr}")
-        finally:
-            os.unlink(input_file)
+            return witness_file.read()
 
-    def _generate_witness_cpp(
-        self, circuit: str, input_data: Dict[str, Any], output_path: Path
-    ) -> None:
+    def _generate_witness_cpp(self, circuit: str, input_data: Dict[str, Any]) -> bytes:
         """Generate witness using C++ binary (faster, lower memory)."""
         paths = self._get_circuit_paths(circuit)
         cpp_binary = paths["cpp_witness"]
 
         if not cpp_binary.exists():
             logger.warning(f"C++ witness generator not found for {circuit}, falling back to WASM")
-            return self._generate_witness_wasm(circuit, input_data, output_path)
-
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
-            json.dump(input_data, f)
-            input_file = f.name
-
-        try:
-            result = subprocess.run(
-                [str(cpp_binary), input_file, str(output_path)],
-                capture_output=True,
-                text=True,
+            return self._generate_witness_wasm(circuit, input_data)
+
+        with MemFile("input.json", json.dumps(input_data).encode()) as input_file, MemFile(
+            "witness.wtns"
+        ) as witness_file:
+            result = _run_with_files(
+                [str(cpp_binary), input_file.path, witness_file.path],
+                [input_file, witness_file],
                 timeout=60,
             )
 
             if result.returncode != 0:
                 raise WitnessGenerationError(f"C++ witness generation failed: {result.stderr}")
-        finally:
-            os.unlink(input_file)
+            return witness_file.read()
 
     def _prove_rapidsnark(
-        self, circuit: str, witness_path: Path, proof_path: Path, public_path: Path
+        self, circuit: str, witness: "MemFile", proof: "MemFile", public: "MemFile"
     ) -> None:
         """Generate proof using rapidsnark (fast C++ prover)."""
         paths = self._get_circuit_paths(circuit)
@@ -173,37 +419,43 @@ class RapidsnarkProver:
         cmd = [
             self.rapidsnark_bin,
             str(paths["zkey"]),
-            str(witness_path),
-            str(proof_path),
-            str(public_path),
+            witness.path,
+            proof.path,
+            public.path,
         ]
 
-        # Set thread count via environment
+        # Set thread count via environment; scheduled jobs stay within their CPU budget
         env = os.environ.copy()
-        env["OMP_NUM_THREADS"] = str(self.thread_count)
+        env["OMP_NUM_THREADS"] = str(current_cpu_budget() or self.thread_count)
 
         logger.debug(f"Running rapidsnark: {' '.join(cmd)}")
 
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300, env=env)
+        result = _run_with_files(cmd, [witness, proof, public], timeout=300, env=env)
 
         if result.returncode != 0:
             raise RapidsnarkError(f"Rapidsnark proving failed: {result.stderr}")
 
     def _prove_snarkjs(
-        self, circuit: str, witness_path: Path, proof_path: Path, public_path: Path
+        self, circuit: str, witness: "MemFile", proof: "MemFile", public: "MemFile"
     ) -> None:
         """Generate proof using SnarkJS (slower but always available)."""
         paths = self._get_circuit_paths(circuit)
 
-        cmd = f"{self.snarkjs_path} groth16 prove {paths['zkey']} {witness_path} {proof_path} {public_path}"
+        cmd = [
+            *self.snarkjs_cmd,
+            "groth16",
+            "prove",
+            str(paths["zkey"]),
+            witness.path,
+            proof.path,
+            public.path,
+        ]
 
-        logger.debug(f"Running snarkjs: {cmd}")
+        logger.debug(f"Running snarkjs: {' '.join(cmd)}")
 
-        result = subprocess.run(
+        result = _run_with_files(
             cmd,
-            shell=True,
-            capture_output=True,
-            text=True,
+            [witness, proof, public],
             timeout=600,
             env={**os.environ, "NODE_OPTIONS": "--max-old-space-size=8192"},
         )
@@ -234,6 +486,19 @@ class RapidsnarkProver:
             RapidsnarkError: If proving fails
             WitnessGenerationError: If witness generation fails
         """
+        proof, public_signals, _ = self.prove_with_timings(
+            circuit, input_data, force_rapidsnark, force_snarkjs
+        )
+        return proof, public_signals
+
+    def prove_with_timings(
+        self,
+        circuit: str,
+        input_data: Dict[str, Any],
+        force_rapidsnark: bool = False,
+        force_snarkjs: bool = False,
+    ) -> Tuple[Dict[str, Any], list, "ProofTimings"]:
+        """Like `prove`, also returning the per-stage timing breakdown."""
         config = CIRCUIT_CONFIG.get(circuit, {"use_rapidsnark": False, "witness_type": "wasm"})
 
         # Determine which prover to use
@@ -245,36 +510,41 @@ class RapidsnarkProver:
 
         # Determine witness generation method
         witness_type = config.get("witness_type", "wasm")
-
-        logger.info(
-            f"Proving {circuit} with {'rapidsnark' if use_rapidsnark else 'snarkjs'}, witness={witness_type}"
+        timings = ProofTimings(
+            circuit=circuit,
+            prover="rapidsnark" if use_rapidsnark else "snarkjs",
+            witness_type=witness_type,
         )
+        start = time.perf_counter()
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmpdir = Path(tmpdir)
-            witness_path = tmpdir / "witness.wtns"
-            proof_path = tmpdir / "proof.json"
-            public_path = tmpdir / "public.json"
-
-            # Generate witness
-            if witness_type == "cpp":
-                self._generate_witness_cpp(circuit, input_data, witness_path)
-            else:
-                self._generate_witness_wasm(circuit, input_data, witness_path)
+        # Generate witness
+        if witness_type == "cpp":
+            witness_bytes = self._generate_witness_cpp(circuit, input_data)
+        else:
+            witness_bytes = self._generate_witness_wasm(circuit, input_data)
+        timings.witness_ms = (time.perf_counter() - start) * 1000
 
+        with MemFile("witness.wtns", witness_bytes) as witness, MemFile(
+            "proof.json"
+        ) as proof_file, MemFile("public.json") as public_file:
             # Generate proof
+            prove_start = time.perf_counter()
             if use_rapidsnark:
-                self._prove_rapidsnark(circuit, witness_path, proof_path, public_path)
+                self._prove_rapidsnark(circuit, witness, proof_file, public_file)
             else:
-                self._prove_snarkjs(circuit, witness_path, proof_path, public_path)
+                self._prove_snarkjs(circuit, witness, proof_file, public_file)
+            timings.prove_ms = (time.perf_counter() - prove_start) * 1000
 
             # Read results
-            with open(proof_path) as f:
-                proof = json.load(f)
-            with open(public_path) as f:
-                public_signals = json.load(f)
+            read_start = time.perf_counter()
+            proof = json.loads(proof_file.read())
+            public_signals = json.loads(public_file.read())
+            timings.read_ms = (time.perf_counter() - read_start) * 1000
 
-            return proof, public_signals
+        timings.total_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Proved {circuit}: {timings.summary()}")
+        timings.record()
+        return proof, public_signals, timings
 
     def verify(self, circuit: str, proof: Dict[str, Any], public_signals: list) -> bool:
         """
@@ -293,21 +563,25 @@ class RapidsnarkProver:
         """
         paths = self._get_circuit_paths(circuit)
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmpdir = Path(tmpdir)
-            proof_path = tmpdir / "proof.json"
-            public_path = tmpdir / "public.json"
-
-            with open(proof_path, "w") as f:
-                json.dump(proof, f)
-            with open(public_path, "w") as f:
-                json.dump(public_signals, f)
-
-            cmd = f"{self.snarkjs_path} groth16 verify {paths['vkey']} {public_path} {proof_path}"
+        with MemFile("proof.json", json.dumps(proof).encode()) as proof_file, MemFile(
+            "public.json", json.dumps(public_signals).encode()
+        ) as public_file:
+            cmd = [
+                *self.snarkjs_cmd,
+                "groth16",
+                "verify",
+                str(paths["vkey"]),
+                public_file.path,
+                proof_file.path,
+            ]
+            result = _run_with_files(cmd, [proof_file, public_file], timeout=30)
 
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=30)
+        return result.returncode == 0 and "OK" in result.stdout
 
-            return result.returncode == 0 and "OK" in result.stdout
+    def close(self) -> None:
+        """Stop the witness server processes."""
+        if self._witness_servers is not None:
+            self._witness_servers.close()
 
 
 # Singleton instance for convenience
@@ -363,13 +637,14 @@ if __name__ == "__main__":
         import time
 
         start = time.time()
-        proof, public_signals = prover.prove(
+        proof, public_signals, timings = prover.prove_with_timings(
             args.circuit,
             input_data,
             force_snarkjs=args.force_snarkjs,
             force_rapidsnark=args.force_rapidsnark,
         )
         elapsed = time.time() - start
+        print(f"   {timings.summary()}", file=sys.stderr)
 
         result = {"proof": proof, "publicSignals": public_signals}
 
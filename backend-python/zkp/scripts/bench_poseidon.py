@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark native Poseidon against the poseidon-hash.js path.
+
+Before poseidon.py, off-chain hashes came from `node poseidon-hash.js`, one
+Node process per hash. This times, per Poseidon(2) hash:
+  - native: poseidon_many over a batch (what the Merkle tree uses)
+  - js-cli: `node poseidon-hash.js --inputs a,b`, as the API called it
+  - js-inproc: circomlibjs' poseidon() in a single Node loop, for reference
+
+The JS rows need node and `npm install` in zkp/. Outputs are checked for
+equality before timing.
+
+Usage:
+    python zkp/scripts/bench_poseidon.py [--rows 2000] [--cli-calls 10]
+"""
+import argparse
+import json
+import random
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ZKP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ZKP_DIR.parent))
+
+from zkp.poseidon import FIELD_MODULUS, poseidon, poseidon_many  # noqa: E402
+
+INPROC_SCRIPT = """
+import { poseidon } from "circomlibjs";
+const rows = JSON.parse(process.argv[1]).map((r) => r.map(BigInt));
+const start = process.hrtime.bigint();
+const out = rows.map((r) => poseidon(r).toString());
+const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+console.log(JSON.stringify({ seconds, out }));
+"""
+
+
+def js_available() -> bool:
+    return shutil.which("node") is not None and (ZKP_DIR / "node_modules" / "circomlibjs").exists()
+
+
+def hash_with_cli(row) -> int:
+    result = subprocess.run(
+        ["node", "poseidon-hash.js", "--inputs", ",".join(map(str, row))],
+        cwd=ZKP_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return int(json.loads(result.stdout)["poseidon"], 16)
+
+
+def bench_native(rows) -> float:
+    poseidon(rows[0])  # derive the width's parameters outside the timing
+    start = time.perf_counter()
+    poseidon_many(rows)
+    return (time.perf_counter() - start) / len(rows)
+
+
+def bench_cli(rows) -> float:
+    start = time.perf_counter()
+    for row in rows:
+        if hash_with_cli(row) != poseidon(row):
+            raise SystemExit(f"poseidon-hash.js disagrees on {row}")
+    return (time.perf_counter() - start) / len(rows)
+
+
+def bench_inproc(rows) -> float:
+    result = subprocess.run(
+        [
+            "node",
+            "--input-type=module",
+            "-e",
+            INPROC_SCRIPT,
+            json.dumps([list(map(str, r)) for r in rows]),
+        ],
+        cwd=ZKP_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    data = json.loads(result.stdout)
+    if [int(v) for v in data["out"]] != poseidon_many(rows):
+        raise SystemExit("circomlibjs disagrees with native Poseidon")
+    return data["seconds"] / len(rows)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--cli-calls", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(46)
+    rows = [[rng.randrange(FIELD_MODULUS) for _ in range(2)] for _ in range(args.rows)]
+
+    results = {"native": bench_native(rows)}
+    if js_available():
+        results["js-cli"] = bench_cli(rows[: args.cli_calls])
+        results["js-inproc"] = bench_inproc(rows)
+    else:
+        print("node/circomlibjs not installed (npm install in zkp/); JS rows skipped")
+
+    for name, seconds in results.items():
+        print(f"{name:>10}: {seconds * 1e3:8.3f} ms/hash")
+    if "js-cli" in results:
+        print(
+            f"native is {results['js-cli'] / results['native']:.0f}x faster than poseidon-hash.js"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
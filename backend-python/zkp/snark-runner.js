@@ -12,37 +12,25 @@ import { groth16 } from "snarkjs";
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
 
-const circuits = {
-  age: {
-    name: "age",
-    wasm: path.join(__dirname, "artifacts", "age", "age_js", "age.wasm"),
-    zkey: path.join(__dirname, "artifacts", "age", "age_final.zkey"),
-    vkey: path.join(__dirname, "artifacts", "age", "verification_key.json"),
-    publicSignals: ["minAgeOut", "referenceTsOut", "documentHashOut", "commitment", "nullifier"],
-  },
-  age_level3: {
-    name: "age_level3",
-    wasm: path.join(__dirname, "artifacts", "age_level3", "age_level3_js", "age_level3.wasm"),
-    zkey: path.join(__dirname, "artifacts", "age_level3", "age_level3_final.zkey"),
-    vkey: path.join(__dirname, "artifacts", "age_level3", "verification_key.json"),
-    publicSignals: ["referenceTs", "minAge", "userID", "documentHash", "nullifier", "verified"],
-  },
-  authenticity: {
-    name: "authenticity",
-    wasm: path.join(__dirname, "artifacts", "authenticity", "authenticity_js", "authenticity.wasm"),
-    zkey: path.join(__dirname, "artifacts", "authenticity", "authenticity_final.zkey"),
-    vkey: path.join(__dirname, "artifacts", "authenticity", "verification_key.json"),
-    publicSignals: ["rootOut", "leafOut", "epochOut", "nullifier"],
-  },
-  // Level 3 Inequality - for reputation/threshold proofs
-  level3_inequality: {
-    name: "level3_inequality",
-    wasm: path.join(__dirname, "artifacts", "level3_inequality", "Level3Inequality_js", "Level3Inequality.wasm"),
-    zkey: path.join(__dirname, "artifacts", "level3_inequality", "Level3Inequality_final.zkey"),
-    vkey: path.join(__dirname, "artifacts", "level3_inequality", "verification_key.json"),
-    publicSignals: ["threshold", "senderID", "nullifier", "out"],
-  },
-};
+// Circuit names, file stems and public signals are shared with
+// artifact_manager.py through circuits.json
+const manifest = JSON.parse(fs.readFileSync(path.join(__dirname, "circuits.json"), "utf8"));
+const circuits = Object.fromEntries(
+  Object.entries(manifest).map(([name, spec]) => {
+    const stem = spec.stem ?? name;
+    const base = path.join(__dirname, "artifacts", name);
+    return [
+      name,
+      {
+        name,
+        wasm: path.join(base, `${stem}_js`, `${stem}.wasm`),
+        zkey: path.join(base, `${stem}_final.zkey`),
+        vkey: path.join(base, "verification_key.json"),
+        publicSignals: spec.publicSignals ?? [],
+      },
+    ];
+  }),
+);
 
 async function readJsonMaybe(filePath) {
   if (filePath) {
@@ -0,0 +1,159 @@
+"""
+Sparse Poseidon Merkle Tree
+===========================
+
+Fixed-depth binary Merkle tree with Poseidon(2) nodes, matching the
+`MerklePath(16)` template in circuits/authenticity.circom. Empty leaves are
+zero and every empty subtree has a known root (`zeros[level]`), so only
+nodes that differ from their default are stored: a tree holding n leaves
+keeps at most n * depth nodes however large 2**depth is.
+
+Updates are applied level by level and all dirty parents on a level are
+hashed in one `poseidon_many` call. Reading an inclusion path is a dict
+lookup per level, so `proof()` returns the `pathElementsHex`/`pathIndices`
+the authenticity circuit expects in microseconds.
+
+Usage:
+    from zkp.sparse_merkle import SparseMerkleTree
+
+    tree = SparseMerkleTree()
+    indices = tree.insert_many(document_hashes)   # hex digests or ints
+    payload = tree.proof(indices[0])              # leafHex, rootHex, path...
+"""
+
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+
+from zkp.poseidon import FieldInput, field_to_hex, hex_to_field, poseidon, poseidon_many, to_field
+
+AUTHENTICITY_TREE_DEPTH = 16
+
+
+def leaf_to_field(leaf: FieldInput) -> int:
+    """Leaf value as the circuit sees it; bare strings are hex digests."""
+    if isinstance(leaf, str):
+        return hex_to_field(leaf)
+    return to_field(leaf)
+
+
+def zero_hashes(depth: int) -> List[int]:
+    """Roots of empty subtrees: zeros[0] = 0, zeros[i + 1] = H(zeros[i], zeros[i])."""
+    zeros = [0]
+    for _ in range(depth):
+        zeros.append(poseidon([zeros[-1], zeros[-1]]))
+    return zeros
+
+
+class SparseMerkleTree:
+    """Poseidon Merkle tree storing only non-default nodes."""
+
+    def __init__(self, depth: int = AUTHENTICITY_TREE_DEPTH):
+        self.depth = depth
+        self.capacity = 1 << depth
+        self.zeros = zero_hashes(depth)
+        self._nodes: Dict[Tuple[int, int], int] = {}
+        self._next_index = 0
+
+    def __len__(self) -> int:
+        """Number of leaf slots up to the highest one written."""
+        return self._next_index
+
+    def node(self, level: int, index: int) -> int:
+        return self._nodes.get((level, index), self.zeros[level])
+
+    @property
+    def root(self) -> int:
+        return self.node(self.depth, 0)
+
+    @property
+    def root_hex(self) -> str:
+        return field_to_hex(self.root)
+
+    def stored_nodes(self) -> int:
+        """Number of non-default nodes held in memory."""
+        return len(self._nodes)
+
+    def update_many(self, leaves: Mapping[int, FieldInput]) -> None:
+        """Set leaves by index, rehashing each affected node once."""
+        dirty = set()
+        for index, value in leaves.items():
+            if not 0 <= index < self.capacity:
+                raise IndexError(f"Leaf index {index} outside a depth-{self.depth} tree")
+            self._store(0, index, leaf_to_field(value))
+            dirty.add(index >> 1)
+            self._next_index = max(self._next_index, index + 1)
+
+        for level in range(1, self.depth + 1):
+            parents = sorted(dirty)
+            rows, hashed = [], []
+            zero_child = self.zeros[level - 1]
+            for parent in parents:
+                left = self.node(level - 1, 2 * parent)
+                right = self.node(level - 1, 2 * parent + 1)
+                if left == zero_child and right == zero_child:
+                    self._store(level, parent, self.zeros[level])
+                else:
+                    rows.append((left, right))
+                    hashed.append(parent)
+            for parent, value in zip(hashed, poseidon_many(rows)):
+                self._store(level, parent, value)
+            dirty = {parent >> 1 for parent in parents}
+
+    def update(self, index: int, leaf: FieldInput) -> None:
+        self.update_many({index: leaf})
+
+    def insert_many(self, leaves: Iterable[FieldInput]) -> List[int]:
+        """Append leaves after the highest written slot; returns their indices."""
+        leaves = list(leaves)
+        start = self._next_index
+        if start + len(leaves) > self.capacity:
+            raise IndexError(f"Depth-{self.depth} tree holds at most {self.capacity} leaves")
+        self.update_many({start + i: leaf for i, leaf in enumerate(leaves)})
+        return list(range(start, start + len(leaves)))
+
+    def insert(self, leaf: FieldInput) -> int:
+        return self.insert_many([leaf])[0]
+
+    def path(self, index: int) -> Tuple[List[int], List[int]]:
+        """
+        Sibling path for a leaf, leaf to root.
+
+        Returns:
+            (path_elements, path_indices) with path_indices[i] = 0 when the
+            running node is the left input at level i, as in MerklePath
+        """
+        if not 0 <= index < self.capacity:
+            raise IndexError(f"Leaf index {index} outside a depth-{self.depth} tree")
+        elements, indices = [], []
+        for level in range(self.depth):
+            elements.append(self.node(level, index ^ 1))
+            indices.append(index & 1)
+            index >>= 1
+        return elements, indices
+
+    def proof(self, index: int) -> Dict[str, object]:
+        """Authenticity circuit inputs (hex without prefix) for one leaf."""
+        elements, indices = self.path(index)
+        return {
+            "leafHex": field_to_hex(self.node(0, index)),
+            "rootHex": self.root_hex,
+            "pathElementsHex": [field_to_hex(e) for e in elements],
+            "pathIndices": indices,
+        }
+
+    @staticmethod
+    def verify_path(
+        leaf: FieldInput, root: FieldInput, elements: Sequence[int], indices: Sequence[int]
+    ) -> bool:
+        """Recompute the root from a leaf and its path."""
+        current = leaf_to_field(leaf)
+        for sibling, side in zip(elements, indices):
+            sibling = leaf_to_field(sibling)
+            pair = [sibling, current] if side else [current, sibling]
+            current = poseidon(pair)
+        return current == leaf_to_field(root)
+
+    def _store(self, level: int, index: int, value: int) -> None:
+        if value == self.zeros[level]:
+            self._nodes.pop((level, index), None)
+        else:
+            self._nodes[(level, index)] = value
@@ -0,0 +1,54 @@
+#!/usr/bin/env node
+/**
+ * Persistent WASM witness calculator for rapidsnark_prover.py.
+ *
+ * Keeps each circuit's witness calculator compiled in memory and answers
+ * requests over stdio, so a proof pays neither node startup, npx resolution
+ * nor WASM compilation. One JSON line per request:
+ *   {"wasm": "/path/to/circuit.wasm", "input": {...}}
+ * One frame per response:
+ *   status (uint8, 0 = ok) | length (uint32 BE) | .wtns bytes or UTF-8 error
+ */
+import fs from "fs";
+import readline from "readline";
+import { WitnessCalculatorBuilder } from "circom_runtime";
+
+// Circuit log() output must not interleave with response frames on stdout
+console.log = console.error;
+
+const calculators = new Map();
+
+async function calculatorFor(wasmPath) {
+  let calculator = calculators.get(wasmPath);
+  if (!calculator) {
+    calculator = await WitnessCalculatorBuilder(fs.readFileSync(wasmPath));
+    calculators.set(wasmPath, calculator);
+  }
+  return calculator;
+}
+
+function frame(status, payload) {
+  const header = Buffer.alloc(5);
+  header.writeUInt8(status, 0);
+  header.writeUInt32BE(payload.length, 1);
+  return Buffer.concat([header, payload]);
+}
+
+async function write(buffer) {
+  if (!process.stdout.write(buffer)) {
+    await new Promise((resolve) => process.stdout.once("drain", resolve));
+  }
+}
+
+const lines = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+for await (const line of lines) {
+  if (!line.trim()) continue;
+  try {
+    const { wasm, input } = JSON.parse(line);
+    const calculator = await calculatorFor(wasm);
+    const witness = await calculator.calculateWTNSBin(input, 0);
+    await write(frame(0, Buffer.from(witness)));
+  } catch (err) {
+    await write(frame(1, Buffer.from(String(err?.message ?? err))));
+  }
+}
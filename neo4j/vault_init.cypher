@@ -1,4 +1,5 @@
 // Neo4j schema extensions for Personal Proof Vault MVP
+// Applied automatically as migration 1 of backend-python/api/schema_migrations.py
 
 // Constraints for Document nodes
 CREATE CONSTRAINT document_id_unique IF NOT EXISTS FOR (d:Document) REQUIRE d.id IS UNIQUE;